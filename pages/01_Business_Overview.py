@@ -12,10 +12,18 @@ import pandas as pd
 import plotly.express as px
 import streamlit as st
 
-from utils.data_functions import get_customer_360_segments, get_global_kpis
+from utils.data_functions import (
+    finish_page_run,
+    get_aum_trend,
+    get_customer_360_segments,
+    get_exposure,
+    get_global_kpis,
+    start_page_run,
+)
 from utils.personas import get_persona_info, get_section_insights
 
 st.set_page_config(page_title="Business Overview", page_icon=None, layout="wide")
+start_page_run("01_Business_Overview")
 
 # Get current persona from session state
 selected_persona = st.session_state.get("selected_persona", "executive")
@@ -493,27 +501,41 @@ st.markdown("### **AI-Enhanced Visual Analytics**")
 viz_col1, viz_col2 = st.columns(2)
 
 with viz_col1:
-    # AI-optimized AUM growth trend
-    dates = pd.date_range(start="2024-01-01", end="2024-12-31", freq="M")
-    aum_trend = pd.DataFrame(
-        {
-            "Month": dates,
-            "AUM": [850 + i * 15 + np.random.normal(0, 5) for i in range(len(dates))],
-            "AI_Forecast": [
-                850 + i * 17 + 2 for i in range(len(dates))
-            ],  # AI prediction
-        }
-    )
-
-    fig_trend = px.line(
-        aum_trend,
-        x="Month",
-        y=["AUM", "AI_Forecast"],
-        title="AUM Growth: Actual vs AI Forecast",
-        labels={"value": "AUM ($ Millions)", "variable": "Data Type"},
-    )
-    fig_trend.update_traces(line=dict(dash="dash"), selector=dict(name="AI_Forecast"))
-    st.plotly_chart(fig_trend, use_container_width=True)
+    # AUM growth trend from the daily portfolio value grid, with a linear
+    # projection of the trailing year carried three months forward
+    aum_trend = get_aum_trend(months=12, freq="M")
+    if len(aum_trend) >= 2:
+        aum_trend = aum_trend.rename(columns={"DATE": "Month"})
+        aum_trend["AUM"] = aum_trend["AUM"] / 1e6
+        # The last point may be a partial month, so project from the month
+        # ends after the month containing it and regress on elapsed time
+        # rather than on the point index
+        future = pd.date_range(
+            aum_trend["Month"].iloc[-1] + pd.offsets.MonthEnd(0),
+            periods=4,
+            freq=pd.offsets.MonthEnd(),
+        )[1:]
+        actual = len(aum_trend)
+        aum_trend = pd.concat(
+            [aum_trend, pd.DataFrame({"Month": future})], ignore_index=True
+        )
+        x = (aum_trend["Month"] - aum_trend["Month"].iloc[0]).dt.days / 30.4375
+        slope, intercept = np.polyfit(x[:actual], aum_trend["AUM"][:actual], 1)
+        aum_trend["AI_Forecast"] = intercept + slope * x
+
+        fig_trend = px.line(
+            aum_trend,
+            x="Month",
+            y=["AUM", "AI_Forecast"],
+            title="AUM Growth: Actual vs AI Forecast",
+            labels={"value": "AUM ($ Millions)", "variable": "Data Type"},
+        )
+        fig_trend.update_traces(
+            line=dict(dash="dash"), selector=dict(name="AI_Forecast")
+        )
+        st.plotly_chart(fig_trend, use_container_width=True)
+    else:
+        st.info("Not enough position history to plot the AUM trend")
 
 with viz_col2:
     # AI-classified client segments
@@ -528,6 +550,49 @@ with viz_col2:
         )
         st.plotly_chart(fig_segments, use_container_width=True)
 
+# Firm exposure from the latest-position cube
+st.divider()
+st.markdown("### **Firm Exposure Explorer**")
+
+exposure_dims = {
+    "Asset Class": "ASSET_CLASS",
+    "Strategy": "STRATEGY_TYPE",
+    "Ticker": "TICKER",
+    "State": "STATE",
+    "Wealth Segment": "WEALTH_SEGMENT",
+    "Risk Tolerance": "RISK_TOLERANCE",
+    "Advisor": "ADVISOR_ID",
+}
+exp_col1, exp_col2 = st.columns(2)
+with exp_col1:
+    primary_dim = st.selectbox("Exposure by", list(exposure_dims), key="exposure_by")
+with exp_col2:
+    split_dim = st.selectbox(
+        "Split by",
+        ["None"] + [dim for dim in exposure_dims if dim != primary_dim],
+        key="exposure_split",
+    )
+
+exposure_by = (exposure_dims[primary_dim],)
+if split_dim != "None":
+    exposure_by += (exposure_dims[split_dim],)
+exposure = get_exposure(exposure_by, exclude={"TICKER": "CASH"})
+if not exposure.empty:
+    top_keys = exposure.groupby(exposure_by[0])["MARKET_VALUE"].sum().nlargest(20)
+    exposure = exposure[exposure[exposure_by[0]].isin(top_keys.index)]
+    fig_exposure = px.bar(
+        exposure,
+        x=exposure_by[0],
+        y="MARKET_VALUE",
+        color=exposure_by[1] if len(exposure_by) > 1 else None,
+        title=f"Non-Cash Exposure by {primary_dim}",
+        labels={"MARKET_VALUE": "Market Value ($)", exposure_by[0]: primary_dim},
+        category_orders={exposure_by[0]: list(top_keys.index)},
+    )
+    st.plotly_chart(fig_exposure, use_container_width=True)
+else:
+    st.info("No positions available for exposure analysis")
+
 # Cortex AI Performance Metrics
 st.divider()
 st.markdown("### **Cortex AI Performance Dashboard**")
@@ -560,3 +625,5 @@ st.markdown(
 - **Final**: Real-Time Intelligence & Advanced Capabilities
 """
 )
+
+finish_page_run()
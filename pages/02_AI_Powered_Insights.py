@@ -7,14 +7,40 @@ AI_COMPLETE, AI_CLASSIFY, AI_SENTIMENT, AI_SUMMARIZE_AGG, and more.
 Author: Deepjyoti Dev, Senior Data Cloud Architect, Snowflake GXC Team
 """
 
+import time
+
 import pandas as pd
 import plotly.express as px
 import streamlit as st
 
-from utils.data_functions import get_sentiment_analysis
+from utils.context_builder import ground_prompt
+from utils.data_functions import (
+    find_similar_clients,
+    finish_page_run,
+    get_client_embedding_index,
+    get_completion_provider,
+    get_grounding_context,
+    get_hierarchical_summarizer,
+    get_interaction_score_summary,
+    get_interaction_summaries,
+    get_llm_telemetry,
+    get_model_fanout,
+    get_notes_classifier,
+    get_response_cache,
+    get_sentiment_analysis,
+    get_stream_metrics,
+    run_ai_filter,
+    score_new_interactions,
+    start_page_run,
+    stream_ai_complete,
+)
+from utils.filter_cascade import FILTER_SCENARIOS
+from utils.llm_streaming import MockProvider
+from utils.model_fanout import FanoutTarget, leaderboard, simulated_provider
 from utils.personas import get_persona_info, get_section_insights
 
 st.set_page_config(page_title="AI-Powered Insights", page_icon=None, layout="wide")
+start_page_run("02_AI_Powered_Insights")
 
 # Get current persona from session state
 selected_persona = st.session_state.get("selected_persona", "executive")
@@ -32,6 +58,15 @@ default_temperature = st.sidebar.slider(
 )
 max_tokens = st.sidebar.slider("Max Response Tokens", 100, 2000, 500, 50)
 use_context = st.sidebar.checkbox(" Use Business Context", value=True)
+context_budget = st.sidebar.slider(
+    "Context Budget (tokens)",
+    200,
+    2000,
+    600,
+    100,
+    disabled=not use_context,
+    help="Upper bound on the book-of-business facts added to each prompt",
+)
 
 # AI Provider Preferences
 st.sidebar.markdown("### **Provider Preferences**")
@@ -52,11 +87,19 @@ compliance_mode = st.sidebar.selectbox(
     "Compliance Mode", ["Standard", "GDPR", "Financial Services", "Healthcare"], index=2
 )
 
-# Real-time AI Monitoring
+# Real-time AI Monitoring (measured by the local call telemetry)
 st.sidebar.markdown("### **Real-time AI Monitoring**")
-ai_queries_today = st.sidebar.metric("AI Queries Today", "1,247", "↗ +89")
-avg_response_time = st.sidebar.metric("Avg Response Time", "1.3s", "↘ -0.2s")
-ai_accuracy_score = st.sidebar.metric("AI Accuracy Score", "94.7%", "↗ +1.2%")
+telemetry_today = get_llm_telemetry().totals(since_seconds=86400)
+st.sidebar.metric("AI Calls (24h)", f"{telemetry_today['calls']:,}")
+st.sidebar.metric(
+    "Median Model Latency",
+    (
+        f"{telemetry_today['p50_latency_seconds']:.2f}s"
+        if telemetry_today["p50_latency_seconds"] is not None
+        else "-"
+    ),
+)
+st.sidebar.metric("Cache Hit Rate (24h)", f"{telemetry_today['cache_hit_rate']:.0%}")
 
 # Quick AI Actions
 st.sidebar.markdown("### **Quick AI Actions**")
@@ -231,8 +274,9 @@ with cortex_tabs[0]:
                 ],
             )
         else:  # All Models
-            model_choice = st.selectbox(
-                "Select Any AI Model:",
+            # Every selected model is queried concurrently on Generate
+            compare_choices = st.multiselect(
+                "Compare AI Models:",
                 [
                     # Snowflake Cortex
                     "🟦 llama3.1-405b (Cortex - Highest Quality)",
@@ -253,7 +297,14 @@ with cortex_tabs[0]:
                     "🟠 command-r+ (Cohere)",
                     " llama2-70b (Meta)",
                 ],
+                default=[
+                    "🟦 llama3.1-70b (Cortex - Balanced)",
+                    "🟦 snowflake-arctic (Cortex - Native)",
+                    "🟢 gpt-4o (OpenAI - Latest)",
+                    "🟣 claude-3.5-sonnet (Claude - Latest)",
+                ],
             )
+            model_choice = "All Models"
 
         if st.button(" Generate AI Response", type="primary", use_container_width=True):
             # Determine response style based on selected provider
@@ -336,72 +387,225 @@ with cortex_tabs[0]:
             """,
             )
 
-            st.success(f" **{provider_prefix} Analysis Complete:**")
-            st.markdown(response)
+            # Ground the question in a compact digest of current alerts and
+            # opportunities (cached per persona and data version)
+            completion_prompt = user_prompt or query_type
+            if use_context:
+                grounding = get_grounding_context(selected_persona, context_budget)
+                if grounding["text"]:
+                    completion_prompt = ground_prompt(
+                        completion_prompt, grounding["text"]
+                    )
+                    with st.expander(
+                        f"Grounding context - {grounding['tokens']} tokens, "
+                        f"{grounding['facts_used']} of {grounding['facts_total']} facts"
+                        + (" (cached)" if grounding["cached"] else ""),
+                        expanded=False,
+                    ):
+                        st.code(grounding["text"], language="text")
+
+            if model_provider == " All Models":
+                # One prompt to every selected model at once; answers render
+                # as they arrive. Models without an SDK/API key (and empty
+                # prompts) answer through simulated providers.
+                targets = []
+                for choice in compare_choices:
+                    model_id = next(t for t in choice.split() if t[0].isalnum())
+                    provider_name = {
+                        "🟦": "cortex",
+                        "🟢": "openai",
+                        "🟣": "anthropic",
+                    }.get(choice.split()[0])
+                    provider = (
+                        get_completion_provider(provider_name)
+                        if provider_name
+                        else None
+                    )
+                    if (
+                        provider is None
+                        or not provider.available()
+                        or not user_prompt.strip()
+                    ):
+                        provider = simulated_provider(
+                            model_id, lambda prompt, model: response
+                        )
+                        model_id = f"{model_id} (simulated)"
+                    targets.append(
+                        FanoutTarget(choice.split("(")[0].strip(), provider, model_id)
+                    )
 
-            # Add provider-specific notes
-            if "Cortex" in provider_prefix:
-                st.info(
-                    " **Cortex Advantage**: Data stays secure within Snowflake, enterprise-grade governance, cost-effective at scale"
-                )
-            elif "OpenAI" in provider_prefix:
-                st.info(
-                    " **OpenAI (External API)**: Example integration; for governed deployments use Cortex-hosted models"
+                slots = {target.label: st.empty() for target in targets}
+                for label, slot in slots.items():
+                    slot.info(f"**{label}** - waiting for answer...")
+                started = time.perf_counter()
+                results = []
+                for result in get_model_fanout().stream(
+                    completion_prompt,
+                    targets,
+                    temperature=default_temperature,
+                    max_tokens=max_tokens,
+                ):
+                    results.append(result)
+                    with slots[result["LABEL"]].container():
+                        if result["STATUS"] == "ok":
+                            with st.expander(
+                                f"{result['LABEL']} - {result['LATENCY_SECONDS']:.1f}s, "
+                                f"{result['OUTPUT_TOKENS']} tokens",
+                                expanded=len(results) == 1,
+                            ):
+                                st.markdown(result["TEXT"])
+                        else:
+                            st.warning(
+                                f"**{result['LABEL']}** {result['STATUS']} after "
+                                f"{result['ATTEMPTS']} attempt(s): {result['ERROR']}"
+                            )
+                wall_seconds = time.perf_counter() - started
+
+                board = leaderboard(results)
+                st.session_state["model_leaderboard"] = board
+                serial_seconds = board["LATENCY_SECONDS"].sum()
+                wall_col1, wall_col2 = st.columns(2)
+                wall_col1.metric("Comparison Wall Time", f"{wall_seconds:.1f}s")
+                wall_col2.metric(
+                    "Sequential Estimate",
+                    f"{serial_seconds:.1f}s",
+                    delta=f"{serial_seconds - wall_seconds:.1f}s saved",
+                    delta_color="off",
                 )
-            elif "Claude" in provider_prefix:
-                st.info(
-                    " **Claude (External API)**: Example integration; use Cortex-hosted Claude-compatible models for in-platform governance"
+            else:
+                # Answers stream token by token (cached ones replay at once).
+                # External providers without an SDK/API key, and empty prompts,
+                # stream the sample answer through a simulated provider instead.
+                model_id = next(t for t in model_choice.split() if t[0].isalnum())
+                provider_name = {
+                    "Cortex AI": "cortex",
+                    "OpenAI": "openai",
+                    "Claude": "anthropic",
+                }.get(provider_prefix)
+                provider = (
+                    get_completion_provider(provider_name) if provider_name else None
                 )
-
-            # Show simulated SQL/Code based on provider
-            if "Cortex" in provider_prefix:
-                st.markdown("** Generated Snowflake SQL:**")
-                st.code(
-                    f"""
-SELECT SNOWFLAKE.CORTEX.AI_COMPLETE(
-    '{model_choice.split(' ')[0]}',
-    'Context: Wealth management firm with $895M AUM, 450 clients, 25 advisors.
-     Query: {user_prompt[:100]}...'
-) AS ai_response;
-                """,
-                    language="sql",
+                simulated = (
+                    provider is None
+                    or not provider.available()
+                    or not user_prompt.strip()
                 )
-            elif "OpenAI" in provider_prefix:
-                st.markdown("** OpenAI API Integration:**")
-                st.code(
-                    f"""
-import openai
-
-response = openai.ChatCompletion.create(
-    model="{model_choice.split(' ')[0]}",
-    messages=[
-        {{"role": "system", "content": "You are a wealth management AI assistant."}},
-        {{"role": "user", "content": "{user_prompt[:100]}..."}}
-    ],
-    temperature=0.3
-)
-                """,
-                    language="python",
-                )
-            elif "Claude" in provider_prefix:
-                st.markdown("** Anthropic Claude Integration:**")
-                st.code(
-                    f"""
-import anthropic
-
-client = anthropic.Anthropic(api_key="your-api-key")
-response = client.messages.create(
-    model="{model_choice.split(' ')[0]}",
-    max_tokens=1000,
-    messages=[
-        {{"role": "user", "content": "{user_prompt[:100]}..."}}
-    ]
-)
-                """,
-                    language="python",
+                if simulated:
+                    provider = MockProvider(lambda prompt, model: response)
+                    model_id = f"{model_id} (simulated)"
+
+                # A new request supersedes any stream still running for this session
+                previous = st.session_state.pop("active_completion_stream", None)
+                if previous is not None:
+                    previous.cancel()
+                stream, cache_info = stream_ai_complete(
+                    completion_prompt,
+                    model_id,
+                    provider=provider,
+                    fallback=response,
+                    use_cache=not simulated,
+                    temperature=default_temperature,
+                    max_tokens=max_tokens,
                 )
+                st.session_state["active_completion_stream"] = stream
+
+                st.success(f" **{provider_prefix} Analysis Complete:**")
+                if cache_info["match"] in ("exact", "semantic"):
+                    st.caption(
+                        f"Served from response cache ({cache_info['match']} match, "
+                        f"similarity {cache_info['similarity']:.2f}, "
+                        f"cached {cache_info['age_seconds']:.0f}s ago)"
+                    )
+                st.write_stream(stream)
+                st.session_state.pop("active_completion_stream", None)
+                if stream.stats.get("ttft_seconds") is not None:
+                    st.caption(
+                        f"{model_id}: first token {stream.stats['ttft_seconds']:.2f}s, "
+                        f"{stream.stats['tokens']} tokens in "
+                        f"{stream.stats['total_seconds']:.1f}s"
+                    )
+
+                # Add provider-specific notes
+                if "Cortex" in provider_prefix:
+                    st.info(
+                        " **Cortex Advantage**: Data stays secure within Snowflake, enterprise-grade governance, cost-effective at scale"
+                    )
+                elif "OpenAI" in provider_prefix:
+                    st.info(
+                        " **OpenAI (External API)**: Example integration; for governed deployments use Cortex-hosted models"
+                    )
+                elif "Claude" in provider_prefix:
+                    st.info(
+                        " **Claude (External API)**: Example integration; use Cortex-hosted Claude-compatible models for in-platform governance"
+                    )
+
+                # Show simulated SQL/Code based on provider
+                if "Cortex" in provider_prefix:
+                    st.markdown("** Generated Snowflake SQL:**")
+                    st.code(
+                        f"""
+    SELECT SNOWFLAKE.CORTEX.AI_COMPLETE(
+        '{model_choice.split(' ')[0]}',
+        'Context: Wealth management firm with $895M AUM, 450 clients, 25 advisors.
+         Query: {user_prompt[:100]}...'
+    ) AS ai_response;
+                    """,
+                        language="sql",
+                    )
+                elif "OpenAI" in provider_prefix:
+                    st.markdown("** OpenAI API Integration:**")
+                    st.code(
+                        f"""
+    import openai
+
+    response = openai.ChatCompletion.create(
+        model="{model_choice.split(' ')[0]}",
+        messages=[
+            {{"role": "system", "content": "You are a wealth management AI assistant."}},
+            {{"role": "user", "content": "{user_prompt[:100]}..."}}
+        ],
+        temperature=0.3
+    )
+                    """,
+                        language="python",
+                    )
+                elif "Claude" in provider_prefix:
+                    st.markdown("** Anthropic Claude Integration:**")
+                    st.code(
+                        f"""
+    import anthropic
+
+    client = anthropic.Anthropic(api_key="your-api-key")
+    response = client.messages.create(
+        model="{model_choice.split(' ')[0]}",
+        max_tokens=1000,
+        messages=[
+            {{"role": "user", "content": "{user_prompt[:100]}..."}}
+        ]
+    )
+                    """,
+                        language="python",
+                    )
 
     with col2:
+        cache_summary = get_response_cache().summary()
+        st.markdown("** Response Cache**")
+        cache_col1, cache_col2 = st.columns(2)
+        cache_col1.metric("Cached Answers", cache_summary["entries"])
+        cache_col2.metric("Hit Rate", f"{cache_summary['hit_rate']:.0%}")
+
+        stream_summary = get_stream_metrics().summary()
+        if not stream_summary.empty:
+            st.markdown("** Streaming Latency**")
+            st.dataframe(
+                stream_summary.drop(columns="CANCELLED").style.format(
+                    {"TTFT_SECONDS": "{:.2f}", "TOKENS_PER_SECOND": "{:.0f}"},
+                    na_rep="-",
+                ),
+                hide_index=True,
+                use_container_width=True,
+            )
+
         st.markdown("** Model Performance**")
 
         # Multi-provider model comparison metrics
@@ -437,6 +641,26 @@ response = client.messages.create(
                     "Cost ($/1K tokens)": [0.012, 0.025, 0.004, 0.010],
                 }
             )
+        elif "model_leaderboard" in st.session_state:
+            model_metrics = (
+                st.session_state["model_leaderboard"]
+                .set_index("LABEL")[
+                    ["STATUS", "LATENCY_SECONDS", "OUTPUT_TOKENS", "COST_USD"]
+                ]
+                .rename(
+                    columns={
+                        "STATUS": "Status",
+                        "LATENCY_SECONDS": "Speed (sec)",
+                        "OUTPUT_TOKENS": "Tokens",
+                        "COST_USD": "Est. Cost ($)",
+                    }
+                )
+                .reset_index()
+                .rename(columns={"LABEL": "Model"})
+                .style.format(
+                    {"Speed (sec)": "{:.2f}", "Est. Cost ($)": "{:.5f}"}, na_rep="-"
+                )
+            )
         else:  # All Models
             model_metrics = pd.DataFrame(
                 {
@@ -603,34 +827,38 @@ FROM client_interactions;
     with col2:
         st.markdown("** Classification Analytics**")
 
-        # Classification distribution
-        class_data = pd.DataFrame(
-            {
-                "Category": [
-                    "Risk Adjustment",
-                    "Satisfaction",
-                    "Complaints",
-                    "Product Interest",
-                    "Liquidity",
-                ],
-                "Count": [23, 45, 8, 31, 12],
-                "Priority": ["High", "Medium", "Critical", "Medium", "High"],
-            }
+        # Labels come from the persisted batch scores; scoring only sends
+        # interactions that are new or edited since the last run
+        scoring_backend = st.radio(
+            "Scoring backend",
+            ["cortex", "local"],
+            format_func={"cortex": "Cortex", "local": "Local stand-in"}.get,
+            horizontal=True,
+            key="interaction_scoring_backend",
         )
+        if st.button("Score New Interactions", use_container_width=True):
+            with st.spinner("Scoring new and edited interactions..."):
+                run = score_new_interactions(scoring_backend)
+            st.caption(
+                f"{run['SCORED']:,} of {run['PENDING']:,} pending scored "
+                f"in {run['CHUNKS']} chunks"
+                + (f" ({run['FAILED_CHUNKS']} failed)" if run["FAILED_CHUNKS"] else "")
+            )
 
-        fig = px.bar(
-            class_data,
-            x="Category",
-            y="Count",
-            color="Priority",
-            title="Weekly Classification Summary",
-            color_discrete_map={
-                "Critical": "#FF4444",
-                "High": "#FFA500",
-                "Medium": "#90EE90",
-            },
-        )
-        st.plotly_chart(fig, use_container_width=True)
+        class_data = get_interaction_score_summary(scoring_backend)
+        if class_data.empty:
+            st.info("No interactions scored yet - run a scoring pass.")
+        else:
+            fig = px.bar(
+                class_data,
+                x="CATEGORY",
+                y="INTERACTIONS",
+                color="AVG_SENTIMENT",
+                title="Interaction Classification Summary",
+                color_continuous_scale=["#FF4444", "#FFD700", "#90EE90"],
+                range_color=[-1, 1],
+            )
+            st.plotly_chart(fig, use_container_width=True)
 
 # AI_SENTIMENT Demonstration
 with cortex_tabs[2]:
@@ -691,30 +919,10 @@ with cortex_tabs[2]:
     )
 
     if st.button("Analyze Sentiment", use_container_width=True):
-        # Simulate AI_SENTIMENT
-        # Simple sentiment scoring based on keywords
-        positive_words = [
-            "exceptional",
-            "happy",
-            "satisfied",
-            "great",
-            "excellent",
-            "fantastic",
-            "pleased",
-        ]
-        negative_words = [
-            "terrible",
-            "awful",
-            "disappointed",
-            "frustrated",
-            "angry",
-            "upset",
-            "horrible",
-        ]
-
-        text_lower = sample_text.lower()
-        pos_count = sum(1 for word in positive_words if word in text_lower)
-        neg_count = sum(1 for word in negative_words if word in text_lower)
+        # Simulate AI_SENTIMENT with the shared keyword classifier
+        scored = get_notes_classifier().score_text(sample_text)
+        pos_count = max(scored["SENTIMENT_VALUE"], 0)
+        neg_count = max(-scored["SENTIMENT_VALUE"], 0)
 
         if pos_count > neg_count:
             sentiment_score = 0.7 + (pos_count - neg_count) * 0.1
@@ -748,48 +956,60 @@ with cortex_tabs[3]:
     with col1:
         st.markdown("**Client Feedback Summary by Segment**")
 
-        # Simulate aggregated summaries
-        segment_summaries = {
-            "Ultra HNW": """
-           **Ultra HNW Client Feedback Summary (47 interactions):**
-            Clients express high satisfaction with personalized service and exclusive access to alternative investments.
-            Key themes: appreciation for dedicated relationship managers, interest in private equity opportunities,
-            and requests for more sophisticated tax optimization strategies. Overall sentiment: Very Positive (+0.83)
-            """,
-            "Very HNW": """
-           **Very HNW Client Feedback Summary (83 interactions):**
-            Strong performance satisfaction with some concerns about market volatility impact.
-            Key themes: desire for more frequent portfolio reviews, interest in ESG investing options,
-            and appreciation for proactive communication during market downturns. Overall sentiment: Positive (+0.67)
-            """,
-            "HNW": """
-           **HNW Client Feedback Summary (124 interactions):**
-            Mixed feedback with emphasis on fee transparency and communication frequency.
-            Key themes: requests for digital tools access, concerns about advisor availability,
-            and positive responses to educational content. Overall sentiment: Neutral (+0.23)
-            """,
-        }
-
+        # Notes are summarized per client chunk, then merged per advisor,
+        # segment and firm; cached nodes are reused until their inputs change
+        summary_backend = st.radio(
+            "Summarizer",
+            ["cortex", "local"],
+            format_func={"cortex": "Cortex", "local": "Local stand-in"}.get,
+            horizontal=True,
+            key="summary_backend",
+        )
         selected_segment = st.selectbox(
-            "Select wealth segment for summary:", list(segment_summaries.keys())
+            "Select wealth segment for summary:",
+            ["Ultra HNW", "Very HNW", "HNW", "Emerging HNW", "Mass Affluent"],
         )
 
         if st.button("Generate AI Summary", use_container_width=True):
-            st.success(" **Cortex AI Summary Generated:**")
-            st.markdown(segment_summaries[selected_segment])
+            with st.spinner("Summarizing new and changed interaction notes..."):
+                st.session_state["interaction_summaries"] = get_interaction_summaries(
+                    days=90, backend=summary_backend
+                )
+
+        summaries = st.session_state.get("interaction_summaries", pd.DataFrame())
+        if not summaries.empty:
+            segment = summaries[
+                (summaries["LEVEL"] == "WEALTH_SEGMENT")
+                & (summaries["WEALTH_SEGMENT"] == selected_segment)
+            ]
+            if segment.empty:
+                st.info(f"No {selected_segment} interaction notes in the last 90 days.")
+            else:
+                segment = segment.iloc[0]
+                st.success(" **Cortex AI Summary Generated:**")
+                st.markdown(
+                    f"**{selected_segment} Client Feedback Summary "
+                    f"({segment['INTERACTIONS']:,} interactions):**"
+                )
+                st.markdown(segment["SUMMARY"])
+
+                advisors = summaries[
+                    (summaries["LEVEL"] == "ADVISOR_ID")
+                    & (summaries["WEALTH_SEGMENT"] == selected_segment)
+                ]
+                with st.expander(f"Advisor summaries ({len(advisors)})"):
+                    for advisor in advisors.itertuples():
+                        st.markdown(
+                            f"**{advisor.ADVISOR_ID}** "
+                            f"({advisor.INTERACTIONS} interactions): {advisor.SUMMARY}"
+                        )
 
             st.code(
                 """
-SELECT
-    wealth_segment,
-    SNOWFLAKE.CORTEX.AI_SUMMARIZE_AGG(
-        feedback_text,
-        'Summarize client feedback themes and sentiment for executive review'
-    ) AS segment_summary
-FROM client_feedback f
-JOIN clients c ON f.client_id = c.client_id
-WHERE feedback_date >= CURRENT_DATE - 90
-GROUP BY wealth_segment;
+-- Map: summarize each client's notes in context-sized chunks
+SELECT AI_COMPLETE('mistral-large2', :instruction || :chunk_notes);
+-- Reduce: merge child summaries per advisor, segment and firm
+SELECT AI_COMPLETE('mistral-large2', :instruction || :child_summaries);
             """,
                 language="sql",
             )
@@ -797,55 +1017,91 @@ GROUP BY wealth_segment;
     with col2:
         st.markdown("** Summary Metrics**")
 
-        metrics_data = pd.DataFrame(
-            {
-                "Segment": ["Ultra HNW", "Very HNW", "HNW"],
-                "Interactions": [47, 83, 124],
-                "Avg Sentiment": [0.83, 0.67, 0.23],
-                "Key Issues": [2, 4, 7],
-            }
-        )
-
-        st.dataframe(metrics_data, hide_index=True)
+        if summaries.empty:
+            st.caption("Generate a summary to see segment metrics.")
+        else:
+            metrics_data = (
+                summaries[summaries["LEVEL"] == "CLIENT_ID"]
+                .groupby("WEALTH_SEGMENT")
+                .agg(
+                    Interactions=("INTERACTIONS", "sum"),
+                    Clients=("CLIENT_ID", "nunique"),
+                )
+                .reset_index()
+                .rename(columns={"WEALTH_SEGMENT": "Segment"})
+                .sort_values("Interactions", ascending=False)
+            )
+            st.dataframe(metrics_data, hide_index=True)
+
+            cache_stats = get_hierarchical_summarizer(summary_backend).summary()
+            st.metric(
+                "Reused Summaries",
+                f"{summaries['CACHED'].mean():.0%}",
+                delta=f"{cache_stats['calls']:,} summarizer calls total",
+                delta_color="off",
+            )
 
 # AI_FILTER and AI_EMBED demonstrations in remaining tabs
 with cortex_tabs[4]:
     st.markdown("### **AI_FILTER: Smart Data Filtering**")
     st.caption("Use natural language to filter and query data")
 
-    # Demo filtering scenarios
-    filter_examples = [
-        "Clients who mentioned risk concerns in the last 30 days",
-        "Portfolios that may need rebalancing based on recent performance",
-        "Advisors with high client satisfaction ratings",
-        "Interactions that indicate potential churn risk",
-    ]
-
-    selected_filter = st.selectbox("Select filter scenario:", filter_examples)
+    # Cheap predicates and an embedding shortlist run first; only the
+    # surviving candidates reach the AI_FILTER judge, in batches
+    filter_col1, filter_col2 = st.columns([3, 1])
+    selected_filter = filter_col1.selectbox(
+        "Select filter scenario:", list(FILTER_SCENARIOS)
+    )
+    filter_backend = filter_col2.radio(
+        "Judge",
+        ["cortex", "local"],
+        format_func={"cortex": "Cortex", "local": "Local stand-in"}.get,
+        key="ai_filter_backend",
+    )
 
     if st.button("Apply AI Filter", use_container_width=True):
-        st.success(f" **Filter Applied**: {selected_filter}")
-        st.markdown("**Sample Results:**")
+        with st.spinner("Running filter cascade..."):
+            matches, stage_stats = run_ai_filter(selected_filter, filter_backend)
 
-        # Show sample filtered results
-        if "risk concerns" in selected_filter:
-            st.markdown(
-                """
-            - **Sarah Chen**: "Worried about tech stock exposure"
-            - **Michael Torres**: "Market volatility keeping me up at night"
-            - **Dr. Jennifer Wu**: "Should we reduce equity allocation?"
-            """
+        st.success(f" **Filter Applied**: {selected_filter}")
+        if not stage_stats.empty:
+            scanned = int(stage_stats["ROWS_IN"].iloc[0])
+            judged = int(stage_stats["ROWS_IN"].iloc[-1])
+            stat_col1, stat_col2, stat_col3 = st.columns(3)
+            stat_col1.metric("Rows Scanned", f"{scanned:,}")
+            stat_col2.metric(
+                "Sent to AI_FILTER",
+                f"{judged:,}",
+                delta=f"{judged / max(scanned, 1):.1%} of rows",
+                delta_color="off",
+            )
+            stat_col3.metric("Matches", f"{len(matches):,}")
+            st.dataframe(
+                stage_stats.style.format(
+                    {"SELECTIVITY": "{:.2%}", "SECONDS": "{:.3f}"}
+                ),
+                hide_index=True,
+                use_container_width=True,
             )
 
+        if matches.empty:
+            st.info("No interactions matched this filter.")
+        else:
+            st.markdown("**Sample Results:**")
+            for match in matches.head(5).itertuples():
+                st.markdown(
+                    f"- **{match.FIRST_NAME} {match.LAST_NAME}** "
+                    f"({match.INTERACTION_TYPE}, {str(match.TIMESTAMP)[:10]}): "
+                    f"{match.PURPOSE_SUBJECT} - {match.OUTCOME_NOTES}"
+                )
+
         st.code(
             f"""
-SELECT client_id, interaction_text, timestamp
-FROM client_interactions
-WHERE SNOWFLAKE.CORTEX.AI_FILTER(
-    interaction_text,
-    '{selected_filter}'
-) = TRUE
-ORDER BY timestamp DESC;
+-- Only the pre-filtered shortlist is judged, one query per batch
+SELECT f.INDEX, AI_FILTER(CONCAT(
+    '{FILTER_SCENARIOS[selected_filter].question}',
+    '\\n\\nText: ', f.VALUE::STRING)) AS KEEP
+FROM TABLE(FLATTEN(INPUT => PARSE_JSON(:candidate_batch))) f;
         """,
             language="sql",
         )
@@ -863,57 +1119,107 @@ with cortex_tabs[5]:
     )
 
     if st.button("Find Similar Clients", use_container_width=True):
-        st.success(" **Similar Clients Found:**")
-        st.markdown(
-            """
-       **Top Matches (Cosine Similarity):**
-        1. **Robert Kim** (0.87) - Conservative, age 58, ESG focus, quarterly meetings
-        2. **Lisa Rodriguez** (0.82) - Moderate-conservative, age 61, sustainable investing
-        3. **Dr. James Chen** (0.79) - Conservative, age 57, regular review preference
-        """
-        )
+        # Profiles are embedded once and searched through the in-process
+        # IVF index; only clients updated since the last refresh are embedded
+        with st.spinner("Searching client profile index..."):
+            similar = find_similar_clients(client_profile, k=5)
+
+        if similar.empty:
+            st.warning("No client profiles indexed yet.")
+        else:
+            st.success(" **Similar Clients Found:**")
+            st.markdown("**Top Matches (Cosine Similarity):**")
+            for rank, match in enumerate(similar.itertuples(), start=1):
+                goals = (
+                    str(match.FINANCIAL_GOALS).strip("[]").replace('"', "")
+                    if pd.notna(match.FINANCIAL_GOALS)
+                    else "no stated goals"
+                )
+                st.markdown(
+                    f"{rank}. **{match.FIRST_NAME} {match.LAST_NAME}** "
+                    f"({match.SIMILARITY:.2f}) - {match.RISK_TOLERANCE}, "
+                    f"age {match.AGE}, {goals}"
+                )
+            st.caption(f"{len(get_client_embedding_index()):,} client profiles indexed")
 
         st.code(
             """
-WITH client_embeddings AS (
-    SELECT
-        client_id,
-        profile_text,
-        SNOWFLAKE.CORTEX.AI_EMBED('e5-base-v2', profile_text) AS embedding
-    FROM client_profiles
-),
-target_embedding AS (
-    SELECT SNOWFLAKE.CORTEX.AI_EMBED('e5-base-v2', ?) AS target_vec
-)
-SELECT
-    c.client_id,
-    c.profile_text,
-    VECTOR_COSINE_SIMILARITY(c.embedding, t.target_vec) AS similarity
-FROM client_embeddings c
-CROSS JOIN target_embedding t
-ORDER BY similarity DESC
-LIMIT 10;
+-- Profiles are embedded once (and again only when a client changes);
+-- the query text is the only embedding computed per search
+SELECT SNOWFLAKE.CORTEX.AI_EMBED('snowflake-arctic-embed-m-v1.5', ?) AS target_vec;
         """,
             language="sql",
         )
 
-# Cortex AI ROI and Business Impact
+# Measured AI usage: every Cortex / external call is logged with tokens,
+# latency, cache hit and error class
 st.divider()
-st.markdown("### **Cortex AI Business Impact**")
+st.markdown("### **AI Usage & Cost**")
+
+telemetry = get_llm_telemetry()
+usage_window = st.radio(
+    "Window",
+    [86400, 7 * 86400, 30 * 86400],
+    format_func={86400: "24 hours", 7 * 86400: "7 days", 30 * 86400: "30 days"}.get,
+    horizontal=True,
+    key="ai_usage_window",
+)
+usage = telemetry.totals(since_seconds=usage_window)
 
 impact_col1, impact_col2, impact_col3, impact_col4 = st.columns(4)
 
 with impact_col1:
-    st.metric("Revenue Impact", "$3.2M", delta="+23% from AI insights")
+    st.metric("AI Calls", f"{usage['calls']:,}", delta=f"{usage['tokens']:,} tokens")
 
 with impact_col2:
-    st.metric("⏱ Time Saved", "847 hours", delta="Monthly advisor efficiency")
+    st.metric(
+        "Est. Spend",
+        f"${usage['cost_usd']:,.2f}",
+        delta=f"${usage['saved_usd']:,.2f} saved by cache",
+        delta_color="off",
+    )
 
 with impact_col3:
-    st.metric("Accuracy", "94.7%", delta="+12% vs manual analysis")
+    st.metric(
+        "Median Model Latency",
+        (
+            f"{usage['p50_latency_seconds']:.2f}s"
+            if usage["p50_latency_seconds"] is not None
+            else "-"
+        ),
+    )
 
 with impact_col4:
-    st.metric("Insights Generated", "1,247", delta="AI recommendations/month")
+    st.metric(
+        "Cache Hit Rate",
+        f"{usage['cache_hit_rate']:.0%}",
+        delta=f"{usage['error_rate']:.1%} errors",
+        delta_color="off",
+    )
+
+usage_by_model = telemetry.summary(since_seconds=usage_window)
+if usage_by_model.empty:
+    st.info("No AI calls recorded in this window yet.")
+else:
+    st.dataframe(
+        usage_by_model.style.format(
+            {
+                "ERROR_RATE": "{:.1%}",
+                "CACHE_HIT_RATE": "{:.0%}",
+                "P50_LATENCY_SECONDS": "{:.2f}",
+                "P95_LATENCY_SECONDS": "{:.2f}",
+                "COST_USD": "${:,.4f}",
+            },
+            na_rep="-",
+        ),
+        hide_index=True,
+        use_container_width=True,
+    )
+    st.caption(
+        "Token counts are estimated from text length; cost uses approximate "
+        "list prices (Cortex credits at a nominal rate) and is blank for "
+        "unpriced or simulated models."
+    )
 
 # Navigation footer
 st.divider()
@@ -925,3 +1231,5 @@ st.markdown(
 - ** Advanced Capabilities**: Geospatial and predictive analytics
 """
 )
+
+finish_page_run()
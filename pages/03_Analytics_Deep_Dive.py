@@ -7,20 +7,32 @@ featuring risk monitoring, drift analysis, and performance optimization.
 Author: Deepjyoti Dev, Senior Data Cloud Architect, Snowflake GXC Team
 """
 
+import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 import streamlit as st
 
 from utils.data_functions import (
+    finish_page_run,
     get_advisor_productivity,
+    get_concentration_breaches,
+    get_concentration_summary,
+    get_firm_risk_summary,
     get_idle_cash_analysis,
+    get_kyc_insights,
+    get_performance_periods,
+    get_performance_ranking,
     get_portfolio_drift_analysis,
+    get_portfolio_history_chart_data,
+    get_portfolio_risk_metrics,
     get_suitability_risk_alerts,
     get_trade_fee_anomalies,
+    start_page_run,
 )
 from utils.personas import get_persona_info, get_section_insights
 
 st.set_page_config(page_title="Analytics Deep Dive", page_icon=None, layout="wide")
+start_page_run("03_Analytics_Deep_Dive")
 
 # Get current persona from session state
 selected_persona = st.session_state.get("selected_persona", "executive")
@@ -219,6 +231,7 @@ analytics_tabs = st.tabs(
         " Cash Management",
         " Anomaly Detection",
         " Advisor Analytics",
+        " Performance",
     ]
 )
 
@@ -321,6 +334,125 @@ with analytics_tabs[0]:
             use_container_width=True,
         )
 
+    # Concentration Risk
+    st.markdown("** Concentration Risk**")
+    concentration_threshold = st.session_state.get("concentration_threshold", 0.3)
+    concentration_level = st.radio(
+        "Concentration level",
+        ["ticker", "issuer", "asset_class"],
+        format_func=lambda level: level.replace("_", " ").title(),
+        horizontal=True,
+        key="concentration_level",
+    )
+    conc_summary = get_concentration_summary(concentration_threshold).set_index("LEVEL")
+    conc_col1, conc_col2, conc_col3 = st.columns(3)
+    for conc_col, level_name in zip(
+        (conc_col1, conc_col2, conc_col3), ("ticker", "issuer", "asset_class")
+    ):
+        conc_col.metric(
+            f"{level_name.replace('_', ' ').title()} Breaches",
+            int(conc_summary.loc[level_name, "BREACHES"]),
+            f"{int(conc_summary.loc[level_name, 'PORTFOLIOS'])} portfolios",
+            delta_color="off",
+        )
+    conc = get_concentration_breaches(concentration_threshold, concentration_level)
+    if not conc.empty:
+        conc_key = conc.columns[1]
+        fig = px.bar(
+            conc.head(15),
+            x=conc_key,
+            y="PCT_OF_PORTFOLIO",
+            color="PORTFOLIO_ID",
+            title=f"Concentration Breaches (>= {concentration_threshold:.0%})",
+            template="plotly_white",
+        )
+        fig.update_layout(yaxis_tickformat=".0%", height=400)
+        st.plotly_chart(fig, use_container_width=True)
+        st.dataframe(
+            conc.style.format(
+                {
+                    "MARKET_VALUE": "${:,.0f}",
+                    "TOTAL": "${:,.0f}",
+                    "PCT_OF_PORTFOLIO": "{:.1%}",
+                }
+            ),
+            use_container_width=True,
+            hide_index=True,
+        )
+    else:
+        st.success("No concentration breaches at the selected threshold")
+
+    # Portfolio Risk Metrics
+    st.markdown("** Portfolio Risk Metrics**")
+    risk_window = st.selectbox(
+        "Risk window", ["3M", "6M", "1Y"], index=2, key="risk_metrics_window"
+    )
+    risk_summary = get_firm_risk_summary(risk_window)
+    risk_metrics = get_portfolio_risk_metrics(risk_window)
+    if risk_summary["VAR_AMOUNT"] is not None and not risk_metrics.empty:
+        rm_col1, rm_col2, rm_col3 = st.columns(3)
+        rm_col1.metric("Weighted Volatility", f"{risk_summary['VOLATILITY']:.1%}")
+        rm_col2.metric("Weighted Beta", f"{risk_summary['BETA']:.2f}")
+        rm_col3.metric("Total 1-Day VaR (95%)", f"${risk_summary['VAR_AMOUNT']:,.0f}")
+        st.dataframe(
+            risk_metrics[
+                [
+                    "PORTFOLIO_ID",
+                    "CLIENT_ID",
+                    "LATEST_VALUE",
+                    "VOLATILITY",
+                    "MAX_DRAWDOWN",
+                    "VAR",
+                    "CVAR",
+                    "BETA",
+                    "VAR_AMOUNT",
+                ]
+            ].style.format(
+                {
+                    "LATEST_VALUE": "${:,.0f}",
+                    "VOLATILITY": "{:.1%}",
+                    "MAX_DRAWDOWN": "{:.1%}",
+                    "VAR": "{:.2%}",
+                    "CVAR": "{:.2%}",
+                    "BETA": "{:.2f}",
+                    "VAR_AMOUNT": "${:,.0f}",
+                },
+                na_rep="-",
+            ),
+            use_container_width=True,
+            hide_index=True,
+        )
+    else:
+        st.info("No position history available for risk metrics")
+
+    # KYC Review Worklist
+    st.markdown("** KYC Review Worklist**")
+    kyc_page_size = 25
+    kyc_page = st.number_input(
+        "Worklist page", min_value=1, value=1, step=1, key="kyc_worklist_page"
+    )
+    kyc_worklist = get_kyc_insights(
+        limit=kyc_page_size, offset=(int(kyc_page) - 1) * kyc_page_size
+    )
+    if not kyc_worklist.empty:
+        st.dataframe(
+            kyc_worklist[
+                [
+                    "CLIENT_ID",
+                    "FIRST_NAME",
+                    "LAST_NAME",
+                    "DUE_DATE",
+                    "DAYS_SINCE_UPDATE",
+                    "COMPLIANCE_STATUS",
+                    "PRIORITY",
+                ]
+            ],
+            use_container_width=True,
+            hide_index=True,
+        )
+    else:
+        st.info("No KYC reviews due on this page")
+
 # Portfolio Drift Analysis
 with analytics_tabs[1]:
     st.markdown("### **Portfolio Drift & Rebalancing**")
@@ -504,6 +636,60 @@ with analytics_tabs[2]:
             )
             st.plotly_chart(fig, use_container_width=True)
 
+        # Value and cash balance history, downsampled to the chart width
+        st.markdown("** Portfolio Value & Cash Balance History**")
+        history_col1, history_col2 = st.columns([2, 1])
+        with history_col1:
+            history_portfolio = st.selectbox(
+                "Portfolio",
+                idle_cash["PORTFOLIO_ID"].unique(),
+                key="cash_history_portfolio",
+            )
+        with history_col2:
+            history_window = st.selectbox(
+                "Window",
+                ["All", "3Y", "1Y", "6M", "3M"],
+                key="cash_history_window",
+            )
+
+        full_history = get_portfolio_history_chart_data(history_portfolio)
+        history_end = full_history["value"]["DATE"].max()
+        months = {"3Y": 36, "1Y": 12, "6M": 6, "3M": 3}.get(history_window)
+        if months and pd.notna(history_end):
+            history = get_portfolio_history_chart_data(
+                history_portfolio,
+                start=history_end - pd.DateOffset(months=months),
+                end=history_end,
+            )
+        else:
+            history = full_history
+
+        fig = go.Figure()
+        fig.add_trace(
+            go.Scatter(
+                name="Portfolio Value",
+                x=history["value"]["DATE"],
+                y=history["value"]["VALUE"],
+                mode="lines",
+            )
+        )
+        fig.add_trace(
+            go.Scatter(
+                name="Account Balance",
+                x=history["balance"]["TIMESTAMP"],
+                y=history["balance"]["BALANCE"],
+                mode="lines+markers",
+                yaxis="y2",
+            )
+        )
+        fig.update_layout(
+            title=f"{history_portfolio} Value vs Account Balance",
+            yaxis=dict(title="Portfolio Value ($)"),
+            yaxis2=dict(title="Account Balance ($)", overlaying="y", side="right"),
+            hovermode="x unified",
+        )
+        st.plotly_chart(fig, use_container_width=True)
+
 # Anomaly Detection
 with analytics_tabs[3]:
     st.markdown("### **Transaction Anomaly Detection**")
@@ -658,6 +844,88 @@ with analytics_tabs[4]:
             fig.update_xaxes(tickangle=45)
             st.plotly_chart(fig, use_container_width=True)
 
+# Performance Ranking
+with analytics_tabs[5]:
+    st.markdown("### **Portfolio Performance (TWR / MWR)**")
+
+    # MTD / QTD drop out when no valuation snapshot falls inside them.
+    perf_periods = get_performance_periods() or ["1Y"]
+    perf_col1, perf_col2 = st.columns(2)
+    with perf_col1:
+        perf_period = st.selectbox(
+            "Period",
+            perf_periods,
+            index=perf_periods.index("1Y") if "1Y" in perf_periods else 0,
+        )
+    with perf_col2:
+        perf_level = st.selectbox(
+            "Rank by", ["portfolio", "client", "strategy", "advisor"], index=0
+        )
+
+    ranking = get_performance_ranking(level=perf_level, period=perf_period)
+
+    if not ranking.empty:
+        col1, col2 = st.columns(2)
+
+        with col1:
+            top_ranked = ranking.head(15)
+            fig = px.bar(
+                top_ranked,
+                x="ENTITY_ID",
+                y=["TWR", "MWR"],
+                barmode="group",
+                title=f"Top {perf_level.title()} Returns ({perf_period})",
+                labels={"value": "Return", "ENTITY_ID": perf_level.title()},
+            )
+            fig.update_yaxes(tickformat=".1%")
+            fig.update_xaxes(tickangle=45)
+            st.plotly_chart(fig, use_container_width=True)
+
+        with col2:
+            fig = px.scatter(
+                ranking,
+                x="TWR",
+                y="MWR",
+                size=ranking["END_VALUE"].clip(lower=0),
+                hover_data=["ENTITY_ID"],
+                title="Time-Weighted vs Money-Weighted Return",
+            )
+            fig.update_xaxes(tickformat=".1%")
+            fig.update_yaxes(tickformat=".1%")
+            st.plotly_chart(fig, use_container_width=True)
+
+        st.dataframe(
+            ranking[
+                [
+                    "RANK",
+                    "ENTITY_ID",
+                    "PORTFOLIO_COUNT",
+                    "START_VALUE",
+                    "END_VALUE",
+                    "NET_FLOW",
+                    "GAIN",
+                    "TWR",
+                    "TWR_ANNUALIZED",
+                    "MWR",
+                    "INVALID_REASON",
+                ]
+            ].style.format(
+                {
+                    "START_VALUE": "${:,.0f}",
+                    "END_VALUE": "${:,.0f}",
+                    "NET_FLOW": "${:,.0f}",
+                    "GAIN": "${:,.0f}",
+                    "TWR": "{:.2%}",
+                    "TWR_ANNUALIZED": "{:.2%}",
+                    "MWR": "{:.2%}",
+                },
+                na_rep="-",
+            ),
+            use_container_width=True,
+        )
+    else:
+        st.info("No valuation history available for the selected period")
+
 # Analytics Summary Dashboard
 st.divider()
 st.markdown("### **Analytics Summary Dashboard**")
@@ -726,3 +994,5 @@ st.markdown(
 - **AI-Powered Insights**: Return to Cortex AI demonstrations
 """
 )
+
+finish_page_run()
@@ -7,7 +7,8 @@ and live intelligence feeds powered by Cortex AI.
 Author: Deepjyoti Dev, Senior Data Cloud Architect, Snowflake GXC Team
 """
 
-from datetime import datetime, timedelta
+import uuid
+from datetime import datetime
 
 import numpy as np
 import pandas as pd
@@ -15,9 +16,23 @@ import plotly.graph_objects as go
 import pydeck as pdk
 import streamlit as st
 
+from utils.data_functions import (
+    collect_warehouse_queue_times,
+    finish_page_run,
+    get_alert_engine,
+    get_metrics_exposition,
+    get_system_health,
+    read_transaction_stream,
+    refresh_activity_windows,
+    refresh_live_alerts,
+    start_page_run,
+)
 from utils.personas import get_persona_info, get_section_insights
+from utils.stream_windows import GRANULARITIES
+from utils.transaction_replay import DEFAULT_SPEEDUP, SPEEDUPS
 
 st.set_page_config(page_title="Real-Time Intelligence", page_icon=None, layout="wide")
+start_page_run("04_Real_Time_Intelligence")
 
 # Get current persona from session state
 selected_persona = st.session_state.get("selected_persona", "executive")
@@ -180,126 +195,87 @@ with realtime_tabs[0]:
     with alert_col2:
         auto_refresh = st.checkbox(" Auto Refresh", value=True)
 
+    alert_engine = refresh_live_alerts()
+    live_alerts = alert_engine.active(alert_filter)
+
     with alert_col3:
         if st.button("Clear All", use_container_width=True):
-            st.success("All alerts cleared!")
-
-    # Live alerts feed
-    @st.cache_data(ttl=30)  # Refresh every 30 seconds
-    def get_live_alerts():
-        np.random.seed(int(datetime.now().timestamp()) % 1000)
-        alerts = []
-
-        alert_types = [
-            {
-                "type": "Critical",
-                "icon": "",
-                "msg": "Portfolio concentration breach detected",
-                "client": "Sarah Chen",
-                "value": "$12.3M",
-            },
-            {
-                "type": "High",
-                "icon": "🟡",
-                "msg": "Large withdrawal request pending",
-                "client": "Michael Torres",
-                "value": "$2.8M",
-            },
-            {
-                "type": "Critical",
-                "icon": "",
-                "msg": "Suitability drift alert triggered",
-                "client": "Dr. Jennifer Wu",
-                "value": "$15.2M",
-            },
-            {
-                "type": "Medium",
-                "icon": "🟠",
-                "msg": "Client engagement gap exceeded 180 days",
-                "client": "Robert Kim",
-                "value": "$6.8M",
-            },
-            {
-                "type": "High",
-                "icon": "🟡",
-                "msg": "Risk score anomaly detected",
-                "client": "Lisa Rodriguez",
-                "value": "$9.4M",
-            },
-            {
-                "type": "Info",
-                "icon": "",
-                "msg": "Rebalancing opportunity identified",
-                "client": "David Chen",
-                "value": "$4.2M",
-            },
-        ]
-
-        for i in range(np.random.randint(8, 15)):
-            alert = np.random.choice(alert_types)
-            timestamp = datetime.now() - timedelta(minutes=np.random.randint(1, 120))
-            alerts.append(
-                {
-                    **alert,
-                    "timestamp": timestamp.strftime("%H:%M:%S"),
-                    "id": f"ALT_{i+1:03d}",
-                }
-            )
-
-        return sorted(alerts, key=lambda x: x["timestamp"], reverse=True)
-
-    live_alerts = get_live_alerts()
+            cleared = alert_engine.acknowledge(live_alerts["ALERT_ID"])
+            live_alerts = live_alerts.iloc[0:0]
+            st.success(f"{cleared} alerts acknowledged!")
+
+    alert_icons = {
+        "Critical": "",
+        "High": "🟡",
+        "Medium": "🟠",
+        "Low": "🟢",
+        "Info": "",
+    }
 
     # Display alerts
-    st.markdown("** Active Alerts (Real-time Feed):**")
-
-    for alert in live_alerts[:10]:  # Show top 10 alerts
-        if alert["type"] in alert_filter:
-            if alert["type"] == "Critical":
-                st.markdown(
-                    f"""
-                <div class="alert-card">
-                    <b>{alert['icon']} {alert['type'].upper()} | {alert['timestamp']}</b><br>
-                    <b>Client:</b> {alert['client']} ({alert['value']})<br>
-                    <b>Alert:</b> {alert['msg']}<br>
-                    <b>ID:</b> {alert['id']}
-                </div>
-                """,
-                    unsafe_allow_html=True,
-                )
-            else:
-                priority_color = {
-                    "High": "#FFA500",
-                    "Medium": "#FFD700",
-                    "Low": "#90EE90",
-                    "Info": "#87CEEB",
-                }
-                st.markdown(
-                    f"""
-                <div style="background: {priority_color.get(alert['type'], '#gray')}; padding: 10px; border-radius: 8px; margin: 5px 0; color: white;">
-                    <b>{alert['icon']} {alert['type']} | {alert['timestamp']}</b> - {alert['client']} ({alert['value']}): {alert['msg']}
-                </div>
-                """,
-                    unsafe_allow_html=True,
-                )
+    st.markdown(
+        f"** Active Alerts (Real-time Feed):** {len(live_alerts)} open, "
+        f"events through {alert_engine.now:%Y-%m-%d %H:%M}"
+        if alert_engine.now is not None
+        else "** Active Alerts (Real-time Feed):**"
+    )
+    if live_alerts.empty:
+        st.info("No open alerts at the selected priorities.")
+
+    for alert in live_alerts.head(10).to_dict("records"):  # Show top 10 alerts
+        icon = alert_icons.get(alert["SEVERITY"], "")
+        seen = f"{alert['LAST_SEEN']:%Y-%m-%d %H:%M}"
+        if alert["OCCURRENCES"] > 1:
+            seen += f" (x{alert['OCCURRENCES']})"
+        value = f"${alert['VALUE'] / 1e6:.1f}M"
+        if alert["SEVERITY"] == "Critical":
+            st.markdown(
+                f"""
+            <div class="alert-card">
+                <b>{icon} {alert['SEVERITY'].upper()} | {seen}</b><br>
+                <b>Client:</b> {alert['CLIENT_NAME']} ({value})<br>
+                <b>Alert:</b> {alert['RULE']} - {alert['MESSAGE']}<br>
+                <b>ID:</b> {alert['ALERT_ID']}
+            </div>
+            """,
+                unsafe_allow_html=True,
+            )
+        else:
+            priority_color = {
+                "High": "#FFA500",
+                "Medium": "#FFD700",
+                "Low": "#90EE90",
+                "Info": "#87CEEB",
+            }
+            st.markdown(
+                f"""
+            <div style="background: {priority_color.get(alert['SEVERITY'], '#gray')}; padding: 10px; border-radius: 8px; margin: 5px 0; color: white;">
+                <b>{icon} {alert['SEVERITY']} | {seen}</b> - {alert['CLIENT_NAME']} ({value}): {alert['RULE']} - {alert['MESSAGE']}
+            </div>
+            """,
+                unsafe_allow_html=True,
+            )
 
     if auto_refresh:
+        finish_page_run()
         st.rerun()
 
 # Monitoring Dashboard Tab
 with realtime_tabs[1]:
     st.markdown("### **Real-Time Monitoring Dashboard**")
 
+    alert_summary = get_alert_engine().summary()
+
     # Key metrics row
     metrics_col1, metrics_col2, metrics_col3, metrics_col4, metrics_col5 = st.columns(5)
 
     with metrics_col1:
         st.markdown(
-            """
+            f"""
         <div class="monitor-card">
             <h4> Critical Alerts</h4>
-            <h2>7</h2>
-            <p>Last 24h: +3</p>
+            <h2>{alert_summary['by_severity']['Critical']}</h2>
+            <p>Open: {alert_summary['open']} total</p>
         </div>
         """,
             unsafe_allow_html=True,
@@ -307,10 +283,10 @@ with realtime_tabs[1]:
 
     with metrics_col2:
         st.markdown(
-            """
+            f"""
         <div class="monitor-card">
             <h4> AUM at Risk</h4>
-            <h2>$47M</h2>
+            <h2>${alert_summary['value_at_risk'] / 1e6:,.0f}M</h2>
             <p>Requires attention</p>
         </div>
         """,
@@ -357,113 +333,183 @@ with realtime_tabs[1]:
     monitor_col1, monitor_col2 = st.columns(2)
 
     with monitor_col1:
-        # Real-time activity feed
-        @st.cache_data(ttl=10)
-        def get_activity_data():
-            times = [
-                (datetime.now() - timedelta(minutes=i)).strftime("%H:%M")
-                for i in range(30, 0, -1)
-            ]
-            activities = [np.random.randint(50, 200) for _ in times]
-            return times, activities
-
-        times, activities = get_activity_data()
+        # Real-time activity feed, aggregated over the replayed event streams
+        granularity = st.selectbox(
+            "Activity Window", list(GRANULARITIES), index=2, key="activity_window"
+        )
+        windows = refresh_activity_windows(
+            GRANULARITIES[granularity],
+            st.session_state.get("replay_scale", 1),
+            SPEEDUPS.get(st.session_state.get("replay_speed"), DEFAULT_SPEEDUP),
+        )
+        transaction_windows = windows["transactions"].series()
+        interaction_windows = windows["interactions"].series()
 
         fig_activity = go.Figure()
-        fig_activity.add_trace(
-            go.Scatter(
-                x=times,
-                y=activities,
-                mode="lines+markers",
-                name="Activity Level",
-                line=dict(color="#00ff41", width=3),
-                marker=dict(size=6),
+        for label, series, color in (
+            ("Transactions", transaction_windows, "#00ff41"),
+            ("Interactions", interaction_windows, "#1f77b4"),
+        ):
+            fig_activity.add_trace(
+                go.Scatter(
+                    x=series["WINDOW_START"],
+                    y=series["COUNT"],
+                    mode="lines+markers",
+                    name=label,
+                    line=dict(color=color, width=3),
+                    marker=dict(size=6),
+                )
             )
-        )
         fig_activity.update_layout(
-            title="Live System Activity (30 min)",
+            title=f"Live Activity (last 30 x {granularity.lower()})",
             xaxis_title="Time",
-            yaxis_title="Activity Level",
+            yaxis_title="Events",
             height=400,
             plot_bgcolor="rgba(0,0,0,0.1)",
         )
         st.plotly_chart(fig_activity, use_container_width=True)
 
+        sliding = windows["transactions"].snapshot()
+        busiest = windows["interactions"].sliding("CHANNEL")
+        if sliding["start"] is not None:
+            st.caption(
+                f"Last 5 x {granularity.lower()}: {sliding['count']:,} transactions "
+                f"(${sliding['sum'] / 1e6:,.1f}M), "
+                f"{windows['interactions'].snapshot()['count']:,} interactions"
+                + (
+                    f"; busiest channel: {busiest['KEY'].iloc[0]}"
+                    if len(busiest)
+                    else ""
+                )
+            )
+
     with monitor_col2:
-        # System health indicators
-        health_data = {
-            "Component": [
-                "Database",
-                "API Gateway",
-                "AI Models",
-                "Security",
-                "Network",
-            ],
-            "Status": [99.9, 99.8, 98.5, 100.0, 99.2],
-            "Response_Time": [12, 45, 1200, 8, 23],
-        }
+        # System health, measured by the app's own metrics registry
+        collect_warehouse_queue_times()
+        health = get_system_health()
+        latency = health["latency"].dropna(subset=["P50_SECONDS"])
 
         fig_health = go.Figure()
-
-        # Add status bars
-        fig_health.add_trace(
-            go.Bar(
-                name="Uptime %",
-                y=health_data["Component"],
-                x=health_data["Status"],
-                orientation="h",
-                marker=dict(
-                    color=[
-                        "green" if x > 99 else "orange" if x > 95 else "red"
-                        for x in health_data["Status"]
-                    ]
-                ),
+        for label, column, color in (
+            ("p50", "P50_SECONDS", "#2ca02c"),
+            ("p95", "P95_SECONDS", "#ff7f0e"),
+        ):
+            fig_health.add_trace(
+                go.Bar(
+                    name=label,
+                    y=latency["COMPONENT"],
+                    x=latency[column] * 1000,
+                    orientation="h",
+                    marker=dict(color=color),
+                    customdata=latency["COUNT"],
+                    hovertemplate="%{y}: %{x:,.0f} ms (%{customdata} samples)",
+                )
             )
-        )
 
         fig_health.update_layout(
-            title="System Health Monitor", xaxis_title="Uptime (%)", height=400
+            title="System Health Monitor",
+            xaxis_title="Latency (ms, log scale)",
+            xaxis_type="log",
+            barmode="group",
+            height=400,
         )
         st.plotly_chart(fig_health, use_container_width=True)
 
-    # Live transaction monitoring
-    st.markdown("** Live Transaction Monitoring**")
-
-    @st.cache_data(ttl=5)
-    def get_transaction_stream():
-        transactions = []
-        for i in range(15):
-            transaction = {
-                "time": (datetime.now() - timedelta(seconds=i * 10)).strftime(
-                    "%H:%M:%S"
+        health_col1, health_col2, health_col3, health_col4 = st.columns(4)
+        with health_col1:
+            st.metric(
+                "Cache Hit Ratio",
+                (
+                    f"{health['cache_hit_ratio']:.0%}"
+                    if health["cache_hit_ratio"] is not None
+                    else "n/a"
                 ),
-                "type": np.random.choice(["Buy", "Sell", "Transfer", "Withdrawal"]),
-                "amount": np.random.randint(1000, 50000),
-                "client": np.random.choice(
-                    ["Sarah C.", "Michael T.", "Jennifer W.", "Robert K.", "Lisa R."]
-                ),
-                "status": np.random.choice(
-                    ["Completed", "Processing", "Pending"], p=[0.7, 0.2, 0.1]
+            )
+        with health_col2:
+            st.metric(
+                "Cache Size",
+                f"{health['cache_bytes'] / 2**20:,.1f} MB",
+                f"{health['cache_entries']} entries",
+                delta_color="off",
+            )
+        with health_col3:
+            st.metric(
+                "Session Pool",
+                f"{health['pool_utilization']:.0%} busy",
+                f"{health['pool_in_use']:.0f} in use",
+                delta_color="off",
+            )
+        with health_col4:
+            st.metric(
+                "Process RSS",
+                (
+                    f"{health['rss_bytes'] / 2**20:,.0f} MB"
+                    if health["rss_bytes"] is not None
+                    else "n/a"
                 ),
-            }
-            transactions.append(transaction)
-        return transactions
+            )
 
-    transactions = get_transaction_stream()
+        with st.expander("Metrics exposition (Prometheus text format)"):
+            exposition = get_metrics_exposition()
+            st.download_button(
+                "Download metrics",
+                exposition,
+                file_name="metrics.prom",
+                mime="text/plain",
+            )
+            st.code(exposition, language="text")
 
-    # Display as streaming table
-    transaction_df = pd.DataFrame(transactions)
+    # Live transaction monitoring
+    st.markdown("** Live Transaction Monitoring**")
+
+    replay_col1, replay_col2 = st.columns(2)
+    with replay_col1:
+        replay_speed = st.selectbox(
+            "Replay Speed", list(SPEEDUPS), index=1, key="replay_speed"
+        )
+    with replay_col2:
+        replay_scale = st.selectbox(
+            "Replay Volume",
+            [1, 10, 100],
+            format_func=lambda n: f"{n}x TRANSACTIONS",
+            key="replay_scale",
+        )
 
-    # Color code by status
-    def highlight_status(val):
-        if val == "Completed":
+    # Each session reads only the events published since its last refresh
+    consumer = st.session_state.setdefault("transaction_consumer", uuid.uuid4().hex)
+    new_transactions, replay_stats = read_transaction_stream(
+        consumer, replay_scale, SPEEDUPS[replay_speed], backlog=15
+    )
+    feed_key = f"transaction_feed_{replay_scale}"
+    transaction_df = pd.concat(
+        [new_transactions.iloc[::-1], st.session_state.get(feed_key)]
+    ).head(15)
+    st.session_state[feed_key] = transaction_df
+
+    stream_col1, stream_col2, stream_col3, stream_col4 = st.columns(4)
+    with stream_col1:
+        st.metric("Events / sec", f"{replay_stats['events_per_second']:,.0f}")
+    with stream_col2:
+        st.metric("New This Refresh", f"{len(new_transactions):,}")
+    with stream_col3:
+        st.metric("Published", f"{replay_stats['published']:,}")
+    with stream_col4:
+        st.metric("Dropped (lagged)", f"{replay_stats['dropped']:,}")
+    if replay_stats["replay_time"] is not None:
+        st.caption(f"Replay clock: {replay_stats['replay_time']:%Y-%m-%d %H:%M}")
+
+    # Color code by transaction type
+    def highlight_type(val):
+        if val in ("Buy", "Deposit"):
             return "background-color: #90EE90"
-        elif val == "Processing":
+        elif val == "Sell":
             return "background-color: #FFD700"
         else:
             return "background-color: #FFA07A"
 
-    styled_df = transaction_df.style.applymap(highlight_status, subset=["status"])
+    styled_df = transaction_df[
+        ["TIMESTAMP", "TRANSACTION_TYPE", "TICKER", "TOTAL_AMOUNT", "CLIENT_NAME"]
+    ].style.map(highlight_type, subset=["TRANSACTION_TYPE"])
     st.dataframe(styled_df, hide_index=True, use_container_width=True)
 
 # Global Intelligence Map Tab
@@ -921,5 +967,6 @@ st.markdown(
 )
 
 # Auto-refresh indicator
+finish_page_run()
 if st.button("Force Refresh Dashboard"):
     st.rerun()
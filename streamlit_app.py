@@ -12,7 +12,12 @@ License: MIT
 
 import streamlit as st
 
-from utils.data_functions import get_global_kpis, get_snowflake_session
+from utils.data_functions import (
+    finish_page_run,
+    get_global_kpis,
+    get_snowflake_session,
+    start_page_run,
+)
 from utils.personas import (
     get_all_section_insights,
     get_persona_info,
@@ -27,6 +32,7 @@ st.set_page_config(
     layout="wide",
     initial_sidebar_state="expanded",
 )
+start_page_run("streamlit_app")
 
 # Custom CSS for professional styling
 st.markdown(
@@ -524,3 +530,5 @@ st.markdown(
 """,
     unsafe_allow_html=True,
 )
+
+finish_page_run()
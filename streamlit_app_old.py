@@ -22,6 +22,8 @@ import streamlit as st
 from snowflake.snowpark import Session
 from snowflake.snowpark.context import get_active_session
 
+from utils.geo_reference import GeoReference
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
@@ -183,6 +185,12 @@ def run_query(sql: str) -> pd.DataFrame:
         return pd.DataFrame()  # Return empty DataFrame on error
 
 
+@st.cache_resource(show_spinner=False)
+def get_geo_reference() -> GeoReference:
+    """Shared state-centroid / ZIP-prefix reference tables"""
+    return GeoReference()
+
+
 # -----------------------------
 # Reusable Query Helpers
 # -----------------------------
@@ -1268,7 +1276,10 @@ def get_advisor_territory_coverage() -> pd.DataFrame:
 def get_client_location_details() -> pd.DataFrame:
     """Get client locations with coordinates for mapbox visualization"""
 
-    sql = """
+    geo = get_geo_reference()
+    # Only states with a centroid can be placed, so filter before the LIMIT
+    states = ", ".join(f"'{state}'" for state in geo.states.index)
+    sql = f"""
         WITH client_portfolio_values AS (
             SELECT p.CLIENT_ID,
                    SUM(ph.MARKET_VALUE) AS TOTAL_PORTFOLIO_VALUE
@@ -1279,77 +1290,20 @@ def get_client_location_details() -> pd.DataFrame:
                 WHERE ph2.PORTFOLIO_ID = ph.PORTFOLIO_ID
             )
             GROUP BY 1
-        ),
-        state_coordinates AS (
-            SELECT 'AL' AS STATE, 32.806671 AS LATITUDE, -86.791130 AS LONGITUDE
-            UNION ALL SELECT 'AK', 61.570716, -152.404419
-            UNION ALL SELECT 'AZ', 33.729759, -111.431221
-            UNION ALL SELECT 'AR', 34.969704, -92.373123
-            UNION ALL SELECT 'CA', 36.116203, -119.681564
-            UNION ALL SELECT 'CO', 39.059811, -105.311104
-            UNION ALL SELECT 'CT', 41.767, -72.677
-            UNION ALL SELECT 'DE', 39.161921, -75.526755
-            UNION ALL SELECT 'FL', 27.4518, -81.5158
-            UNION ALL SELECT 'GA', 32.9866, -83.6487
-            UNION ALL SELECT 'HI', 21.1098, -157.5311
-            UNION ALL SELECT 'ID', 44.931109, -116.237651
-            UNION ALL SELECT 'IL', 40.349457, -88.986137
-            UNION ALL SELECT 'IN', 39.790942, -86.147685
-            UNION ALL SELECT 'IA', 42.011539, -93.210526
-            UNION ALL SELECT 'KS', 38.572954, -98.580009
-            UNION ALL SELECT 'KY', 37.669773, -84.670067
-            UNION ALL SELECT 'LA', 31.266683, -91.988312
-            UNION ALL SELECT 'ME', 45.367584, -68.972168
-            UNION ALL SELECT 'MD', 39.161921, -75.526755
-            UNION ALL SELECT 'MA', 42.2352, -71.0275
-            UNION ALL SELECT 'MI', 43.354558, -84.955255
-            UNION ALL SELECT 'MN', 45.7326, -93.9196
-            UNION ALL SELECT 'MS', 32.7673, -89.6812
-            UNION ALL SELECT 'MO', 38.572954, -92.189283
-            UNION ALL SELECT 'MT', 47.052632, -110.454353
-            UNION ALL SELECT 'NE', 41.590939, -99.675285
-            UNION ALL SELECT 'NV', 39.161921, -117.055374
-            UNION ALL SELECT 'NH', 43.452492, -71.563896
-            UNION ALL SELECT 'NJ', 40.221741, -74.756138
-            UNION ALL SELECT 'NM', 34.307144, -106.018066
-            UNION ALL SELECT 'NY', 42.659829, -75.615011
-            UNION ALL SELECT 'NC', 35.771, -78.638
-            UNION ALL SELECT 'ND', 47.259, -99.955
-            UNION ALL SELECT 'OH', 40.269789, -82.955255
-            UNION ALL SELECT 'OK', 35.482309, -97.534994
-            UNION ALL SELECT 'OR', 44.931109, -123.029159
-            UNION ALL SELECT 'PA', 40.269789, -77.727883
-            UNION ALL SELECT 'RI', 41.82355, -71.422132
-            UNION ALL SELECT 'SC', 33.836082, -81.163727
-            UNION ALL SELECT 'SD', 44.268543, -99.672985
-            UNION ALL SELECT 'TN', 35.771, -86.25
-            UNION ALL SELECT 'TX', 31.106, -97.6475
-            UNION ALL SELECT 'UT', 39.161921, -111.431221
-            UNION ALL SELECT 'VT', 44.26639, -72.580536
-            UNION ALL SELECT 'VA', 37.54, -78.64
-            UNION ALL SELECT 'WA', 47.042418, -122.893077
-            UNION ALL SELECT 'WV', 38.349497, -81.633294
-            UNION ALL SELECT 'WI', 44.95, -89.5
-            UNION ALL SELECT 'WY', 42.7475, -107.2085
-            UNION ALL SELECT 'AS', -14.270972, -170.132217  -- American Samoa
-            UNION ALL SELECT 'VI', 18.335765, -64.896335    -- Virgin Islands
-            UNION ALL SELECT 'PW', 7.51498, 134.58252       -- Palau
         )
         SELECT c.CLIENT_ID,
                c.FIRST_NAME || ' ' || c.LAST_NAME AS CLIENT_NAME,
                c.CITY, c.STATE, c.ZIP_CODE,
                c.NET_WORTH_ESTIMATE, c.RISK_TOLERANCE,
-               COALESCE(cpv.TOTAL_PORTFOLIO_VALUE, 0) AS PORTFOLIO_VALUE,
-               -- Add small random offset to avoid overlapping points
-               sc.LATITUDE + (RANDOM() * 0.5 - 0.25) AS LATITUDE,
-               sc.LONGITUDE + (RANDOM() * 0.5 - 0.25) AS LONGITUDE
+               COALESCE(cpv.TOTAL_PORTFOLIO_VALUE, 0) AS PORTFOLIO_VALUE
         FROM CLIENTS c
         LEFT JOIN client_portfolio_values cpv ON c.CLIENT_ID = cpv.CLIENT_ID
-        LEFT JOIN state_coordinates sc ON c.STATE = sc.STATE
-        WHERE c.STATE IS NOT NULL AND sc.LATITUDE IS NOT NULL
+        WHERE c.STATE IN ({states})
         LIMIT 1000  -- Limit for performance on map visualization
     """
-    return run_query(sql)
+    # Centroids are joined locally from the packaged geo reference; a small
+    # random offset keeps clients in the same state from overlapping.
+    return geo.client_points(run_query(sql), jitter=0.25)
 
 
 def get_advisor_location_details() -> pd.DataFrame:
@@ -1460,66 +1414,17 @@ def get_climate_risk_locations() -> pd.DataFrame:
                        ELSE 'Low'
                    END AS RISK_LEVEL
             FROM client_locations cl
-        ),
-        state_coordinates AS (
-            SELECT 'AL' AS STATE, 32.806671 AS LATITUDE, -86.791130 AS LONGITUDE
-            UNION ALL SELECT 'AK', 61.570716, -152.404419
-            UNION ALL SELECT 'AZ', 33.729759, -111.431221
-            UNION ALL SELECT 'AR', 34.969704, -92.373123
-            UNION ALL SELECT 'CA', 36.116203, -119.681564
-            UNION ALL SELECT 'CO', 39.059811, -105.311104
-            UNION ALL SELECT 'CT', 41.767, -72.677
-            UNION ALL SELECT 'DE', 39.161921, -75.526755
-            UNION ALL SELECT 'FL', 27.4518, -81.5158
-            UNION ALL SELECT 'GA', 32.9866, -83.6487
-            UNION ALL SELECT 'HI', 21.1098, -157.5311
-            UNION ALL SELECT 'ID', 44.931109, -116.237651
-            UNION ALL SELECT 'IL', 40.349457, -88.986137
-            UNION ALL SELECT 'IN', 39.790942, -86.147685
-            UNION ALL SELECT 'IA', 42.011539, -93.210526
-            UNION ALL SELECT 'KS', 38.572954, -98.580009
-            UNION ALL SELECT 'KY', 37.669773, -84.670067
-            UNION ALL SELECT 'LA', 31.266683, -91.988312
-            UNION ALL SELECT 'ME', 45.367584, -68.972168
-            UNION ALL SELECT 'MD', 39.161921, -75.526755
-            UNION ALL SELECT 'MA', 42.2352, -71.0275
-            UNION ALL SELECT 'MI', 43.354558, -84.955255
-            UNION ALL SELECT 'MN', 45.7326, -93.9196
-            UNION ALL SELECT 'MS', 32.7673, -89.6812
-            UNION ALL SELECT 'MO', 38.572954, -92.189283
-            UNION ALL SELECT 'MT', 47.052632, -110.454353
-            UNION ALL SELECT 'NE', 41.590939, -99.675285
-            UNION ALL SELECT 'NV', 39.161921, -117.055374
-            UNION ALL SELECT 'NH', 43.452492, -71.563896
-            UNION ALL SELECT 'NJ', 40.221741, -74.756138
-            UNION ALL SELECT 'NM', 34.307144, -106.018066
-            UNION ALL SELECT 'NY', 42.659829, -75.615011
-            UNION ALL SELECT 'NC', 35.771, -78.638
-            UNION ALL SELECT 'ND', 47.259, -99.955
-            UNION ALL SELECT 'OH', 40.269789, -82.955255
-            UNION ALL SELECT 'OK', 35.482309, -97.534994
-            UNION ALL SELECT 'OR', 44.931109, -123.029159
-            UNION ALL SELECT 'PA', 40.269789, -77.727883
-            UNION ALL SELECT 'RI', 41.82355, -71.422132
-            UNION ALL SELECT 'SC', 33.836082, -81.163727
-            UNION ALL SELECT 'SD', 44.268543, -99.672985
-            UNION ALL SELECT 'TN', 35.771, -86.25
-            UNION ALL SELECT 'TX', 31.106, -97.6475
-            UNION ALL SELECT 'UT', 39.161921, -111.431221
-            UNION ALL SELECT 'VT', 44.26639, -72.580536
-            UNION ALL SELECT 'VA', 37.54, -78.64
-            UNION ALL SELECT 'WA', 47.042418, -122.893077
-            UNION ALL SELECT 'WV', 38.349497, -81.633294
-            UNION ALL SELECT 'WI', 44.95, -89.5
-            UNION ALL SELECT 'WY', 42.7475, -107.2085
         )
-        SELECT srp.*, sc.LATITUDE, sc.LONGITUDE
+        SELECT srp.*
         FROM state_risk_profile srp
-        LEFT JOIN state_coordinates sc ON srp.STATE = sc.STATE
-        WHERE sc.LATITUDE IS NOT NULL AND srp.LOCATION_AUM > 0
+        WHERE srp.LOCATION_AUM > 0
         ORDER BY srp.LOCATION_AUM DESC
     """
-    return run_query(sql)
+    return (
+        get_geo_reference()
+        .attach_state_centroids(run_query(sql))
+        .reset_index(drop=True)
+    )
 
 
 # -----------------------------
@@ -0,0 +1,608 @@
+"""
+Event-Driven Alerts for Wealth 360 Analytics Platform
+
+Rule-based alerts evaluated incrementally as TRANSACTIONS, POSITION_HISTORY
+and INTERACTIONS rows arrive, instead of re-running the analytic queries.
+Each rule keeps its own running state - portfolio books with per-asset-class
+totals, per-transaction-type mean/variance, last-contact times with a queue
+of contact deadlines - so every event costs O(1) amortized. Alerts are keyed
+by (rule, entity): a condition that persists updates its existing alert, and
+one that clears resolves it. Ingestion is idempotent - a transaction or
+position row that was already applied is skipped - so overlapping batches
+from concurrent refreshes never double-count.
+"""
+
+import threading
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, Iterable, List, Optional, Set, Tuple
+
+import pandas as pd
+
+SEVERITIES = ("Critical", "High", "Medium", "Low", "Info")
+SEVERITY_RANK = {severity: rank for rank, severity in enumerate(SEVERITIES)}
+
+ALERT_COLUMNS = [
+    "ALERT_ID",
+    "RULE",
+    "SEVERITY",
+    "RAISED_AT",
+    "LAST_SEEN",
+    "OCCURRENCES",
+    "CLIENT_ID",
+    "CLIENT_NAME",
+    "PORTFOLIO_ID",
+    "VALUE",
+    "MESSAGE",
+]
+
+# Risk ladder shared by client risk tolerance and portfolio strategy
+RISK_LADDER = {
+    "Conservative": 0,
+    "Moderate": 1,
+    "Balanced": 2,
+    "Growth": 3,
+    "Aggressive Growth": 4,
+}
+# Highest equity + alternatives share suitable for each risk tolerance
+MAX_RISK_ASSET_SHARE = {
+    "Conservative": 0.45,
+    "Moderate": 0.6,
+    "Balanced": 0.75,
+    "Growth": 0.9,
+    "Aggressive Growth": 1.0,
+}
+RISK_ASSET_CLASSES = ("Equity", "Alternative")
+# Cash allocation targets per strategy (percent of portfolio)
+CASH_TARGET_PCT = {
+    "Conservative": 10.0,
+    "Moderate": 7.5,
+    "Balanced": 10.0,
+    "Growth": 5.0,
+    "Aggressive Growth": 5.0,
+}
+
+# Cash moves per transaction type: (cash sign, portfolio total sign)
+CASH_FLOWS = {
+    "Buy": (-1, 0),
+    "Sell": (1, 0),
+    "Deposit": (1, 1),
+    "Withdrawal": (-1, -1),
+}
+
+EVENT_TYPES = ("TRANSACTIONS", "POSITION_HISTORY", "INTERACTIONS")
+
+
+def _money(value: float) -> str:
+    for threshold, suffix in ((1e9, "B"), (1e6, "M"), (1e3, "K")):
+        if abs(value) >= threshold:
+            return f"${value / threshold:.1f}{suffix}"
+    return f"${value:,.0f}"
+
+
+@dataclass
+class Alert:
+    alert_id: str
+    rule: str
+    severity: str
+    raised_at: pd.Timestamp
+    last_seen: pd.Timestamp
+    client_id: Optional[str]
+    portfolio_id: Optional[str]
+    value: float
+    message: str
+    occurrences: int = 1
+    acknowledged: bool = False
+
+
+@dataclass
+class PortfolioBook:
+    """Latest position snapshot of one portfolio, adjusted by later cash flows"""
+
+    snapshot: Optional[pd.Timestamp] = None
+    total: float = 0.0
+    cash: float = 0.0
+    by_class: Dict[str, float] = field(default_factory=dict)
+    top_value: float = 0.0
+    top_ticker: Optional[str] = None
+    tickers: Set[str] = field(default_factory=set)
+
+    def reset(self, snapshot: pd.Timestamp) -> None:
+        self.snapshot = snapshot
+        self.total = self.cash = self.top_value = 0.0
+        self.by_class = {}
+        self.top_ticker = None
+        self.tickers = set()
+
+
+# -----------------------------
+# Rules
+# -----------------------------
+
+
+class AlertRule:
+    """Base rule: every hook is a no-op; rules report through the engine"""
+
+    name = "rule"
+
+    def on_transaction(self, engine: "AlertEngine", event: Any) -> None:
+        pass
+
+    def on_interaction(self, engine: "AlertEngine", event: Any) -> None:
+        pass
+
+    def on_portfolio(self, engine: "AlertEngine", portfolio_id: str) -> None:
+        """Re-check one portfolio after its book changed"""
+
+    def advance(self, engine: "AlertEngine", now: pd.Timestamp) -> None:
+        """Event time moved forward to ``now``"""
+
+
+class SuitabilityRule(AlertRule):
+    """
+    Portfolio strategy more than one step riskier than the client's
+    tolerance, or an equity + alternatives share above the tolerance cap.
+    """
+
+    name = "Suitability mismatch"
+
+    def on_portfolio(self, engine: "AlertEngine", portfolio_id: str) -> None:
+        book = engine.books[portfolio_id]
+        client_id = engine.portfolio_client.get(portfolio_id)
+        tolerance = engine.client_tolerance.get(client_id)
+        strategy = engine.portfolio_strategy.get(portfolio_id)
+        if tolerance not in RISK_LADDER or book.total <= 0:
+            return
+        risky = sum(book.by_class.get(c, 0.0) for c in RISK_ASSET_CLASSES)
+        share = risky / book.total
+        cap = MAX_RISK_ASSET_SHARE[tolerance]
+        gap = RISK_LADDER.get(strategy, RISK_LADDER[tolerance]) - RISK_LADDER[tolerance]
+        if gap > 1 or share > cap + 0.1:
+            severity = "Critical" if gap > 2 or share > cap + 0.25 else "High"
+            engine.raise_alert(
+                self.name,
+                portfolio_id,
+                severity,
+                book.total,
+                f"{strategy} portfolio for a {tolerance} client; "
+                f"{share:.0%} in equity/alternatives (cap {cap:.0%})",
+                portfolio_id=portfolio_id,
+            )
+        else:
+            engine.resolve(self.name, portfolio_id)
+
+
+class ConcentrationRule(AlertRule):
+    """Largest single non-cash holding above ``threshold`` of the portfolio"""
+
+    name = "Concentration breach"
+
+    def __init__(self, threshold: float = 0.3, critical: float = 0.5):
+        self.threshold = threshold
+        self.critical = critical
+
+    def on_portfolio(self, engine: "AlertEngine", portfolio_id: str) -> None:
+        book = engine.books[portfolio_id]
+        weight = book.top_value / book.total if book.total > 0 else 0.0
+        if weight >= self.threshold:
+            engine.raise_alert(
+                self.name,
+                portfolio_id,
+                "Critical" if weight >= self.critical else "High",
+                book.total,
+                f"{book.top_ticker} is {weight:.0%} of the portfolio "
+                f"(limit {self.threshold:.0%})",
+                portfolio_id=portfolio_id,
+            )
+        else:
+            engine.resolve(self.name, portfolio_id)
+
+
+class CashDriftRule(AlertRule):
+    """Cash allocation more than ``tolerance_pct`` points from its target"""
+
+    name = "Cash drift"
+
+    def __init__(self, tolerance_pct: float = 10.0, high_pct: float = 20.0):
+        self.tolerance_pct = tolerance_pct
+        self.high_pct = high_pct
+
+    def on_portfolio(self, engine: "AlertEngine", portfolio_id: str) -> None:
+        book = engine.books[portfolio_id]
+        target = CASH_TARGET_PCT.get(engine.portfolio_strategy.get(portfolio_id))
+        if target is None or book.total <= 0:
+            return
+        cash_pct = max(book.cash, 0.0) / book.total * 100
+        drift = cash_pct - target
+        if abs(drift) > self.tolerance_pct:
+            engine.raise_alert(
+                self.name,
+                portfolio_id,
+                "High" if abs(drift) > self.high_pct else "Medium",
+                book.cash,
+                f"Cash at {cash_pct:.0f}% vs {target:.0f}% target "
+                f"({_money(book.cash)} {'idle' if drift > 0 else 'short'})",
+                portfolio_id=portfolio_id,
+            )
+        else:
+            engine.resolve(self.name, portfolio_id)
+
+
+class LargeTransactionRule(AlertRule):
+    """
+    Amount ``z`` standard deviations above the running mean of its
+    transaction type (Welford's online mean/variance, updated after the
+    check so an outlier cannot mask itself), or above ``absolute``. Each
+    alert is about one transaction, so it resolves ``expire_days`` of event
+    time after it was raised.
+    """
+
+    name = "Large transaction"
+
+    def __init__(
+        self,
+        z: float = 3.0,
+        critical_z: float = 5.0,
+        absolute: float = 2_000_000.0,
+        warmup: int = 30,
+        expire_days: int = 30,
+    ):
+        self.z = z
+        self.critical_z = critical_z
+        self.absolute = absolute
+        self.warmup = warmup
+        self.expiry = pd.Timedelta(days=expire_days)
+        # type -> [count, mean, M2]
+        self._stats: Dict[str, List[float]] = {}
+        self._expiries: Deque[Tuple[pd.Timestamp, str]] = deque()
+
+    def on_transaction(self, engine: "AlertEngine", event: Any) -> None:
+        amount = float(event.TOTAL_AMOUNT)
+        stats = self._stats.setdefault(str(event.TRANSACTION_TYPE), [0, 0.0, 0.0])
+        count, mean, m2 = stats
+        std = (m2 / (count - 1)) ** 0.5 if count > 1 else 0.0
+        score = (amount - mean) / std if count >= self.warmup and std > 0 else 0.0
+        if amount >= self.absolute or score >= self.z:
+            self._expiries.append(
+                (event.TIMESTAMP + self.expiry, str(event.TRANSACTION_ID))
+            )
+            engine.raise_alert(
+                self.name,
+                str(event.TRANSACTION_ID),
+                "Critical" if score >= self.critical_z else "High",
+                amount,
+                f"{event.TRANSACTION_TYPE} {event.TICKER} {_money(amount)}"
+                + (f" ({score:.1f} sd above typical)" if score > 0 else ""),
+                portfolio_id=str(event.PORTFOLIO_ID),
+            )
+        count += 1
+        delta = amount - mean
+        mean += delta / count
+        stats[:] = [count, mean, m2 + delta * (amount - mean)]
+
+    def advance(self, engine: "AlertEngine", now: pd.Timestamp) -> None:
+        while self._expiries and self._expiries[0][0] <= now:
+            engine.resolve(self.name, self._expiries.popleft()[1])
+
+
+class EngagementGapRule(AlertRule):
+    """
+    No interaction with a client for ``gap_days``. Contact deadlines queue up
+    in arrival order; advancing event time pops the expired ones and skips
+    any made stale by a later contact.
+    """
+
+    name = "Engagement gap"
+
+    def __init__(self, gap_days: int = 180, high_net_worth: float = 5_000_000.0):
+        self.gap = pd.Timedelta(days=gap_days)
+        self.high_net_worth = high_net_worth
+        self.last_contact: Dict[str, pd.Timestamp] = {}
+        self._deadlines: Deque[Tuple[pd.Timestamp, str]] = deque()
+
+    def touch(self, client_id: str, ts: pd.Timestamp) -> bool:
+        previous = self.last_contact.get(client_id)
+        if previous is not None and previous >= ts:
+            return False
+        self.last_contact[client_id] = ts
+        self._deadlines.append((ts + self.gap, client_id))
+        return True
+
+    def on_interaction(self, engine: "AlertEngine", event: Any) -> None:
+        client_id = str(event.CLIENT_ID)
+        if self.touch(client_id, event.TIMESTAMP):
+            engine.resolve(self.name, client_id)
+
+    def advance(self, engine: "AlertEngine", now: pd.Timestamp) -> None:
+        while self._deadlines and self._deadlines[0][0] <= now:
+            _, client_id = self._deadlines.popleft()
+            last = self.last_contact[client_id]
+            if last + self.gap > now:
+                continue
+            net_worth = engine.client_net_worth.get(client_id, 0.0)
+            engine.raise_alert(
+                self.name,
+                client_id,
+                "High" if net_worth >= self.high_net_worth else "Medium",
+                net_worth,
+                f"No contact since {last:%Y-%m-%d} " f"({(now - last).days} days)",
+                client_id=client_id,
+            )
+
+
+def default_rules() -> List[AlertRule]:
+    return [
+        SuitabilityRule(),
+        ConcentrationRule(),
+        LargeTransactionRule(),
+        CashDriftRule(),
+        EngagementGapRule(),
+    ]
+
+
+# -----------------------------
+# Engine
+# -----------------------------
+
+
+class AlertEngine:
+    """
+    Incremental alert evaluation over the three event streams.
+
+    ``set_reference`` loads clients and portfolios; ``ingest`` takes any new
+    rows of each stream, replays them in timestamp order and returns the
+    alerts raised by that batch. Position rows with a newer TIMESTAMP than
+    a portfolio's book start a new snapshot; portfolio rules run once per
+    touched portfolio at the end of the batch, so partial snapshots never
+    alert. A position row already applied to the current snapshot (same
+    PORTFOLIO_ID, TIMESTAMP and TICKER) and a TRANSACTION_ID seen before are
+    skipped. ``watermarks`` holds the newest TIMESTAMP seen per stream.
+    """
+
+    def __init__(self, rules: Optional[Iterable[AlertRule]] = None):
+        self.rules = list(rules) if rules is not None else default_rules()
+        self.books: Dict[str, PortfolioBook] = {}
+        self.portfolio_client: Dict[str, str] = {}
+        self.portfolio_strategy: Dict[str, str] = {}
+        self.client_name: Dict[str, str] = {}
+        self.client_tolerance: Dict[str, str] = {}
+        self.client_net_worth: Dict[str, float] = {}
+        self.watermarks: Dict[str, Optional[pd.Timestamp]] = dict.fromkeys(EVENT_TYPES)
+        self.now: Optional[pd.Timestamp] = None
+        self._alerts: Dict[Tuple[str, str], Alert] = {}
+        self._new: List[Alert] = []
+        self._dirty: Set[str] = set()
+        self._transactions: Set[str] = set()
+        self._sequence = 0
+        self._lock = threading.Lock()
+        self.stats = {
+            "events": 0,
+            "duplicates": 0,
+            "raised": 0,
+            "updated": 0,
+            "resolved": 0,
+        }
+
+    # -----------------------------
+    # Reference data
+    # -----------------------------
+
+    def set_reference(self, clients: pd.DataFrame, portfolios: pd.DataFrame) -> None:
+        for row in clients.itertuples(index=False):
+            client_id = str(row.CLIENT_ID)
+            self.client_name[client_id] = f"{row.FIRST_NAME} {row.LAST_NAME}"
+            self.client_tolerance[client_id] = row.RISK_TOLERANCE
+            self.client_net_worth[client_id] = float(row.NET_WORTH_ESTIMATE or 0.0)
+            joined = getattr(row, "JOIN_DATE", None)
+            if joined is not None and pd.notna(joined):
+                for rule in self.rules:
+                    if isinstance(rule, EngagementGapRule):
+                        rule.touch(client_id, pd.Timestamp(joined))
+        for row in portfolios.itertuples(index=False):
+            self.portfolio_client[str(row.PORTFOLIO_ID)] = str(row.CLIENT_ID)
+            self.portfolio_strategy[str(row.PORTFOLIO_ID)] = row.STRATEGY_TYPE
+
+    # -----------------------------
+    # Alert bookkeeping (called by rules)
+    # -----------------------------
+
+    def raise_alert(
+        self,
+        rule: str,
+        key: str,
+        severity: str,
+        value: float,
+        message: str,
+        client_id: Optional[str] = None,
+        portfolio_id: Optional[str] = None,
+    ) -> None:
+        now = self.now
+        existing = self._alerts.get((rule, key))
+        if existing is not None:
+            existing.last_seen = now
+            existing.occurrences += 1
+            existing.value = value
+            existing.message = message
+            if SEVERITY_RANK[severity] < SEVERITY_RANK[existing.severity]:
+                existing.severity = severity
+                existing.acknowledged = False
+            self.stats["updated"] += 1
+            return
+        self._sequence += 1
+        alert = Alert(
+            alert_id=f"ALT_{self._sequence:06d}",
+            rule=rule,
+            severity=severity,
+            raised_at=now,
+            last_seen=now,
+            client_id=client_id or self.portfolio_client.get(portfolio_id),
+            portfolio_id=portfolio_id,
+            value=value,
+            message=message,
+        )
+        self._alerts[(rule, key)] = alert
+        self._new.append(alert)
+        self.stats["raised"] += 1
+
+    def resolve(self, rule: str, key: str) -> None:
+        if self._alerts.pop((rule, key), None) is not None:
+            self.stats["resolved"] += 1
+
+    # -----------------------------
+    # Ingestion
+    # -----------------------------
+
+    def _apply_position(self, event: Any) -> None:
+        portfolio_id = str(event.PORTFOLIO_ID)
+        book = self.books.setdefault(portfolio_id, PortfolioBook())
+        if book.snapshot is None or event.TIMESTAMP > book.snapshot:
+            book.reset(event.TIMESTAMP)
+        elif event.TIMESTAMP < book.snapshot:
+            return
+        elif str(event.TICKER) in book.tickers:
+            self.stats["duplicates"] += 1
+            return
+        book.tickers.add(str(event.TICKER))
+        value = float(event.MARKET_VALUE or 0.0)
+        asset_class = str(event.ASSET_CLASS)
+        book.total += value
+        book.by_class[asset_class] = book.by_class.get(asset_class, 0.0) + value
+        if event.TICKER == "CASH" or asset_class == "Cash":
+            book.cash += value
+        elif value > book.top_value:
+            book.top_value, book.top_ticker = value, str(event.TICKER)
+        self._dirty.add(portfolio_id)
+
+    def _apply_transaction(self, event: Any) -> None:
+        transaction_id = str(event.TRANSACTION_ID)
+        if transaction_id in self._transactions:
+            self.stats["duplicates"] += 1
+            return
+        self._transactions.add(transaction_id)
+        for rule in self.rules:
+            rule.on_transaction(self, event)
+        portfolio_id = str(event.PORTFOLIO_ID)
+        book = self.books.get(portfolio_id)
+        flow = CASH_FLOWS.get(str(event.TRANSACTION_TYPE))
+        if book is None or flow is None or event.TIMESTAMP <= book.snapshot:
+            return
+        amount = float(event.TOTAL_AMOUNT or 0.0)
+        book.cash += flow[0] * amount
+        book.total += flow[1] * amount
+        self._dirty.add(portfolio_id)
+
+    def ingest(
+        self,
+        transactions: Optional[pd.DataFrame] = None,
+        positions: Optional[pd.DataFrame] = None,
+        interactions: Optional[pd.DataFrame] = None,
+    ) -> List[Dict[str, Any]]:
+        """Replay new rows in timestamp order; returns alerts newly raised"""
+        frames = []
+        for kind, frame in zip(EVENT_TYPES, (transactions, positions, interactions)):
+            if frame is None or frame.empty:
+                continue
+            frame = frame.assign(
+                TIMESTAMP=pd.to_datetime(frame["TIMESTAMP"]), EVENT_STREAM=kind
+            )
+            frames.append(frame)
+        with self._lock:
+            self._new = []
+            if frames:
+                events = pd.concat(frames, ignore_index=True).sort_values(
+                    "TIMESTAMP", kind="stable"
+                )
+                for event in events.itertuples(index=False):
+                    if self.now is None or event.TIMESTAMP > self.now:
+                        self.now = event.TIMESTAMP
+                        for rule in self.rules:
+                            rule.advance(self, self.now)
+                    if event.EVENT_STREAM == "POSITION_HISTORY":
+                        self._apply_position(event)
+                    elif event.EVENT_STREAM == "TRANSACTIONS":
+                        self._apply_transaction(event)
+                    else:
+                        for rule in self.rules:
+                            rule.on_interaction(self, event)
+                self.stats["events"] += len(events)
+                for kind, group in events.groupby("EVENT_STREAM"):
+                    latest = group["TIMESTAMP"].max()
+                    current = self.watermarks[kind]
+                    if current is None or latest > current:
+                        self.watermarks[kind] = latest
+            for portfolio_id in sorted(self._dirty):
+                for rule in self.rules:
+                    rule.on_portfolio(self, portfolio_id)
+            self._dirty.clear()
+            return [self._row(alert) for alert in self._new]
+
+    # -----------------------------
+    # Queries
+    # -----------------------------
+
+    def _row(self, alert: Alert) -> Dict[str, Any]:
+        return {
+            "ALERT_ID": alert.alert_id,
+            "RULE": alert.rule,
+            "SEVERITY": alert.severity,
+            "RAISED_AT": alert.raised_at,
+            "LAST_SEEN": alert.last_seen,
+            "OCCURRENCES": alert.occurrences,
+            "CLIENT_ID": alert.client_id,
+            "CLIENT_NAME": self.client_name.get(alert.client_id, alert.client_id),
+            "PORTFOLIO_ID": alert.portfolio_id,
+            "VALUE": alert.value,
+            "MESSAGE": alert.message,
+        }
+
+    def active(
+        self,
+        severities: Optional[Iterable[str]] = None,
+        include_acknowledged: bool = False,
+    ) -> pd.DataFrame:
+        """Open alerts, most severe first, then most recently seen"""
+        wanted = set(severities) if severities is not None else None
+        with self._lock:
+            rows = [
+                self._row(alert)
+                for alert in self._alerts.values()
+                if (wanted is None or alert.severity in wanted)
+                and (include_acknowledged or not alert.acknowledged)
+            ]
+        alerts = pd.DataFrame(rows, columns=ALERT_COLUMNS)
+        if alerts.empty:
+            return alerts
+        alerts["_RANK"] = alerts["SEVERITY"].map(SEVERITY_RANK)
+        return (
+            alerts.sort_values(["_RANK", "LAST_SEEN"], ascending=[True, False])
+            .drop(columns="_RANK")
+            .reset_index(drop=True)
+        )
+
+    def acknowledge(self, alert_ids: Iterable[str]) -> int:
+        """Hide alerts until they escalate; returns how many were acknowledged"""
+        ids = set(alert_ids)
+        count = 0
+        with self._lock:
+            for alert in self._alerts.values():
+                if alert.alert_id in ids and not alert.acknowledged:
+                    alert.acknowledged = True
+                    count += 1
+        return count
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            open_alerts = list(self._alerts.values())
+        by_severity = {severity: 0 for severity in SEVERITIES}
+        for alert in open_alerts:
+            by_severity[alert.severity] += 1
+        return dict(
+            self.stats,
+            open=len(open_alerts),
+            by_severity=by_severity,
+            value_at_risk=sum(
+                self.books[portfolio_id].total
+                for portfolio_id in {alert.portfolio_id for alert in open_alerts}
+                if portfolio_id in self.books
+            ),
+        )
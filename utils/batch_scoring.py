@@ -0,0 +1,397 @@
+"""
+Batch Interaction Scoring for Wealth 360 Analytics Platform
+
+Incremental AI_CLASSIFY / AI_SENTIMENT scoring of INTERACTIONS notes. Each
+run diffs the notes against the persisted scores (by INTERACTION_ID, content
+hash and model version) and sends only new or edited interactions to the
+backend, in fixed-size chunks scored in parallel. Results are upserted into a
+side table, so dashboards read precomputed labels and scoring cost grows with
+new interactions only. ``LocalScoringBackend`` is a deterministic stand-in
+for Cortex.
+"""
+
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from utils.llm_telemetry import LLMTelemetry, timed_call
+from utils.notes_classifier import NotesClassifier
+from utils.text_embedding import HashingEmbedder
+
+logger = logging.getLogger(__name__)
+
+# Category -> description used by the local stand-in model
+INTERACTION_CATEGORIES: Dict[str, str] = {
+    "Risk Adjustment Request": "reduce risk volatility concern rebalance conservative allocation",
+    "Satisfaction Feedback": "satisfied happy pleased great excellent performance thanks",
+    "Complaint/Escalation": "complaint complained issue escalate frustrated unhappy leave service problem",
+    "Product Interest": "interested product esg fund options annuity insurance new offering",
+    "Liquidity Need": "liquidity withdrawal cash distribution home purchase need funds",
+    "Investment Opportunity": "investment opportunity additional contribution invest more market",
+    "Compliance Issue": "compliance kyc documentation regulatory update information verify",
+}
+
+SCORE_COLUMNS = [
+    "INTERACTION_ID",
+    "CONTENT_HASH",
+    "CATEGORY",
+    "CONFIDENCE",
+    "SENTIMENT",
+    "SENTIMENT_LABEL",
+    "MODEL_VERSION",
+    "SCORED_AT",
+]
+
+# Local stand-in label for notes sharing no words with any category
+UNCLASSIFIED = "Other"
+
+DEFAULT_CHUNK_SIZE = 100
+DEFAULT_WORKERS = 4
+# |sentiment| below this is labelled Neutral
+NEUTRAL_BAND = 0.2
+
+
+def content_hash(texts: pd.Series) -> np.ndarray:
+    """Stable 64-bit hash per text (as int64, so it fits a NUMBER column)"""
+    return (
+        pd.util.hash_pandas_object(texts.fillna("").astype(str), index=False)
+        .to_numpy()
+        .view(np.int64)
+    )
+
+
+def sentiment_label(scores: pd.Series) -> pd.Series:
+    labels = np.where(
+        scores >= NEUTRAL_BAND,
+        "Positive",
+        np.where(scores <= -NEUTRAL_BAND, "Negative", "Neutral"),
+    )
+    return pd.Series(labels, index=scores.index)
+
+
+# -----------------------------
+# Backends
+# -----------------------------
+
+
+class ScoringBackend:
+    """
+    ``score(texts)`` returns one row per text with CATEGORY, CONFIDENCE
+    (None when the backend has no score) and SENTIMENT in [-1, 1].
+    ``version`` is stored with each result; changing it rescores everything.
+    """
+
+    version = "base"
+
+    def __init__(self, categories: Optional[Sequence[str]] = None):
+        self.categories = list(categories or INTERACTION_CATEGORIES)
+
+    def score(self, texts: List[str]) -> pd.DataFrame:
+        raise NotImplementedError
+
+
+class CortexScoringBackend(ScoringBackend):
+    """
+    One query per chunk: the texts are bound as a JSON array and flattened,
+    so each chunk costs a single round trip to AI_CLASSIFY and SENTIMENT.
+    """
+
+    version = "cortex-ai-classify-v1"
+
+    SQL = """
+        SELECT f.INDEX AS IDX,
+               AI_CLASSIFY(f.VALUE::STRING, PARSE_JSON(?)):labels[0]::STRING AS CATEGORY,
+               SNOWFLAKE.CORTEX.SENTIMENT(f.VALUE::STRING) AS SENTIMENT
+        FROM TABLE(FLATTEN(INPUT => PARSE_JSON(?))) f
+        ORDER BY f.INDEX
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Any],
+        categories: Optional[Sequence[str]] = None,
+        telemetry: Optional[LLMTelemetry] = None,
+    ):
+        super().__init__(categories)
+        self.session_factory = session_factory
+        self.telemetry = telemetry
+
+    def score(self, texts: List[str]) -> pd.DataFrame:
+        with timed_call(
+            self.telemetry, "classify", "cortex", "ai_classify", "\n".join(texts)
+        ) as call:
+            rows = (
+                self.session_factory()
+                .sql(self.SQL, params=[json.dumps(self.categories), json.dumps(texts)])
+                .to_pandas()
+            )
+            call["completion_tokens"] = 2 * len(rows)
+        rows.columns = [c.upper() for c in rows.columns]
+        return pd.DataFrame(
+            {
+                "CATEGORY": rows["CATEGORY"].to_numpy(),
+                "CONFIDENCE": None,
+                "SENTIMENT": rows["SENTIMENT"].astype(float).to_numpy(),
+            }
+        )
+
+
+class LocalScoringBackend(ScoringBackend):
+    """
+    Deterministic stand-in: the category is the nearest category description
+    by hashed-embedding cosine similarity, confidence its softmax weight, and
+    sentiment the keyword polarity of ``NotesClassifier`` squashed to [-1, 1].
+    Notes sharing no words with any category are labelled UNCLASSIFIED.
+    """
+
+    version = "local-hashing-v1"
+
+    def __init__(
+        self,
+        categories: Optional[Sequence[str]] = None,
+        embedder=None,
+        classifier: Optional[NotesClassifier] = None,
+        temperature: float = 0.1,
+    ):
+        super().__init__(categories)
+        self.embedder = embedder or HashingEmbedder()
+        self.classifier = classifier or NotesClassifier()
+        self.temperature = temperature
+        self._centroids = self.embedder.embed(
+            f"{name} {INTERACTION_CATEGORIES.get(name, '')}" for name in self.categories
+        )
+
+    def score(self, texts: List[str]) -> pd.DataFrame:
+        similarity = self.embedder.embed(texts) @ self._centroids.T
+        logits = similarity / self.temperature
+        weights = np.exp(logits - logits.max(axis=1, keepdims=True))
+        weights /= weights.sum(axis=1, keepdims=True)
+        best = weights.argmax(axis=1)
+        category = np.asarray(self.categories, dtype=object)[best]
+        category[similarity.max(axis=1) <= 0] = UNCLASSIFIED
+        polarity = self.classifier.classify_texts(pd.Series(texts))["SENTIMENT_VALUE"]
+        return pd.DataFrame(
+            {
+                "CATEGORY": category,
+                "CONFIDENCE": weights[np.arange(len(texts)), best],
+                "SENTIMENT": np.tanh(polarity.to_numpy(dtype=float) / 2),
+            }
+        )
+
+
+# -----------------------------
+# Score stores
+# -----------------------------
+
+
+class MemoryScoreStore:
+    """In-process score table (tests and the local stand-in)"""
+
+    def __init__(self) -> None:
+        self._table = pd.DataFrame(columns=SCORE_COLUMNS)
+
+    def load(self) -> pd.DataFrame:
+        return self._table.copy()
+
+    def upsert(self, scores: pd.DataFrame) -> None:
+        kept = self._table[
+            ~self._table["INTERACTION_ID"].isin(scores["INTERACTION_ID"])
+        ]
+        self._table = pd.concat([kept, scores[SCORE_COLUMNS]], ignore_index=True)
+
+
+class SnowflakeScoreStore:
+    """
+    Side table keyed by INTERACTION_ID. Upserts stage the batch in a
+    temporary table and MERGE it, so rescored rows replace their old labels.
+    """
+
+    def __init__(
+        self, session_factory: Callable[[], Any], table: str = "INTERACTION_AI_SCORES"
+    ):
+        self.session_factory = session_factory
+        self.table = table
+
+    def _ensure(self, session) -> None:
+        session.sql(
+            f"""
+            CREATE TABLE IF NOT EXISTS {self.table} (
+                INTERACTION_ID STRING PRIMARY KEY,
+                CONTENT_HASH NUMBER(19, 0),
+                CATEGORY STRING,
+                CONFIDENCE FLOAT,
+                SENTIMENT FLOAT,
+                SENTIMENT_LABEL STRING,
+                MODEL_VERSION STRING,
+                SCORED_AT TIMESTAMP_NTZ
+            )
+            """
+        ).collect()
+
+    def load(self) -> pd.DataFrame:
+        session = self.session_factory()
+        self._ensure(session)
+        frame = session.sql(f"SELECT * FROM {self.table}").to_pandas()
+        frame.columns = [c.upper() for c in frame.columns]
+        return frame.reindex(columns=SCORE_COLUMNS)
+
+    def upsert(self, scores: pd.DataFrame) -> None:
+        session = self.session_factory()
+        self._ensure(session)
+        stage = f"{self.table}_STAGE"
+        session.write_pandas(
+            scores[SCORE_COLUMNS],
+            stage,
+            auto_create_table=True,
+            overwrite=True,
+            table_type="temporary",
+        )
+        updates = ", ".join(f"t.{c} = s.{c}" for c in SCORE_COLUMNS[1:])
+        columns = ", ".join(SCORE_COLUMNS)
+        values = ", ".join(f"s.{c}" for c in SCORE_COLUMNS)
+        session.sql(
+            f"""
+            MERGE INTO {self.table} t USING {stage} s
+                ON t.INTERACTION_ID = s.INTERACTION_ID
+            WHEN MATCHED THEN UPDATE SET {updates}
+            WHEN NOT MATCHED THEN INSERT ({columns}) VALUES ({values})
+            """
+        ).collect()
+
+
+# -----------------------------
+# Incremental batch scorer
+# -----------------------------
+
+
+class BatchScorer:
+    """
+    Keeps the persisted scores in memory (loaded once from ``store``) and
+    scores only interactions that are missing, whose text hash changed or
+    that were scored by another model version. Chunks run on a thread pool;
+    a failed chunk is logged and left pending for the next run. Shared across
+    Streamlit sessions, so loading and runs are serialised by a lock and the
+    score table is replaced rather than modified in place.
+    """
+
+    def __init__(
+        self,
+        backend: ScoringBackend,
+        store=None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        max_workers: int = DEFAULT_WORKERS,
+    ):
+        self.backend = backend
+        self.store = store or MemoryScoreStore()
+        self.chunk_size = chunk_size
+        self.max_workers = max_workers
+        self._scores: Optional[pd.DataFrame] = None
+        self._lock = threading.RLock()
+
+    @property
+    def scores(self) -> pd.DataFrame:
+        """All persisted scores, indexed by INTERACTION_ID"""
+        with self._lock:
+            if self._scores is None:
+                loaded = self.store.load()
+                self._scores = loaded.set_index("INTERACTION_ID", drop=False)
+            return self._scores
+
+    def pending(
+        self,
+        interactions: pd.DataFrame,
+        text_col: str = "OUTCOME_NOTES",
+        id_col: str = "INTERACTION_ID",
+    ) -> pd.DataFrame:
+        """Rows of ``interactions`` with no current score (adds CONTENT_HASH)"""
+        frame = interactions[[id_col, text_col]].dropna(subset=[text_col])
+        frame = frame.drop_duplicates(subset=id_col, keep="last")
+        frame = frame.assign(CONTENT_HASH=content_hash(frame[text_col]))
+        stored = self.scores.reindex(frame[id_col].astype(str).to_numpy())
+        current = (
+            stored["CONTENT_HASH"].to_numpy() == frame["CONTENT_HASH"].to_numpy()
+        ) & (stored["MODEL_VERSION"].to_numpy() == self.backend.version)
+        return frame[~current]
+
+    def _score_chunk(
+        self, chunk: pd.DataFrame, text_col: str
+    ) -> Optional[pd.DataFrame]:
+        try:
+            result = self.backend.score(chunk[text_col].astype(str).tolist())
+        except Exception as e:
+            logger.warning(f"Scoring chunk of {len(chunk)} failed: {e}")
+            return None
+        result.index = chunk.index
+        return result
+
+    def run(
+        self,
+        interactions: pd.DataFrame,
+        text_col: str = "OUTCOME_NOTES",
+        id_col: str = "INTERACTION_ID",
+    ) -> Dict[str, Any]:
+        """Score pending interactions and persist them; returns run stats"""
+        with self._lock:
+            return self._run(interactions, text_col, id_col)
+
+    def _run(
+        self, interactions: pd.DataFrame, text_col: str, id_col: str
+    ) -> Dict[str, Any]:
+        started = time.perf_counter()
+        todo = self.pending(interactions, text_col, id_col)
+        chunks = [
+            todo.iloc[i : i + self.chunk_size]
+            for i in range(0, len(todo), self.chunk_size)
+        ]
+        with ThreadPoolExecutor(max_workers=max(1, self.max_workers)) as pool:
+            results = list(pool.map(lambda c: self._score_chunk(c, text_col), chunks))
+
+        scored = [r for r in results if r is not None]
+        if scored:
+            done = pd.concat(scored)
+            batch = pd.DataFrame(
+                {
+                    "INTERACTION_ID": todo.loc[done.index, id_col].astype(str),
+                    "CONTENT_HASH": todo.loc[done.index, "CONTENT_HASH"],
+                    "CATEGORY": done["CATEGORY"],
+                    "CONFIDENCE": done["CONFIDENCE"].astype(float),
+                    "SENTIMENT": done["SENTIMENT"].astype(float),
+                    "SENTIMENT_LABEL": sentiment_label(done["SENTIMENT"].astype(float)),
+                    "MODEL_VERSION": self.backend.version,
+                    "SCORED_AT": pd.Timestamp.now().floor("s"),
+                }
+            )
+            self.store.upsert(batch)
+            kept = self.scores.drop(index=batch["INTERACTION_ID"], errors="ignore")
+            self._scores = pd.concat(
+                ([kept] if len(kept) else [])
+                + [batch.set_index("INTERACTION_ID", drop=False)]
+            )
+
+        return {
+            "PENDING": len(todo),
+            "SCORED": sum(len(r) for r in scored),
+            "CHUNKS": len(chunks),
+            "FAILED_CHUNKS": len(results) - len(scored),
+            "SECONDS": time.perf_counter() - started,
+        }
+
+    def labelled(
+        self, interactions: pd.DataFrame, id_col: str = "INTERACTION_ID"
+    ) -> pd.DataFrame:
+        """``interactions`` with the stored score columns joined on"""
+        columns = ["CATEGORY", "CONFIDENCE", "SENTIMENT", "SENTIMENT_LABEL"]
+        stored = self.scores.reindex(interactions[id_col].astype(str).to_numpy())
+        return pd.concat(
+            [
+                interactions.reset_index(drop=True),
+                stored[columns].reset_index(drop=True),
+            ],
+            axis=1,
+        )
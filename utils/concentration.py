@@ -0,0 +1,200 @@
+"""
+Concentration Analysis for Wealth 360 Analytics Platform
+
+Latest-snapshot portfolio weights held in memory at ticker, issuer and asset
+class level. Every non-zero weight is sorted once when the engine is built, so
+a breach query for any threshold is a binary search plus a slice - moving the
+concentration slider never goes back to the warehouse.
+"""
+
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+# Ticker -> issuer. Funds resolve to their sponsor so that several ETFs from
+# the same family count as one issuer exposure; unlisted tickers map to
+# themselves.
+ISSUERS: Dict[str, str] = {
+    "AAPL": "Apple",
+    "ABBV": "AbbVie",
+    "AMZN": "Amazon",
+    "BA": "Boeing",
+    "BAC": "Bank of America",
+    "BLK": "BlackRock",
+    "C": "Citigroup",
+    "CAT": "Caterpillar",
+    "COP": "ConocoPhillips",
+    "COST": "Costco",
+    "CVX": "Chevron",
+    "DE": "Deere",
+    "EOG": "EOG Resources",
+    "GE": "General Electric",
+    "GOOG": "Alphabet",
+    "GOOGL": "Alphabet",
+    "GS": "Goldman Sachs",
+    "HON": "Honeywell",
+    "JNJ": "Johnson & Johnson",
+    "JPM": "JPMorgan Chase",
+    "KO": "Coca-Cola",
+    "LLY": "Eli Lilly",
+    "LMT": "Lockheed Martin",
+    "MCD": "McDonald's",
+    "META": "Meta Platforms",
+    "MPC": "Marathon Petroleum",
+    "MRK": "Merck",
+    "MS": "Morgan Stanley",
+    "MSFT": "Microsoft",
+    "NKE": "Nike",
+    "NVDA": "NVIDIA",
+    "PEP": "PepsiCo",
+    "PFE": "Pfizer",
+    "PG": "Procter & Gamble",
+    "RTX": "RTX",
+    "SLB": "Schlumberger",
+    "TMO": "Thermo Fisher",
+    "TSLA": "Tesla",
+    "UNH": "UnitedHealth",
+    "WFC": "Wells Fargo",
+    "WMT": "Walmart",
+    "XOM": "Exxon Mobil",
+    # Fund sponsors
+    "AGG": "iShares (BlackRock)",
+    "IEF": "iShares (BlackRock)",
+    "IVV": "iShares (BlackRock)",
+    "SLV": "iShares (BlackRock)",
+    "TLT": "iShares (BlackRock)",
+    "BND": "Vanguard",
+    "VOO": "Vanguard",
+    "GLD": "SPDR (State Street)",
+    "SPY": "SPDR (State Street)",
+    "XLE": "SPDR (State Street)",
+    "XLF": "SPDR (State Street)",
+    "XLK": "SPDR (State Street)",
+    "QQQ": "Invesco",
+}
+
+# Level name -> grouping column
+LEVELS = {"ticker": "TICKER", "issuer": "ISSUER", "asset_class": "ASSET_CLASS"}
+
+POSITION_COLUMNS = ["PORTFOLIO_ID", "TICKER", "ASSET_CLASS", "MARKET_VALUE"]
+
+
+class ConcentrationEngine:
+    """
+    Portfolio x holding weight matrices for the latest positions.
+
+    For each level the engine keeps a dense (portfolio x key) weight matrix
+    and its non-zero entries sorted by weight descending; ``breaches`` takes
+    the prefix of that order at or above the threshold.
+    """
+
+    def __init__(self, positions: pd.DataFrame):
+        frame = positions.reindex(columns=POSITION_COLUMNS).copy()
+        frame["TICKER"] = frame["TICKER"].astype(str)
+        frame["ASSET_CLASS"] = frame["ASSET_CLASS"].fillna("Unclassified")
+        frame["ISSUER"] = frame["TICKER"].map(ISSUERS).fillna(frame["TICKER"])
+        frame["MARKET_VALUE"] = pd.to_numeric(
+            frame["MARKET_VALUE"], errors="coerce"
+        ).fillna(0.0)
+
+        port_codes, self.portfolios = pd.factorize(frame["PORTFOLIO_ID"])
+        self.totals = np.bincount(
+            port_codes,
+            weights=frame["MARKET_VALUE"].to_numpy(),
+            minlength=len(self.portfolios),
+        )
+        self.weights: Dict[str, pd.DataFrame] = {}
+        self._ranked: Dict[str, pd.DataFrame] = {}
+        for level, col in LEVELS.items():
+            self._build_level(level, col, frame, port_codes)
+
+    # -----------------------------
+    # Build
+    # -----------------------------
+
+    def _build_level(
+        self, level: str, col: str, frame: pd.DataFrame, port_codes: np.ndarray
+    ) -> None:
+        key_codes, keys = pd.factorize(frame[col])
+        values = np.zeros((len(self.portfolios), len(keys)))
+        np.add.at(values, (port_codes, key_codes), frame["MARKET_VALUE"].to_numpy())
+        with np.errstate(divide="ignore", invalid="ignore"):
+            weights = np.where(
+                self.totals[:, None] > 0, values / self.totals[:, None], 0.0
+            )
+        self.weights[level] = pd.DataFrame(
+            weights, index=pd.Index(self.portfolios, name="PORTFOLIO_ID"), columns=keys
+        )
+
+        rows, cols = np.nonzero(weights > 0)
+        order = np.argsort(-weights[rows, cols], kind="stable")
+        rows, cols = rows[order], cols[order]
+        self._ranked[level] = pd.DataFrame(
+            {
+                "PORTFOLIO_ID": self.portfolios[rows],
+                col: keys[cols],
+                "MARKET_VALUE": values[rows, cols],
+                "TOTAL": self.totals[rows],
+                "PCT_OF_PORTFOLIO": weights[rows, cols],
+            }
+        )
+
+    def __len__(self) -> int:
+        return len(self.portfolios)
+
+    # -----------------------------
+    # Queries
+    # -----------------------------
+
+    def _check_level(self, level: str) -> None:
+        if level not in LEVELS:
+            raise ValueError(f"level must be one of {tuple(LEVELS)}, got {level!r}")
+
+    def breaches(
+        self, threshold: float = 0.3, level: str = "ticker", limit: Optional[int] = None
+    ) -> pd.DataFrame:
+        """Holdings at ``level`` weighing at least ``threshold`` of their portfolio"""
+        self._check_level(level)
+        ranked = self._ranked[level]
+        weights = ranked["PCT_OF_PORTFOLIO"].to_numpy()
+        count = int(np.searchsorted(-weights, -threshold, side="right"))
+        if limit is not None:
+            count = min(count, limit)
+        return ranked.iloc[:count]
+
+    def summary(self, threshold: float = 0.3) -> pd.DataFrame:
+        """Breach counts and value in breach for every level at ``threshold``"""
+        rows = []
+        for level, col in LEVELS.items():
+            hits = self.breaches(threshold, level)
+            rows.append(
+                {
+                    "LEVEL": level,
+                    "BREACHES": len(hits),
+                    "PORTFOLIOS": hits["PORTFOLIO_ID"].nunique(),
+                    "KEYS": hits[col].nunique(),
+                    "VALUE_IN_BREACH": float(hits["MARKET_VALUE"].sum()),
+                }
+            )
+        return pd.DataFrame(rows)
+
+    def profile(self, level: str = "ticker") -> pd.DataFrame:
+        """Largest holding and Herfindahl index of every portfolio at ``level``"""
+        self._check_level(level)
+        weights = self.weights[level]
+        matrix = weights.to_numpy()
+        if not matrix.size:
+            return pd.DataFrame(
+                columns=["PORTFOLIO_ID", "TOP_HOLDING", "TOP_WEIGHT", "HHI", "TOTAL"]
+            )
+        top = matrix.argmax(axis=1)
+        return pd.DataFrame(
+            {
+                "PORTFOLIO_ID": weights.index,
+                "TOP_HOLDING": weights.columns[top],
+                "TOP_WEIGHT": matrix[np.arange(len(matrix)), top],
+                "HHI": (matrix**2).sum(axis=1),
+                "TOTAL": self.totals,
+            }
+        )
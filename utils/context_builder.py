@@ -0,0 +1,422 @@
+"""
+Prompt Context Builder for Wealth 360 Analytics Platform
+
+Turns the existing analytics (suitability alerts, allocation drift, idle
+cash, churn warnings and transaction anomalies) into a compact digest of
+ranked one-line facts for grounding LLM prompts. Each source contributes a
+headline plus its most severe / largest items, one per entity; facts are
+weighted by persona, deduplicated and packed greedily into a token budget.
+Digests are cached per persona, data version and budget, and the facts
+behind them per data version, so switching persona never re-queries.
+"""
+
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from utils.llm_streaming import CHARS_PER_TOKEN, estimate_tokens
+from utils.text_embedding import normalize_text
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUDGET_TOKENS = 600
+MAX_FACTS_PER_SOURCE = 25
+HEADLINE_SCORE = 2.0
+DEFAULT_CACHE_ENTRIES = 64
+
+# Digest section order and titles
+SOURCES = {
+    "suitability": "Suitability",
+    "drift": "Allocation drift",
+    "idle_cash": "Idle cash",
+    "churn": "Churn risk",
+    "anomalies": "Transaction anomalies",
+}
+
+# Relative weight of each source per persona (missing entries weigh 1.0)
+PERSONA_WEIGHTS: Dict[str, Dict[str, float]] = {
+    "chief_investment_officer": {"drift": 2.0, "suitability": 1.5},
+    "relationship_manager": {"churn": 2.0, "idle_cash": 1.5},
+    "compliance_officer": {"suitability": 2.0, "anomalies": 2.0},
+    "wealth_advisor": {"churn": 1.5, "idle_cash": 1.5, "drift": 1.5},
+    "operations_manager": {"anomalies": 2.0, "idle_cash": 1.5},
+    "executive": {"suitability": 1.2, "churn": 1.2},
+}
+
+SEVERITY = {
+    "High": 1.0,
+    "High Priority": 1.0,
+    "Medium": 0.6,
+    "Medium Priority": 0.6,
+    "Low": 0.3,
+    "Low Priority": 0.3,
+}
+
+
+@dataclass
+class Fact:
+    """One digest line about one entity (or a source headline)"""
+
+    source: str
+    key: str
+    text: str
+    score: float
+
+
+def _money(value: Any) -> str:
+    if value is None or pd.isna(value):
+        return "n/a"
+    value = float(value)
+    for threshold, suffix in ((1e9, "B"), (1e6, "M"), (1e3, "K")):
+        if abs(value) >= threshold:
+            return f"${value / threshold:.1f}{suffix}"
+    return f"${value:,.0f}"
+
+
+def _name(row: Any) -> str:
+    first = getattr(row, "FIRST_NAME", None)
+    last = getattr(row, "LAST_NAME", None)
+    name = " ".join(str(p) for p in (first, last) if p is not None and pd.notna(p))
+    return name or str(getattr(row, "CLIENT_ID", "Unknown client"))
+
+
+def _ranked(
+    frame: pd.DataFrame, severity: pd.Series, magnitude: pd.Series
+) -> pd.DataFrame:
+    """Top rows by severity scaled by magnitude percentile, with SCORE"""
+    pct = pd.to_numeric(magnitude, errors="coerce").rank(pct=True).fillna(0.0)
+    score = severity.to_numpy(dtype=float) * (0.5 + 0.5 * pct.to_numpy())
+    return frame.assign(SCORE=score).nlargest(MAX_FACTS_PER_SOURCE, "SCORE")
+
+
+# -----------------------------
+# Fact extraction per source
+# -----------------------------
+
+
+def suitability_facts(alerts: pd.DataFrame) -> List[Fact]:
+    if alerts.empty:
+        return []
+    aggressive = int((alerts["ALIGNMENT_STATUS"] == "Too Aggressive").sum())
+    facts = [
+        Fact(
+            "suitability",
+            "headline",
+            f"{len(alerts)} portfolios misaligned with client risk tolerance "
+            f"({aggressive} too aggressive), "
+            f"{_money(alerts['TOTAL_PORTFOLIO_VALUE'].sum())} affected",
+            HEADLINE_SCORE,
+        )
+    ]
+    top = _ranked(
+        alerts,
+        alerts["ALERT_LEVEL"].map(SEVERITY).fillna(0.3),
+        alerts["TOTAL_PORTFOLIO_VALUE"],
+    )
+    for row in top.itertuples():
+        facts.append(
+            Fact(
+                "suitability",
+                str(row.PORTFOLIO_ID),
+                f"{_name(row)}: {row.STRATEGY_TYPE} portfolio {row.PORTFOLIO_ID} "
+                f"is {str(row.ALIGNMENT_STATUS).lower()} for a {row.RISK_TOLERANCE} "
+                f"client ({_money(row.TOTAL_PORTFOLIO_VALUE)})",
+                row.SCORE,
+            )
+        )
+    return facts
+
+
+def drift_facts(drift: pd.DataFrame) -> List[Fact]:
+    if drift.empty:
+        return []
+    # One fact per portfolio: its most drifted asset class
+    worst = drift.sort_values("DRIFT_PCT", ascending=False).drop_duplicates(
+        "PORTFOLIO_ID"
+    )
+    facts = [
+        Fact(
+            "drift",
+            "headline",
+            f"{len(worst)} portfolios drifted over 3pt from target allocation, "
+            f"{int((worst['DRIFT_PCT'] > 10).sum())} by more than 10pt",
+            HEADLINE_SCORE,
+        )
+    ]
+    top = _ranked(
+        worst,
+        (worst["DRIFT_PCT"].astype(float) / 20).clip(0.1, 1.0),
+        worst["TOTAL_PORTFOLIO_VALUE"],
+    )
+    for row in top.itertuples():
+        facts.append(
+            Fact(
+                "drift",
+                str(row.PORTFOLIO_ID),
+                f"Portfolio {row.PORTFOLIO_ID} ({row.STRATEGY_TYPE}): "
+                f"{row.ASSET_CLASS} {float(row.CURRENT_PCT):.0f}% vs "
+                f"{float(row.TARGET_PCT):.0f}% target, "
+                f"{_money(row.TOTAL_PORTFOLIO_VALUE)}",
+                row.SCORE,
+            )
+        )
+    return facts
+
+
+def idle_cash_facts(cash: pd.DataFrame) -> List[Fact]:
+    cash = cash[cash["SWEEP_PRIORITY"] != "Acceptable"] if not cash.empty else cash
+    if cash.empty:
+        return []
+    facts = [
+        Fact(
+            "idle_cash",
+            "headline",
+            f"{_money(cash['CASH_BALANCE'].sum())} idle cash across {len(cash)} "
+            f"portfolios, ~{_money(cash['POTENTIAL_ANNUAL_INCOME'].sum())}/yr "
+            "if swept",
+            HEADLINE_SCORE,
+        )
+    ]
+    top = _ranked(
+        cash, cash["SWEEP_PRIORITY"].map(SEVERITY).fillna(0.3), cash["CASH_BALANCE"]
+    )
+    for row in top.itertuples():
+        facts.append(
+            Fact(
+                "idle_cash",
+                str(row.PORTFOLIO_ID),
+                f"{_name(row)}: {_money(row.CASH_BALANCE)} cash "
+                f"({float(row.CASH_PERCENTAGE):.0f}% of portfolio {row.PORTFOLIO_ID})",
+                row.SCORE,
+            )
+        )
+    return facts
+
+
+def churn_facts(churn: pd.DataFrame) -> List[Fact]:
+    if churn.empty:
+        return []
+    churn = churn.drop_duplicates("CLIENT_ID")
+    high = int((churn["RISK_LEVEL"] == "High").sum())
+    facts = [
+        Fact(
+            "churn",
+            "headline",
+            f"{high} clients at high and {len(churn) - high} at medium churn risk "
+            f"({_money(churn['NET_WORTH_ESTIMATE'].sum())} net worth)",
+            HEADLINE_SCORE,
+        )
+    ]
+    top = _ranked(
+        churn,
+        churn["RISK_LEVEL"].map(SEVERITY).fillna(0.3),
+        churn["NET_WORTH_ESTIMATE"],
+    )
+    for row in top.itertuples():
+        gap = getattr(row, "DAYS_SINCE_LAST_CONTACT", None)
+        contact = f", {int(gap)} days since contact" if pd.notna(gap) else ""
+        facts.append(
+            Fact(
+                "churn",
+                str(row.CLIENT_ID),
+                f"{_name(row)}: {row.RISK_LEVEL.lower()} risk ({row.RISK_FACTOR}), "
+                f"net worth {_money(row.NET_WORTH_ESTIMATE)}{contact}",
+                row.SCORE,
+            )
+        )
+    return facts
+
+
+def anomaly_facts(anomalies: pd.DataFrame) -> List[Fact]:
+    if anomalies.empty:
+        return []
+    types = anomalies["ANOMALY_TYPE"].value_counts()
+    facts = [
+        Fact(
+            "anomalies",
+            "headline",
+            f"{len(anomalies)} anomalous transactions in the last 90 days: "
+            + ", ".join(
+                f"{count} {kind.lower()}" for kind, count in types.head(3).items()
+            ),
+            HEADLINE_SCORE,
+        )
+    ]
+    # One fact per client and anomaly type, describing the largest instance
+    grouped = anomalies.sort_values("TOTAL_AMOUNT", ascending=False)
+    counts = grouped.groupby(["CLIENT_ID", "ANOMALY_TYPE"], dropna=False)[
+        "TRANSACTION_ID"
+    ].transform("size")
+    grouped = grouped.assign(COUNT=counts).drop_duplicates(
+        ["CLIENT_ID", "ANOMALY_TYPE"]
+    )
+    top = _ranked(
+        grouped,
+        pd.Series(np.ones(len(grouped)), index=grouped.index),
+        grouped["TOTAL_AMOUNT"],
+    )
+    for row in top.itertuples():
+        repeat = f" (x{row.COUNT})" if row.COUNT > 1 else ""
+        facts.append(
+            Fact(
+                "anomalies",
+                f"{row.CLIENT_ID}:{row.ANOMALY_TYPE}",
+                f"{_name(row)}: {row.ANOMALY_TYPE}{repeat}, largest "
+                f"{row.TRANSACTION_TYPE} {row.TICKER} {_money(row.TOTAL_AMOUNT)}",
+                row.SCORE,
+            )
+        )
+    return facts
+
+
+FACT_BUILDERS: Dict[str, Callable[[pd.DataFrame], List[Fact]]] = {
+    "suitability": suitability_facts,
+    "drift": drift_facts,
+    "idle_cash": idle_cash_facts,
+    "churn": churn_facts,
+    "anomalies": anomaly_facts,
+}
+
+
+# -----------------------------
+# Packing and caching
+# -----------------------------
+
+
+def ground_prompt(question: str, context: str) -> str:
+    """Prompt with the digest placed ahead of the user's question"""
+    if not context:
+        return question
+    return (
+        "You are a wealth management analyst. Use the facts below about our "
+        "book of business where relevant, cite figures from them, and say when "
+        f"they are insufficient.\n\n{context}\n\nQuestion: {question}"
+    )
+
+
+def pack_facts(
+    facts: List[Fact],
+    budget_tokens: int,
+    weights: Optional[Dict[str, float]] = None,
+    title: str = "Book context:",
+) -> Dict[str, Any]:
+    """
+    Digest of the highest weighted-score facts that fit in ``budget_tokens``
+    (section titles included), grouped by source. Duplicate (source, entity)
+    pairs and repeated wording are dropped first.
+    """
+    weights = weights or {}
+    seen_keys, seen_texts, unique = set(), set(), []
+    for fact in sorted(facts, key=lambda f: -f.score):
+        text_key = normalize_text(fact.text)
+        if (fact.source, fact.key) in seen_keys or text_key in seen_texts:
+            continue
+        seen_keys.add((fact.source, fact.key))
+        seen_texts.add(text_key)
+        unique.append(fact)
+
+    # Budget in characters of the rendered digest, so the final estimate
+    # matches the accounting exactly
+    ranked = sorted(unique, key=lambda f: -f.score * weights.get(f.source, 1.0))
+    used = len(title)
+    chosen: Dict[str, List[Fact]] = {}
+    for fact in ranked:
+        cost = len(f"\n- {fact.text}")
+        if fact.source not in chosen:
+            cost += len(f"\n{SOURCES.get(fact.source, fact.source)}:")
+        if round((used + cost) / CHARS_PER_TOKEN) > budget_tokens:
+            continue
+        chosen.setdefault(fact.source, []).append(fact)
+        used += cost
+
+    lines = [title]
+    for source in list(SOURCES) + sorted(set(chosen) - set(SOURCES)):
+        if source in chosen:
+            lines.append(f"{SOURCES.get(source, source)}:")
+            lines.extend(f"- {fact.text}" for fact in chosen[source])
+    text = "\n".join(lines) if chosen else ""
+    return {
+        "text": text,
+        "tokens": estimate_tokens(text),
+        "facts_used": sum(len(v) for v in chosen.values()),
+        "facts_total": len(unique),
+    }
+
+
+class ContextBuilder:
+    """
+    ``build(persona, fingerprint, loaders)`` returns a digest dict (text,
+    tokens, facts_used, facts_total, cached). ``loaders`` maps source names
+    to zero-argument callables returning that source's DataFrame; they run
+    only when the data version changes. A loader that raises contributes
+    no facts.
+    """
+
+    def __init__(
+        self,
+        budget_tokens: int = DEFAULT_BUDGET_TOKENS,
+        persona_weights: Optional[Dict[str, Dict[str, float]]] = None,
+        max_entries: int = DEFAULT_CACHE_ENTRIES,
+    ):
+        self.budget_tokens = budget_tokens
+        self.persona_weights = (
+            PERSONA_WEIGHTS if persona_weights is None else persona_weights
+        )
+        self.max_entries = max_entries
+        self._digests: "OrderedDict[Tuple[str, str, int], Dict[str, Any]]" = (
+            OrderedDict()
+        )
+        self._facts: Tuple[Optional[str], List[Fact]] = (None, [])
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "loads": 0}
+
+    def facts(
+        self, fingerprint: str, loaders: Dict[str, Callable[[], pd.DataFrame]]
+    ) -> List[Fact]:
+        """All facts for this data version, extracted once per version"""
+        with self._lock:
+            version, facts = self._facts
+            if version == fingerprint:
+                return facts
+        facts = []
+        for source, load in loaders.items():
+            try:
+                facts.extend(FACT_BUILDERS[source](load()))
+            except Exception as e:
+                logger.warning(f"Context facts for {source} failed: {e}")
+        with self._lock:
+            self._facts = (fingerprint, facts)
+            self.stats["loads"] += 1
+        return facts
+
+    def build(
+        self,
+        persona: str,
+        fingerprint: str,
+        loaders: Dict[str, Callable[[], pd.DataFrame]],
+        budget_tokens: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        budget = budget_tokens or self.budget_tokens
+        key = (persona, fingerprint, budget)
+        with self._lock:
+            digest = self._digests.get(key)
+            if digest is not None:
+                self._digests.move_to_end(key)
+                self.stats["hits"] += 1
+                return dict(digest, cached=True)
+        digest = pack_facts(
+            self.facts(fingerprint, loaders),
+            budget,
+            self.persona_weights.get(persona),
+        )
+        with self._lock:
+            self.stats["misses"] += 1
+            self._digests[key] = digest
+            while len(self._digests) > self.max_entries:
+                self._digests.popitem(last=False)
+        return dict(digest, cached=False)
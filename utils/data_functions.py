@@ -7,15 +7,72 @@ and shared utilities used across all pages of the application.
 Author: Deepjyoti Dev, Senior Data Cloud Architect, Snowflake GXC Team
 """
 
+import hashlib
 import logging
 import os
-from typing import Any, Dict, Optional
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
 
 import pandas as pd
 import streamlit as st
 from snowflake.snowpark import Session
 from snowflake.snowpark.context import get_active_session
 
+from utils.alert_engine import AlertEngine
+from utils.batch_scoring import (
+    BatchScorer,
+    CortexScoringBackend,
+    LocalScoringBackend,
+    SnowflakeScoreStore,
+)
+from utils.concentration import ConcentrationEngine
+from utils.context_builder import ContextBuilder
+from utils.downsample import DEFAULT_WIDTH_PX, SeriesPyramid
+from utils.exposure_cube import ExposureCube
+from utils.filter_cascade import (
+    FILTER_SCENARIOS,
+    CortexFilterJudge,
+    FilterCascade,
+    SimilarityJudge,
+)
+from utils.geo_reference import GeoReference
+from utils.hierarchical_summary import (
+    CortexSummarizer,
+    ExtractiveSummarizer,
+    HierarchicalSummarizer,
+)
+from utils.kyc_worklist import KYCWorklist
+from utils.llm_streaming import (
+    AnthropicProvider,
+    CompletionProvider,
+    CortexProvider,
+    MockProvider,
+    OpenAIProvider,
+    StreamMetrics,
+    TimedStream,
+    estimate_tokens,
+    word_chunks,
+)
+from utils.llm_telemetry import LLMTelemetry
+from utils.market_events import EXPOSURE_COLUMNS, EventIntervalIndex, outreach_list
+from utils.metric_compiler import MODEL_FILES, MetricCompiler
+from utils.metrics_registry import MetricsRegistry, process_rss_bytes
+from utils.model_fanout import ModelFanout
+from utils.notes_classifier import NotesClassifier
+from utils.performance import PerformanceEngine
+from utils.response_cache import SemanticResponseCache
+from utils.risk_metrics import WINDOWS, RiskEngine
+from utils.stream_windows import WindowedAggregator
+from utils.transaction_replay import (
+    DEFAULT_SPEEDUP,
+    TransactionReplay,
+    synthetic_transactions,
+)
+from utils.value_series import ValueSeriesEngine
+from utils.vector_index import PROFILE_COLUMNS, ClientEmbeddingIndex
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
@@ -119,107 +176,274 @@ def get_snowflake_session() -> Session:
     return Session.builder.configs(connection_parameters).create()
 
 
-@st.cache_data(ttl=600, show_spinner=False)
-def run_query(sql: str) -> pd.DataFrame:
-    """Execute SQL query and return results as pandas DataFrame"""
+QUERY_CACHE_TTL_SECONDS = 600
+# One shared Snowpark session per process (see get_snowflake_session)
+SESSION_POOL_SIZE = 1
+WAREHOUSE_HISTORY_INTERVAL_SECONDS = 60
+HEALTH_COLUMNS = ["COMPONENT", "COUNT", "P50_SECONDS", "P95_SECONDS"]
+
+# Set by _cached_query when a run_query call actually reached Snowflake
+_query_state = threading.local()
+
+
+@st.cache_resource(show_spinner=False)
+def get_metrics_registry() -> MetricsRegistry:
+    """Process-wide operational metrics (queries, cache, session, page runs)"""
+    registry = MetricsRegistry()
+    registry.histogram(
+        "snowflake_query_duration_seconds",
+        "Wall time of queries sent to Snowflake",
+        ["status"],
+    )
+    registry.histogram(
+        "snowflake_warehouse_queue_seconds",
+        "Time this session's queries spent queued on the warehouse",
+    )
+    registry.counter(
+        "query_cache_requests_total", "run_query calls by cache result", ["result"]
+    )
+    registry.gauge("query_cache_entries", "Live run_query cache entries").set_function(
+        lambda: _query_cache_stats()[0]
+    )
+    registry.gauge(
+        "query_cache_bytes", "Memory held by cached run_query results"
+    ).set_function(lambda: _query_cache_stats()[1])
+    registry.gauge(
+        "snowflake_session_pool_size", "Snowpark sessions available to the app"
+    ).set(SESSION_POOL_SIZE)
+    registry.gauge(
+        "snowflake_session_pool_in_use", "Snowpark sessions currently running a query"
+    )
+    registry.counter(
+        "snowflake_session_busy_seconds_total",
+        "Session time spent running queries",
+    )
+    registry.histogram(
+        "page_run_duration_seconds", "Streamlit script run time per page", ["page"]
+    )
+    registry.gauge(
+        "process_resident_memory_bytes", "Resident memory of the app process"
+    ).set_function(process_rss_bytes)
+    registry.gauge(
+        "process_start_time_seconds", "Start time of the metrics registry"
+    ).set(registry.started)
+    return registry
+
+
+@st.cache_resource(show_spinner=False)
+def _query_cache_index() -> Dict[str, Tuple[float, int]]:
+    """SQL hash -> (expiry, result bytes) of results run_query has cached"""
+    return {}
+
+
+def _query_cache_stats() -> Tuple[int, int]:
+    """Live cache entries and their bytes, dropping expired ones"""
+    index = _query_cache_index()
+    now = time.time()
+    for key in [k for k, (expires, _) in list(index.items()) if expires <= now]:
+        index.pop(key, None)
+    return len(index), sum(size for _, size in index.values())
+
+
+@st.cache_data(ttl=QUERY_CACHE_TTL_SECONDS, show_spinner=False)
+def _cached_query(sql: str) -> pd.DataFrame:
+    """Execute SQL on Snowflake (runs only on a cache miss)"""
+    _query_state.missed = True
+    registry = get_metrics_registry()
+    in_use = registry.gauge("snowflake_session_pool_in_use")
+    in_use.inc()
+    started = time.perf_counter()
+    status = "ok"
     try:
         session = get_snowflake_session()
         logger.debug(f"Executing query: {sql[:100]}...")
         result = session.sql(sql).to_pandas()
         logger.info(f"Query returned {len(result)} rows")
+        _query_cache_index()[hashlib.sha1(sql.encode("utf-8")).hexdigest()] = (
+            time.time() + QUERY_CACHE_TTL_SECONDS,
+            int(result.memory_usage(deep=True).sum()),
+        )
         return result
     except Exception as e:
+        status = "error"
         logger.error(f"Query execution failed: {e}")
         st.error(f"Database query failed: {str(e)}")
         return pd.DataFrame()
+    finally:
+        elapsed = time.perf_counter() - started
+        in_use.dec()
+        registry.counter("snowflake_session_busy_seconds_total").inc(elapsed)
+        registry.histogram("snowflake_query_duration_seconds").observe(
+            elapsed, status=status
+        )
+
+
+def run_query(sql: str) -> pd.DataFrame:
+    """Execute SQL query and return results as pandas DataFrame"""
+    _query_state.missed = False
+    result = _cached_query(sql)
+    get_metrics_registry().counter("query_cache_requests_total").inc(
+        result="miss" if _query_state.missed else "hit"
+    )
+    return result
 
 
 # -----------------------------
-# Global KPIs and Metrics
+# Operational Metrics
 # -----------------------------
 
 
-def get_global_kpis() -> Dict[str, Any]:
-    """Calculate firm-level KPIs including client count, advisor count, AUM, and YTD growth"""
-    # Clients
-    clients_df = run_query("SELECT COUNT(DISTINCT CLIENT_ID) AS CNT FROM CLIENTS")
-    num_clients = (
-        int(clients_df.loc[0, "CNT"])
-        if not clients_df.empty and "CNT" in clients_df.columns
-        else 0
-    )
+def start_page_run(page: str) -> None:
+    """Mark the start of a page's script run (pair with finish_page_run)"""
+    st.session_state["_page_run"] = (page, time.perf_counter())
 
-    # Advisors
-    advisors_df = run_query("SELECT COUNT(DISTINCT ADVISOR_ID) AS CNT FROM ADVISORS")
-    num_advisors = (
-        int(advisors_df.loc[0, "CNT"])
-        if not advisors_df.empty and "CNT" in advisors_df.columns
-        else 0
-    )
 
-    # AUM
-    aum_sql = """
-        WITH latest AS (
-            SELECT PORTFOLIO_ID, MAX(TIMESTAMP) AS MAX_TS
-            FROM POSITION_HISTORY
-            GROUP BY PORTFOLIO_ID
+def finish_page_run() -> None:
+    """Record the run time of the page started with start_page_run"""
+    page, started = st.session_state.pop("_page_run", (None, None))
+    if page is not None:
+        get_metrics_registry().histogram("page_run_duration_seconds").observe(
+            time.perf_counter() - started, page=page
         )
-        SELECT COALESCE(SUM(ph.MARKET_VALUE), 0) AS AUM
-        FROM POSITION_HISTORY ph
-        JOIN latest lt
-          ON ph.PORTFOLIO_ID = lt.PORTFOLIO_ID AND ph.TIMESTAMP = lt.MAX_TS
-        WHERE ph.TICKER <> 'CASH'
-    """
-    aum_df = run_query(aum_sql)
-    aum = (
-        float(aum_df.loc[0, "AUM"])
-        if not aum_df.empty and "AUM" in aum_df.columns
-        else 0.0
-    )
 
-    # YTD growth
-    ytd_sql = """
-        WITH port AS (
-            SELECT p.PORTFOLIO_ID,
-                   TO_TIMESTAMP(DATE_TRUNC('YEAR', CURRENT_DATE)) AS START_OF_YEAR,
-                   TO_TIMESTAMP(CURRENT_DATE) AS END_DATE
-            FROM PORTFOLIOS AS p
-        ),
-        daily_portfolio_value AS (
-            SELECT ph.PORTFOLIO_ID, ph.TIMESTAMP, SUM(ph.MARKET_VALUE) AS TOT_MARKET_VALUE
-            FROM POSITION_HISTORY AS ph
-            WHERE ph.TICKER <> 'CASH'
-            GROUP BY 1,2
-        ),
-        start_of_year_value AS (
-            SELECT 1 AS JOIN_ID, p.START_OF_YEAR, SUM(TOT_MARKET_VALUE) AS TOT_MARKET_VALUE
-            FROM port AS p
-            ASOF JOIN daily_portfolio_value AS pv
-            MATCH_CONDITION (p.START_OF_YEAR >= pv.TIMESTAMP)
-            ON p.PORTFOLIO_ID = pv.PORTFOLIO_ID
-            GROUP BY 1,2
+
+@st.cache_resource(show_spinner=False)
+def _warehouse_history_state() -> Dict[str, Any]:
+    return {"checked": 0.0, "watermark": None}
+
+
+def collect_warehouse_queue_times() -> None:
+    """Observe warehouse queue time of this session's finished queries (at most once a minute)"""
+    state = _warehouse_history_state()
+    if time.time() - state["checked"] < WAREHOUSE_HISTORY_INTERVAL_SECONDS:
+        return
+    state["checked"] = time.time()
+    since = ""
+    if state["watermark"] is not None:
+        since = f"AND END_TIME > '{state['watermark']}'"
+    sql = f"""
+        SELECT END_TIME,
+               QUEUED_PROVISIONING_TIME + QUEUED_REPAIR_TIME
+                 + QUEUED_OVERLOAD_TIME AS QUEUED_MS
+        FROM TABLE(INFORMATION_SCHEMA.QUERY_HISTORY_BY_SESSION(RESULT_LIMIT => 1000))
+        WHERE EXECUTION_STATUS = 'SUCCESS' {since}
+    """
+    # Straight to the session: history must not be cached or counted as app queries
+    try:
+        history = get_snowflake_session().sql(sql).to_pandas()
+    except Exception as e:
+        logger.warning(f"Warehouse queue times unavailable: {e}")
+        return
+    queue = get_metrics_registry().histogram("snowflake_warehouse_queue_seconds")
+    for queued_ms in history["QUEUED_MS"].fillna(0):
+        queue.observe(float(queued_ms) / 1000)
+    if not history.empty:
+        state["watermark"] = history["END_TIME"].max()
+
+
+def get_system_health() -> Dict[str, Any]:
+    """Latency percentiles per component plus cache, session and memory gauges"""
+    registry = get_metrics_registry()
+    queries = registry.histogram("snowflake_query_duration_seconds")
+    pages = registry.histogram("page_run_duration_seconds")
+    components = [
+        ("Snowflake queries", queries, {"status": "ok"}),
+        (
+            "Warehouse queue",
+            registry.histogram("snowflake_warehouse_queue_seconds"),
+            {},
         ),
-        latest_value AS (
-            SELECT 1 AS JOIN_ID, p.END_DATE, SUM(TOT_MARKET_VALUE) AS TOT_MARKET_VALUE
-            FROM port AS p
-            ASOF JOIN daily_portfolio_value AS pv
-            MATCH_CONDITION (p.END_DATE >= pv.TIMESTAMP)
-            ON p.PORTFOLIO_ID = pv.PORTFOLIO_ID
-            GROUP BY 1,2
-        )
-        SELECT (l.TOT_MARKET_VALUE - s.TOT_MARKET_VALUE)
-               / NULLIF(NULLIF(s.TOT_MARKET_VALUE, 0), 0) AS YTD_GROWTH_PCT
-        FROM latest_value AS l
-        JOIN start_of_year_value AS s ON (l.JOIN_ID = s.JOIN_ID)
-    """
-    ytd_df = run_query(ytd_sql)
-    ytd_growth_pct = (
-        float(ytd_df.loc[0, "YTD_GROWTH_PCT"])
-        if not ytd_df.empty
-        and "YTD_GROWTH_PCT" in ytd_df.columns
-        and pd.notna(ytd_df.loc[0, "YTD_GROWTH_PCT"])
-        else None
+    ] + [
+        (f"Page {labels['page']}", pages, labels)
+        for labels in sorted(pages.label_sets(), key=lambda page: page["page"])
+    ]
+    latency = pd.DataFrame(
+        [
+            {
+                "COMPONENT": name,
+                "COUNT": histogram.count(**labels),
+                "P50_SECONDS": histogram.quantile(0.5, **labels),
+                "P95_SECONDS": histogram.quantile(0.95, **labels),
+            }
+            for name, histogram, labels in components
+        ],
+        columns=HEALTH_COLUMNS,
     )
+    requests = registry.counter("query_cache_requests_total")
+    hits, misses = requests.value(result="hit"), requests.value(result="miss")
+    entries, size = _query_cache_stats()
+    uptime = max(time.time() - registry.started, 1e-9)
+    busy = registry.counter("snowflake_session_busy_seconds_total").value()
+    failed = queries.count(status="error")
+    sent = failed + queries.count(status="ok")
+    return {
+        "latency": latency,
+        "cache_hit_ratio": hits / (hits + misses) if hits + misses else None,
+        "cache_entries": entries,
+        "cache_bytes": size,
+        "query_error_rate": failed / sent if sent else None,
+        "pool_in_use": registry.gauge("snowflake_session_pool_in_use").value(),
+        "pool_utilization": min(busy / (uptime * SESSION_POOL_SIZE), 1.0),
+        "rss_bytes": process_rss_bytes(),
+    }
+
+
+def get_metrics_exposition() -> str:
+    """All operational metrics in the Prometheus text exposition format"""
+    return get_metrics_registry().exposition()
+
+
+@st.cache_resource(show_spinner=False)
+def get_metric_compiler() -> MetricCompiler:
+    """Semantic-model metric compiler (compiled plans cached inside)"""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    return MetricCompiler.from_files([os.path.join(root, f) for f in MODEL_FILES])
+
+
+def get_metric(
+    metrics: List[str],
+    dimensions: Optional[List[str]] = None,
+    filters: Optional[List[str]] = None,
+    where: Optional[Dict[str, Any]] = None,
+) -> pd.DataFrame:
+    """Semantic-model metrics grouped by dimensions, e.g. NumberOfClients by STATE"""
+    compiler = get_metric_compiler()
+    plan = compiler.compile(metrics, dimensions or (), filters or (), where)
+    return compiler.execute(plan, run_query)
+
+
+def get_metric_value(
+    metric: str, filters: Optional[List[str]] = None
+) -> Optional[float]:
+    """Single firm-level value of a semantic-model metric"""
+    result = get_metric([metric], filters=filters)
+    if result.empty:
+        return None
+    value = result.iloc[0, -1]
+    return float(value) if pd.notna(value) else None
+
+
+# -----------------------------
+# Global KPIs and Metrics
+# -----------------------------
+
+
+def get_global_kpis() -> Dict[str, Any]:
+    """Calculate firm-level KPIs including client count, advisor count, AUM, and YTD growth"""
+    # Clients and advisors (semantic-model metrics)
+    num_clients = int(get_metric_value("NumberOfClients") or 0)
+    num_advisors = int(get_metric_value("NumberOfAdvisors") or 0)
+
+    # AUM (latest non-cash positions, from the exposure cube)
+    aum = refresh_exposure_cube().total(exclude={"TICKER": "CASH"})
+
+    # YTD growth (as-of start of year vs as-of today, from the daily value grid)
+    ytd_growth_pct = None
+    series = refresh_value_series()
+    if len(series):
+        ytd = series.period_to_date("YTD", level="firm")
+        change_pct = ytd["CHANGE_PCT"].iloc[0]
+        ytd_growth_pct = float(change_pct) if pd.notna(change_pct) else None
 
     return {
         "num_clients": num_clients,
@@ -229,6 +453,141 @@ def get_global_kpis() -> Dict[str, Any]:
     }
 
 
+@st.cache_resource(show_spinner=False)
+def get_value_series_engine() -> ValueSeriesEngine:
+    """Shared daily portfolio / client / firm value grid"""
+    return ValueSeriesEngine()
+
+
+def refresh_value_series() -> ValueSeriesEngine:
+    """Merge POSITION_HISTORY snapshots newer than the engine's watermark"""
+    engine = get_value_series_engine()
+    since = ""
+    if engine.watermark is not None:
+        since = f"AND ph.TIMESTAMP > '{engine.watermark}'"
+    sql = f"""
+        SELECT ph.PORTFOLIO_ID, p.CLIENT_ID, ph.TIMESTAMP,
+               SUM(ph.MARKET_VALUE) AS MARKET_VALUE
+        FROM POSITION_HISTORY ph
+        JOIN PORTFOLIOS p ON ph.PORTFOLIO_ID = p.PORTFOLIO_ID
+        WHERE ph.TICKER <> 'CASH' {since}
+        GROUP BY 1, 2, 3
+    """
+    engine.update(run_query(sql))
+    return engine
+
+
+def get_aum_trend(
+    months: int = 12, freq: str = "M", end: Optional[pd.Timestamp] = None
+) -> pd.DataFrame:
+    """Firm AUM sampled per period over the trailing ``months`` (DATE, AUM)"""
+    engine = refresh_value_series()
+    if not len(engine):
+        return pd.DataFrame(columns=["DATE", "AUM"])
+    end = pd.Timestamp(engine.days[-1]) if end is None else pd.Timestamp(end)
+    start = end - pd.DateOffset(months=months) + pd.Timedelta(days=1)
+    trend = engine.trend(start, end, freq=freq, level="firm")
+    return trend.rename(columns={"FIRM": "AUM"}).reset_index()
+
+
+@st.cache_resource(show_spinner=False)
+def get_exposure_cube() -> ExposureCube:
+    """Shared latest-position exposure cube"""
+    return ExposureCube()
+
+
+def refresh_exposure_cube() -> ExposureCube:
+    """Fold POSITION_HISTORY snapshots newer than the cube's watermark into it"""
+    cube = get_exposure_cube()
+    if cube.watermark is None:
+        snapshot_filter = """
+            WHERE ph.TIMESTAMP = (
+                SELECT MAX(TIMESTAMP) FROM POSITION_HISTORY ph2
+                WHERE ph2.PORTFOLIO_ID = ph.PORTFOLIO_ID
+            )
+        """
+    else:
+        snapshot_filter = f"WHERE ph.TIMESTAMP > '{cube.watermark}'"
+    sql = f"""
+        WITH advisors AS (
+            SELECT CLIENT_ID, ADVISOR_ID
+            FROM ADVISOR_CLIENT_RELATIONSHIPS
+            QUALIFY ROW_NUMBER() OVER (
+                PARTITION BY CLIENT_ID ORDER BY START_DATE DESC NULLS LAST
+            ) = 1
+        )
+        SELECT ph.PORTFOLIO_ID, ph.TIMESTAMP, ph.MARKET_VALUE,
+               ph.TICKER, ph.ASSET_CLASS, p.STRATEGY_TYPE,
+               c.STATE, c.RISK_TOLERANCE, a.ADVISOR_ID,
+               CASE
+                   WHEN c.NET_WORTH_ESTIMATE >= 50000000 THEN 'Ultra HNW'
+                   WHEN c.NET_WORTH_ESTIMATE >= 5000000 THEN 'Very HNW'
+                   WHEN c.NET_WORTH_ESTIMATE >= 1000000 THEN 'HNW'
+                   WHEN c.NET_WORTH_ESTIMATE >= 250000 THEN 'Emerging HNW'
+                   ELSE 'Mass Affluent'
+               END AS WEALTH_SEGMENT
+        FROM POSITION_HISTORY ph
+        JOIN PORTFOLIOS p ON ph.PORTFOLIO_ID = p.PORTFOLIO_ID
+        LEFT JOIN CLIENTS c ON p.CLIENT_ID = c.CLIENT_ID
+        LEFT JOIN advisors a ON p.CLIENT_ID = a.CLIENT_ID
+        {snapshot_filter}
+    """
+    cube.update(run_query(sql))
+    return cube
+
+
+def get_exposure(
+    by: Tuple[str, ...] = ("ASSET_CLASS",),
+    where: Optional[Dict[str, Any]] = None,
+    exclude: Optional[Dict[str, Any]] = None,
+) -> pd.DataFrame:
+    """Latest-position market value sliced and rolled up by cube dimensions"""
+    return refresh_exposure_cube().rollup(by, where=where, exclude=exclude)
+
+
+@st.cache_resource(ttl=600, show_spinner=False, max_entries=256)
+def get_portfolio_value_pyramid(portfolio_id: str) -> SeriesPyramid:
+    """Multi-resolution daily value series of one portfolio"""
+    series = refresh_value_series().series(portfolio_id, level="portfolio")
+    return SeriesPyramid(series, "DATE", "VALUE")
+
+
+@st.cache_resource(ttl=600, show_spinner=False, max_entries=256)
+def get_account_balance_pyramid(portfolio_id: str) -> SeriesPyramid:
+    """Multi-resolution ACCOUNT_HISTORY balance series of a portfolio's account"""
+    sql = f"""
+        SELECT ah.TIMESTAMP, ah.BALANCE
+        FROM ACCOUNT_HISTORY ah
+        JOIN PORTFOLIOS p ON ah.ACCOUNT_ID = p.ACCOUNT_ID
+        WHERE p.PORTFOLIO_ID = {_sql_literal_list([portfolio_id])}
+        ORDER BY ah.TIMESTAMP
+    """
+    history = run_query(sql)
+    if history.empty:
+        history = pd.DataFrame(columns=["TIMESTAMP", "BALANCE"])
+    history["TIMESTAMP"] = pd.to_datetime(history["TIMESTAMP"])
+    history["BALANCE"] = history["BALANCE"].astype(float)
+    return SeriesPyramid(history, "TIMESTAMP", "BALANCE")
+
+
+def get_portfolio_history_chart_data(
+    portfolio_id: str,
+    start: Optional[pd.Timestamp] = None,
+    end: Optional[pd.Timestamp] = None,
+    width_px: int = DEFAULT_WIDTH_PX,
+) -> Dict[str, pd.DataFrame]:
+    """
+    Downsampled value and account-balance series of a portfolio, sized for a
+    chart ``width_px`` wide over [start, end]
+    """
+    return {
+        "value": get_portfolio_value_pyramid(portfolio_id).query(start, end, width_px),
+        "balance": get_account_balance_pyramid(portfolio_id).query(
+            start, end, width_px
+        ),
+    }
+
+
 # -----------------------------
 # Customer Analytics Functions
 # -----------------------------
@@ -401,16 +760,52 @@ def get_churn_early_warning() -> pd.DataFrame:
     return run_query(sql)
 
 
-def get_event_driven_opportunities() -> pd.DataFrame:
+@st.cache_data(ttl=600, show_spinner=False)
+def get_market_event_exposure() -> pd.DataFrame:
+    """Per-client exposure to each MARKET_EVENTS window (positions, trades, contacts)"""
+    events = run_query(
+        """
+        SELECT EVENT_ID, EVENT_NAME, IMPACT_TYPE, START_DATE, END_DATE
+        FROM MARKET_EVENTS
+        """
+    )
+    if events.empty:
+        return pd.DataFrame(columns=EXPOSURE_COLUMNS)
+
+    portfolio_values = run_query(
+        """
+        SELECT p.CLIENT_ID, ph.PORTFOLIO_ID, ph.TIMESTAMP,
+               SUM(ph.MARKET_VALUE) AS MARKET_VALUE
+        FROM POSITION_HISTORY ph
+        JOIN PORTFOLIOS p ON ph.PORTFOLIO_ID = p.PORTFOLIO_ID
+        GROUP BY 1, 2, 3
+        """
+    )
+    transactions = run_query(
+        """
+        SELECT p.CLIENT_ID, t.TIMESTAMP, t.TRANSACTION_TYPE, t.TOTAL_AMOUNT
+        FROM TRANSACTIONS t
+        JOIN PORTFOLIOS p ON t.PORTFOLIO_ID = p.PORTFOLIO_ID
+        """
+    )
+    interactions = run_query("SELECT CLIENT_ID, TIMESTAMP FROM INTERACTIONS")
+
+    index = EventIntervalIndex(events)
+    return index.client_exposure(portfolio_values, transactions, interactions)
+
+
+def get_market_event_outreach(event_name: str, top_n: int = 50) -> pd.DataFrame:
+    """Targeted outreach list - clients ranked by value held through an event"""
+    exposure = get_market_event_exposure()
+    if exposure.empty:
+        return exposure
+    return outreach_list(exposure, event_name, top_n)
+
+
+def get_event_driven_opportunities(event_window_days: int = 90) -> pd.DataFrame:
     """Event-Driven Outreach - Timely, contextual nudge at life/market events"""
     sql = """
-        WITH recent_market_events AS (
-            SELECT DISTINCT EVENT_ID, EVENT_NAME, IMPACT_TYPE, DESCRIPTION, START_DATE, END_DATE
-            FROM MARKET_EVENTS
-            WHERE START_DATE >= DATEADD(DAY, -90, CURRENT_DATE)
-               OR END_DATE >= DATEADD(DAY, -90, CURRENT_DATE)
-        ),
-        client_impact AS (
+        WITH client_impact AS (
             SELECT c.CLIENT_ID, c.FIRST_NAME, c.LAST_NAME,
                    c.LIFE_EVENT, c.LAST_UPDATE_TIMESTAMP,
                    MAX(i.TIMESTAMP) AS LAST_CONTACT,
@@ -423,7 +818,6 @@ def get_event_driven_opportunities() -> pd.DataFrame:
                CASE
                    WHEN ci.LIFE_EVENT IS NOT NULL AND ci.LAST_UPDATE_TIMESTAMP >= DATEADD(DAY, -60, CURRENT_DATE) THEN 'Recent Life Event'
                    WHEN ci.DAYS_SINCE_CONTACT > 90 THEN 'Long-term Re-engagement'
-                   WHEN EXISTS (SELECT 1 FROM recent_market_events) THEN 'Market Event Follow-up'
                    ELSE 'Regular Check-in'
                END AS OUTREACH_TYPE,
                ci.LIFE_EVENT,
@@ -449,41 +843,234 @@ def get_event_driven_opportunities() -> pd.DataFrame:
             CASE PRIORITY WHEN 'High' THEN 1 WHEN 'Medium' THEN 2 ELSE 3 END,
             ci.DAYS_SINCE_CONTACT DESC
     """
-    return run_query(sql)
+    df = run_query(sql)
+    if df.empty:
+        return df
+
+    # Attach each client's most recent market event with actual exposure, and
+    # only route to a market follow-up when that event touches the window.
+    exposure = get_market_event_exposure()
+    exposure = exposure[exposure["VALUE_HELD"] > 0]
+    latest = (
+        exposure.sort_values(["END_DATE", "VALUE_HELD"])
+        .groupby("CLIENT_ID")
+        .tail(1)
+        .set_index("CLIENT_ID")
+    )
+    df["MARKET_EVENT"] = df["CLIENT_ID"].map(latest["EVENT_NAME"])
+    df["EVENT_VALUE_HELD"] = df["CLIENT_ID"].map(latest["VALUE_HELD"]).fillna(0.0)
+
+    window_start = pd.Timestamp.now().normalize() - pd.Timedelta(days=event_window_days)
+    event_end = pd.to_datetime(df["CLIENT_ID"].map(latest["END_DATE"]))
+    follow_up = (df["OUTREACH_TYPE"] == "Regular Check-in") & (
+        event_end >= window_start
+    )
+    df.loc[follow_up, "OUTREACH_TYPE"] = "Market Event Follow-up"
+    df.loc[follow_up, "SUGGESTED_DISCUSSION_TOPICS"] = (
+        df.loc[follow_up, "MARKET_EVENT"] + " impact review, positioning update"
+    )
+    return df
+
+
+@st.cache_resource(show_spinner=False)
+def get_notes_classifier() -> NotesClassifier:
+    """Shared keyword classifier; its result cache is keyed by INTERACTION_ID"""
+    return NotesClassifier()
 
 
 def get_sentiment_analysis() -> pd.DataFrame:
     """Complaint/Sentiment Intelligence - Mine notes for issues & intent"""
     sql = """
-        WITH recent_interactions AS (
-            SELECT i.INTERACTION_ID, i.CLIENT_ID, i.ADVISOR_ID, i.TIMESTAMP,
-                   i.TYPE, i.CHANNEL, i.OUTCOME_NOTES,
-                   c.FIRST_NAME, c.LAST_NAME
-            FROM INTERACTIONS i
-            JOIN CLIENTS c ON i.CLIENT_ID = c.CLIENT_ID
-            WHERE i.TIMESTAMP >= DATEADD(DAY, -30, CURRENT_DATE)
-              AND i.OUTCOME_NOTES IS NOT NULL
+        SELECT i.INTERACTION_ID, i.CLIENT_ID, c.FIRST_NAME, c.LAST_NAME,
+               i.ADVISOR_ID, i.TIMESTAMP, i.INTERACTION_TYPE AS TYPE, i.CHANNEL,
+               i.OUTCOME_NOTES
+        FROM INTERACTIONS i
+        JOIN CLIENTS c ON i.CLIENT_ID = c.CLIENT_ID
+        WHERE i.TIMESTAMP >= DATEADD(DAY, -30, CURRENT_DATE)
+          AND i.OUTCOME_NOTES IS NOT NULL
+        ORDER BY i.TIMESTAMP DESC
+    """
+    df = run_query(sql)
+    if df.empty:
+        return df
+    scored = get_notes_classifier().classify(df, text_col="OUTCOME_NOTES")
+    return scored.drop(columns=["SENTIMENT_VALUE"])
+
+
+@st.cache_resource(show_spinner=False)
+def get_interaction_scorer(backend: str = "cortex") -> BatchScorer:
+    """
+    Incremental AI_CLASSIFY / sentiment scorer. "cortex" persists to the
+    INTERACTION_AI_SCORES side table; "local" is the in-memory stand-in.
+    """
+    if backend == "local":
+        return BatchScorer(LocalScoringBackend(), chunk_size=500)
+    return BatchScorer(
+        CortexScoringBackend(get_snowflake_session, telemetry=get_llm_telemetry()),
+        SnowflakeScoreStore(get_snowflake_session),
+    )
+
+
+def score_new_interactions(backend: str = "cortex") -> Dict[str, Any]:
+    """Score interactions that are new or edited since the last run"""
+    sql = """
+        SELECT INTERACTION_ID, OUTCOME_NOTES
+        FROM INTERACTIONS
+        WHERE OUTCOME_NOTES IS NOT NULL
+    """
+    # Straight to the session: a cached read would hide edits for up to the query TTL
+    try:
+        interactions = get_snowflake_session().sql(sql).to_pandas()
+    except Exception as e:
+        logger.warning(f"Pending interactions unavailable: {e}")
+        interactions = pd.DataFrame()
+    if interactions.empty:
+        return {"PENDING": 0, "SCORED": 0, "CHUNKS": 0, "FAILED_CHUNKS": 0}
+    try:
+        return get_interaction_scorer(backend).run(interactions)
+    except Exception as e:
+        logger.warning(f"Interaction scoring failed ({backend}): {e}")
+        return {"PENDING": 0, "SCORED": 0, "CHUNKS": 0, "FAILED_CHUNKS": 0}
+
+
+def get_interaction_score_summary(backend: str = "cortex") -> pd.DataFrame:
+    """Stored interaction labels: count and average sentiment per category"""
+    try:
+        scores = get_interaction_scorer(backend).scores
+    except Exception as e:
+        logger.warning(f"Interaction scores unavailable ({backend}): {e}")
+        return pd.DataFrame(columns=["CATEGORY", "INTERACTIONS", "AVG_SENTIMENT"])
+    if scores.empty:
+        return pd.DataFrame(columns=["CATEGORY", "INTERACTIONS", "AVG_SENTIMENT"])
+    return (
+        scores.groupby("CATEGORY")
+        .agg(
+            INTERACTIONS=("INTERACTION_ID", "size"),
+            AVG_SENTIMENT=("SENTIMENT", "mean"),
         )
-        SELECT ri.INTERACTION_ID, ri.CLIENT_ID, ri.FIRST_NAME, ri.LAST_NAME,
-               ri.ADVISOR_ID, ri.TIMESTAMP, ri.TYPE, ri.CHANNEL,
-               ri.OUTCOME_NOTES,
+        .reset_index()
+        .sort_values("INTERACTIONS", ascending=False)
+    )
+
+
+def _client_index_path() -> str:
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    return os.path.join(root, ".cache", "client_profile_index.npz")
+
+
+@st.cache_resource(show_spinner=False)
+def get_client_embedding_index() -> ClientEmbeddingIndex:
+    """Client-profile ANN index, loaded from its persisted file when present"""
+    return ClientEmbeddingIndex.load(_client_index_path())
+
+
+def refresh_client_embedding_index() -> ClientEmbeddingIndex:
+    """Embed clients updated since the index watermark and persist the index"""
+    index = get_client_embedding_index()
+    since = (
+        f"WHERE LAST_UPDATE_TIMESTAMP > '{index.watermark}'"
+        if index.watermark is not None
+        else ""
+    )
+    sql = f"SELECT {', '.join(PROFILE_COLUMNS)} FROM CLIENTS {since}"
+    if index.upsert(run_query(sql)):
+        index.save(_client_index_path())
+    return index
+
+
+def find_similar_clients(profile_text: str, k: int = 10) -> pd.DataFrame:
+    """Clients whose profile embedding is closest to a free-text profile"""
+    matches = refresh_client_embedding_index().similar(profile_text, k)
+    if matches.empty:
+        return matches
+    sql = f"""
+        SELECT CLIENT_ID, FIRST_NAME, LAST_NAME, AGE, RISK_TOLERANCE,
+               FINANCIAL_GOALS, LIFE_EVENT
+        FROM CLIENTS
+        WHERE CLIENT_ID IN ({_sql_literal_list(matches["CLIENT_ID"])})
+    """
+    return matches.merge(run_query(sql), on="CLIENT_ID", how="left")
+
+
+@st.cache_resource(show_spinner=False)
+def get_hierarchical_summarizer(backend: str = "cortex") -> HierarchicalSummarizer:
+    """Client -> advisor -> segment -> firm summarizer with its node cache"""
+    if backend == "local":
+        return HierarchicalSummarizer(ExtractiveSummarizer())
+    return HierarchicalSummarizer(
+        CortexSummarizer(get_snowflake_session, telemetry=get_llm_telemetry())
+    )
+
+
+def get_interaction_summaries(days: int = 90, backend: str = "cortex") -> pd.DataFrame:
+    """
+    Hierarchical summaries of recent interaction notes. Only chunks and
+    ancestors whose inputs changed since the last run call the summarizer.
+    """
+    sql = f"""
+        SELECT i.INTERACTION_ID, i.TIMESTAMP, i.CLIENT_ID, i.ADVISOR_ID,
+               TRIM(COALESCE(i.OUTCOME_NOTES, '') || CHR(10) ||
+                    COALESCE(i.LLM_GENERATED_CONTENT, '')) AS TEXT,
                CASE
-                   WHEN LOWER(ri.OUTCOME_NOTES) LIKE '%complaint%' OR LOWER(ri.OUTCOME_NOTES) LIKE '%issue%' THEN 'Negative'
-                   WHEN LOWER(ri.OUTCOME_NOTES) LIKE '%satisfied%' OR LOWER(ri.OUTCOME_NOTES) LIKE '%happy%' THEN 'Positive'
-                   WHEN LOWER(ri.OUTCOME_NOTES) LIKE '%neutral%' OR LOWER(ri.OUTCOME_NOTES) LIKE '%okay%' THEN 'Neutral'
-                   WHEN LOWER(ri.OUTCOME_NOTES) LIKE '%concern%' OR LOWER(ri.OUTCOME_NOTES) LIKE '%worry%' THEN 'Negative'
-                   WHEN LOWER(ri.OUTCOME_NOTES) LIKE '%excellent%' OR LOWER(ri.OUTCOME_NOTES) LIKE '%great%' THEN 'Positive'
-                   ELSE 'Neutral'
-               END AS SENTIMENT_SCORE,
+                   WHEN c.NET_WORTH_ESTIMATE >= 50000000 THEN 'Ultra HNW'
+                   WHEN c.NET_WORTH_ESTIMATE >= 5000000 THEN 'Very HNW'
+                   WHEN c.NET_WORTH_ESTIMATE >= 1000000 THEN 'HNW'
+                   WHEN c.NET_WORTH_ESTIMATE >= 250000 THEN 'Emerging HNW'
+                   ELSE 'Mass Affluent'
+               END AS WEALTH_SEGMENT
+        FROM INTERACTIONS i
+        JOIN CLIENTS c ON i.CLIENT_ID = c.CLIENT_ID
+        WHERE i.TIMESTAMP >= DATEADD(DAY, -{int(days)}, CURRENT_DATE)
+    """
+    notes = run_query(sql)
+    if notes.empty:
+        return pd.DataFrame()
+    try:
+        return get_hierarchical_summarizer(backend).run(notes)
+    except Exception as e:
+        logger.warning(f"Hierarchical summarization failed ({backend}): {e}")
+        return pd.DataFrame()
+
+
+@st.cache_resource(show_spinner=False)
+def get_filter_cascade(backend: str = "cortex") -> FilterCascade:
+    """Pre-filter cascade in front of AI_FILTER (or the local stand-in judge)"""
+    if backend == "local":
+        return FilterCascade(SimilarityJudge())
+    return FilterCascade(
+        CortexFilterJudge(get_snowflake_session, telemetry=get_llm_telemetry())
+    )
+
+
+def run_ai_filter(
+    scenario: str, backend: str = "cortex"
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Interactions matching a natural-language filter scenario, plus per-stage
+    rows in/out, selectivity and model calls of the cascade.
+    """
+    sql = """
+        SELECT i.INTERACTION_ID, i.CLIENT_ID, c.FIRST_NAME, c.LAST_NAME,
+               i.ADVISOR_ID, i.TIMESTAMP, i.INTERACTION_TYPE, i.CHANNEL,
+               i.PURPOSE_SUBJECT, i.OUTCOME_NOTES, i.LLM_GENERATED_CONTENT,
                CASE
-                   WHEN LOWER(ri.OUTCOME_NOTES) LIKE '%urgent%' OR LOWER(ri.OUTCOME_NOTES) LIKE '%escalate%' THEN 'High'
-                   WHEN LOWER(ri.OUTCOME_NOTES) LIKE '%follow%' OR LOWER(ri.OUTCOME_NOTES) LIKE '%review%' THEN 'Medium'
-                   ELSE 'Low'
-               END AS PRIORITY_LEVEL
-        FROM recent_interactions ri
-        ORDER BY ri.TIMESTAMP DESC
+                   WHEN c.NET_WORTH_ESTIMATE >= 50000000 THEN 'Ultra HNW'
+                   WHEN c.NET_WORTH_ESTIMATE >= 5000000 THEN 'Very HNW'
+                   WHEN c.NET_WORTH_ESTIMATE >= 1000000 THEN 'HNW'
+                   WHEN c.NET_WORTH_ESTIMATE >= 250000 THEN 'Emerging HNW'
+                   ELSE 'Mass Affluent'
+               END AS WEALTH_SEGMENT
+        FROM INTERACTIONS i
+        JOIN CLIENTS c ON i.CLIENT_ID = c.CLIENT_ID
     """
-    return run_query(sql)
+    interactions = run_query(sql)
+    if interactions.empty:
+        return interactions, pd.DataFrame()
+    try:
+        return get_filter_cascade(backend).run(interactions, FILTER_SCENARIOS[scenario])
+    except Exception as e:
+        logger.warning(f"AI filter cascade failed ({backend}): {e}")
+        return interactions.iloc[0:0], pd.DataFrame()
 
 
 # -----------------------------
@@ -672,6 +1259,261 @@ def get_trade_fee_anomalies() -> pd.DataFrame:
     return run_query(sql)
 
 
+@st.cache_resource(ttl=600, show_spinner=False)
+def get_performance_engine() -> PerformanceEngine:
+    """TWR / MWR engine over all portfolios (per-period results cached inside)"""
+    valuations_sql = """
+        SELECT ph.PORTFOLIO_ID, ph.TIMESTAMP, SUM(ph.MARKET_VALUE) AS MARKET_VALUE
+        FROM POSITION_HISTORY ph
+        WHERE ph.TICKER <> 'CASH'
+        GROUP BY 1, 2
+    """
+    flows_sql = """
+        SELECT t.PORTFOLIO_ID, t.TIMESTAMP, t.TRANSACTION_TYPE, t.TOTAL_AMOUNT
+        FROM TRANSACTIONS t
+        WHERE t.TRANSACTION_TYPE IN ('Buy', 'Sell')
+    """
+    attributes_sql = """
+        SELECT p.PORTFOLIO_ID, p.CLIENT_ID, p.STRATEGY_TYPE, acr.ADVISOR_ID
+        FROM PORTFOLIOS p
+        LEFT JOIN ADVISOR_CLIENT_RELATIONSHIPS acr ON p.CLIENT_ID = acr.CLIENT_ID
+        QUALIFY ROW_NUMBER() OVER (
+            PARTITION BY p.PORTFOLIO_ID ORDER BY acr.START_DATE DESC NULLS LAST
+        ) = 1
+    """
+    valuations = run_query(valuations_sql)
+    flows = run_query(flows_sql)
+    if valuations.empty:
+        valuations = pd.DataFrame(columns=["PORTFOLIO_ID", "TIMESTAMP", "MARKET_VALUE"])
+    if flows.empty:
+        flows = pd.DataFrame(
+            columns=["PORTFOLIO_ID", "TIMESTAMP", "TRANSACTION_TYPE", "TOTAL_AMOUNT"]
+        )
+    return PerformanceEngine(valuations, flows, run_query(attributes_sql))
+
+
+def get_performance_ranking(
+    level: str = "portfolio", period: str = "YTD", by: str = "TWR"
+) -> pd.DataFrame:
+    """Portfolios, clients, strategies or advisors ranked by return for a period"""
+    return get_performance_engine().rank(level=level, period=period, by=by)
+
+
+def get_performance_periods() -> List[str]:
+    """Reporting periods the valuation snapshots are dense enough to cover"""
+    return list(get_performance_engine().supported_periods())
+
+
+@st.cache_resource(ttl=600, show_spinner=False)
+def get_concentration_engine() -> ConcentrationEngine:
+    """Latest-snapshot weights at ticker, issuer and asset-class level"""
+    sql = """
+        WITH latest AS (
+            SELECT PORTFOLIO_ID, MAX(TIMESTAMP) AS MAX_TS
+            FROM POSITION_HISTORY
+            GROUP BY PORTFOLIO_ID
+        )
+        SELECT ph.PORTFOLIO_ID, ph.TICKER, ph.ASSET_CLASS, ph.MARKET_VALUE
+        FROM POSITION_HISTORY ph
+        JOIN latest lt
+          ON ph.PORTFOLIO_ID = lt.PORTFOLIO_ID AND ph.TIMESTAMP = lt.MAX_TS
+        WHERE ph.TICKER <> 'CASH'
+    """
+    return ConcentrationEngine(run_query(sql))
+
+
+def get_concentration_breaches(
+    threshold_pct: float = 0.3, level: str = "ticker"
+) -> pd.DataFrame:
+    """Holdings at or above ``threshold_pct`` of their portfolio (no re-query)"""
+    return get_concentration_engine().breaches(threshold_pct, level)
+
+
+def get_concentration_summary(threshold_pct: float = 0.3) -> pd.DataFrame:
+    """Breach counts per level (ticker, issuer, asset class) at a threshold"""
+    return get_concentration_engine().summary(threshold_pct)
+
+
+@st.cache_resource(ttl=600, show_spinner=False)
+def get_risk_engine() -> RiskEngine:
+    """Rolling risk metrics over the daily value grid (tables cached per window)"""
+    return RiskEngine.from_value_series(refresh_value_series())
+
+
+def get_portfolio_risk_metrics(window: str = "1Y") -> pd.DataFrame:
+    """Volatility, drawdown, VaR / CVaR and beta of every portfolio"""
+    engine = get_risk_engine()
+    table = engine.table(WINDOWS[window])
+    owners = refresh_value_series().portfolio_clients
+    return table.assign(
+        CLIENT_ID=owners.reindex(table["PORTFOLIO_ID"]).to_numpy()
+    ).sort_values("VAR_AMOUNT", ascending=False, na_position="last")
+
+
+def get_firm_risk_summary(window: str = "1Y") -> Dict[str, Optional[float]]:
+    """Value-weighted volatility and beta plus total VaR for the book"""
+    return get_risk_engine().firm_summary(WINDOWS[window])
+
+
+# -----------------------------
+# Real-Time Monitoring Functions
+# -----------------------------
+
+
+@st.cache_resource(show_spinner=False)
+def get_alert_engine() -> AlertEngine:
+    """Shared alert engine, seeded with client and portfolio reference data"""
+    engine = AlertEngine()
+    engine.set_reference(
+        run_query(
+            """
+            SELECT CLIENT_ID, FIRST_NAME, LAST_NAME, RISK_TOLERANCE,
+                   NET_WORTH_ESTIMATE, JOIN_DATE
+            FROM CLIENTS
+            """
+        ),
+        run_query("SELECT PORTFOLIO_ID, CLIENT_ID, STRATEGY_TYPE FROM PORTFOLIOS"),
+    )
+    return engine
+
+
+def refresh_live_alerts() -> AlertEngine:
+    """Apply transaction, position and interaction rows past each watermark"""
+    engine = get_alert_engine()
+
+    def since(table: str) -> str:
+        watermark = engine.watermarks[table]
+        return f"WHERE TIMESTAMP > '{watermark}'" if watermark is not None else ""
+
+    engine.ingest(
+        transactions=run_query(
+            f"""
+            SELECT TRANSACTION_ID, PORTFOLIO_ID, TIMESTAMP, TICKER,
+                   TRANSACTION_TYPE, TOTAL_AMOUNT
+            FROM TRANSACTIONS
+            {since("TRANSACTIONS")}
+            """
+        ),
+        positions=run_query(
+            f"""
+            SELECT PORTFOLIO_ID, TIMESTAMP, TICKER, MARKET_VALUE, ASSET_CLASS
+            FROM POSITION_HISTORY
+            {since("POSITION_HISTORY")}
+            """
+        ),
+        interactions=run_query(
+            f"""
+            SELECT CLIENT_ID, TIMESTAMP, INTERACTION_TYPE
+            FROM INTERACTIONS
+            {since("INTERACTIONS")}
+            """
+        ),
+    )
+    return engine
+
+
+def get_live_alerts(severities: Optional[Iterable[str]] = None) -> pd.DataFrame:
+    """Open alerts after applying new events, most severe first"""
+    return refresh_live_alerts().active(severities)
+
+
+@st.cache_resource(show_spinner=False)
+def get_transaction_replay(
+    scale: int = 1, speedup: float = DEFAULT_SPEEDUP
+) -> TransactionReplay:
+    """
+    Shared replay of TRANSACTIONS (``scale`` > 1 adds synthetic copies); one
+    per speed, so a session changing speed never moves another one's clock
+    """
+    sql = """
+        SELECT t.TRANSACTION_ID, t.PORTFOLIO_ID, p.CLIENT_ID,
+               c.FIRST_NAME || ' ' || c.LAST_NAME AS CLIENT_NAME,
+               t.TIMESTAMP, t.TICKER, t.TRANSACTION_TYPE,
+               t.QUANTITY, t.PRICE, t.TOTAL_AMOUNT, t.CURRENCY
+        FROM TRANSACTIONS t
+        JOIN PORTFOLIOS p ON t.PORTFOLIO_ID = p.PORTFOLIO_ID
+        LEFT JOIN CLIENTS c ON p.CLIENT_ID = c.CLIENT_ID
+    """
+    return TransactionReplay(
+        synthetic_transactions(run_query(sql), scale), speedup=speedup
+    )
+
+
+def _built_replay(
+    get_replay: Callable[..., TransactionReplay], *key: Any
+) -> TransactionReplay:
+    """``get_replay(*key)``, dropped from the resource cache again when empty"""
+    replay = get_replay(*key)
+    if not replay.size:
+        # Almost always a failed query: rebuild on the next read instead
+        get_replay.clear(*key)
+    return replay
+
+
+def read_transaction_stream(
+    consumer: str,
+    scale: int = 1,
+    speedup: Optional[float] = None,
+    backlog: Optional[int] = None,
+) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    """Replayed transactions new to ``consumer`` since its last read, and replay stats"""
+    replay = _built_replay(get_transaction_replay, scale, speedup or DEFAULT_SPEEDUP)
+    events = replay.poll(consumer, backlog=backlog)
+    return events, replay.stats(consumer)
+
+
+@st.cache_resource(show_spinner=False)
+def get_interaction_replay(
+    scale: int = 1, speedup: float = DEFAULT_SPEEDUP
+) -> TransactionReplay:
+    """
+    Replay of INTERACTIONS on ``get_transaction_replay(scale, speedup)``'s
+    clock; one per scale and speed, since each transaction replay runs its
+    own clock
+    """
+    sql = """
+        SELECT INTERACTION_ID, CLIENT_ID, ADVISOR_ID, TIMESTAMP,
+               INTERACTION_TYPE, CHANNEL, DURATION_MINUTES
+        FROM INTERACTIONS
+    """
+    replay = TransactionReplay(run_query(sql))
+    replay.align(get_transaction_replay(scale, speedup))
+    return replay
+
+
+@st.cache_resource(show_spinner=False)
+def get_activity_windows(
+    bucket_seconds: int = 60, scale: int = 1, speedup: float = DEFAULT_SPEEDUP
+) -> Dict[str, WindowedAggregator]:
+    """Tumbling / sliding window aggregates of the replayed event streams"""
+    return {
+        "transactions": WindowedAggregator(
+            bucket_seconds,
+            dimensions=("TRANSACTION_TYPE",),
+            value_column="TOTAL_AMOUNT",
+        ),
+        "interactions": WindowedAggregator(
+            bucket_seconds,
+            dimensions=("CHANNEL", "ADVISOR_ID", "INTERACTION_TYPE"),
+            value_column="DURATION_MINUTES",
+        ),
+    }
+
+
+def refresh_activity_windows(
+    bucket_seconds: int = 60, scale: int = 1, speedup: float = DEFAULT_SPEEDUP
+) -> Dict[str, WindowedAggregator]:
+    """Fold replayed events published since the last refresh into the windows"""
+    windows = get_activity_windows(bucket_seconds, scale, speedup)
+    transactions = _built_replay(get_transaction_replay, scale, speedup)
+    interactions = _built_replay(get_interaction_replay, scale, speedup)
+    interactions.align(transactions)
+    consumer = f"activity-windows-{bucket_seconds}-x{scale}-{speedup:g}"
+    windows["transactions"].ingest(transactions.poll(consumer))
+    windows["interactions"].ingest(interactions.poll(consumer))
+    return windows
+
+
 # -----------------------------
 # Additional Analytics Functions
 # -----------------------------
@@ -714,71 +1556,440 @@ def get_advisor_productivity(window_days: int = 90) -> pd.DataFrame:
     return run_query(sql)
 
 
-def generate_wealth_narrative(client_id: str) -> Dict[str, pd.DataFrame]:
-    """Wealth Narrative & Client Briefing - Auto-generate client summaries"""
-    overview_sql = f"""
-        SELECT c.CLIENT_ID, c.FIRST_NAME, c.LAST_NAME, c.RISK_TOLERANCE,
-               c.NET_WORTH_ESTIMATE, c.LIFE_EVENT, c.LAST_UPDATE_TIMESTAMP AS LIFE_EVENT_DATE,
-               COUNT(DISTINCT p.PORTFOLIO_ID) AS NUM_PORTFOLIOS,
-               COUNT(DISTINCT acr.ADVISOR_ID) AS NUM_ADVISORS
-        FROM CLIENTS c
-        LEFT JOIN PORTFOLIOS p ON c.CLIENT_ID = p.CLIENT_ID
-        LEFT JOIN ADVISOR_CLIENT_RELATIONSHIPS acr ON c.CLIENT_ID = acr.CLIENT_ID
-        WHERE c.CLIENT_ID = '{client_id}'
-        GROUP BY 1, 2, 3, 4, 5, 6, 7
+NARRATIVE_CACHE_TTL_SECONDS = 600
+NARRATIVE_CACHE_MAX_ENTRIES = 2048
+
+_OVERVIEW_COLUMNS = [
+    "CLIENT_ID",
+    "FIRST_NAME",
+    "LAST_NAME",
+    "RISK_TOLERANCE",
+    "NET_WORTH_ESTIMATE",
+    "LIFE_EVENT",
+    "LIFE_EVENT_DATE",
+    "NUM_PORTFOLIOS",
+    "NUM_ADVISORS",
+]
+_PORTFOLIO_COLUMNS = ["PORTFOLIO_ID", "STRATEGY_TYPE", "CURRENT_VALUE"]
+
+
+def _sql_literal_list(values: Iterable[str]) -> str:
+    """Render values as a quoted, comma-separated SQL IN list"""
+    return ", ".join("'" + str(v).replace("'", "''") + "'" for v in values)
+
+
+@st.cache_resource(show_spinner=False)
+def _narrative_bundle_cache() -> Tuple[OrderedDict, threading.Lock]:
+    """
+    Process-wide LRU of per-client narrative bundles keyed by CLIENT_ID
+    (values are (cached_at, bundle)), and the lock guarding it
     """
+    return OrderedDict(), threading.Lock()
 
-    portfolios_sql = f"""
-        WITH portfolio_values AS (
-            SELECT p.PORTFOLIO_ID, p.STRATEGY_TYPE,
-                   SUM(ph.MARKET_VALUE) AS CURRENT_VALUE
+
+def _cached_narrative_bundle(client_id: str) -> Optional[Dict[str, pd.DataFrame]]:
+    store, lock = _narrative_bundle_cache()
+    with lock:
+        entry = store.get(client_id)
+        if entry is None:
+            return None
+        cached_at, bundle = entry
+        if time.time() - cached_at > NARRATIVE_CACHE_TTL_SECONDS:
+            del store[client_id]
+            return None
+        store.move_to_end(client_id)
+        return bundle
+
+
+def _store_narrative_bundles(bundles: Dict[str, Dict[str, pd.DataFrame]]) -> None:
+    """Add bundles, drop expired entries and evict the least recently used"""
+    store, lock = _narrative_bundle_cache()
+    now = time.time()
+    with lock:
+        for client_id, bundle in bundles.items():
+            store[client_id] = (now, bundle)
+            store.move_to_end(client_id)
+        expired = [
+            client_id
+            for client_id, (cached_at, _) in store.items()
+            if now - cached_at > NARRATIVE_CACHE_TTL_SECONDS
+        ]
+        for client_id in expired:
+            del store[client_id]
+        while len(store) > NARRATIVE_CACHE_MAX_ENTRIES:
+            store.popitem(last=False)
+
+
+def get_wealth_narrative_batch(
+    client_ids: Optional[List[str]] = None, advisor_id: Optional[str] = None
+) -> Dict[str, Dict[str, pd.DataFrame]]:
+    """
+    Build overview and portfolio bundles for many clients in one set-based query.
+
+    Pass a list of client IDs, an advisor ID (the advisor's whole book), or both.
+    Bundles are returned keyed by CLIENT_ID and cached per client, so later
+    single-client calls to generate_wealth_narrative are served without a query.
+    """
+    requested = list(dict.fromkeys(client_ids or []))
+    if not requested and advisor_id is None:
+        return {}
+
+    bundles: Dict[str, Dict[str, pd.DataFrame]] = {}
+    if advisor_id is None:
+        for cid in requested:
+            cached = _cached_narrative_bundle(cid)
+            if cached is not None:
+                bundles[cid] = cached
+        requested = [cid for cid in requested if cid not in bundles]
+        if not requested:
+            return bundles
+
+    filters = []
+    if requested:
+        filters.append(f"c.CLIENT_ID IN ({_sql_literal_list(requested)})")
+    if advisor_id is not None:
+        filters.append(
+            "c.CLIENT_ID IN (SELECT CLIENT_ID FROM ADVISOR_CLIENT_RELATIONSHIPS "
+            f"WHERE ADVISOR_ID = {_sql_literal_list([advisor_id])})"
+        )
+
+    sql = f"""
+        WITH book AS (
+            SELECT c.CLIENT_ID, c.FIRST_NAME, c.LAST_NAME, c.RISK_TOLERANCE,
+                   c.NET_WORTH_ESTIMATE, c.LIFE_EVENT, c.LAST_UPDATE_TIMESTAMP AS LIFE_EVENT_DATE
+            FROM CLIENTS c
+            WHERE {" OR ".join(filters)}
+        ),
+        client_counts AS (
+            SELECT b.CLIENT_ID,
+                   COUNT(DISTINCT p.PORTFOLIO_ID) AS NUM_PORTFOLIOS,
+                   COUNT(DISTINCT acr.ADVISOR_ID) AS NUM_ADVISORS
+            FROM book b
+            LEFT JOIN PORTFOLIOS p ON b.CLIENT_ID = p.CLIENT_ID
+            LEFT JOIN ADVISOR_CLIENT_RELATIONSHIPS acr ON b.CLIENT_ID = acr.CLIENT_ID
+            GROUP BY 1
+        ),
+        latest_positions AS (
+            SELECT ph.PORTFOLIO_ID, ph.MARKET_VALUE
+            FROM POSITION_HISTORY ph
+            JOIN PORTFOLIOS p ON ph.PORTFOLIO_ID = p.PORTFOLIO_ID
+            JOIN book b ON p.CLIENT_ID = b.CLIENT_ID
+            QUALIFY ph.TIMESTAMP = MAX(ph.TIMESTAMP) OVER (PARTITION BY ph.PORTFOLIO_ID)
+        ),
+        portfolio_values AS (
+            SELECT p.CLIENT_ID, p.PORTFOLIO_ID, p.STRATEGY_TYPE,
+                   SUM(lp.MARKET_VALUE) AS CURRENT_VALUE
             FROM PORTFOLIOS p
-            JOIN POSITION_HISTORY ph ON p.PORTFOLIO_ID = ph.PORTFOLIO_ID
-            WHERE p.CLIENT_ID = '{client_id}'
-              AND ph.TIMESTAMP = (
-                  SELECT MAX(TIMESTAMP) FROM POSITION_HISTORY ph2
-                  WHERE ph2.PORTFOLIO_ID = ph.PORTFOLIO_ID
-              )
-            GROUP BY 1, 2
+            JOIN latest_positions lp ON p.PORTFOLIO_ID = lp.PORTFOLIO_ID
+            GROUP BY 1, 2, 3
         )
-        SELECT * FROM portfolio_values
-        ORDER BY CURRENT_VALUE DESC
+        SELECT b.*, cc.NUM_PORTFOLIOS, cc.NUM_ADVISORS,
+               pv.PORTFOLIO_ID, pv.STRATEGY_TYPE, pv.CURRENT_VALUE
+        FROM book b
+        JOIN client_counts cc ON b.CLIENT_ID = cc.CLIENT_ID
+        LEFT JOIN portfolio_values pv ON b.CLIENT_ID = pv.CLIENT_ID
+        ORDER BY b.CLIENT_ID, pv.CURRENT_VALUE DESC
     """
+    df = run_query(sql)
+
+    fetched: Dict[str, Dict[str, pd.DataFrame]] = {}
+    if not df.empty:
+        for cid, rows in df.groupby("CLIENT_ID", sort=False):
+            portfolios = rows.loc[rows["PORTFOLIO_ID"].notna(), _PORTFOLIO_COLUMNS]
+            fetched[cid] = {
+                "overview": rows[_OVERVIEW_COLUMNS].head(1).reset_index(drop=True),
+                "portfolios": portfolios.reset_index(drop=True),
+            }
+        _store_narrative_bundles(fetched)
+    bundles.update(fetched)
+    return bundles
+
+
+def generate_wealth_narrative(client_id: str) -> Dict[str, pd.DataFrame]:
+    """Wealth Narrative & Client Briefing - Auto-generate client summaries"""
+    cached = _cached_narrative_bundle(client_id)
+    if cached is not None:
+        return cached
 
+    bundle = get_wealth_narrative_batch([client_id]).get(client_id)
+    if bundle is not None:
+        return bundle
     return {
-        "overview": run_query(overview_sql),
-        "portfolios": run_query(portfolios_sql),
+        "overview": pd.DataFrame(columns=_OVERVIEW_COLUMNS),
+        "portfolios": pd.DataFrame(columns=_PORTFOLIO_COLUMNS),
     }
 
 
-def get_kyc_insights() -> pd.DataFrame:
+@st.cache_resource(show_spinner=False)
+def get_kyc_worklist() -> KYCWorklist:
+    """Shared KYC review worklist (heap of due review obligations)"""
+    return KYCWorklist()
+
+
+def refresh_kyc_worklist() -> KYCWorklist:
+    """Apply CLIENTS rows updated since the worklist's watermark"""
+    worklist = get_kyc_worklist()
+    since = ""
+    if worklist.watermark is not None:
+        since = f"WHERE c.LAST_UPDATE_TIMESTAMP >= '{worklist.watermark}'"
+    sql = f"""
+        SELECT c.CLIENT_ID, c.FIRST_NAME, c.LAST_NAME, c.JOIN_DATE,
+               c.LIFE_EVENT, c.LAST_UPDATE_TIMESTAMP
+        FROM CLIENTS c
+        {since}
+    """
+    worklist.upsert(run_query(sql))
+    return worklist
+
+
+def get_kyc_insights(limit: Optional[int] = None, offset: int = 0) -> pd.DataFrame:
     """KYB/KYC Ops Copilot - Speed up checks & documentation Q&A"""
+    worklist = refresh_kyc_worklist()
+    return worklist.next_due(n=limit or len(worklist), offset=offset)
+
+
+# -----------------------------
+# LLM Completion Functions
+# -----------------------------
+
+
+def _telemetry_path() -> str:
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    return os.path.join(root, ".cache", "llm_telemetry.sqlite")
+
+
+@st.cache_resource(show_spinner=False)
+def get_llm_telemetry() -> LLMTelemetry:
+    """Local log of every AI call (model, tokens, latency, cache hit, errors)"""
+    return LLMTelemetry(_telemetry_path())
+
+
+@st.cache_resource(show_spinner=False)
+def get_response_cache() -> SemanticResponseCache:
+    """Completion cache shared by every session"""
+    return SemanticResponseCache()
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def get_data_fingerprint() -> str:
+    """Short hash of the latest activity per fact table (the data version)"""
     sql = """
-        WITH client_compliance AS (
-            SELECT c.CLIENT_ID, c.FIRST_NAME, c.LAST_NAME, c.DATE_JOINED,
-                   c.LAST_UPDATE_TIMESTAMP,
-                   DATEDIFF(DAY, c.LAST_UPDATE_TIMESTAMP, CURRENT_DATE) AS DAYS_SINCE_UPDATE,
-                   CASE
-                       WHEN DATEDIFF(DAY, c.LAST_UPDATE_TIMESTAMP, CURRENT_DATE) > 365 THEN 'Annual Review Required'
-                       WHEN DATEDIFF(DAY, c.LAST_UPDATE_TIMESTAMP, CURRENT_DATE) > 180 THEN 'Semi-Annual Check'
-                       WHEN c.LIFE_EVENT IS NOT NULL AND c.LAST_UPDATE_TIMESTAMP >= DATEADD(DAY, -30, CURRENT_DATE) THEN 'Life Event Update'
-                       ELSE 'Current'
-                   END AS COMPLIANCE_STATUS
-            FROM CLIENTS c
+        SELECT (SELECT MAX(TIMESTAMP) FROM POSITION_HISTORY) AS POSITIONS_TS,
+               (SELECT MAX(TIMESTAMP) FROM TRANSACTIONS) AS TRANSACTIONS_TS,
+               (SELECT MAX(TIMESTAMP) FROM INTERACTIONS) AS INTERACTIONS_TS,
+               (SELECT MAX(LAST_UPDATE_TIMESTAMP) FROM CLIENTS) AS CLIENTS_TS
+    """
+    df = run_query(sql)
+    marker = "" if df.empty else "|".join(str(v) for v in df.iloc[0].tolist())
+    return hashlib.sha1(marker.encode("utf-8")).hexdigest()[:12]
+
+
+def ai_complete(prompt: str, model: str) -> Optional[str]:
+    """One Cortex AI_COMPLETE call; None when Cortex is unavailable"""
+    sql = "SELECT AI_COMPLETE(?, ?) AS RESPONSE"
+    try:
+        with get_llm_telemetry().timed("complete", "cortex", model, prompt) as call:
+            result = (
+                get_snowflake_session().sql(sql, params=[model, prompt]).to_pandas()
+            )
+            call["completion_tokens"] = (
+                0 if result.empty else estimate_tokens(str(result.iloc[0, 0]))
+            )
+    except Exception as e:
+        logger.warning(f"AI_COMPLETE failed for {model}: {e}")
+        return None
+    if result.empty or pd.isna(result.iloc[0, 0]):
+        return None
+    return str(result.iloc[0, 0])
+
+
+def cached_ai_complete(
+    prompt: str, model: str, compute: Optional[Any] = None
+) -> Tuple[Optional[str], Dict[str, Any]]:
+    """
+    Completion served from the semantic response cache when the same (or a
+    near-identical) prompt was answered for this model and data version;
+    otherwise ``compute()`` (default: Cortex AI_COMPLETE) is called.
+    """
+    response, info = get_response_cache().get_or_compute(
+        prompt,
+        model,
+        compute or (lambda: ai_complete(prompt, model)),
+        fingerprint=get_data_fingerprint(),
+    )
+    if info["match"] != "miss":
+        get_llm_telemetry().record(
+            "complete",
+            "cortex",
+            model,
+            estimate_tokens(prompt),
+            estimate_tokens(response or ""),
+            cache_hit=True,
         )
-        SELECT cc.CLIENT_ID, cc.FIRST_NAME, cc.LAST_NAME, cc.DATE_JOINED,
-               cc.LAST_UPDATE_TIMESTAMP, cc.DAYS_SINCE_UPDATE, cc.COMPLIANCE_STATUS,
-               CASE
-                   WHEN cc.COMPLIANCE_STATUS = 'Annual Review Required' THEN 'High'
-                   WHEN cc.COMPLIANCE_STATUS = 'Semi-Annual Check' THEN 'Medium'
-                   WHEN cc.COMPLIANCE_STATUS = 'Life Event Update' THEN 'Medium'
-                   ELSE 'Low'
-               END AS PRIORITY
-        FROM client_compliance cc
-        WHERE cc.COMPLIANCE_STATUS <> 'Current'
-        ORDER BY cc.DAYS_SINCE_UPDATE DESC
+    return response, info
+
+
+def _provider_api_key(prefix: str) -> Optional[str]:
+    """``{PREFIX}_API_KEY`` from the environment, else ``st.secrets[PREFIX]``"""
+    env_val = os.environ.get(f"{prefix}_API_KEY")
+    if env_val:
+        return env_val
+    try:
+        for section in (prefix, prefix.lower()):
+            if section in st.secrets:
+                return st.secrets[section].get("API_KEY")
+    except Exception:
+        pass
+    return None
+
+
+def get_completion_provider(provider: str) -> CompletionProvider:
+    """Streaming provider by name (cortex, openai or anthropic)"""
+    if provider == "openai":
+        return OpenAIProvider(_provider_api_key("OPENAI"))
+    if provider == "anthropic":
+        return AnthropicProvider(_provider_api_key("ANTHROPIC"))
+    return CortexProvider(get_snowflake_session)
+
+
+@st.cache_resource(show_spinner=False)
+def get_stream_metrics() -> StreamMetrics:
+    """Time-to-first-token / tokens-per-second history shared by every session"""
+    return StreamMetrics()
+
+
+def stream_ai_complete(
+    prompt: str,
+    model: str,
+    provider: Optional[CompletionProvider] = None,
+    fallback: Optional[str] = None,
+    use_cache: bool = True,
+    **params: Any,
+) -> Tuple[TimedStream, Dict[str, Any]]:
     """
-    return run_query(sql)
+    Streaming completion for ``st.write_stream``. A response-cache hit is
+    replayed as a single chunk; otherwise the provider stream (default:
+    Cortex) is timed into ``get_stream_metrics()`` and, once it finishes
+    uncancelled, stored in the response cache. If the provider fails before
+    its first chunk, ``fallback`` text is streamed instead (untimed and
+    uncached). Mock provider runs are kept out of telemetry and stream
+    metrics so simulated latencies never skew the health views. Returns the stream and lookup info whose ``match`` is "miss"
+    when streamed from the model, or "fallback".
+    """
+    cache = get_response_cache()
+    fingerprint = get_data_fingerprint()
+    telemetry = get_llm_telemetry()
+    prompt_tokens = estimate_tokens(prompt)
+    provider = provider or get_completion_provider("cortex")
+    observed = provider.name != MockProvider.name
+    hit = cache.get(prompt, model, fingerprint) if use_cache else None
+    if hit is not None:
+        if observed:
+            telemetry.record(
+                "complete",
+                provider.name,
+                model,
+                prompt_tokens,
+                estimate_tokens(hit["response"]),
+                cache_hit=True,
+            )
+        return TimedStream(iter([hit["response"]]), model), hit
+
+    info: Dict[str, Any] = {"match": "miss", "provider": provider.name}
+
+    def chunks():
+        started = False
+        requested = time.perf_counter()
+        try:
+            for chunk in provider.stream(prompt, model, **params):
+                started = True
+                yield chunk
+        except Exception as e:
+            if started or fallback is None:
+                raise
+            logger.warning(f"{provider.name} stream failed for {model}: {e}")
+            if observed:
+                telemetry.record(
+                    "complete",
+                    provider.name,
+                    model,
+                    prompt_tokens,
+                    latency_seconds=time.perf_counter() - requested,
+                    error=e,
+                )
+            info["match"] = "fallback"
+            stream.metrics = stream.on_complete = stream.on_finish = None
+            yield from word_chunks(fallback)
+
+    stream = TimedStream(
+        chunks(),
+        model,
+        metrics=get_stream_metrics() if observed else None,
+        on_complete=(
+            (lambda text: cache.put(prompt, model, text, fingerprint))
+            if use_cache
+            else None
+        ),
+        on_finish=(
+            (
+                lambda stats: telemetry.record(
+                    "complete",
+                    provider.name,
+                    model,
+                    prompt_tokens,
+                    stats["tokens"],
+                    stats["total_seconds"],
+                    error=stats["error"],
+                )
+            )
+            if observed
+            else None
+        ),
+    )
+    return stream, info
+
+
+@st.cache_resource(show_spinner=False)
+def get_context_builder() -> ContextBuilder:
+    """Prompt grounding digests shared by every session"""
+    return ContextBuilder()
+
+
+def get_grounding_context(
+    persona: str, budget_tokens: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Token-budgeted digest of suitability alerts, drift, idle cash, churn and
+    anomalies for ``persona``, cached per data version; the source queries
+    only run when ``get_data_fingerprint()`` changes.
+    """
+    return get_context_builder().build(
+        persona,
+        get_data_fingerprint(),
+        {
+            "suitability": get_suitability_risk_alerts,
+            "drift": get_portfolio_drift_analysis,
+            "idle_cash": get_idle_cash_analysis,
+            "churn": get_churn_early_warning,
+            "anomalies": get_trade_fee_anomalies,
+        },
+        budget_tokens,
+    )
+
+
+@st.cache_resource(show_spinner=False)
+def get_model_fanout() -> ModelFanout:
+    """
+    Concurrent multi-model comparison. External APIs get tighter
+    concurrency limits than Cortex; successful answers are also recorded
+    in ``get_stream_metrics()``.
+    """
+    return ModelFanout(
+        concurrency={"cortex": 4, "openai": 2, "anthropic": 2},
+        timeouts={"cortex": 60.0},
+        metrics=get_stream_metrics(),
+        telemetry=get_llm_telemetry(),
+    )
 
 
 # -----------------------------
@@ -835,5 +2046,17 @@ def get_client_geographic_distribution() -> pd.DataFrame:
     return run_query(sql)
 
 
+@st.cache_resource(show_spinner=False)
+def get_geo_reference() -> GeoReference:
+    """Shared state-centroid / ZIP-prefix reference tables"""
+    return GeoReference()
+
+
+@st.cache_data(ttl=600, show_spinner=False)
+def get_state_map_layer() -> pd.DataFrame:
+    """Per-state AUM metrics as ready-to-render map layer columns"""
+    return get_geo_reference().state_layer(get_client_geographic_distribution())
+
+
 # Additional functions for geospatial data would go here...
 # (Truncated for brevity - these would include all the geospatial functions from the original file)
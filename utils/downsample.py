@@ -0,0 +1,210 @@
+"""
+Chart Downsampling for Wealth 360 Analytics Platform
+
+Server-side reduction of long time series (ACCOUNT_HISTORY balances,
+POSITION_HISTORY values) before plotly figures are built. A chart asks for a
+pixel width and gets back at most a few points per pixel, chosen by
+Largest-Triangle-Three-Buckets or min/max bucketing so the visual shape and
+extremes survive. Multi-resolution pyramids let zoomed views read the right
+level instead of rescanning the full series.
+"""
+
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+POINTS_PER_PIXEL = 2
+DEFAULT_WIDTH_PX = 800
+
+# A pyramid stops halving once a level is this small.
+PYRAMID_BASE_POINTS = 512
+# Pick the finest level with at most this many candidates per output point.
+PYRAMID_OVERSAMPLE = 4
+
+METHODS = ("lttb", "minmax")
+
+
+def point_budget(width_px: int, points_per_px: float = POINTS_PER_PIXEL) -> int:
+    """Number of points worth sending for a chart ``width_px`` wide"""
+    return max(int(width_px * points_per_px), 3)
+
+
+def _as_float(values) -> np.ndarray:
+    arr = np.asarray(values)
+    if np.issubdtype(arr.dtype, np.datetime64):
+        return arr.astype("datetime64[ns]").astype(np.int64).astype(float)
+    return arr.astype(float)
+
+
+def lttb_indices(x, y, n_out: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets selection.
+
+    Keeps the first and last points and, for each of ``n_out - 2`` equal-count
+    buckets, the point forming the largest triangle with the previously kept
+    point and the mean of the next bucket. Returns sorted positional indices.
+    """
+    xs, ys = _as_float(x), _as_float(y)
+    n = len(xs)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    starts, ends = edges[:-1], edges[1:]
+    counts = np.maximum(ends - starts, 1)
+    # Mean of every bucket in one pass; the "next bucket" of the last one is
+    # the final point.
+    mean_x = np.add.reduceat(xs[: n - 1], starts) / counts
+    mean_y = np.add.reduceat(ys[: n - 1], starts) / counts
+    next_x = np.append(mean_x[1:], xs[-1])
+    next_y = np.append(mean_y[1:], ys[-1])
+
+    keep = np.empty(n_out, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i, (lo, hi) in enumerate(zip(starts, ends)):
+        hi = max(hi, lo + 1)
+        area = np.abs(
+            (xs[a] - next_x[i]) * (ys[lo:hi] - ys[a])
+            - (xs[a] - xs[lo:hi]) * (next_y[i] - ys[a])
+        )
+        a = lo + int(np.argmax(area))
+        keep[i + 1] = a
+    return keep
+
+
+def minmax_indices(y, n_buckets: int) -> np.ndarray:
+    """
+    Min/max bucketing: the positions of the lowest and highest value in each of
+    ``n_buckets`` equal-count buckets (up to two points per bucket, sorted).
+    """
+    ys = _as_float(y)
+    n = len(ys)
+    if n <= 2 * n_buckets or n_buckets < 1:
+        return np.arange(n)
+    # Equal-width buckets of ``size`` points; the tail is padded so that the
+    # whole series reshapes into a (buckets x size) block.
+    size = -(-n // n_buckets)
+    rows = -(-n // size)
+    pad = rows * size - n
+    low = np.concatenate([ys, np.full(pad, np.inf)]).reshape(rows, size)
+    high = np.concatenate([ys, np.full(pad, -np.inf)]).reshape(rows, size)
+    offsets = np.arange(rows) * size
+    lows = offsets + np.argmin(low, axis=1)
+    highs = offsets + np.argmax(high, axis=1)
+    return np.unique(np.concatenate([lows, highs, [0, n - 1]]))
+
+
+def downsample_indices(x, y, n_out: int, method: str = "lttb") -> np.ndarray:
+    """Positional indices of at most ``n_out`` representative points"""
+    if method == "lttb":
+        return lttb_indices(x, y, n_out)
+    if method == "minmax":
+        return minmax_indices(y, max(n_out // 2, 1))
+    raise ValueError(f"method must be one of {METHODS}, got {method!r}")
+
+
+def downsample(
+    df: pd.DataFrame,
+    x_col: str,
+    y_col: str,
+    width_px: int = DEFAULT_WIDTH_PX,
+    method: str = "lttb",
+    by: Optional[str] = None,
+) -> pd.DataFrame:
+    """
+    Reduce ``df`` to the rows worth plotting at ``width_px``.
+
+    Rows are sorted by ``x_col``; with ``by`` each group (one line on the
+    chart) is reduced separately and shares the pixel budget.
+    """
+    if df.empty:
+        return df
+    if by is None:
+        frame = df.sort_values(x_col, kind="stable")
+        keep = downsample_indices(
+            frame[x_col].to_numpy(),
+            frame[y_col].to_numpy(),
+            point_budget(width_px),
+            method,
+        )
+        return frame.iloc[keep]
+
+    groups = df[by].nunique()
+    per_group = max(point_budget(width_px) // max(groups, 1), 3)
+    frames: List[pd.DataFrame] = []
+    for _, frame in df.sort_values([by, x_col], kind="stable").groupby(by, sort=False):
+        keep = downsample_indices(
+            frame[x_col].to_numpy(), frame[y_col].to_numpy(), per_group, method
+        )
+        frames.append(frame.iloc[keep])
+    return pd.concat(frames)
+
+
+class SeriesPyramid:
+    """
+    Multi-resolution view of one sorted series.
+
+    Level 0 is the raw series; each further level halves the point count with
+    min/max bucketing over the previous level, down to PYRAMID_BASE_POINTS.
+    ``query`` picks the finest level that keeps the visible range within an
+    oversampled pixel budget, slices it with ``searchsorted`` and finishes
+    with LTTB, so a zoomed request costs O(budget) rather than O(n).
+    """
+
+    def __init__(self, df: pd.DataFrame, x_col: str, y_col: str):
+        self.x_col = x_col
+        self.y_col = y_col
+        self.frame = df.sort_values(x_col, kind="stable").reset_index(drop=True)
+        self._x = _as_float(self.frame[x_col].to_numpy())
+        y = self.frame[y_col].to_numpy()
+
+        # Each level stores positions into ``frame`` plus its sorted x values.
+        self.levels: List[np.ndarray] = [np.arange(len(self.frame))]
+        while len(self.levels[-1]) > 2 * PYRAMID_BASE_POINTS:
+            prev = self.levels[-1]
+            keep = minmax_indices(y[prev], len(prev) // 4)
+            if len(keep) >= len(prev):
+                break
+            self.levels.append(prev[keep])
+        self._level_x = [self._x[level] for level in self.levels]
+
+    def __len__(self) -> int:
+        return len(self.frame)
+
+    def _bound(self, value, default: float) -> float:
+        if value is None:
+            return default
+        if np.issubdtype(self.frame[self.x_col].dtype, np.datetime64):
+            return float(pd.Timestamp(value).value)
+        return float(value)
+
+    def level_sizes(self) -> List[int]:
+        return [len(level) for level in self.levels]
+
+    def query(
+        self,
+        start=None,
+        end=None,
+        width_px: int = DEFAULT_WIDTH_PX,
+    ) -> pd.DataFrame:
+        """Rows to plot for the x range [start, end] at ``width_px``"""
+        if self.frame.empty:
+            return self.frame
+        lo = self._bound(start, -np.inf)
+        hi = self._bound(end, np.inf)
+
+        budget = point_budget(width_px)
+        chosen = self.levels[0][0:0]
+        for level, xs in zip(self.levels, self._level_x):
+            a = np.searchsorted(xs, lo, side="left")
+            b = np.searchsorted(xs, hi, side="right")
+            chosen = level[a:b]
+            if len(chosen) <= budget * PYRAMID_OVERSAMPLE:
+                break
+
+        keep = lttb_indices(
+            self._x[chosen], self.frame[self.y_col].to_numpy()[chosen], budget
+        )
+        return self.frame.iloc[chosen[keep]]
@@ -0,0 +1,234 @@
+"""
+Exposure Cube for Wealth 360 Analytics Platform
+
+Pre-aggregated market value of the latest positions across ticker, asset
+class, strategy, client geography, wealth segment, risk tolerance and advisor.
+The base cuboid is held as integer-coded dimension columns, so any slice or
+roll-up is a mask plus one ``bincount``; answered queries are memoised until
+the next snapshot lands. New snapshots replace only the affected portfolios'
+contributions rather than rebuilding the whole cube.
+"""
+
+import threading
+from typing import Dict, Iterable, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+DIMENSIONS = (
+    "TICKER",
+    "ASSET_CLASS",
+    "STRATEGY_TYPE",
+    "STATE",
+    "WEALTH_SEGMENT",
+    "RISK_TOLERANCE",
+    "ADVISOR_ID",
+)
+
+MEASURES = ("MARKET_VALUE", "POSITIONS")
+
+SNAPSHOT_COLUMNS = ["PORTFOLIO_ID", "TIMESTAMP", "MARKET_VALUE"] + list(DIMENSIONS)
+
+UNKNOWN = "Unknown"
+
+Filter = Dict[str, object]
+
+
+def _values(selection) -> Tuple[str, ...]:
+    if isinstance(selection, (list, tuple, set, pd.Index, np.ndarray)):
+        return tuple(sorted(str(v) for v in selection))
+    return (str(selection),)
+
+
+def _filter_key(filters: Optional[Filter]) -> Tuple:
+    if not filters:
+        return ()
+    return tuple(sorted((dim, _values(sel)) for dim, sel in filters.items()))
+
+
+class ExposureCube:
+    """
+    Latest-position exposure cube.
+
+    ``positions`` keeps the latest snapshot rows per portfolio; ``base`` is
+    their aggregate over all DIMENSIONS. ``rollup`` groups the base by any
+    subset of dimensions under ``where`` / ``exclude`` filters. One cube is
+    shared by every Streamlit session, so updates and queries hold a lock and
+    callers get copies of memoised results.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.RLock()
+        self.clear()
+
+    def clear(self) -> None:
+        with self._lock:
+            self.positions = pd.DataFrame(columns=SNAPSHOT_COLUMNS)
+            self.latest = pd.Series(dtype="datetime64[ns]", name="TIMESTAMP")
+            self.base = pd.DataFrame(columns=list(DIMENSIONS) + list(MEASURES))
+            self.watermark: Optional[pd.Timestamp] = None
+            self._invalidate()
+
+    def _invalidate(self) -> None:
+        self._codes: Optional[Dict[str, Tuple[np.ndarray, pd.Index]]] = None
+        self._memo: Dict[Tuple, pd.DataFrame] = {}
+
+    def __len__(self) -> int:
+        return len(self.base)
+
+    # -----------------------------
+    # Build
+    # -----------------------------
+
+    @staticmethod
+    def _prepare(snapshots: pd.DataFrame) -> pd.DataFrame:
+        frame = snapshots.reindex(columns=SNAPSHOT_COLUMNS).copy()
+        frame["TIMESTAMP"] = pd.to_datetime(frame["TIMESTAMP"])
+        frame["MARKET_VALUE"] = pd.to_numeric(
+            frame["MARKET_VALUE"], errors="coerce"
+        ).fillna(0.0)
+        for dim in DIMENSIONS:
+            frame[dim] = frame[dim].fillna(UNKNOWN).astype(str)
+        return frame
+
+    @staticmethod
+    def _aggregate(rows: pd.DataFrame, sign: float = 1.0) -> pd.DataFrame:
+        grouped = rows.groupby(list(DIMENSIONS), sort=False, observed=True).agg(
+            MARKET_VALUE=("MARKET_VALUE", "sum"), POSITIONS=("MARKET_VALUE", "size")
+        )
+        return grouped * sign
+
+    def load(self, snapshots: pd.DataFrame) -> None:
+        """Replace the cube with the latest snapshot of every portfolio"""
+        with self._lock:
+            self.clear()
+            self.update(snapshots)
+
+    def update(self, snapshots: pd.DataFrame) -> int:
+        """
+        Merge new snapshot rows; returns the number of portfolios whose latest
+        snapshot changed. Only those portfolios' old rows are subtracted from
+        and their new rows added to the base cuboid.
+        """
+        if snapshots.empty:
+            return 0
+        frame = self._prepare(snapshots)
+        with self._lock:
+            return self._update(frame)
+
+    def _update(self, frame: pd.DataFrame) -> int:
+        newest = frame.groupby("PORTFOLIO_ID")["TIMESTAMP"].max()
+        current = self.latest.reindex(newest.index)
+        changed = newest[current.isna() | (newest > current)]
+        if changed.empty:
+            return 0
+
+        incoming = frame[
+            frame["TIMESTAMP"].to_numpy()
+            == changed.reindex(frame["PORTFOLIO_ID"]).to_numpy()
+        ]
+        outgoing = self.positions[self.positions["PORTFOLIO_ID"].isin(changed.index)]
+        delta = pd.concat(
+            [self._aggregate(outgoing, -1.0), self._aggregate(incoming)]
+            + ([self.base.set_index(list(DIMENSIONS))] if len(self.base) else [])
+        )
+        base = delta.groupby(level=list(range(len(DIMENSIONS))), sort=False).sum()
+        base = base[base["POSITIONS"] > 0].reset_index()
+        base["POSITIONS"] = base["POSITIONS"].round().astype(np.int64)
+        self.base = base
+
+        keep = self.positions[~self.positions["PORTFOLIO_ID"].isin(changed.index)]
+        self.positions = pd.concat([keep, incoming], ignore_index=True)
+        self.latest = pd.concat(
+            [self.latest.drop(changed.index, errors="ignore"), changed]
+        ).rename("TIMESTAMP")
+        latest = newest.max()
+        if self.watermark is None or latest > self.watermark:
+            self.watermark = latest
+        self._invalidate()
+        return len(changed)
+
+    def _coded(self) -> Dict[str, Tuple[np.ndarray, pd.Index]]:
+        if self._codes is None:
+            self._codes = {dim: pd.factorize(self.base[dim]) for dim in DIMENSIONS}
+        return self._codes
+
+    # -----------------------------
+    # Queries
+    # -----------------------------
+
+    def _mask(self, where: Optional[Filter], exclude: Optional[Filter]) -> np.ndarray:
+        codes = self._coded()
+        mask = np.ones(len(self.base), dtype=bool)
+        for filters, keep in ((where, True), (exclude, False)):
+            for dim, selection in (filters or {}).items():
+                if dim not in codes:
+                    raise ValueError(f"unknown dimension {dim!r}")
+                dim_codes, labels = codes[dim]
+                wanted = np.flatnonzero(labels.isin(_values(selection)))
+                hit = np.isin(dim_codes, wanted)
+                mask &= hit if keep else ~hit
+        return mask
+
+    def rollup(
+        self,
+        by: Sequence[str] = (),
+        where: Optional[Filter] = None,
+        exclude: Optional[Filter] = None,
+    ) -> pd.DataFrame:
+        """
+        MARKET_VALUE, POSITIONS and SHARE of the filtered slice grouped by
+        ``by`` (largest first). An empty ``by`` gives a single total row.
+        """
+        by = tuple(by)
+        unknown = [dim for dim in by if dim not in DIMENSIONS]
+        if unknown:
+            raise ValueError(f"unknown dimensions {unknown}")
+        key = (by, _filter_key(where), _filter_key(exclude))
+        with self._lock:
+            if key not in self._memo:
+                self._memo[key] = self._rollup(by, where, exclude)
+            return self._memo[key].copy()
+
+    def _rollup(
+        self,
+        by: Tuple[str, ...],
+        where: Optional[Filter],
+        exclude: Optional[Filter],
+    ) -> pd.DataFrame:
+
+        mask = self._mask(where, exclude)
+        value = self.base["MARKET_VALUE"].to_numpy(dtype=float)[mask]
+        count = self.base["POSITIONS"].to_numpy(dtype=float)[mask]
+        codes = self._coded()
+        if by:
+            sizes = [max(len(codes[dim][1]), 1) for dim in by]
+            flat = np.ravel_multi_index([codes[dim][0][mask] for dim in by], sizes)
+            cells, inverse = np.unique(flat, return_inverse=True)
+            result = pd.DataFrame(
+                {
+                    dim: codes[dim][1][idx]
+                    for dim, idx in zip(by, np.unravel_index(cells, sizes))
+                }
+            )
+            result["MARKET_VALUE"] = np.bincount(inverse, weights=value)
+            result["POSITIONS"] = np.bincount(inverse, weights=count).astype(np.int64)
+        else:
+            result = pd.DataFrame(
+                {"MARKET_VALUE": [value.sum()], "POSITIONS": [int(count.sum())]}
+            )
+        total = result["MARKET_VALUE"].sum()
+        result["SHARE"] = result["MARKET_VALUE"] / total if total else 0.0
+        return result.sort_values("MARKET_VALUE", ascending=False).reset_index(
+            drop=True
+        )
+
+    def total(
+        self, where: Optional[Filter] = None, exclude: Optional[Filter] = None
+    ) -> float:
+        """Market value of a slice"""
+        return float(self.rollup((), where, exclude)["MARKET_VALUE"].iloc[0])
+
+    def members(self, dim: str, where: Optional[Filter] = None) -> Iterable[str]:
+        """Distinct values of ``dim`` present in a slice"""
+        return self.rollup((dim,), where)[dim].tolist()
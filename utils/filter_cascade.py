@@ -0,0 +1,330 @@
+"""
+Filter Cascade for Wealth 360 Analytics Platform
+
+Natural-language filters over INTERACTIONS without running an LLM predicate
+on every row. Cheap vectorized predicates (recency, segment, interaction
+type and keyword signals) run first, an embedding-similarity shortlist
+ranks what survives, and only that shortlist is sent - in batches - to the
+expensive AI_FILTER judge. Every stage reports rows in/out, selectivity,
+time and model calls.
+"""
+
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from utils.llm_telemetry import LLMTelemetry, timed_call
+from utils.text_embedding import HashingEmbedder
+
+TEXT_COLUMNS = ("PURPOSE_SUBJECT", "OUTCOME_NOTES", "LLM_GENERATED_CONTENT")
+STAT_COLUMNS = ["STAGE", "ROWS_IN", "ROWS_OUT", "SELECTIVITY", "SECONDS", "CALLS"]
+
+DEFAULT_SHORTLIST = 200
+DEFAULT_BATCH_SIZE = 25
+DEFAULT_WORKERS = 4
+DEFAULT_EMBED_CACHE_ENTRIES = 50000
+
+# Judge: texts + question -> one keep/drop decision per text
+Judge = Callable[[List[str], str], List[bool]]
+
+
+@dataclass
+class FilterScenario:
+    """Cheap signals that any row matching ``question`` should show"""
+
+    question: str
+    keywords: Sequence[str] = ()
+    interaction_types: Sequence[str] = ()
+    recent_days: Optional[int] = None
+    segments: Sequence[str] = ()
+    shortlist: int = DEFAULT_SHORTLIST
+    min_similarity: float = 0.05
+    query_text: str = ""
+
+
+FILTER_SCENARIOS: Dict[str, FilterScenario] = {
+    "Clients who mentioned risk concerns in the last 30 days": FilterScenario(
+        question="Does the client express concern or worry about investment risk, losses or market volatility?",
+        keywords=(
+            "risk",
+            "volatil",
+            "worr",
+            "concern",
+            "loss",
+            "downturn",
+            "nervous",
+            "anxious",
+        ),
+        interaction_types=("Complaint",),
+        recent_days=30,
+        query_text="client worried concerned about risk volatility market losses downturn",
+    ),
+    "Portfolios that may need rebalancing based on recent performance": FilterScenario(
+        question="Does the interaction suggest the client's portfolio needs rebalancing or an allocation change?",
+        keywords=(
+            "rebalanc",
+            "allocation",
+            "overweight",
+            "underweight",
+            "drift",
+            "reallocat",
+        ),
+        recent_days=90,
+        query_text="portfolio rebalancing allocation drift overweight adjust positions",
+    ),
+    "Advisors with high client satisfaction ratings": FilterScenario(
+        question="Does the client express clear satisfaction with their advisor or service?",
+        keywords=(
+            "satisf",
+            "happy",
+            "pleased",
+            "great",
+            "excellent",
+            "appreciat",
+            "thank",
+        ),
+        query_text="client satisfied happy pleased with advisor excellent service appreciation",
+    ),
+    "Interactions that indicate potential churn risk": FilterScenario(
+        question="Does the interaction indicate the client might leave, move assets or close accounts?",
+        keywords=(
+            "leav",
+            "transfer",
+            "close",
+            "frustrat",
+            "unhappy",
+            "fee",
+            "competitor",
+            "switch",
+            "disappoint",
+        ),
+        interaction_types=("Complaint",),
+        recent_days=180,
+        query_text="client frustrated unhappy may leave transfer assets close account competitor fees",
+    ),
+}
+
+
+def combined_text(frame: pd.DataFrame) -> pd.Series:
+    parts = [frame[col].fillna("").astype(str) for col in TEXT_COLUMNS if col in frame]
+    text = parts[0] if parts else pd.Series("", index=frame.index)
+    for part in parts[1:]:
+        text = text + "\n" + part
+    return text.str.strip()
+
+
+# -----------------------------
+# Judges
+# -----------------------------
+
+
+class CortexFilterJudge:
+    """AI_FILTER over a batch bound as one JSON array (one query per batch)"""
+
+    name = "cortex"
+
+    SQL = """
+        SELECT f.INDEX AS IDX,
+               AI_FILTER(CONCAT(?, '\\n\\nText: ', f.VALUE::STRING)) AS KEEP
+        FROM TABLE(FLATTEN(INPUT => PARSE_JSON(?))) f
+        ORDER BY f.INDEX
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Any],
+        telemetry: Optional[LLMTelemetry] = None,
+    ):
+        self.session_factory = session_factory
+        self.telemetry = telemetry
+
+    def __call__(self, texts: List[str], question: str) -> List[bool]:
+        prompt = "\n".join(f"{question}\n\nText: {t}" for t in texts)
+        with timed_call(
+            self.telemetry, "filter", "cortex", "ai_filter", prompt
+        ) as call:
+            rows = (
+                self.session_factory()
+                .sql(self.SQL, params=[question, json.dumps(texts)])
+                .to_pandas()
+            )
+            call["completion_tokens"] = len(rows)
+        return [bool(v) for v in rows.iloc[:, 1]]
+
+
+class SimilarityJudge:
+    """
+    Deterministic local stand-in: keeps texts whose hashed embedding is at
+    least ``threshold`` similar to the question.
+    """
+
+    name = "similarity"
+
+    def __init__(self, threshold: float = 0.1, embedder=None):
+        self.threshold = threshold
+        self.embedder = embedder or HashingEmbedder()
+
+    def __call__(self, texts: List[str], question: str) -> List[bool]:
+        scores = self.embedder.embed(texts) @ self.embedder.embed_one(question)
+        return (scores >= self.threshold).tolist()
+
+
+# -----------------------------
+# Cascade
+# -----------------------------
+
+
+class FilterCascade:
+    """
+    ``run(frame, scenario)`` applies, in order: recency (relative to the
+    newest row, so historical extracts behave like live data), segment,
+    cheap signals (keyword hit in any text column OR a listed interaction
+    type), the embedding shortlist, and finally the batched judge.
+    Shortlist embeddings are memoised by content hash across runs, in an LRU
+    of at most ``max_embeddings`` vectors shared by every session under a lock.
+    """
+
+    def __init__(
+        self,
+        judge: Optional[Judge] = None,
+        embedder=None,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        max_workers: int = DEFAULT_WORKERS,
+        max_embeddings: int = DEFAULT_EMBED_CACHE_ENTRIES,
+    ):
+        self.judge = judge or SimilarityJudge()
+        self.embedder = embedder or HashingEmbedder()
+        self.batch_size = batch_size
+        self.max_workers = max_workers
+        self.max_embeddings = max_embeddings
+        # Embedding memo: content hash -> vector, least recently used first
+        self._vectors: "OrderedDict[int, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _embed(self, texts: pd.Series) -> np.ndarray:
+        """Embeddings by content hash, so unchanged rows are embedded once"""
+        if texts.empty:
+            return np.zeros((0, self.embedder.dim), dtype=np.float32)
+        hashes = pd.util.hash_pandas_object(texts, index=False).to_numpy()
+        codes, uniques = pd.factorize(hashes)
+        first = pd.Series(np.arange(len(codes))).groupby(codes).first().to_numpy()
+        found: Dict[int, np.ndarray] = {}
+        with self._lock:
+            for h in uniques:
+                vector = self._vectors.get(int(h))
+                if vector is not None:
+                    self._vectors.move_to_end(int(h))
+                    found[int(h)] = vector
+        new = [i for i, h in enumerate(uniques) if int(h) not in found]
+        if new:
+            vectors = self.embedder.embed(texts.iloc[first[new]].tolist())
+            fresh = {int(uniques[i]): vectors[k] for k, i in enumerate(new)}
+            found.update(fresh)
+            with self._lock:
+                self._vectors.update(fresh)
+                while len(self._vectors) > self.max_embeddings:
+                    self._vectors.popitem(last=False)
+        return np.vstack([found[int(h)] for h in uniques])[codes]
+
+    def _stages(
+        self, scenario: FilterScenario
+    ) -> List[Tuple[str, Callable[[pd.DataFrame], Tuple[pd.DataFrame, int]]]]:
+        stages = []
+        if scenario.recent_days:
+
+            def recent(frame: pd.DataFrame) -> Tuple[pd.DataFrame, int]:
+                ts = pd.to_datetime(frame["TIMESTAMP"])
+                cutoff = ts.max() - pd.Timedelta(days=scenario.recent_days)
+                return frame[ts >= cutoff], 0
+
+            stages.append((f"Last {scenario.recent_days} days", recent))
+        if scenario.segments:
+            segments = set(scenario.segments)
+            stages.append(
+                (
+                    "Segment",
+                    lambda frame: (frame[frame["WEALTH_SEGMENT"].isin(segments)], 0),
+                )
+            )
+        if scenario.keywords or scenario.interaction_types:
+            pattern = re.compile(
+                "|".join(re.escape(k) for k in scenario.keywords) or r"$^",
+                re.IGNORECASE,
+            )
+            types = set(scenario.interaction_types)
+
+            def signals(frame: pd.DataFrame) -> Tuple[pd.DataFrame, int]:
+                hit = frame["_TEXT"].str.contains(pattern)
+                if types and "INTERACTION_TYPE" in frame:
+                    hit |= frame["INTERACTION_TYPE"].isin(types)
+                return frame[hit], 0
+
+            stages.append(("Keyword / type signals", signals))
+
+        def shortlist(frame: pd.DataFrame) -> Tuple[pd.DataFrame, int]:
+            if frame.empty:
+                return frame, 0
+            query = self.embedder.embed_one(scenario.query_text or scenario.question)
+            scores = self._embed(frame["_TEXT"]) @ query
+            frame = frame.assign(SIMILARITY=scores)
+            frame = frame[frame["SIMILARITY"] >= scenario.min_similarity]
+            return frame.nlargest(scenario.shortlist, "SIMILARITY"), 0
+
+        stages.append(("Embedding shortlist", shortlist))
+        stages.append(("AI filter", lambda frame: self._judge(frame, scenario)))
+        return stages
+
+    def _judge(
+        self, frame: pd.DataFrame, scenario: FilterScenario
+    ) -> Tuple[pd.DataFrame, int]:
+        texts = frame["_TEXT"].tolist()
+        batches = [
+            texts[i : i + self.batch_size]
+            for i in range(0, len(texts), self.batch_size)
+        ]
+        with ThreadPoolExecutor(max_workers=max(1, self.max_workers)) as pool:
+            verdicts = list(
+                pool.map(lambda batch: self.judge(batch, scenario.question), batches)
+            )
+        keep = np.array([v for batch in verdicts for v in batch], dtype=bool)
+        return frame[keep] if len(keep) else frame, len(batches)
+
+    def run(
+        self, frame: pd.DataFrame, scenario: FilterScenario
+    ) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """Matching rows (best shortlist score first) and per-stage stats"""
+        current = frame.assign(_TEXT=combined_text(frame))
+        total = max(len(frame), 1)
+        stats = [
+            {
+                "STAGE": "All rows",
+                "ROWS_IN": len(frame),
+                "ROWS_OUT": len(frame),
+                "SELECTIVITY": 1.0,
+                "SECONDS": 0.0,
+                "CALLS": 0,
+            }
+        ]
+        for name, stage in self._stages(scenario):
+            rows_in = len(current)
+            started = time.perf_counter()
+            current, calls = stage(current)
+            stats.append(
+                {
+                    "STAGE": name,
+                    "ROWS_IN": rows_in,
+                    "ROWS_OUT": len(current),
+                    "SELECTIVITY": len(current) / total,
+                    "SECONDS": time.perf_counter() - started,
+                    "CALLS": calls,
+                }
+            )
+        return current.drop(columns="_TEXT"), pd.DataFrame(stats, columns=STAT_COLUMNS)
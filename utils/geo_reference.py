@@ -0,0 +1,288 @@
+"""
+Geographic Reference Data for Wealth 360 Analytics Platform
+
+Packaged state centroids and USPS three-digit ZIP prefix ranges, with
+vectorized joins that turn per-state metrics or client rows into columnar map
+layer data. Replaces the per-row centroid lookups and the inline coordinate
+UNION ALL previously used to place clients on maps.
+"""
+
+from typing import List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# (state code, latitude, longitude) - approximate geographic centres
+STATE_CENTROIDS: List[Tuple[str, float, float]] = [
+    ("AL", 32.806671, -86.791130),
+    ("AK", 61.370716, -152.404419),
+    ("AZ", 33.729759, -111.431221),
+    ("AR", 34.969704, -92.373123),
+    ("CA", 36.116203, -119.681564),
+    ("CO", 39.059811, -105.311104),
+    ("CT", 41.597782, -72.755371),
+    ("DE", 39.318523, -75.507141),
+    ("DC", 38.905985, -77.033418),
+    ("FL", 27.766279, -81.686783),
+    ("GA", 33.040619, -83.643074),
+    ("HI", 21.094318, -157.498337),
+    ("ID", 44.240459, -114.478828),
+    ("IL", 40.349457, -88.986137),
+    ("IN", 39.849426, -86.258278),
+    ("IA", 42.011539, -93.210526),
+    ("KS", 38.526600, -96.726486),
+    ("KY", 37.668140, -84.670067),
+    ("LA", 31.169546, -91.867805),
+    ("ME", 44.693947, -69.381927),
+    ("MD", 39.063946, -76.802101),
+    ("MA", 42.230171, -71.530106),
+    ("MI", 43.326618, -84.536095),
+    ("MN", 45.694454, -93.900192),
+    ("MS", 32.741646, -89.678696),
+    ("MO", 38.456085, -92.288368),
+    ("MT", 46.921925, -110.454353),
+    ("NE", 41.125370, -98.268082),
+    ("NV", 38.313515, -117.055374),
+    ("NH", 43.452492, -71.563896),
+    ("NJ", 40.298904, -74.521011),
+    ("NM", 34.840515, -106.248482),
+    ("NY", 42.165726, -74.948051),
+    ("NC", 35.630066, -79.806419),
+    ("ND", 47.528912, -99.784012),
+    ("OH", 40.388783, -82.764915),
+    ("OK", 35.565342, -96.928917),
+    ("OR", 44.572021, -122.070938),
+    ("PA", 40.590752, -77.209755),
+    ("RI", 41.680893, -71.511780),
+    ("SC", 33.856892, -80.945007),
+    ("SD", 44.299782, -99.438828),
+    ("TN", 35.747845, -86.692345),
+    ("TX", 31.054487, -97.563461),
+    ("UT", 40.150032, -111.862434),
+    ("VT", 44.045876, -72.710686),
+    ("VA", 37.769337, -78.169968),
+    ("WA", 47.400902, -121.490494),
+    ("WV", 38.491226, -80.954453),
+    ("WI", 44.268543, -89.616508),
+    ("WY", 42.755966, -107.302490),
+    ("PR", 18.220833, -66.590149),
+    ("VI", 18.335765, -64.896335),
+    ("GU", 13.444304, 144.793731),
+    ("AS", -14.270972, -170.132217),
+    ("MP", 15.097900, 145.673900),
+    ("MH", 7.131474, 171.184478),
+    ("PW", 7.514980, 134.582520),
+]
+
+# (first prefix, last prefix, state code) - USPS three-digit ZIP prefix ranges
+ZIP_PREFIX_RANGES: List[Tuple[int, int, str]] = [
+    (5, 5, "NY"),
+    (6, 7, "PR"),
+    (8, 8, "VI"),
+    (9, 9, "PR"),
+    (10, 27, "MA"),
+    (28, 29, "RI"),
+    (30, 38, "NH"),
+    (39, 49, "ME"),
+    (50, 54, "VT"),
+    (55, 55, "MA"),
+    (56, 59, "VT"),
+    (60, 69, "CT"),
+    (70, 89, "NJ"),
+    (100, 149, "NY"),
+    (150, 196, "PA"),
+    (197, 199, "DE"),
+    (200, 200, "DC"),
+    (201, 201, "VA"),
+    (202, 205, "DC"),
+    (206, 219, "MD"),
+    (220, 246, "VA"),
+    (247, 268, "WV"),
+    (270, 289, "NC"),
+    (290, 299, "SC"),
+    (300, 319, "GA"),
+    (320, 349, "FL"),
+    (350, 369, "AL"),
+    (370, 385, "TN"),
+    (386, 397, "MS"),
+    (398, 399, "GA"),
+    (400, 427, "KY"),
+    (430, 459, "OH"),
+    (460, 479, "IN"),
+    (480, 499, "MI"),
+    (500, 528, "IA"),
+    (530, 549, "WI"),
+    (550, 567, "MN"),
+    (569, 569, "DC"),
+    (570, 577, "SD"),
+    (580, 588, "ND"),
+    (590, 599, "MT"),
+    (600, 629, "IL"),
+    (630, 658, "MO"),
+    (660, 679, "KS"),
+    (680, 693, "NE"),
+    (700, 714, "LA"),
+    (716, 729, "AR"),
+    (730, 749, "OK"),
+    (750, 799, "TX"),
+    (800, 816, "CO"),
+    (820, 831, "WY"),
+    (832, 838, "ID"),
+    (840, 847, "UT"),
+    (850, 865, "AZ"),
+    (870, 884, "NM"),
+    (885, 885, "TX"),
+    (889, 898, "NV"),
+    (900, 961, "CA"),
+    (967, 968, "HI"),
+    (969, 969, "GU"),
+    (970, 979, "OR"),
+    (980, 994, "WA"),
+    (995, 999, "AK"),
+]
+
+LAYER_COLUMNS = [
+    "STATE",
+    "lat",
+    "lon",
+    "TOTAL_AUM",
+    "CLIENT_COUNT",
+    "MARKET_TIER",
+    "color_r",
+    "color_g",
+    "color_b",
+    "color_a",
+    "radius",
+]
+
+
+class GeoReference:
+    """
+    In-memory geographic lookup tables.
+
+    State centroids are held in a frame indexed by state code and ZIP prefixes
+    in a dense 1000-slot array, so attaching coordinates to any number of rows
+    is a single index alignment rather than a per-row dictionary lookup.
+    """
+
+    def __init__(self) -> None:
+        self.states = pd.DataFrame(
+            STATE_CENTROIDS, columns=["STATE", "LATITUDE", "LONGITUDE"]
+        ).set_index("STATE")
+        self._zip_prefix_states = np.full(1000, None, dtype=object)
+        for first, last, state in ZIP_PREFIX_RANGES:
+            self._zip_prefix_states[first : last + 1] = state
+
+    # -----------------------------
+    # Lookups
+    # -----------------------------
+
+    def zip_to_state(self, zip_codes: pd.Series) -> pd.Series:
+        """State code implied by each ZIP's three-digit prefix (None if unknown)"""
+        digits = zip_codes.astype(str).str.extract(r"^\s*(\d{1,5})")[0]
+        prefix = pd.to_numeric(digits.str.zfill(5).str[:3], errors="coerce")
+        valid = prefix.notna().to_numpy()
+        states = np.full(len(zip_codes), None, dtype=object)
+        states[valid] = self._zip_prefix_states[prefix[valid].astype(int).to_numpy()]
+        return pd.Series(states, index=zip_codes.index, name="ZIP_STATE")
+
+    def attach_state_centroids(
+        self, df: pd.DataFrame, state_col: str = "STATE", how: str = "inner"
+    ) -> pd.DataFrame:
+        """
+        Join LATITUDE / LONGITUDE onto ``df`` by state code.
+
+        ``how="inner"`` drops rows whose state has no centroid; ``"left"``
+        keeps them with missing coordinates.
+        """
+        if df.empty or state_col not in df.columns:
+            return df.iloc[0:0].assign(LATITUDE=[], LONGITUDE=[])
+        keys = df[state_col].astype(str).str.strip().str.upper()
+        coords = self.states.reindex(keys.to_numpy())
+        out = df.assign(
+            LATITUDE=coords["LATITUDE"].to_numpy(),
+            LONGITUDE=coords["LONGITUDE"].to_numpy(),
+        )
+        if how == "inner":
+            out = out[out["LATITUDE"].notna()]
+        return out
+
+    def attach_zip_centroids(
+        self, df: pd.DataFrame, zip_col: str = "ZIP_CODE", how: str = "inner"
+    ) -> pd.DataFrame:
+        """
+        Join coordinates onto ``df`` by ZIP code.
+
+        ZIPs are resolved to a state through their USPS prefix and placed at
+        that state's centroid; the resolved code is returned as ZIP_STATE.
+        """
+        zip_states = self.zip_to_state(df[zip_col])
+        return self.attach_state_centroids(
+            df.assign(ZIP_STATE=zip_states), state_col="ZIP_STATE", how=how
+        )
+
+    # -----------------------------
+    # Map layers
+    # -----------------------------
+
+    def state_layer(
+        self, state_metrics: pd.DataFrame, value_col: str = "TOTAL_AUM"
+    ) -> pd.DataFrame:
+        """
+        Columnar ScatterplotLayer data for per-state metrics.
+
+        Rows are placed at their state centroid, coloured on a blue-to-red
+        gradient and sized by the square root of ``value_col``.
+        """
+        if state_metrics.empty:
+            return pd.DataFrame(columns=LAYER_COLUMNS)
+        placed = self.attach_state_centroids(state_metrics)
+        value = pd.to_numeric(placed[value_col], errors="coerce").fillna(0.0)
+        layer = pd.DataFrame(
+            {
+                "STATE": placed["STATE"].astype(str).str.strip().str.upper(),
+                "lat": placed["LATITUDE"],
+                "lon": placed["LONGITUDE"],
+                "TOTAL_AUM": value.astype(float),
+                "CLIENT_COUNT": _column_or(placed, "CLIENT_COUNT", 0).astype(int),
+                "MARKET_TIER": _column_or(placed, "MARKET_TIER", "N/A").astype(str),
+            }
+        ).reset_index(drop=True)
+        if layer.empty:
+            return layer.reindex(columns=LAYER_COLUMNS)
+
+        span = (layer["TOTAL_AUM"].max() - layer["TOTAL_AUM"].min()) or 1.0
+        norm = (layer["TOTAL_AUM"] - layer["TOTAL_AUM"].min()) / span
+        layer["color_r"] = (50 + norm * 205).astype(int)
+        layer["color_g"] = (80 + norm * 120).astype(int)
+        layer["color_b"] = (255 - norm * 205).astype(int)
+        layer["color_a"] = 220
+        layer["radius"] = np.sqrt(layer["TOTAL_AUM"].clip(lower=0)) / 50.0
+        return layer
+
+    def client_points(
+        self,
+        clients: pd.DataFrame,
+        jitter: float = 0.25,
+        limit: Optional[int] = None,
+        seed: Optional[int] = None,
+    ) -> pd.DataFrame:
+        """
+        Place client rows at their state centroid with a uniform +/- ``jitter``
+        degree offset so co-located clients do not overlap.
+        """
+        placed = self.attach_state_centroids(clients)
+        if limit is not None:
+            placed = placed.head(limit)
+        rng = np.random.default_rng(seed)
+        offsets = rng.uniform(-jitter, jitter, size=(len(placed), 2))
+        return placed.assign(
+            LATITUDE=placed["LATITUDE"] + offsets[:, 0],
+            LONGITUDE=placed["LONGITUDE"] + offsets[:, 1],
+        ).reset_index(drop=True)
+
+
+def _column_or(df: pd.DataFrame, col: str, default) -> pd.Series:
+    if col not in df.columns:
+        return pd.Series(default, index=df.index)
+    return df[col].fillna(default)
@@ -0,0 +1,332 @@
+"""
+Hierarchical Summarization for Wealth 360 Analytics Platform
+
+Map-reduce summaries of interaction notes: each client's notes are cut into
+context-sized chunks and summarized in parallel, then merged per advisor
+(within a wealth segment), per segment and for the firm. Every node is cached
+under a key derived from its exact inputs - the chunk's interaction ids and
+content hashes, or its children's keys - so new interactions only re-run the
+chunks and ancestors they touch. ``ExtractiveSummarizer`` is a deterministic
+local stand-in for the Cortex summarizer.
+"""
+
+import hashlib
+import re
+import threading
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from utils.llm_streaming import estimate_tokens
+from utils.llm_telemetry import LLMTelemetry, timed_call
+from utils.text_embedding import HashingEmbedder, normalize_text
+
+# Node path prefixes, from the root down; the firm is the empty path
+LEVELS = ("FIRM", "WEALTH_SEGMENT", "ADVISOR_ID", "CLIENT_ID")
+NOTE_COLUMNS = ["INTERACTION_ID", "TIMESTAMP", "TEXT"] + list(LEVELS[1:])
+
+DEFAULT_INSTRUCTION = (
+    "Summarize the recurring client feedback themes, concerns and sentiment "
+    "for an executive audience."
+)
+DEFAULT_CHUNK_CHARS = 6000
+DEFAULT_WORKERS = 4
+DEFAULT_CACHE_ENTRIES = 20000
+# Grouped merge rounds per parent before its summaries are merged in one call
+MAX_REDUCE_ROUNDS = 8
+
+_SENTENCE = re.compile(r"(?<=[.!?])\s+|\n+")
+_ABBREVIATION = re.compile(r"\b(Mr|Mrs|Ms|Dr|Jr|Sr|vs|etc|e\.g|i\.e)\.")
+_BULLET = re.compile(r"^[\s#*>\-\d.)]+|[*_`]+")
+MIN_SENTENCE_WORDS = 3
+# "Sentence (x3)." as emitted by ExtractiveSummarizer, so merges keep counts
+_COUNTED = re.compile(r"^(.*?)\s*\(x(\d+)\)\.?$")
+
+Summarize = Callable[[List[str], str], str]
+
+
+def _digest(*parts: str) -> str:
+    return hashlib.sha1("\x1f".join(parts).encode("utf-8")).hexdigest()[:16]
+
+
+# -----------------------------
+# Summarizers
+# -----------------------------
+
+
+class ExtractiveSummarizer:
+    """
+    Deterministic stand-in: the distinct sentences closest to the centroid
+    of all input sentences (weighted by how often each recurs), with counts.
+    Markdown markers are stripped and fragments under MIN_SENTENCE_WORDS
+    words are ignored.
+    """
+
+    name = "extractive"
+
+    def __init__(self, max_sentences: int = 4, embedder=None):
+        self.max_sentences = max_sentences
+        self.embedder = embedder or HashingEmbedder()
+
+    def __call__(self, texts: List[str], instruction: str) -> str:
+        counts: Counter = Counter()
+        first: Dict[str, str] = {}
+        for text in texts:
+            for sentence in _SENTENCE.split(_ABBREVIATION.sub(r"\1", str(text))):
+                sentence, repeats = _BULLET.sub("", sentence).strip(), 1
+                counted = _COUNTED.match(sentence)
+                if counted:
+                    sentence, repeats = counted.group(1), int(counted.group(2))
+                key = normalize_text(sentence)
+                if len(key.split()) >= MIN_SENTENCE_WORDS:
+                    counts[key] += repeats
+                    first.setdefault(key, sentence)
+        if not counts:
+            return ""
+        keys = list(counts)
+        weights = np.array([counts[k] for k in keys], dtype=np.float32)
+        vectors = self.embedder.embed(keys)
+        centroid = weights @ vectors
+        scores = vectors @ centroid + np.log1p(weights)
+        picked = np.argsort(-scores, kind="stable")[: self.max_sentences]
+        return " ".join(
+            f"{first[keys[i]].rstrip('.')} (x{counts[keys[i]]})." for i in picked
+        )
+
+
+class CortexSummarizer:
+    """One AI_COMPLETE call per node: the instruction plus bulleted inputs"""
+
+    name = "cortex"
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Any],
+        model: str = "mistral-large2",
+        telemetry: Optional[LLMTelemetry] = None,
+    ):
+        self.session_factory = session_factory
+        self.model = model
+        self.name = f"cortex:{model}"
+        self.telemetry = telemetry
+
+    def __call__(self, texts: List[str], instruction: str) -> str:
+        prompt = instruction + "\n\n" + "\n".join(f"- {t}" for t in texts)
+        with timed_call(
+            self.telemetry, "summarize", "cortex", self.model, prompt
+        ) as call:
+            result = (
+                self.session_factory()
+                .sql(
+                    "SELECT AI_COMPLETE(?, ?) AS RESPONSE", params=[self.model, prompt]
+                )
+                .to_pandas()
+            )
+            summary = str(result.iloc[0, 0])
+            call["completion_tokens"] = estimate_tokens(summary)
+        return summary
+
+
+# -----------------------------
+# Map-reduce pipeline
+# -----------------------------
+
+
+def chunk_texts(texts: Sequence[str], max_chars: int) -> List[List[int]]:
+    """
+    Greedy consecutive chunks (as positions) of at most ``max_chars`` each.
+    Appending texts leaves every earlier chunk unchanged, which keeps their
+    cache keys stable.
+    """
+    chunks: List[List[int]] = []
+    size = 0
+    for pos, text in enumerate(texts):
+        length = len(text) + 1
+        if not chunks or size + length > max_chars:
+            chunks.append([])
+            size = 0
+        chunks[-1].append(pos)
+        size += length
+    return chunks
+
+
+class HierarchicalSummarizer:
+    """
+    Client -> advisor -> segment -> firm summaries over interaction notes.
+
+    ``run(notes)`` takes INTERACTION_ID, TIMESTAMP, TEXT, WEALTH_SEGMENT,
+    ADVISOR_ID and CLIENT_ID columns and returns one row per node with its
+    LEVEL, PATH, SUMMARY, INTERACTIONS and whether it came from cache.
+    Summaries are shared across runs through a bounded LRU keyed by inputs.
+    """
+
+    def __init__(
+        self,
+        summarize: Optional[Summarize] = None,
+        instruction: str = DEFAULT_INSTRUCTION,
+        chunk_chars: int = DEFAULT_CHUNK_CHARS,
+        max_workers: int = DEFAULT_WORKERS,
+        max_entries: int = DEFAULT_CACHE_ENTRIES,
+    ):
+        self.summarize = summarize or ExtractiveSummarizer()
+        self.instruction = instruction
+        self.chunk_chars = chunk_chars
+        self.max_workers = max_workers
+        self.max_entries = max_entries
+        self._cache: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"calls": 0, "hits": 0}
+        self._computed: set = set()
+
+    @property
+    def _scope(self) -> str:
+        return _digest(getattr(self.summarize, "name", "custom"), self.instruction)
+
+    # -----------------------------
+    # Cache
+    # -----------------------------
+
+    def _cached(self, key: str) -> Optional[str]:
+        with self._lock:
+            summary = self._cache.get(key)
+            if summary is not None:
+                self._cache.move_to_end(key)
+            return summary
+
+    def _store(self, key: str, summary: str) -> None:
+        with self._lock:
+            self._cache[key] = summary
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+
+    def _resolve(self, jobs: Dict[str, List[str]]) -> Dict[str, str]:
+        """Summaries for {key: inputs}; cache misses run on the thread pool"""
+        done: Dict[str, str] = {}
+        for key in jobs:
+            summary = self._cached(key)
+            if summary is not None:
+                done[key] = summary
+        missing = [key for key in jobs if key not in done]
+        self.stats["hits"] += len(done)
+        self.stats["calls"] += len(missing)
+        with ThreadPoolExecutor(max_workers=max(1, self.max_workers)) as pool:
+            results = pool.map(
+                lambda key: self.summarize(jobs[key], self.instruction), missing
+            )
+            for key, summary in zip(missing, results):
+                self._store(key, summary)
+                done[key] = summary
+        self._computed.update(missing)
+        return done
+
+    def _reduce(
+        self, children: Dict[Tuple, List[Tuple[str, str]]]
+    ) -> Dict[Tuple, Tuple[str, str]]:
+        """
+        Merge each parent's (key, summary) children into one (key, summary).
+        A single child passes through unchanged; children whose summaries
+        overflow a chunk are merged in groups, repeatedly, so every call
+        stays within ``chunk_chars``. When grouping would not shrink a parent
+        (every summary is over half a chunk) or MAX_REDUCE_ROUNDS is reached,
+        its summaries are cut to an equal share of a chunk and merged in one
+        call, so the reduce always terminates.
+        """
+        pending = dict(children)
+        merged: Dict[Tuple, Tuple[str, str]] = {}
+        rounds = 0
+        while pending:
+            rounds += 1
+            jobs: Dict[str, List[str]] = {}
+            plan: Dict[Tuple, List[str]] = {}
+            for parent, items in pending.items():
+                if len(items) == 1:
+                    merged[parent] = items[0]
+                    continue
+                summaries = [summary for _, summary in items]
+                keys = [key for key, _ in items]
+                groups = chunk_texts(summaries, self.chunk_chars)
+                if len(groups) >= len(items) or rounds >= MAX_REDUCE_ROUNDS:
+                    share = max(self.chunk_chars // len(items) - 1, 1)
+                    key = _digest(self._scope, "merge-all", *keys)
+                    jobs[key] = [summary[:share] for summary in summaries]
+                    plan[parent] = [key]
+                    continue
+                plan[parent] = []
+                for group in groups:
+                    key = _digest(self._scope, "merge", *(keys[i] for i in group))
+                    jobs[key] = [summaries[i] for i in group]
+                    plan[parent].append(key)
+            done = self._resolve(jobs)
+            pending = {
+                parent: [(key, done[key]) for key in keys]
+                for parent, keys in plan.items()
+            }
+        return merged
+
+    def run(self, notes: pd.DataFrame) -> pd.DataFrame:
+        notes = notes.reindex(columns=NOTE_COLUMNS).dropna(subset=["TEXT"])
+        notes = notes.assign(TEXT=notes["TEXT"].astype(str).str.strip())
+        notes = notes[notes["TEXT"] != ""]
+        for col in LEVELS[1:]:
+            notes[col] = notes[col].fillna("Unknown").astype(str)
+        notes = notes.sort_values(["TIMESTAMP", "INTERACTION_ID"], kind="stable")
+        hashes = pd.util.hash_pandas_object(notes["TEXT"], index=False).astype(str)
+        tokens = notes["INTERACTION_ID"].astype(str) + ":" + hashes
+        self._computed = set()
+
+        # Map: chunks of each client's notes, oldest first
+        jobs: Dict[str, List[str]] = {}
+        client_chunks: Dict[Tuple, List[str]] = {}
+        counts: Counter = Counter()
+        for path, group in notes.groupby(list(LEVELS[1:]), sort=True):
+            texts = group["TEXT"].tolist()
+            group_tokens = tokens.loc[group.index].tolist()
+            client_chunks[path] = []
+            for chunk in chunk_texts(texts, self.chunk_chars):
+                key = _digest(self._scope, "chunk", *(group_tokens[i] for i in chunk))
+                jobs[key] = [texts[i] for i in chunk]
+                client_chunks[path].append(key)
+            for depth in range(len(LEVELS)):
+                counts[path[:depth]] += len(group)
+        done = self._resolve(jobs)
+
+        # Reduce: each client's chunks, then advisor, segment and firm
+        layer = self._reduce(
+            {
+                path: [(key, done[key]) for key in keys]
+                for path, keys in client_chunks.items()
+            }
+        )
+        layers = [layer]
+        for depth in range(len(LEVELS) - 2, -1, -1):
+            parents: Dict[Tuple, List[Tuple[str, str]]] = {}
+            for path, node in sorted(layer.items()):
+                parents.setdefault(path[:depth], []).append(node)
+            layer = self._reduce(parents)
+            layers.append(layer)
+
+        rows = []
+        for layer in reversed(layers):
+            for path, (key, summary) in layer.items():
+                row = {
+                    "LEVEL": LEVELS[len(path)],
+                    "PATH": " / ".join(path) or "Firm",
+                    "SUMMARY": summary,
+                    "INTERACTIONS": counts[path],
+                    "CACHED": key not in self._computed,
+                }
+                row.update(zip(LEVELS[1:], list(path) + [None] * len(LEVELS)))
+                rows.append(row)
+        return pd.DataFrame(rows)
+
+    def summary(self) -> Dict[str, Any]:
+        lookups = self.stats["calls"] + self.stats["hits"]
+        return dict(
+            self.stats,
+            entries=len(self._cache),
+            hit_rate=self.stats["hits"] / lookups if lookups else 0.0,
+        )
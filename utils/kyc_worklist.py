@@ -0,0 +1,284 @@
+"""
+KYC Review Worklist for Wealth 360 Analytics Platform
+
+Keeps every client's next KYC review obligation (life-event, semi-annual or
+annual) in a due-date-ordered heap. The heap is updated incrementally from
+CLIENTS.LAST_UPDATE_TIMESTAMP changes, and paged "next N due" requests cost
+O(log n) per returned item instead of a full rescan and sort of CLIENTS.
+"""
+
+import heapq
+import itertools
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+LIFE_EVENT_WINDOW_DAYS = 30
+SEMI_ANNUAL_DAYS = 180
+ANNUAL_DAYS = 365
+
+LIFE_EVENT_UPDATE = "Life Event Update"
+SEMI_ANNUAL_CHECK = "Semi-Annual Check"
+ANNUAL_REVIEW = "Annual Review Required"
+CURRENT = "Current"
+
+STATUS_PRIORITY = {
+    ANNUAL_REVIEW: "High",
+    SEMI_ANNUAL_CHECK: "Medium",
+    LIFE_EVENT_UPDATE: "Medium",
+    CURRENT: "Low",
+}
+
+CLIENT_COLUMNS = [
+    "CLIENT_ID",
+    "FIRST_NAME",
+    "LAST_NAME",
+    "JOIN_DATE",
+    "LIFE_EVENT",
+    "LAST_UPDATE_TIMESTAMP",
+]
+
+WORKLIST_COLUMNS = [
+    "CLIENT_ID",
+    "FIRST_NAME",
+    "LAST_NAME",
+    "JOIN_DATE",
+    "LAST_UPDATE_TIMESTAMP",
+    "DAYS_SINCE_UPDATE",
+    "DUE_DATE",
+    "OBLIGATION",
+    "COMPLIANCE_STATUS",
+    "PRIORITY",
+]
+
+DAY_NS = 86_400 * 10**9
+
+# (due date in ns, tie-breaker, client id, obligation, version)
+_HeapEntry = Tuple[int, int, str, str, int]
+
+
+def compliance_status(
+    last_update: pd.Timestamp, has_life_event: bool, as_of: pd.Timestamp
+) -> str:
+    """Review status of a single client at ``as_of`` (same rules as the SQL view)"""
+    return _status_from_days((as_of - last_update).days, has_life_event)
+
+
+def _status_from_days(days: int, has_life_event: bool) -> str:
+    if days > ANNUAL_DAYS:
+        return ANNUAL_REVIEW
+    if days > SEMI_ANNUAL_DAYS:
+        return SEMI_ANNUAL_CHECK
+    if has_life_event and days <= LIFE_EVENT_WINDOW_DAYS:
+        return LIFE_EVENT_UPDATE
+    return CURRENT
+
+
+class KYCWorklist:
+    """
+    Due-date-ordered heap of KYC review obligations.
+
+    Each client has at most one live heap entry: its next outstanding review.
+    A life event opens a review at the update timestamp; otherwise the next
+    review falls due SEMI_ANNUAL_DAYS after the last update and escalates to an
+    annual review once ANNUAL_DAYS have passed. Superseded entries are left in
+    the heap and skipped lazily using a per-client version counter. The
+    worklist is shared by every Streamlit session and paging pops and pushes
+    the heap, so updates and queries hold a lock.
+    """
+
+    def __init__(self) -> None:
+        self._heap: List[_HeapEntry] = []
+        # client id -> (last update ns, has life event, version)
+        self._state: Dict[str, Tuple[int, bool, int]] = {}
+        self._versions: Dict[str, int] = {}
+        self._attrs = pd.DataFrame(columns=["FIRST_NAME", "LAST_NAME", "JOIN_DATE"])
+        self._counter = itertools.count()
+        self.watermark: Optional[pd.Timestamp] = None
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._state)
+
+    # -----------------------------
+    # Incremental maintenance
+    # -----------------------------
+
+    def upsert(self, clients: pd.DataFrame) -> int:
+        """
+        Apply CLIENTS rows (new clients or changed LAST_UPDATE_TIMESTAMP values).
+
+        Rows whose timestamp has not moved are ignored. Returns the number of
+        clients whose obligations were rescheduled.
+        """
+        if clients.empty:
+            return 0
+        frame = clients.reindex(columns=CLIENT_COLUMNS)
+        frame["CLIENT_ID"] = frame["CLIENT_ID"].astype(str)
+        frame["LAST_UPDATE_TIMESTAMP"] = pd.to_datetime(frame["LAST_UPDATE_TIMESTAMP"])
+        frame = frame.dropna(subset=["LAST_UPDATE_TIMESTAMP"])
+        frame = frame.drop_duplicates("CLIENT_ID", keep="last")
+        with self._lock:
+            return self._upsert(frame)
+
+    def _upsert(self, frame: pd.DataFrame) -> int:
+        ids = frame["CLIENT_ID"].to_numpy()
+        updated_ns = frame["LAST_UPDATE_TIMESTAMP"].to_numpy("datetime64[ns]")
+        updated_ns = updated_ns.astype(np.int64)
+        known = np.array(
+            [self._state.get(cid, (None,))[0] for cid in ids], dtype=object
+        )
+        changed = known != updated_ns
+        if not changed.any():
+            return 0
+
+        frame = frame[changed]
+        ids = ids[changed]
+        updated_ns = updated_ns[changed]
+        life_event = (frame["LIFE_EVENT"].fillna("").astype(str) != "").to_numpy()
+        due_ns = np.where(
+            life_event, updated_ns, updated_ns + SEMI_ANNUAL_DAYS * DAY_NS
+        )
+        obligations = np.where(life_event, LIFE_EVENT_UPDATE, SEMI_ANNUAL_CHECK)
+
+        entries: List[_HeapEntry] = []
+        for cid, upd, has_event, due, obligation in zip(
+            ids, updated_ns.tolist(), life_event.tolist(), due_ns.tolist(), obligations
+        ):
+            version = self._versions.get(cid, 0) + 1
+            self._versions[cid] = version
+            self._state[cid] = (upd, has_event, version)
+            entries.append((due, next(self._counter), cid, str(obligation), version))
+
+        if len(entries) > len(self._heap):
+            self._heap.extend(entries)
+            heapq.heapify(self._heap)
+        else:
+            for entry in entries:
+                heapq.heappush(self._heap, entry)
+
+        attrs = frame.set_index("CLIENT_ID")[["FIRST_NAME", "LAST_NAME", "JOIN_DATE"]]
+        if self._attrs.empty:
+            self._attrs = attrs
+        else:
+            self._attrs = pd.concat(
+                [self._attrs.drop(index=attrs.index, errors="ignore"), attrs]
+            )
+
+        latest = frame["LAST_UPDATE_TIMESTAMP"].max()
+        if self.watermark is None or latest > self.watermark:
+            self.watermark = latest
+        self._compact()
+        return len(entries)
+
+    def remove(self, client_id: str) -> None:
+        """Drop a client from the worklist (its heap entries become stale)"""
+        with self._lock:
+            if self._state.pop(client_id, None) is not None:
+                self._versions[client_id] += 1
+                self._attrs = self._attrs.drop(index=client_id, errors="ignore")
+
+    def _compact(self) -> None:
+        # Rebuild once stale entries dominate so the heap stays O(clients).
+        if len(self._heap) > 2 * max(len(self._state), 1024):
+            self._heap = [e for e in self._heap if self._is_live(e)]
+            heapq.heapify(self._heap)
+
+    def _is_live(self, entry: _HeapEntry) -> bool:
+        state = self._state.get(entry[2])
+        return state is not None and state[2] == entry[4]
+
+    # -----------------------------
+    # Queries
+    # -----------------------------
+
+    def next_due(
+        self,
+        n: int = 25,
+        offset: int = 0,
+        as_of: Optional[pd.Timestamp] = None,
+        include_upcoming: bool = False,
+    ) -> pd.DataFrame:
+        """
+        Return the next ``n`` obligations in due-date order, skipping ``offset``.
+
+        Only obligations already due at ``as_of`` are returned unless
+        ``include_upcoming`` is set. Entries are popped and pushed back, so a
+        page costs O((offset + n) log n) and leaves the heap unchanged apart
+        from re-keying lapsed life-event reviews to their semi-annual date.
+        """
+        as_of = pd.Timestamp.now() if as_of is None else pd.Timestamp(as_of)
+        with self._lock:
+            return self._next_due(n, offset, as_of.value, include_upcoming)
+
+    def _next_due(
+        self, n: int, offset: int, as_of_ns: int, include_upcoming: bool
+    ) -> pd.DataFrame:
+        wanted = offset + n
+        taken: List[_HeapEntry] = []
+        rows: List[Dict[str, Any]] = []
+
+        while self._heap and len(taken) < wanted:
+            entry = heapq.heappop(self._heap)
+            if not self._is_live(entry):
+                continue
+            due, _, client_id, obligation, version = entry
+            if due > as_of_ns and not include_upcoming:
+                heapq.heappush(self._heap, entry)
+                break
+
+            updated_ns, has_event, _ = self._state[client_id]
+            days = (as_of_ns - updated_ns) // DAY_NS
+            if obligation == LIFE_EVENT_UPDATE and days > LIFE_EVENT_WINDOW_DAYS:
+                # Life-event window lapsed: the next obligation is the semi-annual review.
+                heapq.heappush(
+                    self._heap,
+                    (
+                        updated_ns + SEMI_ANNUAL_DAYS * DAY_NS,
+                        next(self._counter),
+                        client_id,
+                        SEMI_ANNUAL_CHECK,
+                        version,
+                    ),
+                )
+                continue
+
+            taken.append(entry)
+            if len(taken) > offset:
+                status = _status_from_days(days, has_event)
+                rows.append(
+                    {
+                        "CLIENT_ID": client_id,
+                        "LAST_UPDATE_TIMESTAMP": pd.Timestamp(updated_ns),
+                        "DAYS_SINCE_UPDATE": days,
+                        "DUE_DATE": pd.Timestamp(due),
+                        "OBLIGATION": obligation,
+                        "COMPLIANCE_STATUS": status,
+                        "PRIORITY": STATUS_PRIORITY[status],
+                    }
+                )
+
+        for entry in taken:
+            heapq.heappush(self._heap, entry)
+
+        page = pd.DataFrame(rows, columns=WORKLIST_COLUMNS)
+        if not page.empty:
+            attrs = self._attrs.reindex(page["CLIENT_ID"])
+            for col in ["FIRST_NAME", "LAST_NAME", "JOIN_DATE"]:
+                page[col] = attrs[col].to_numpy()
+        return page
+
+    def due_count(self, as_of: Optional[pd.Timestamp] = None) -> int:
+        """Number of clients with an obligation due at ``as_of`` (O(n), vectorized)"""
+        with self._lock:
+            state = [(s[0], s[1]) for s in self._state.values()]
+        if not state:
+            return 0
+        as_of = pd.Timestamp.now() if as_of is None else pd.Timestamp(as_of)
+        state = np.array(state, dtype=np.int64)
+        days = (as_of.value - state[:, 0]) // DAY_NS
+        has_event = state[:, 1].astype(bool)
+        due = (days > SEMI_ANNUAL_DAYS) | (has_event & (days <= LIFE_EVENT_WINDOW_DAYS))
+        return int(due.sum())
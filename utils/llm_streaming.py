@@ -0,0 +1,320 @@
+"""
+Streaming LLM Completions for Wealth 360 Analytics Platform
+
+A small provider interface that yields completion text incrementally, for
+Cortex-hosted models (``snowflake.cortex.complete(stream=True)``, falling
+back to one AI_COMPLETE call) and external OpenAI / Anthropic APIs when their
+SDKs and keys are present, plus a deterministic mock provider. ``TimedStream``
+wraps any provider stream with cancellation and records time-to-first-token
+and tokens/sec into ``StreamMetrics``.
+"""
+
+import re
+import threading
+import time
+from collections import defaultdict, deque
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional
+
+import pandas as pd
+
+# Rough characters-per-token for English text (used only for rate estimates)
+CHARS_PER_TOKEN = 4
+METRICS_HISTORY = 200
+
+_WORD_CHUNK = re.compile(r"\S+\s*|\s+")
+
+
+def estimate_tokens(text: str) -> int:
+    return max(1, round(len(text) / CHARS_PER_TOKEN)) if text else 0
+
+
+def word_chunks(text: str) -> Iterator[str]:
+    """Split text into word-sized chunks (whitespace kept with each word)"""
+    for match in _WORD_CHUNK.finditer(text):
+        yield match.group(0)
+
+
+# -----------------------------
+# Providers
+# -----------------------------
+
+
+class CompletionProvider:
+    """Base provider: ``stream`` yields text chunks of one completion"""
+
+    name = "base"
+
+    def stream(self, prompt: str, model: str, **params: Any) -> Iterator[str]:
+        raise NotImplementedError
+
+    def available(self) -> bool:
+        return True
+
+
+class CortexProvider(CompletionProvider):
+    """
+    Cortex-hosted models. Streams through ``snowflake.cortex.complete`` when
+    snowflake-ml-python is installed; otherwise runs one AI_COMPLETE query
+    and yields its answer in word chunks. The session is opened lazily, so
+    connection errors surface from ``stream`` like any other provider error.
+    """
+
+    name = "cortex"
+
+    def __init__(self, session_factory: Callable[[], Any]):
+        self.session_factory = session_factory
+
+    def stream(self, prompt: str, model: str, **params: Any) -> Iterator[str]:
+        session = self.session_factory()
+        try:
+            from snowflake.cortex import CompleteOptions, complete
+        except ImportError:
+            complete = None
+        if complete is not None:
+            options = CompleteOptions(
+                **{
+                    k: v
+                    for k, v in params.items()
+                    if k in ("temperature", "max_tokens")
+                }
+            )
+            yield from complete(
+                model, prompt, options=options, session=session, stream=True
+            )
+            return
+        result = (
+            session.sql("SELECT AI_COMPLETE(?, ?) AS RESPONSE", params=[model, prompt])
+            .to_pandas()
+            .iloc[0, 0]
+        )
+        yield from word_chunks(str(result))
+
+
+class OpenAIProvider(CompletionProvider):
+    """OpenAI chat completions with ``stream=True`` (needs the openai SDK)"""
+
+    name = "openai"
+
+    def __init__(self, api_key: Optional[str]):
+        self.api_key = api_key
+
+    def available(self) -> bool:
+        try:
+            import openai  # noqa: F401
+        except ImportError:
+            return False
+        return bool(self.api_key)
+
+    def stream(self, prompt: str, model: str, **params: Any) -> Iterator[str]:
+        from openai import OpenAI
+
+        client = OpenAI(api_key=self.api_key)
+        response = client.chat.completions.create(
+            model=model,
+            messages=[{"role": "user", "content": prompt}],
+            stream=True,
+            temperature=params.get("temperature", 0.3),
+            max_tokens=params.get("max_tokens", 500),
+        )
+        try:
+            for event in response:
+                if event.choices and event.choices[0].delta.content:
+                    yield event.choices[0].delta.content
+        finally:
+            response.close()
+
+
+class AnthropicProvider(CompletionProvider):
+    """Anthropic Messages API text stream (needs the anthropic SDK)"""
+
+    name = "anthropic"
+
+    def __init__(self, api_key: Optional[str]):
+        self.api_key = api_key
+
+    def available(self) -> bool:
+        try:
+            import anthropic  # noqa: F401
+        except ImportError:
+            return False
+        return bool(self.api_key)
+
+    def stream(self, prompt: str, model: str, **params: Any) -> Iterator[str]:
+        import anthropic
+
+        client = anthropic.Anthropic(api_key=self.api_key)
+        with client.messages.stream(
+            model=model,
+            max_tokens=params.get("max_tokens", 500),
+            temperature=params.get("temperature", 0.3),
+            messages=[{"role": "user", "content": prompt}],
+        ) as stream:
+            yield from stream.text_stream
+
+
+class MockProvider(CompletionProvider):
+    """
+    Deterministic local provider: streams ``respond(prompt, model)`` word by
+    word after ``first_token_seconds``, at ``tokens_per_second``. The first
+    ``failures`` calls raise ConnectionError, for exercising retries.
+    """
+
+    name = "mock"
+
+    def __init__(
+        self,
+        respond: Optional[Callable[[str, str], str]] = None,
+        first_token_seconds: float = 0.3,
+        tokens_per_second: float = 60.0,
+        sleep: Callable[[float], None] = time.sleep,
+        failures: int = 0,
+    ):
+        self.respond = respond or (lambda prompt, model: f"[{model}] {prompt}")
+        self.first_token_seconds = first_token_seconds
+        self.tokens_per_second = tokens_per_second
+        self.sleep = sleep
+        self.failures = failures
+        self._lock = threading.Lock()
+
+    def stream(self, prompt: str, model: str, **params: Any) -> Iterator[str]:
+        with self._lock:
+            failing = self.failures > 0
+            self.failures -= failing
+        if failing:
+            raise ConnectionError(f"{model}: simulated provider failure")
+        self.sleep(self.first_token_seconds)
+        for chunk in word_chunks(self.respond(prompt, model)):
+            self.sleep(estimate_tokens(chunk) / self.tokens_per_second)
+            yield chunk
+
+
+# -----------------------------
+# Timing and cancellation
+# -----------------------------
+
+
+class StreamMetrics:
+    """Per-model history of time-to-first-token and tokens/sec"""
+
+    def __init__(self, history: int = METRICS_HISTORY):
+        self._runs: Dict[str, Deque[Dict[str, Any]]] = defaultdict(
+            lambda: deque(maxlen=history)
+        )
+        self._lock = threading.Lock()
+
+    def record(self, model: str, stats: Dict[str, Any]) -> None:
+        with self._lock:
+            self._runs[model].append(stats)
+
+    def summary(self) -> pd.DataFrame:
+        """Median TTFT / tokens/sec and run counts per model"""
+        with self._lock:
+            rows: List[Dict[str, Any]] = [
+                dict(run, MODEL=model)
+                for model, runs in self._runs.items()
+                for run in runs
+            ]
+        columns = ["MODEL", "RUNS", "TTFT_SECONDS", "TOKENS_PER_SECOND", "CANCELLED"]
+        if not rows:
+            return pd.DataFrame(columns=columns)
+        runs = pd.DataFrame(rows)
+        return (
+            runs.groupby("MODEL")
+            .agg(
+                RUNS=("tokens", "size"),
+                TTFT_SECONDS=("ttft_seconds", "median"),
+                TOKENS_PER_SECOND=("tokens_per_second", "median"),
+                CANCELLED=("cancelled", "sum"),
+            )
+            .reset_index()
+            .reindex(columns=columns)
+        )
+
+
+class TimedStream:
+    """
+    Iterator over a provider stream that measures it and can be cancelled.
+
+    ``cancel()`` (from any thread) stops iteration at the next chunk and
+    closes the provider generator, releasing its connection. ``on_complete``
+    receives the full text only when the stream ran to the end; ``on_finish``
+    receives the stats (with the error class, if the provider raised) of
+    every run.
+    """
+
+    def __init__(
+        self,
+        chunks: Iterator[str],
+        model: str,
+        metrics: Optional[StreamMetrics] = None,
+        on_complete: Optional[Callable[[str], None]] = None,
+        on_finish: Optional[Callable[[Dict[str, Any]], None]] = None,
+    ):
+        self._chunks = chunks
+        self.model = model
+        self.metrics = metrics
+        self.on_complete = on_complete
+        self.on_finish = on_finish
+        self._cancelled = threading.Event()
+        self.text_parts: List[str] = []
+        self.stats: Dict[str, Any] = {}
+
+    def cancel(self) -> None:
+        self._cancelled.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    @property
+    def text(self) -> str:
+        return "".join(self.text_parts)
+
+    def __iter__(self) -> Iterator[str]:
+        started = time.perf_counter()
+        first: Optional[float] = None
+        finished = False
+        error: Optional[str] = None
+        try:
+            for chunk in self._chunks:
+                if self._cancelled.is_set():
+                    break
+                if first is None:
+                    first = time.perf_counter()
+                self.text_parts.append(chunk)
+                yield chunk
+            else:
+                finished = True
+        except Exception as e:
+            error = type(e).__name__
+            raise
+        finally:
+            close = getattr(self._chunks, "close", None)
+            if close is not None:
+                close()
+            self._finish(started, first, finished, error)
+
+    def _finish(
+        self,
+        started: float,
+        first: Optional[float],
+        finished: bool,
+        error: Optional[str] = None,
+    ) -> None:
+        ended = time.perf_counter()
+        tokens = estimate_tokens(self.text)
+        generating = ended - first if first is not None else 0.0
+        self.stats = {
+            "ttft_seconds": (first - started) if first is not None else None,
+            "total_seconds": ended - started,
+            "tokens": tokens,
+            "tokens_per_second": tokens / generating if generating > 0 else None,
+            "cancelled": not finished,
+            "error": error,
+        }
+        if self.metrics is not None and error is None:
+            self.metrics.record(self.model, self.stats)
+        if self.on_finish is not None:
+            self.on_finish(self.stats)
+        if finished and self.on_complete is not None:
+            self.on_complete(self.text)
@@ -0,0 +1,298 @@
+"""
+LLM Usage Telemetry for Wealth 360 Analytics Platform
+
+Every AI call - Cortex AISQL functions, streamed completions and external
+providers - is logged as one row: feature, provider, model, estimated
+prompt/completion tokens, latency, cache hit and error class, with an
+estimated USD cost from MODEL_PRICING. Rows live in a local SQLite file
+(or in memory) and are aggregated per model into latency percentiles,
+error and cache-hit rates and spend.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Any, ContextManager, Dict, Iterator, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from utils.llm_streaming import estimate_tokens
+
+DEFAULT_RETENTION_DAYS = 30
+
+# Approximate list prices, USD per 1M (input, output) tokens. Cortex models
+# and AISQL functions are billed in credits per 1M tokens; converted at
+# CORTEX_CREDIT_USD.
+CORTEX_CREDIT_USD = 3.0
+MODEL_PRICING: Dict[str, Tuple[float, float]] = {
+    **{
+        model: (credits * CORTEX_CREDIT_USD, credits * CORTEX_CREDIT_USD)
+        for model, credits in {
+            "llama3.1-8b": 0.19,
+            "llama3.1-70b": 1.21,
+            "llama3.1-405b": 3.0,
+            "llama3.2-1b": 0.04,
+            "llama3.2-3b": 0.06,
+            "mistral-7b": 0.12,
+            "mistral-large": 5.1,
+            "mistral-large2": 1.95,
+            "mixtral-8x7b": 0.22,
+            "snowflake-arctic": 0.84,
+            "gemma-7b": 0.12,
+            "jamba-instruct": 0.83,
+            "jamba-1.5-mini": 0.1,
+            "jamba-1.5-large": 1.4,
+            "ai_classify": 1.39,
+            "ai_filter": 1.39,
+            "sentiment": 0.08,
+            "snowflake-arctic-embed-m-v1.5": 0.03,
+        }.items()
+    },
+    "gpt-4o": (2.5, 10.0),
+    "gpt-4o-mini": (0.15, 0.6),
+    "gpt-4-turbo": (10.0, 30.0),
+    "gpt-4": (30.0, 60.0),
+    "gpt-3.5-turbo": (0.5, 1.5),
+    "claude-3.5-sonnet": (3.0, 15.0),
+    "claude-3-opus": (15.0, 75.0),
+    "claude-3-sonnet": (3.0, 15.0),
+    "claude-3-haiku": (0.25, 1.25),
+}
+
+TELEMETRY_COLUMNS = [
+    "TS",
+    "FEATURE",
+    "PROVIDER",
+    "MODEL",
+    "PROMPT_TOKENS",
+    "COMPLETION_TOKENS",
+    "LATENCY_SECONDS",
+    "CACHE_HIT",
+    "ERROR_CLASS",
+    "COST_USD",
+]
+SUMMARY_COLUMNS = [
+    "PROVIDER",
+    "MODEL",
+    "CALLS",
+    "ERROR_RATE",
+    "CACHE_HIT_RATE",
+    "P50_LATENCY_SECONDS",
+    "P95_LATENCY_SECONDS",
+    "PROMPT_TOKENS",
+    "COMPLETION_TOKENS",
+    "COST_USD",
+]
+
+_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS LLM_CALLS (
+        TS REAL NOT NULL,
+        FEATURE TEXT,
+        PROVIDER TEXT,
+        MODEL TEXT,
+        PROMPT_TOKENS INTEGER,
+        COMPLETION_TOKENS INTEGER,
+        LATENCY_SECONDS REAL,
+        CACHE_HIT INTEGER,
+        ERROR_CLASS TEXT,
+        COST_USD REAL
+    )
+"""
+
+
+def estimate_cost(
+    model: str, prompt_tokens: int, output_tokens: int
+) -> Optional[float]:
+    """Estimated USD cost of one call; None for models without a price"""
+    price = MODEL_PRICING.get(model)
+    if price is None:
+        return None
+    return (prompt_tokens * price[0] + output_tokens * price[1]) / 1_000_000
+
+
+class LLMTelemetry:
+    """
+    Append-only call log. ``path=None`` keeps it in memory; otherwise rows
+    persist in a SQLite file and are pruned after ``retention_days``.
+    Safe to share across threads and Streamlit sessions.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        retention_days: float = DEFAULT_RETENTION_DAYS,
+        clock=time.time,
+    ):
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path or ":memory:", check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(_SCHEMA)
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS LLM_CALLS_TS ON LLM_CALLS (TS)"
+            )
+            self._conn.execute(
+                "DELETE FROM LLM_CALLS WHERE TS < ?",
+                (self.clock() - retention_days * 86400,),
+            )
+
+    def record(
+        self,
+        feature: str,
+        provider: str,
+        model: str,
+        prompt_tokens: int = 0,
+        completion_tokens: int = 0,
+        latency_seconds: float = 0.0,
+        cache_hit: bool = False,
+        error: Union[BaseException, str, None] = None,
+    ) -> None:
+        if isinstance(error, BaseException):
+            error = type(error).__name__
+        cost = (
+            0.0
+            if cache_hit or error is not None
+            else estimate_cost(model, prompt_tokens, completion_tokens)
+        )
+        row = (
+            self.clock(),
+            feature,
+            provider,
+            model,
+            int(prompt_tokens),
+            int(completion_tokens),
+            float(latency_seconds),
+            int(bool(cache_hit)),
+            error,
+            cost,
+        )
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"INSERT INTO LLM_CALLS VALUES ({', '.join('?' * len(row))})", row
+            )
+
+    @contextmanager
+    def timed(
+        self, feature: str, provider: str, model: str, prompt: str = ""
+    ) -> Iterator[Dict[str, int]]:
+        """
+        Records the enclosed call on exit, including the class of any
+        exception (which is re-raised). Set ``completion_tokens`` on the
+        yielded dict; ``prompt_tokens`` is pre-filled from ``prompt``.
+        """
+        call = {"prompt_tokens": estimate_tokens(prompt), "completion_tokens": 0}
+        started = time.perf_counter()
+        error: Optional[BaseException] = None
+        try:
+            yield call
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            self.record(
+                feature,
+                provider,
+                model,
+                call["prompt_tokens"],
+                call["completion_tokens"],
+                time.perf_counter() - started,
+                error=error,
+            )
+
+    # -----------------------------
+    # Aggregates
+    # -----------------------------
+
+    def calls(self, since_seconds: Optional[float] = None) -> pd.DataFrame:
+        """Raw call rows, newest first (optionally only the last N seconds)"""
+        since = self.clock() - since_seconds if since_seconds else 0.0
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM LLM_CALLS WHERE TS >= ? ORDER BY TS DESC", (since,)
+            ).fetchall()
+        calls = pd.DataFrame(rows, columns=TELEMETRY_COLUMNS)
+        calls["CACHE_HIT"] = calls["CACHE_HIT"].astype(bool)
+        return calls
+
+    def summary(self, since_seconds: Optional[float] = None) -> pd.DataFrame:
+        """
+        Per provider/model: calls, error and cache-hit rates, p50/p95 latency
+        of calls that reached the model, tokens and estimated spend.
+        """
+        calls = self.calls(since_seconds)
+        if calls.empty:
+            return pd.DataFrame(columns=SUMMARY_COLUMNS)
+        served = calls[~calls["CACHE_HIT"] & calls["ERROR_CLASS"].isna()]
+        latency = served.groupby(["PROVIDER", "MODEL"])["LATENCY_SECONDS"]
+        summary = (
+            calls.assign(ERROR=calls["ERROR_CLASS"].notna())
+            .groupby(["PROVIDER", "MODEL"])
+            .agg(
+                CALLS=("TS", "size"),
+                ERROR_RATE=("ERROR", "mean"),
+                CACHE_HIT_RATE=("CACHE_HIT", "mean"),
+                PROMPT_TOKENS=("PROMPT_TOKENS", "sum"),
+                COMPLETION_TOKENS=("COMPLETION_TOKENS", "sum"),
+                COST_USD=("COST_USD", lambda s: s.sum(min_count=1)),
+            )
+            .join(latency.median().rename("P50_LATENCY_SECONDS"))
+            .join(latency.quantile(0.95).rename("P95_LATENCY_SECONDS"))
+            .reset_index()
+        )
+        return summary.reindex(columns=SUMMARY_COLUMNS).sort_values(
+            "CALLS", ascending=False, ignore_index=True
+        )
+
+    def totals(self, since_seconds: Optional[float] = None) -> Dict[str, Any]:
+        """Headline figures, including the estimated spend avoided by cache hits"""
+        calls = self.calls(since_seconds)
+        if calls.empty:
+            return {
+                "calls": 0,
+                "error_rate": 0.0,
+                "cache_hit_rate": 0.0,
+                "p50_latency_seconds": None,
+                "tokens": 0,
+                "cost_usd": 0.0,
+                "saved_usd": 0.0,
+            }
+        served = calls[~calls["CACHE_HIT"] & calls["ERROR_CLASS"].isna()]
+        hits = calls[calls["CACHE_HIT"]]
+        saved = [
+            estimate_cost(model, prompt, completion) or 0.0
+            for model, prompt, completion in zip(
+                hits["MODEL"], hits["PROMPT_TOKENS"], hits["COMPLETION_TOKENS"]
+            )
+        ]
+        return {
+            "calls": len(calls),
+            "error_rate": float(calls["ERROR_CLASS"].notna().mean()),
+            "cache_hit_rate": float(calls["CACHE_HIT"].mean()),
+            "p50_latency_seconds": (
+                float(np.median(served["LATENCY_SECONDS"])) if len(served) else None
+            ),
+            "tokens": int(
+                calls["PROMPT_TOKENS"].sum() + calls["COMPLETION_TOKENS"].sum()
+            ),
+            "cost_usd": float(calls["COST_USD"].fillna(0.0).sum()),
+            "saved_usd": float(sum(saved)),
+        }
+
+
+def timed_call(
+    telemetry: Optional[LLMTelemetry],
+    feature: str,
+    provider: str,
+    model: str,
+    prompt: str = "",
+) -> ContextManager[Dict[str, int]]:
+    """``telemetry.timed(...)``, or a no-op when telemetry is None"""
+    if telemetry is None:
+        return nullcontext({"prompt_tokens": 0, "completion_tokens": 0})
+    return telemetry.timed(feature, provider, model, prompt)
@@ -0,0 +1,171 @@
+"""
+Market Event Interval Index for Wealth 360 Analytics Platform
+
+Indexes MARKET_EVENTS [START_DATE, END_DATE] intervals so that any stream of
+timestamped rows (positions, transactions, interactions) can be matched to the
+events active at each timestamp in O((n + m) log m), and rolls the matches up
+into per-client event exposure for targeted outreach.
+"""
+
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+EVENT_COLUMNS = ["EVENT_ID", "EVENT_NAME", "IMPACT_TYPE", "START_DATE", "END_DATE"]
+
+EXPOSURE_COLUMNS = [
+    "CLIENT_ID",
+    "EVENT_ID",
+    "EVENT_NAME",
+    "IMPACT_TYPE",
+    "START_DATE",
+    "END_DATE",
+    "VALUE_HELD",
+    "PEAK_VALUE_HELD",
+    "TXN_COUNT",
+    "BUY_AMOUNT",
+    "SELL_AMOUNT",
+    "INTERACTION_COUNT",
+]
+
+
+class EventIntervalIndex:
+    """
+    Static interval index over market events.
+
+    The 2m event boundaries split the timeline into elementary segments; each
+    segment stores the events covering it. A timestamp is located with one
+    binary search, so matching n timestamps costs O(n log m) plus output size.
+    Events are treated as closed intervals, inclusive of their END_DATE day.
+    """
+
+    def __init__(self, events: pd.DataFrame):
+        events = events.reindex(columns=EVENT_COLUMNS).copy()
+        events["START_DATE"] = pd.to_datetime(events["START_DATE"])
+        events["END_DATE"] = pd.to_datetime(events["END_DATE"])
+        events = events.dropna(subset=["START_DATE", "END_DATE"])
+        self.events = events.reset_index(drop=True)
+
+        starts = self.events["START_DATE"].to_numpy("datetime64[ns]").astype(np.int64)
+        # Inclusive end: anything on END_DATE itself still belongs to the event.
+        ends = (
+            (self.events["END_DATE"] + pd.Timedelta(days=1))
+            .to_numpy("datetime64[ns]")
+            .astype(np.int64)
+        )
+        self._boundaries = np.unique(np.concatenate([starts, ends]))
+
+        # Segment i spans [boundaries[i], boundaries[i + 1]).
+        seg_lo = np.searchsorted(self._boundaries, starts)
+        seg_hi = np.searchsorted(self._boundaries, ends)
+        lengths = seg_hi - seg_lo
+        event_idx = np.repeat(np.arange(len(self.events)), lengths)
+        offsets = np.arange(lengths.sum()) - np.repeat(
+            np.cumsum(lengths) - lengths, lengths
+        )
+        self._segment_events = pd.DataFrame(
+            {
+                "_SEGMENT": np.repeat(seg_lo, lengths) + offsets,
+                "_EVENT": event_idx,
+            }
+        )
+
+    def __len__(self) -> int:
+        return len(self.events)
+
+    def locate(self, timestamps: pd.Series) -> np.ndarray:
+        """Elementary segment index per timestamp (-1 when before all events)"""
+        ts = pd.to_datetime(timestamps).to_numpy("datetime64[ns]").astype(np.int64)
+        return np.searchsorted(self._boundaries, ts, side="right") - 1
+
+    def match(self, df: pd.DataFrame, ts_col: str = "TIMESTAMP") -> pd.DataFrame:
+        """
+        Inner-join rows to every event active at their timestamp.
+
+        Returns the input columns plus EVENT_ID, EVENT_NAME and IMPACT_TYPE;
+        rows outside all events are dropped, rows inside overlapping events
+        appear once per event.
+        """
+        if df.empty or self.events.empty:
+            return df.iloc[0:0].assign(EVENT_ID=[], EVENT_NAME=[], IMPACT_TYPE=[])
+        keyed = df.assign(_SEGMENT=self.locate(df[ts_col]))
+        matched = keyed.merge(self._segment_events, on="_SEGMENT", how="inner")
+        event_attrs = self.events[["EVENT_ID", "EVENT_NAME", "IMPACT_TYPE"]]
+        matched = matched.join(event_attrs, on="_EVENT")
+        return matched.drop(columns=["_SEGMENT", "_EVENT"])
+
+    def active_at(self, when: pd.Timestamp) -> pd.DataFrame:
+        """Events active at a single point in time"""
+        seg = self.locate(pd.Series([when]))[0]
+        idx = self._segment_events.loc[
+            self._segment_events["_SEGMENT"] == seg, "_EVENT"
+        ]
+        return self.events.iloc[idx.to_numpy()]
+
+    # -----------------------------
+    # Client exposure
+    # -----------------------------
+
+    def client_exposure(
+        self,
+        portfolio_values: pd.DataFrame,
+        transactions: Optional[pd.DataFrame] = None,
+        interactions: Optional[pd.DataFrame] = None,
+    ) -> pd.DataFrame:
+        """
+        Per-client, per-event exposure.
+
+        ``portfolio_values`` holds one row per portfolio snapshot
+        (CLIENT_ID, PORTFOLIO_ID, TIMESTAMP, MARKET_VALUE). VALUE_HELD is the
+        client's value carried through the event: the sum over portfolios of
+        each portfolio's average snapshot value inside the event window.
+        ``transactions`` (CLIENT_ID, TIMESTAMP, TRANSACTION_TYPE, TOTAL_AMOUNT)
+        and ``interactions`` (CLIENT_ID, TIMESTAMP) add activity counts.
+        """
+        keys = ["CLIENT_ID", "EVENT_ID"]
+        held = self.match(portfolio_values)
+        per_portfolio = held.groupby(keys + ["PORTFOLIO_ID"], sort=False)[
+            "MARKET_VALUE"
+        ].agg(["mean", "max"])
+        exposure = per_portfolio.groupby(level=keys).sum()
+        exposure.columns = ["VALUE_HELD", "PEAK_VALUE_HELD"]
+
+        if transactions is not None and not transactions.empty:
+            txns = self.match(transactions)
+            amount = txns["TOTAL_AMOUNT"].astype(float)
+            txns = txns.assign(
+                BUY_AMOUNT=amount.where(txns["TRANSACTION_TYPE"] == "Buy", 0.0),
+                SELL_AMOUNT=amount.where(txns["TRANSACTION_TYPE"] == "Sell", 0.0),
+            )
+            txn_stats = txns.groupby(keys).agg(
+                TXN_COUNT=("TOTAL_AMOUNT", "size"),
+                BUY_AMOUNT=("BUY_AMOUNT", "sum"),
+                SELL_AMOUNT=("SELL_AMOUNT", "sum"),
+            )
+            exposure = exposure.join(txn_stats, how="outer")
+
+        if interactions is not None and not interactions.empty:
+            touches = self.match(interactions).groupby(keys).size()
+            exposure = exposure.join(touches.rename("INTERACTION_COUNT"), how="outer")
+
+        exposure = exposure.reset_index().reindex(columns=EXPOSURE_COLUMNS)
+        event_attrs = self.events.set_index("EVENT_ID")
+        for col in ["EVENT_NAME", "IMPACT_TYPE", "START_DATE", "END_DATE"]:
+            exposure[col] = exposure["EVENT_ID"].map(event_attrs[col])
+        for col in ["VALUE_HELD", "PEAK_VALUE_HELD", "BUY_AMOUNT", "SELL_AMOUNT"]:
+            exposure[col] = exposure[col].astype(float).fillna(0.0)
+        for col in ["TXN_COUNT", "INTERACTION_COUNT"]:
+            exposure[col] = exposure[col].fillna(0).astype(int)
+        return exposure.sort_values(
+            ["EVENT_ID", "VALUE_HELD"], ascending=[True, False]
+        ).reset_index(drop=True)
+
+
+def outreach_list(
+    exposure: pd.DataFrame, event_name: str, top_n: Optional[int] = None
+) -> pd.DataFrame:
+    """Clients ranked by value held through the named event"""
+    rows = exposure[exposure["EVENT_NAME"] == event_name]
+    rows = rows.sort_values("VALUE_HELD", ascending=False)
+    return rows.head(top_n) if top_n else rows
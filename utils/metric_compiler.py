@@ -0,0 +1,516 @@
+"""
+Semantic Metric Compiler for Wealth 360 Analytics Platform
+
+Compiles metric x dimension requests against the YAML semantic models
+(``wealth_customer_360.yaml``, ``semantic_model.yaml``) into SQL. Tables,
+members and relationships come from the models; joins are found on the
+relationship graph, column references are qualified per table alias, and
+compiled plans are cached by request. Requests covered by a declared
+pre-aggregation are routed to it and rolled up locally instead of scanning the
+base tables again.
+"""
+
+import re
+from collections import deque
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import pandas as pd
+import yaml
+
+# Earlier files win when a table or member is defined more than once.
+MODEL_FILES = ("wealth_customer_360.yaml", "semantic_model.yaml")
+
+MEMBER_KINDS = {
+    "dimensions": "dimension",
+    "time_dimensions": "time_dimension",
+    "facts": "fact",
+    "metrics": "metric",
+    "filters": "filter",
+}
+
+TIME_GRAINS = ("DAY", "WEEK", "MONTH", "QUARTER", "YEAR")
+
+# Outer aggregate -> how partial results roll up
+ROLLUP_FUNCTIONS = {"SUM": "sum", "COUNT": "sum", "MIN": "min", "MAX": "max"}
+
+# Pre-aggregations the compiler may route to. Each is materialised with its
+# own compiled SQL (so the warehouse result cache applies) and answers any
+# request on the same table whose metrics, dimensions and named filters it
+# covers.
+PREAGGREGATIONS: List[Dict[str, Any]] = [
+    {
+        "name": "client_profile",
+        "table": "CLIENTS",
+        "metrics": ["NumberOfClients"],
+        "dimensions": ["STATE", "RISK_TOLERANCE", "GENDER", "MARITAL_STATUS"],
+    },
+    {
+        "name": "hnw_client_profile",
+        "table": "CLIENTS",
+        "metrics": ["NumberOfClients"],
+        "dimensions": ["STATE", "RISK_TOLERANCE"],
+        "filters": ["HighNetWorthClients"],
+    },
+    {
+        "name": "advisor_profile",
+        "table": "ADVISORS",
+        "metrics": ["NumberOfAdvisors"],
+        "dimensions": ["SPECIALIZATION", "REGION"],
+    },
+    {
+        "name": "account_mix",
+        "table": "ACCOUNTS",
+        "metrics": ["NumberOfAccounts", "NumberOfInvestmentAccounts"],
+        "dimensions": ["ACCOUNT_TYPE", "STATUS", "CURRENCY"],
+    },
+    {
+        "name": "trade_flows",
+        "table": "TRANSACTIONS",
+        "metrics": ["TotalBuyAmount", "TotalSellAmount", "NumberOfTrades"],
+        "dimensions": ["TRANSACTION_TYPE", "TICKER", "TIMESTAMP:MONTH"],
+    },
+    {
+        "name": "interaction_mix",
+        "table": "INTERACTIONS",
+        "metrics": ["NumberOfInteractions", "NumberOfMeetings", "NumberOfComplaints"],
+        "dimensions": ["INTERACTION_TYPE", "CHANNEL", "ADVISOR_ID"],
+    },
+]
+
+_TOKEN = re.compile(r"'(?:[^']|'')*'|\"[^\"]*\"|[A-Za-z_][A-Za-z0-9_$]*|\s+|.")
+_IDENTIFIER = re.compile(r"^[A-Za-z_][A-Za-z0-9_$]*$")
+_DISTINCT_TARGET = re.compile(
+    r"^COUNT\s*\(\s*DISTINCT\s+(?:CASE\s+WHEN\s+.+?\s+THEN\s+)?([A-Za-z_][A-Za-z0-9_$]*)",
+    re.IGNORECASE | re.DOTALL,
+)
+
+
+def load_models(paths: Iterable[str]) -> List[Dict[str, Any]]:
+    """Parse semantic model YAML files (missing files are skipped)"""
+    models = []
+    for path in paths:
+        try:
+            with open(path, "r", encoding="utf-8") as handle:
+                models.append(yaml.safe_load(handle) or {})
+        except FileNotFoundError:
+            continue
+    return models
+
+
+def sql_literal(value: Any) -> str:
+    if value is None:
+        return "NULL"
+    if isinstance(value, bool):
+        return "TRUE" if value else "FALSE"
+    if isinstance(value, (int, float)):
+        return repr(value)
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def qualify(expr: str, columns: Iterable[str], alias: str) -> str:
+    """Prefix bare references to ``columns`` in ``expr`` with ``alias.``"""
+    columns = set(columns)
+    tokens = _TOKEN.findall(expr)
+    out = []
+    for i, token in enumerate(tokens):
+        if token in columns:
+            prev = next((t for t in reversed(tokens[:i]) if not t.isspace()), "")
+            nxt = next((t for t in tokens[i + 1 :] if not t.isspace()), "")
+            if prev != "." and nxt != "(":
+                token = f"{alias}.{token}"
+        out.append(token)
+    return "".join(out)
+
+
+def outer_aggregate(expr: str) -> Optional[str]:
+    match = re.match(r"^\s*([A-Za-z_]+)\s*\(", expr)
+    return match.group(1).upper() if match else None
+
+
+class SemanticCatalog:
+    """
+    Tables, members and the join graph merged from one or more models.
+
+    Edges carry the join columns and whether walking them can fan out rows
+    (one-to-many), which decides which metrics stay correct across a join.
+    """
+
+    def __init__(self, models: Iterable[Dict[str, Any]]):
+        self.tables: Dict[str, Dict[str, Any]] = {}
+        self.edges: Dict[str, List[Tuple[str, List[Tuple[str, str]], bool]]] = {}
+        for model in models:
+            for table in model.get("tables") or []:
+                self._add_table(table)
+            for rel in model.get("relationships") or []:
+                self._add_relationship(rel)
+
+    def _add_table(self, spec: Dict[str, Any]) -> None:
+        name = spec["name"]
+        table = self.tables.setdefault(
+            name,
+            {
+                "table": (spec.get("base_table") or {}).get("table", name),
+                "primary_key": (spec.get("primary_key") or {}).get("columns", []),
+                "members": {},
+            },
+        )
+        for section, kind in MEMBER_KINDS.items():
+            for member in spec.get(section) or []:
+                table["members"].setdefault(
+                    member["name"], {"kind": kind, "expr": str(member["expr"])}
+                )
+
+    def _add_edge(self, a: str, b: str, pairs, fanout: bool) -> None:
+        self.edges.setdefault(a, []).append((b, pairs, fanout))
+
+    def _add_relationship(self, rel: Dict[str, Any]) -> None:
+        if "left_table" in rel:
+            left, right = rel["left_table"], rel["right_table"]
+            pairs = [
+                (c["left_column"], c["right_column"])
+                for c in rel.get("relationship_columns") or []
+            ]
+            kind = rel.get("relationship_type", "many_to_one")
+        else:
+            left, right = rel["from_table"], rel["to_table"]
+            pairs = [(rel["from_column"], rel["to_column"])]
+            kind = rel.get("type", "many_to_one")
+        self._add_edge(left, right, pairs, kind == "one_to_many")
+        self._add_edge(right, left, [(b, a) for a, b in pairs], kind == "many_to_one")
+
+    def columns(self, table: str) -> List[str]:
+        """Physical columns referenced by plain-identifier members"""
+        spec = self.tables[table]
+        cols = {
+            m["expr"] for m in spec["members"].values() if _IDENTIFIER.match(m["expr"])
+        }
+        return sorted(cols | set(spec["primary_key"]))
+
+    def resolve(
+        self, ref: str, kinds: Sequence[str], prefer: Optional[str] = None
+    ) -> Tuple[str, str, Dict[str, str]]:
+        """(table, member name, member) for ``NAME`` or ``TABLE.NAME``"""
+        if "." in ref:
+            table, name = ref.split(".", 1)
+            member = self.tables.get(table, {}).get("members", {}).get(name)
+            if member is None or member["kind"] not in kinds:
+                raise KeyError(f"unknown {'/'.join(kinds)} {ref!r}")
+            return table, name, member
+        matches = [
+            (table, spec["members"][ref])
+            for table, spec in self.tables.items()
+            if ref in spec["members"] and spec["members"][ref]["kind"] in kinds
+        ]
+        if not matches:
+            raise KeyError(f"unknown {'/'.join(kinds)} {ref!r}")
+        for table, member in matches:
+            if table == prefer:
+                return table, ref, member
+        if len(matches) > 1:
+            options = ", ".join(f"{t}.{ref}" for t, _ in matches)
+            raise KeyError(f"ambiguous reference {ref!r}; use one of {options}")
+        return matches[0][0], ref, matches[0][1]
+
+    def join_path(self, src: str, dst: str) -> List[Tuple[str, str, list, bool]]:
+        """Shortest relationship path src -> dst as (from, to, pairs, fanout) hops"""
+        if src == dst:
+            return []
+        seen = {src: None}
+        queue = deque([src])
+        while queue:
+            node = queue.popleft()
+            for nxt, pairs, fanout in self.edges.get(node, []):
+                if nxt in seen or nxt not in self.tables:
+                    continue
+                seen[nxt] = (node, pairs, fanout)
+                if nxt == dst:
+                    path = []
+                    while seen[nxt] is not None:
+                        prev, p, f = seen[nxt]
+                        path.append((prev, nxt, p, f))
+                        nxt = prev
+                    return path[::-1]
+                queue.append(nxt)
+        raise KeyError(f"no relationship path from {src} to {dst}")
+
+
+class MetricCompiler:
+    """
+    Request -> plan compiler with a plan cache and pre-aggregation routing.
+
+    A plan is a dict holding the SQL to run and, for routed plans, the
+    pre-aggregation plus the local roll-up to apply. ``stats`` counts cache
+    hits, compilations and routed plans.
+    """
+
+    def __init__(
+        self,
+        catalog: SemanticCatalog,
+        preaggregations: Optional[List[Dict[str, Any]]] = None,
+    ):
+        self.catalog = catalog
+        self.preaggregations = {
+            spec["name"]: spec
+            for spec in (
+                PREAGGREGATIONS if preaggregations is None else preaggregations
+            )
+        }
+        self._plans: Dict[Tuple, Dict[str, Any]] = {}
+        self.stats = {"hits": 0, "compiled": 0, "routed": 0}
+
+    @classmethod
+    def from_files(cls, paths: Iterable[str], **kwargs) -> "MetricCompiler":
+        return cls(SemanticCatalog(load_models(paths)), **kwargs)
+
+    # -----------------------------
+    # Request normalisation
+    # -----------------------------
+
+    def _metric(self, ref: str) -> Tuple[str, str, Dict[str, str]]:
+        return self.catalog.resolve(ref, ("metric",))
+
+    def _dimension(self, ref: str, base: str) -> Dict[str, Any]:
+        name, _, grain = ref.partition(":")
+        table, member_name, member = self.catalog.resolve(
+            name, ("dimension", "time_dimension", "fact"), prefer=base
+        )
+        grain = grain.upper()
+        if grain and grain not in TIME_GRAINS:
+            raise ValueError(f"grain must be one of {TIME_GRAINS}, got {grain!r}")
+        alias = member_name if not grain else f"{member_name}_{grain}"
+        return {
+            "key": (table, member_name, grain),
+            "table": table,
+            "expr": member["expr"],
+            "grain": grain,
+            "alias": alias.upper(),
+        }
+
+    def _request(
+        self,
+        metrics: Sequence[str],
+        dimensions: Sequence[str],
+        filters: Sequence[str],
+        where: Optional[Dict[str, Any]],
+    ) -> Dict[str, Any]:
+        if not metrics:
+            raise ValueError("at least one metric is required")
+        resolved = [self._metric(ref) for ref in metrics]
+        base = resolved[0][0]
+        if any(table != base for table, _, _ in resolved):
+            raise ValueError("all metrics in one request must share a table")
+        named = []
+        for ref in filters:
+            table, name, member = self.catalog.resolve(ref, ("filter",), prefer=base)
+            named.append({"key": (table, name), "table": table, "expr": member["expr"]})
+        conditions = []
+        for ref, value in (where or {}).items():
+            dim = self._dimension(ref, base)
+            values = value if isinstance(value, (list, tuple, set)) else [value]
+            conditions.append(dict(dim, values=tuple(sorted(values, key=str))))
+        return {
+            "base": base,
+            "metrics": [
+                {"name": name, "expr": m["expr"], "alias": name.upper()}
+                for _, name, m in resolved
+            ],
+            "dimensions": [self._dimension(ref, base) for ref in dimensions],
+            "filters": named,
+            "where": conditions,
+        }
+
+    # -----------------------------
+    # SQL generation
+    # -----------------------------
+
+    def _sql(self, request: Dict[str, Any]) -> Tuple[str, bool]:
+        base = request["base"]
+        aliases = {base: "t0"}
+        joins: List[str] = []
+        fanout = False
+        needed = [d["table"] for d in request["dimensions"] + request["where"]]
+        needed += [f["table"] for f in request["filters"]]
+        for table in needed:
+            if table in aliases:
+                continue
+            for src, dst, pairs, hop_fanout in self.catalog.join_path(base, table):
+                fanout |= hop_fanout
+                if dst in aliases:
+                    continue
+                aliases[dst] = f"t{len(aliases)}"
+                on = " AND ".join(
+                    f"{aliases[src]}.{a} = {aliases[dst]}.{b}" for a, b in pairs
+                )
+                joins.append(
+                    f"LEFT JOIN {self.catalog.tables[dst]['table']} {aliases[dst]} ON {on}"
+                )
+
+        def col(expr: str, table: str) -> str:
+            return qualify(expr, self.catalog.columns(table), aliases[table])
+
+        def dim_expr(dim: Dict[str, Any]) -> str:
+            expr = col(dim["expr"], dim["table"])
+            return f"DATE_TRUNC('{dim['grain']}', {expr})" if dim["grain"] else expr
+
+        select = [f"{dim_expr(d)} AS {d['alias']}" for d in request["dimensions"]]
+        select += [
+            f"{col(m['expr'], base)} AS {m['alias']}" for m in request["metrics"]
+        ]
+        predicates = [f"({col(f['expr'], f['table'])})" for f in request["filters"]]
+        for cond in request["where"]:
+            literals = ", ".join(sql_literal(v) for v in cond["values"])
+            predicates.append(f"{dim_expr(cond)} IN ({literals})")
+
+        sql = (
+            f"SELECT {', '.join(select)}\nFROM {self.catalog.tables[base]['table']} t0"
+        )
+        if joins:
+            sql += "\n" + "\n".join(joins)
+        if predicates:
+            sql += "\nWHERE " + "\n  AND ".join(predicates)
+        if request["dimensions"]:
+            groups = ", ".join(str(i + 1) for i in range(len(request["dimensions"])))
+            sql += f"\nGROUP BY {groups}"
+            sql += f"\nORDER BY {request['metrics'][0]['alias']} DESC NULLS LAST"
+        return sql, fanout
+
+    def _check_fanout(self, request: Dict[str, Any], fanout: bool) -> None:
+        if not fanout:
+            return
+        for metric in request["metrics"]:
+            if not _DISTINCT_TARGET.match(metric["expr"].strip()):
+                raise ValueError(
+                    f"{metric['name']} would be double counted across a "
+                    "one-to-many join; choose dimensions on its own or parent tables"
+                )
+
+    # -----------------------------
+    # Pre-aggregation routing
+    # -----------------------------
+
+    def _rollup_function(self, metric: Dict[str, str], base: str) -> Optional[str]:
+        agg = outer_aggregate(metric["expr"])
+        distinct = _DISTINCT_TARGET.match(metric["expr"].strip())
+        if distinct:
+            # Distinct counts of the table's own key partition cleanly across
+            # groups of that table's dimensions, so they add up.
+            primary_key = self.catalog.tables[base]["primary_key"]
+            return "sum" if distinct.group(1) in primary_key else None
+        return ROLLUP_FUNCTIONS.get(agg)
+
+    def _route(self, request: Dict[str, Any]) -> Optional[Tuple[str, Dict[str, Any]]]:
+        wanted_metrics = {m["name"] for m in request["metrics"]}
+        wanted_dims = {d["key"] for d in request["dimensions"] + request["where"]}
+        wanted_filters = {f["key"] for f in request["filters"]}
+        for name, spec in self.preaggregations.items():
+            if spec["table"] != request["base"]:
+                continue
+            pre = self._preaggregation_request(name)
+            pre_dims = {d["key"] for d in pre["dimensions"]}
+            if not wanted_metrics <= {m["name"] for m in pre["metrics"]}:
+                continue
+            if not wanted_dims <= pre_dims:
+                continue
+            if wanted_filters != {f["key"] for f in pre["filters"]}:
+                continue
+            exact = wanted_dims == pre_dims and not request["where"]
+            functions = {
+                m["alias"]: self._rollup_function(m, request["base"])
+                for m in request["metrics"]
+            }
+            if not exact and any(fn is None for fn in functions.values()):
+                continue
+            return name, {a: fn or "sum" for a, fn in functions.items()}
+        return None
+
+    def _preaggregation_request(self, name: str) -> Dict[str, Any]:
+        spec = self.preaggregations[name]
+        return self._request(
+            spec["metrics"], spec["dimensions"], spec.get("filters", ()), None
+        )
+
+    def preaggregation_sql(self, name: str) -> str:
+        """SQL that materialises a declared pre-aggregation"""
+        return self._sql(self._preaggregation_request(name))[0]
+
+    # -----------------------------
+    # Public API
+    # -----------------------------
+
+    def compile(
+        self,
+        metrics: Sequence[str],
+        dimensions: Sequence[str] = (),
+        filters: Sequence[str] = (),
+        where: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Plan for ``metrics`` grouped by ``dimensions``.
+
+        ``filters`` names model filters (e.g. HighNetWorthClients); ``where``
+        maps dimension references to a value or list of values. Dimensions
+        may be qualified (``CLIENTS.STATE``) and time dimensions may carry a
+        grain (``TIMESTAMP:MONTH``).
+        """
+        key = (
+            tuple(metrics),
+            tuple(dimensions),
+            tuple(sorted(filters)),
+            tuple(
+                sorted(
+                    (k, tuple(v) if isinstance(v, (list, tuple, set)) else (v,))
+                    for k, v in (where or {}).items()
+                )
+            ),
+        )
+        if key in self._plans:
+            self.stats["hits"] += 1
+            return self._plans[key]
+
+        request = self._request(metrics, dimensions, filters, where)
+        routed = self._route(request)
+        plan: Dict[str, Any] = {
+            "metrics": [m["alias"] for m in request["metrics"]],
+            "dimensions": [d["alias"] for d in request["dimensions"]],
+        }
+        if routed is not None:
+            name, functions = routed
+            plan.update(
+                source="preaggregation",
+                preaggregation=name,
+                sql=self.preaggregation_sql(name),
+                rollup=functions,
+                where={c["alias"]: list(c["values"]) for c in request["where"]},
+            )
+            self.stats["routed"] += 1
+        else:
+            sql, fanout = self._sql(request)
+            self._check_fanout(request, fanout)
+            plan.update(source="table", sql=sql)
+        self.stats["compiled"] += 1
+        self._plans[key] = plan
+        return plan
+
+    def execute(
+        self, plan: Dict[str, Any], runner: Callable[[str], pd.DataFrame]
+    ) -> pd.DataFrame:
+        """Run a plan through ``runner`` (e.g. run_query) and apply any roll-up"""
+        frame = runner(plan["sql"])
+        columns = plan["dimensions"] + plan["metrics"]
+        if frame.empty:
+            return pd.DataFrame(columns=columns)
+        if plan["source"] != "preaggregation":
+            return frame
+        for col, values in plan["where"].items():
+            frame = frame[frame[col].isin(values)]
+        dims = plan["dimensions"]
+        if not dims:
+            return pd.DataFrame(
+                {m: [frame[m].agg(fn)] for m, fn in plan["rollup"].items()}
+            )
+        rolled = frame.groupby(dims, dropna=False, as_index=False).agg(plan["rollup"])
+        return (
+            rolled.reindex(columns=columns)
+            .sort_values(plan["metrics"][0], ascending=False)
+            .reset_index(drop=True)
+        )
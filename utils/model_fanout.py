@@ -0,0 +1,317 @@
+"""
+Multi-Model Fan-Out for Wealth 360 Analytics Platform
+
+Sends one prompt to several completion providers at once. Each model call
+runs on a worker thread under an asyncio event loop, with a per-provider
+concurrency limit, a per-attempt timeout and exponential backoff (with
+jitter) between retries, so a comparison takes as long as its slowest model
+rather than the sum of all of them. Results are yielded in completion order
+and summarised into a latency / token / estimated cost leaderboard.
+"""
+
+import asyncio
+import hashlib
+import queue
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import pandas as pd
+
+from utils.llm_streaming import (
+    CompletionProvider,
+    MockProvider,
+    StreamMetrics,
+    estimate_tokens,
+)
+from utils.llm_telemetry import LLMTelemetry, estimate_cost
+
+DEFAULT_TIMEOUT_SECONDS = 30.0
+DEFAULT_CONCURRENCY = 4
+DEFAULT_RETRIES = 2
+DEFAULT_BACKOFF_SECONDS = 0.5
+
+RESULT_COLUMNS = [
+    "LABEL",
+    "PROVIDER",
+    "MODEL",
+    "STATUS",
+    "ATTEMPTS",
+    "LATENCY_SECONDS",
+    "TTFT_SECONDS",
+    "PROMPT_TOKENS",
+    "OUTPUT_TOKENS",
+    "TOKENS_PER_SECOND",
+    "COST_USD",
+    "ERROR",
+]
+
+
+@dataclass
+class FanoutTarget:
+    """One model to query; ``timeout`` overrides the provider default"""
+
+    label: str
+    provider: CompletionProvider
+    model: str
+    timeout: Optional[float] = None
+
+
+def simulated_provider(
+    model: str, respond: Callable[[str, str], str], failures: int = 0
+) -> MockProvider:
+    """
+    Mock provider with a first-token delay (0.2-1.4s) and generation speed
+    (40-160 tokens/sec) fixed per model name, so simulated comparisons
+    finish in a stable but realistic-looking order.
+    """
+    seed = int(hashlib.sha1(model.encode("utf-8")).hexdigest()[:8], 16)
+    return MockProvider(
+        respond,
+        first_token_seconds=0.2 + (seed % 1000) / 1000 * 1.2,
+        tokens_per_second=40 + (seed // 1000) % 120,
+        failures=failures,
+    )
+
+
+# -----------------------------
+# Fan-out
+# -----------------------------
+
+
+class ModelFanout:
+    """
+    Concurrent prompt dispatch to many models.
+
+    ``concurrency`` and ``timeouts`` are keyed by provider name (cortex,
+    openai, anthropic, mock); providers not listed get the defaults.
+    Errors are retried up to ``retries`` times, sleeping
+    ``backoff * 2**n * (1 + jitter)`` in between; a timeout is final, and
+    the abandoned stream is closed at its next chunk. Successful calls are
+    recorded into ``metrics``, and every call into ``telemetry``, when given;
+    simulated (mock provider) calls are recorded in neither.
+    """
+
+    def __init__(
+        self,
+        concurrency: Optional[Dict[str, int]] = None,
+        timeouts: Optional[Dict[str, float]] = None,
+        default_concurrency: int = DEFAULT_CONCURRENCY,
+        default_timeout: float = DEFAULT_TIMEOUT_SECONDS,
+        retries: int = DEFAULT_RETRIES,
+        backoff: float = DEFAULT_BACKOFF_SECONDS,
+        metrics: Optional[StreamMetrics] = None,
+        telemetry: Optional[LLMTelemetry] = None,
+    ):
+        self.concurrency = concurrency or {}
+        self.timeouts = timeouts or {}
+        self.default_concurrency = default_concurrency
+        self.default_timeout = default_timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.metrics = metrics
+        self.telemetry = telemetry
+
+    def _timeout(self, target: FanoutTarget) -> float:
+        if target.timeout is not None:
+            return target.timeout
+        return self.timeouts.get(target.provider.name, self.default_timeout)
+
+    @staticmethod
+    def _consume(
+        target: FanoutTarget,
+        prompt: str,
+        params: Dict[str, Any],
+        abandoned: threading.Event,
+    ) -> Tuple[str, Optional[float]]:
+        """Full answer and time to its first chunk (runs on a worker thread)"""
+        started = time.perf_counter()
+        first: Optional[float] = None
+        parts: List[str] = []
+        chunks = target.provider.stream(prompt, target.model, **params)
+        try:
+            for chunk in chunks:
+                if abandoned.is_set():
+                    break
+                if first is None:
+                    first = time.perf_counter() - started
+                parts.append(chunk)
+        finally:
+            close = getattr(chunks, "close", None)
+            if close is not None:
+                close()
+        return "".join(parts), first
+
+    async def _call(
+        self,
+        target: FanoutTarget,
+        prompt: str,
+        params: Dict[str, Any],
+        limits: Dict[str, asyncio.Semaphore],
+        executor: ThreadPoolExecutor,
+    ) -> Dict[str, Any]:
+        name = target.provider.name
+        if name not in limits:
+            limits[name] = asyncio.Semaphore(
+                self.concurrency.get(name, self.default_concurrency)
+            )
+        timeout = self._timeout(target)
+        started = time.perf_counter()
+        text, ttft, status, error, attempts = "", None, "error", None, 0
+        error_class: Optional[str] = None
+        while True:
+            attempts += 1
+            abandoned = threading.Event()
+            async with limits[name]:
+                attempt_started = time.perf_counter() - started
+                try:
+                    text, ttft = await asyncio.wait_for(
+                        asyncio.get_running_loop().run_in_executor(
+                            executor, self._consume, target, prompt, params, abandoned
+                        ),
+                        timeout,
+                    )
+                    if ttft is not None:
+                        ttft += attempt_started
+                    status, error, error_class = "ok", None, None
+                    break
+                except asyncio.TimeoutError:
+                    abandoned.set()
+                    status, error = "timeout", f"no answer within {timeout:g}s"
+                    error_class = "TimeoutError"
+                    break
+                except Exception as e:
+                    error_class = type(e).__name__
+                    error = f"{error_class}: {e}"
+            if attempts > self.retries:
+                break
+            await asyncio.sleep(
+                self.backoff * 2 ** (attempts - 1) * (1 + random.random())
+            )
+        latency = time.perf_counter() - started
+        prompt_tokens = estimate_tokens(prompt)
+        output_tokens = estimate_tokens(text)
+        generating = latency - ttft if ttft is not None else 0.0
+        result = {
+            "LABEL": target.label,
+            "PROVIDER": name,
+            "MODEL": target.model,
+            "STATUS": status,
+            "ATTEMPTS": attempts,
+            "LATENCY_SECONDS": latency,
+            "TTFT_SECONDS": ttft,
+            "PROMPT_TOKENS": prompt_tokens,
+            "OUTPUT_TOKENS": output_tokens,
+            "TOKENS_PER_SECOND": (
+                output_tokens / generating
+                if status == "ok" and generating > 0
+                else None
+            ),
+            "COST_USD": (
+                estimate_cost(target.model, prompt_tokens, output_tokens)
+                if status == "ok"
+                else None
+            ),
+            "ERROR": error,
+            "TEXT": text,
+        }
+        observed = name != MockProvider.name
+        if observed and self.telemetry is not None:
+            self.telemetry.record(
+                "compare",
+                name,
+                target.model,
+                prompt_tokens,
+                output_tokens,
+                latency,
+                error=error_class,
+            )
+        if observed and status == "ok" and self.metrics is not None:
+            self.metrics.record(
+                target.model,
+                {
+                    "ttft_seconds": ttft,
+                    "total_seconds": latency,
+                    "tokens": output_tokens,
+                    "tokens_per_second": result["TOKENS_PER_SECOND"],
+                    "cancelled": False,
+                },
+            )
+        return result
+
+    async def run(
+        self,
+        prompt: str,
+        targets: Sequence[FanoutTarget],
+        on_result: Optional[Callable[[Dict[str, Any]], None]] = None,
+        **params: Any,
+    ) -> List[Dict[str, Any]]:
+        """
+        Every target's result, in completion order. Calls run on a dedicated
+        pool that is not waited for on exit, so a worker still stuck in a
+        timed-out call does not hold up the caller.
+        """
+        limits: Dict[str, asyncio.Semaphore] = {}
+        results: List[Dict[str, Any]] = []
+        executor = ThreadPoolExecutor(
+            max_workers=max(1, len(targets)), thread_name_prefix="model-fanout"
+        )
+        try:
+            calls = [
+                self._call(target, prompt, params, limits, executor)
+                for target in targets
+            ]
+            for finished in asyncio.as_completed(calls):
+                result = await finished
+                results.append(result)
+                if on_result is not None:
+                    on_result(result)
+        finally:
+            executor.shutdown(wait=False)
+        return results
+
+    def stream(
+        self, prompt: str, targets: Sequence[FanoutTarget], **params: Any
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Blocking iterator over results as they arrive, for callers without
+        an event loop (e.g. a Streamlit script); the loop runs on a
+        background thread.
+        """
+        arrived: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue()
+        failure: List[BaseException] = []
+
+        def loop() -> None:
+            try:
+                asyncio.run(self.run(prompt, targets, on_result=arrived.put, **params))
+            except BaseException as e:
+                failure.append(e)
+            finally:
+                arrived.put(None)
+
+        threading.Thread(target=loop, name="model-fanout", daemon=True).start()
+        # Stop at the last result rather than the sentinel, which only comes
+        # once the event loop has shut down.
+        for _ in range(len(targets)):
+            result = arrived.get()
+            if result is None:
+                break
+            yield result
+        if failure:
+            raise failure[0]
+
+
+def leaderboard(results: Sequence[Dict[str, Any]]) -> pd.DataFrame:
+    """Successful answers fastest first, then timeouts and errors"""
+    board = pd.DataFrame(list(results)).reindex(columns=RESULT_COLUMNS)
+    if board.empty:
+        return board
+    board["_FAILED"] = board["STATUS"] != "ok"
+    return (
+        board.sort_values(["_FAILED", "LATENCY_SECONDS"], kind="stable")
+        .drop(columns="_FAILED")
+        .reset_index(drop=True)
+    )
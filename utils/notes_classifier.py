@@ -0,0 +1,228 @@
+"""
+Interaction Notes Classifier for Wealth 360 Analytics Platform
+
+Keyword-driven sentiment and priority tagging for INTERACTIONS notes, shared by
+the data layer and the AI Insights page. All lexicon keywords are compiled into
+a single multi-pattern matcher that runs over a whole notes column at once, and
+results are cached per INTERACTION_ID and content hash so only new or edited
+interactions are ever re-scanned.
+"""
+
+import re
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Ordered sentiment rules - the first rule with a keyword hit wins. The first
+# five mirror the CASE expression previously evaluated in SQL; the last two
+# carry the words the AI Insights sentiment box used to check on its own.
+# They only decide notes that none of the earlier rules match, which would
+# otherwise fall through to Neutral.
+SENTIMENT_RULES: List[Tuple[str, Sequence[str]]] = [
+    ("Negative", ("complaint", "issue")),
+    ("Positive", ("satisfied", "happy")),
+    ("Neutral", ("neutral", "okay")),
+    ("Negative", ("concern", "worry")),
+    ("Positive", ("excellent", "great")),
+    ("Positive", ("exceptional", "fantastic", "pleased")),
+    (
+        "Negative",
+        (
+            "terrible",
+            "awful",
+            "disappointed",
+            "frustrated",
+            "angry",
+            "upset",
+            "horrible",
+        ),
+    ),
+]
+
+PRIORITY_RULES: List[Tuple[str, Sequence[str]]] = [
+    ("High", ("urgent", "escalate")),
+    ("Medium", ("follow", "review")),
+]
+
+DEFAULT_SENTIMENT = "Neutral"
+DEFAULT_PRIORITY = "Low"
+
+RESULT_COLUMNS = ["SENTIMENT_SCORE", "PRIORITY_LEVEL", "SENTIMENT_VALUE"]
+
+
+class KeywordAutomaton:
+    """
+    Single-pass multi-keyword matcher.
+
+    Every keyword from every lexicon is folded into one compiled alternation
+    (longest keywords first), so a text is scanned once regardless of how many
+    rules or lexicons are registered. Matching is case-insensitive substring
+    matching, the same semantics as ``LOWER(col) LIKE '%kw%'``.
+    """
+
+    def __init__(self, keywords: Sequence[str]):
+        unique = sorted({k.lower() for k in keywords}, key=lambda k: (-len(k), k))
+        self.keywords = unique
+        self.pattern = re.compile("|".join(re.escape(k) for k in unique))
+
+    def find_all(self, texts: pd.Series) -> pd.Series:
+        """Return, per row, the list of keywords found in the text"""
+        return texts.fillna("").astype(str).str.lower().str.findall(self.pattern)
+
+
+class NotesClassifier:
+    """
+    Sentiment / priority classifier over interaction notes.
+
+    ``classify`` takes a frame with an ID column and a text column and returns
+    SENTIMENT_SCORE, PRIORITY_LEVEL and a numeric SENTIMENT_VALUE per row.
+    Results are memoised by (INTERACTION_ID, content hash); repeated calls only
+    classify rows that are new or whose text changed. One instance is shared
+    by every Streamlit session, so cache reads and swaps hold a lock.
+    """
+
+    def __init__(
+        self,
+        sentiment_rules: Optional[List[Tuple[str, Sequence[str]]]] = None,
+        priority_rules: Optional[List[Tuple[str, Sequence[str]]]] = None,
+    ):
+        self.sentiment_rules = sentiment_rules or SENTIMENT_RULES
+        self.priority_rules = priority_rules or PRIORITY_RULES
+
+        # keyword -> (sentiment rank, priority rank, polarity)
+        no_rank = np.iinfo(np.int32).max
+        table: Dict[str, List[int]] = {}
+        for rank, (label, words) in enumerate(self.sentiment_rules):
+            polarity = {"Positive": 1, "Negative": -1}.get(label, 0)
+            for w in words:
+                entry = table.setdefault(w.lower(), [no_rank, no_rank, 0])
+                if rank < entry[0]:
+                    entry[0] = rank
+                    entry[2] = polarity
+        for rank, (_, words) in enumerate(self.priority_rules):
+            for w in words:
+                entry = table.setdefault(w.lower(), [no_rank, no_rank, 0])
+                entry[1] = min(entry[1], rank)
+
+        self._keyword_table = pd.DataFrame.from_dict(
+            table,
+            orient="index",
+            columns=["SENTIMENT_RANK", "PRIORITY_RANK", "POLARITY"],
+        )
+        self._sentiment_labels = np.array(
+            [label for label, _ in self.sentiment_rules] + [DEFAULT_SENTIMENT],
+            dtype=object,
+        )
+        self._priority_labels = np.array(
+            [label for label, _ in self.priority_rules] + [DEFAULT_PRIORITY],
+            dtype=object,
+        )
+        self.automaton = KeywordAutomaton(list(table))
+        self._cache = pd.DataFrame(
+            columns=["CONTENT_HASH"] + RESULT_COLUMNS,
+        ).astype({"CONTENT_HASH": "uint64"})
+        self._lock = threading.RLock()
+
+    # -----------------------------
+    # Core scoring
+    # -----------------------------
+
+    def _score_unique(self, texts: pd.Series) -> pd.DataFrame:
+        """Classify distinct texts; returns a frame aligned with ``texts``"""
+        hits = self.automaton.find_all(texts).explode().dropna()
+        ranks = self._keyword_table.reindex(hits.to_numpy())
+        ranks.index = hits.index
+        n_sent = len(self.sentiment_rules)
+        n_prio = len(self.priority_rules)
+
+        per_text = ranks.groupby(level=0).agg(
+            SENTIMENT_RANK=("SENTIMENT_RANK", "min"),
+            PRIORITY_RANK=("PRIORITY_RANK", "min"),
+            SENTIMENT_VALUE=("POLARITY", "sum"),
+        )
+        per_text = per_text.reindex(texts.index)
+        sent_rank = per_text["SENTIMENT_RANK"].fillna(n_sent).clip(upper=n_sent)
+        prio_rank = per_text["PRIORITY_RANK"].fillna(n_prio).clip(upper=n_prio)
+
+        return pd.DataFrame(
+            {
+                "SENTIMENT_SCORE": self._sentiment_labels[sent_rank.astype(int)],
+                "PRIORITY_LEVEL": self._priority_labels[prio_rank.astype(int)],
+                "SENTIMENT_VALUE": per_text["SENTIMENT_VALUE"].fillna(0).astype(int),
+            },
+            index=texts.index,
+        )
+
+    def classify_texts(self, texts: pd.Series) -> pd.DataFrame:
+        """Classify a text column without touching the cache"""
+        codes, uniques = pd.factorize(texts.fillna(""), sort=False)
+        if len(uniques) == 0:
+            return pd.DataFrame(columns=RESULT_COLUMNS, index=texts.index)
+        scored = self._score_unique(pd.Series(uniques))
+        out = scored.iloc[codes]
+        out.index = texts.index
+        return out
+
+    def score_text(self, text: str) -> Dict[str, object]:
+        """Classify a single free-text snippet (e.g. a user-entered note)"""
+        row = self.classify_texts(pd.Series([text])).iloc[0]
+        return {
+            "SENTIMENT_SCORE": row["SENTIMENT_SCORE"],
+            "PRIORITY_LEVEL": row["PRIORITY_LEVEL"],
+            "SENTIMENT_VALUE": int(row["SENTIMENT_VALUE"]),
+        }
+
+    # -----------------------------
+    # Incremental, cached classification
+    # -----------------------------
+
+    def classify(
+        self,
+        df: pd.DataFrame,
+        text_col: str = "OUTCOME_NOTES",
+        id_col: str = "INTERACTION_ID",
+    ) -> pd.DataFrame:
+        """
+        Return ``df`` with SENTIMENT_SCORE, PRIORITY_LEVEL and SENTIMENT_VALUE
+        columns appended, reclassifying only new or changed rows.
+        """
+        if df.empty:
+            return df.assign(**{c: pd.Series(dtype=object) for c in RESULT_COLUMNS})
+
+        ids = df[id_col].astype(str)
+        hashes = pd.util.hash_pandas_object(
+            df[text_col].fillna(""), index=False
+        ).to_numpy()
+        with self._lock:
+            results = self._classify_cached(df, ids, hashes, text_col)
+        results.index = df.index
+        return pd.concat([df, results], axis=1)
+
+    def _classify_cached(
+        self, df: pd.DataFrame, ids: pd.Series, hashes: np.ndarray, text_col: str
+    ) -> pd.DataFrame:
+        positions = self._cache.index.get_indexer(ids.to_numpy())
+        cached_hash = self._cache["CONTENT_HASH"].to_numpy(dtype="uint64")
+        stale = positions < 0
+        stale[~stale] = cached_hash[positions[~stale]] != hashes[~stale]
+
+        if stale.any():
+            fresh = self.classify_texts(df.loc[stale, text_col])
+            fresh.index = ids[stale].to_numpy()
+            fresh.insert(0, "CONTENT_HASH", hashes[stale])
+            fresh = fresh[~fresh.index.duplicated(keep="last")]
+            kept = self._cache.drop(index=fresh.index, errors="ignore")
+            self._cache = pd.concat([kept, fresh]) if len(kept) else fresh
+            self._cache["CONTENT_HASH"] = self._cache["CONTENT_HASH"].astype("uint64")
+
+        return self._cache.loc[ids.to_numpy(), RESULT_COLUMNS]
+
+    @property
+    def cache_size(self) -> int:
+        return len(self._cache)
+
+    def clear_cache(self) -> None:
+        with self._lock:
+            self._cache = self._cache.iloc[0:0]
@@ -0,0 +1,405 @@
+"""
+Portfolio Performance Engine for Wealth 360 Analytics Platform
+
+Computes time-weighted (TWR) and money-weighted (MWR / IRR) returns for every
+portfolio at once from POSITION_HISTORY valuations and TRANSACTIONS Buy/Sell
+flows, and rolls them up to client, strategy and advisor level. Results for a
+period are computed once and kept in a per-period cube for ranking.
+"""
+
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+LEVEL_KEYS = {
+    "portfolio": "PORTFOLIO_ID",
+    "client": "CLIENT_ID",
+    "strategy": "STRATEGY_TYPE",
+    "advisor": "ADVISOR_ID",
+}
+
+PERIODS = ("MTD", "QTD", "YTD", "1Y", "3Y", "SI")
+
+CUBE_COLUMNS = [
+    "LEVEL",
+    "ENTITY_ID",
+    "PERIOD",
+    "START_DATE",
+    "END_DATE",
+    "PORTFOLIO_COUNT",
+    "START_VALUE",
+    "END_VALUE",
+    "NET_FLOW",
+    "GAIN",
+    "TWR",
+    "TWR_ANNUALIZED",
+    "MWR",
+    "INVALID_REASON",
+]
+
+# Flow sign from the portfolio's point of view: buys add invested capital.
+FLOW_SIGN = {"Buy": 1.0, "Sell": -1.0}
+
+DAYS_PER_YEAR = 365.25
+
+IRR_MAX_ITER = 100
+IRR_TOLERANCE = 1e-10
+
+
+def period_bounds(
+    period: str, as_of: pd.Timestamp, inception: pd.Timestamp
+) -> Tuple[pd.Timestamp, pd.Timestamp]:
+    """Start / end timestamps of a named reporting period ending at ``as_of``"""
+    as_of = pd.Timestamp(as_of)
+    if period == "MTD":
+        start = as_of.to_period("M").start_time
+    elif period == "QTD":
+        start = as_of.to_period("Q").start_time
+    elif period == "YTD":
+        start = as_of.to_period("Y").start_time
+    elif period == "1Y":
+        start = as_of - pd.DateOffset(years=1)
+    elif period == "3Y":
+        start = as_of - pd.DateOffset(years=3)
+    elif period == "SI":
+        start = pd.Timestamp(inception)
+    else:
+        raise ValueError(f"period must be one of {PERIODS}, got {period!r}")
+    return max(start, pd.Timestamp(inception)), as_of
+
+
+def solve_irr(
+    groups: np.ndarray, amounts: np.ndarray, years: np.ndarray, n_groups: int
+) -> np.ndarray:
+    """
+    Annualised IRR per group, solved for all groups simultaneously.
+
+    Each row is a cash flow ``amount`` compounded over ``years`` to the common
+    horizon; the IRR r satisfies sum(amount * (1 + r) ** years) = 0 within a
+    group. Newton iterations run on the whole vector, with converged groups
+    masked out. A group converges only once its NPV is near zero, so a flat
+    derivative (no sign change in the flows) or an exhausted iteration budget
+    returns NaN rather than the last guess.
+    """
+    x = np.ones(n_groups)
+    scale = np.bincount(groups, weights=np.abs(amounts), minlength=n_groups)
+    active = scale > 0
+    converged = ~active
+    failed = np.zeros(n_groups, dtype=bool)
+    with np.errstate(all="ignore"):
+        for _ in range(IRR_MAX_ITER):
+            xr = x[groups]
+            growth = xr**years
+            f = np.bincount(groups, weights=amounts * growth, minlength=n_groups)
+            df = np.bincount(
+                groups, weights=amounts * years * growth / xr, minlength=n_groups
+            )
+            converged |= np.abs(f) <= IRR_TOLERANCE * scale
+            failed |= ~converged & ~(np.isfinite(df) & (df != 0))
+            step = np.where(converged | failed, 0.0, f / df)
+            x = np.clip(x - step, 1e-6, 1e3)
+            if (converged | failed).all():
+                break
+    rate = x - 1.0
+    rate[~converged | ~active] = np.nan
+    return rate
+
+
+class PerformanceEngine:
+    """
+    Batch TWR / MWR calculator over all portfolios.
+
+    ``valuations`` holds one row per portfolio snapshot (PORTFOLIO_ID,
+    TIMESTAMP, MARKET_VALUE); ``flows`` holds TRANSACTIONS rows (PORTFOLIO_ID,
+    TIMESTAMP, TRANSACTION_TYPE, TOTAL_AMOUNT); ``attributes`` maps each
+    PORTFOLIO_ID to CLIENT_ID, STRATEGY_TYPE and ADVISOR_ID.
+
+    Consecutive snapshots delimit sub-periods. Each sub-period return is a
+    Modified Dietz return with flows weighted by the time they were invested,
+    and sub-periods are chain-linked into the TWR. Period boundaries snap to
+    the valuation snapshots inside the period: only sub-periods that start
+    and end within [start, end] are linked, so a period shorter than the
+    snapshot spacing has no result. A sub-period with no positive Dietz
+    capital, or one that loses more than everything, has no meaningful return;
+    portfolios containing one get a NaN TWR and an INVALID_REASON and are left
+    out of the roll-up composites. ``supported_periods`` lists the named
+    periods that do have one, so callers can hide the rest.
+    """
+
+    def __init__(
+        self,
+        valuations: pd.DataFrame,
+        flows: pd.DataFrame,
+        attributes: Optional[pd.DataFrame] = None,
+    ):
+        self.subperiods, self._flows = self._build_subperiods(valuations, flows)
+        if attributes is None or attributes.empty:
+            attributes = pd.DataFrame({"PORTFOLIO_ID": self.portfolios})
+        self.attributes = (
+            attributes.drop_duplicates("PORTFOLIO_ID")
+            .set_index("PORTFOLIO_ID")
+            .reindex(columns=["CLIENT_ID", "STRATEGY_TYPE", "ADVISOR_ID"])
+        )
+        self._cube: Dict[Tuple[pd.Timestamp, pd.Timestamp], pd.DataFrame] = {}
+
+    @property
+    def portfolios(self) -> np.ndarray:
+        return self.subperiods["PORTFOLIO_ID"].unique()
+
+    @property
+    def inception(self) -> pd.Timestamp:
+        return self.subperiods["START_TS"].min()
+
+    @property
+    def as_of(self) -> pd.Timestamp:
+        return self.subperiods["END_TS"].max()
+
+    # -----------------------------
+    # Sub-period construction
+    # -----------------------------
+
+    @staticmethod
+    def _build_subperiods(
+        valuations: pd.DataFrame, flows: pd.DataFrame
+    ) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """Sub-period returns, plus each in-period flow tagged with its sub-period"""
+        vals = valuations[["PORTFOLIO_ID", "TIMESTAMP", "MARKET_VALUE"]].copy()
+        vals["TIMESTAMP"] = pd.to_datetime(vals["TIMESTAMP"])
+        vals["MARKET_VALUE"] = vals["MARKET_VALUE"].astype(float)
+        vals = vals.sort_values(["PORTFOLIO_ID", "TIMESTAMP"])
+        vals = vals.drop_duplicates(["PORTFOLIO_ID", "TIMESTAMP"], keep="last")
+        prev = vals.groupby("PORTFOLIO_ID", sort=False).shift(1)
+        sub = pd.DataFrame(
+            {
+                "PORTFOLIO_ID": vals["PORTFOLIO_ID"],
+                "START_TS": prev["TIMESTAMP"],
+                "END_TS": vals["TIMESTAMP"],
+                "START_VALUE": prev["MARKET_VALUE"],
+                "END_VALUE": vals["MARKET_VALUE"],
+            }
+        ).dropna(subset=["START_TS"])
+        sub = sub.reset_index(drop=True)
+        sub["SUBPERIOD"] = np.arange(len(sub))
+
+        # Attach each flow to the sub-period whose end snapshot follows it.
+        txns = flows[flows["TRANSACTION_TYPE"].isin(FLOW_SIGN)].copy()
+        txns["TIMESTAMP"] = pd.to_datetime(txns["TIMESTAMP"])
+        txns["FLOW"] = txns["TOTAL_AMOUNT"].astype(float) * txns[
+            "TRANSACTION_TYPE"
+        ].map(FLOW_SIGN)
+        txns = txns.dropna(subset=["TIMESTAMP", "FLOW"]).sort_values("TIMESTAMP")
+        matched = pd.merge_asof(
+            txns[["PORTFOLIO_ID", "TIMESTAMP", "FLOW"]],
+            sub[["PORTFOLIO_ID", "START_TS", "END_TS", "SUBPERIOD"]].sort_values(
+                "END_TS"
+            ),
+            left_on="TIMESTAMP",
+            right_on="END_TS",
+            by="PORTFOLIO_ID",
+            direction="forward",
+        )
+        matched = matched[matched["TIMESTAMP"] > matched["START_TS"]]
+        span = (matched["END_TS"] - matched["START_TS"]).dt.total_seconds()
+        remaining = (matched["END_TS"] - matched["TIMESTAMP"]).dt.total_seconds()
+        matched["WEIGHTED_FLOW"] = matched["FLOW"] * (remaining / span)
+
+        per_sub = matched.groupby("SUBPERIOD")[["FLOW", "WEIGHTED_FLOW"]].sum()
+        sub = sub.join(per_sub, on="SUBPERIOD")
+        sub[["FLOW", "WEIGHTED_FLOW"]] = sub[["FLOW", "WEIGHTED_FLOW"]].fillna(0.0)
+
+        capital = sub["START_VALUE"] + sub["WEIGHTED_FLOW"]
+        gain = sub["END_VALUE"] - sub["START_VALUE"] - sub["FLOW"]
+        sub["RETURN"] = np.where(capital > 0, gain / capital.where(capital > 0), np.nan)
+        return sub, matched[["SUBPERIOD", "TIMESTAMP", "FLOW"]]
+
+    # -----------------------------
+    # Period results
+    # -----------------------------
+
+    def results(self, start, end) -> pd.DataFrame:
+        """
+        TWR and MWR for every entity at every level over [start, end].
+
+        Cached per (start, end); returns rows in CUBE_COLUMNS order with the
+        PERIOD column left blank.
+        """
+        key = (pd.Timestamp(start), pd.Timestamp(end))
+        if key not in self._cube:
+            self._cube[key] = self._compute(*key)
+        return self._cube[key].copy()
+
+    def period(self, period: str = "YTD", as_of=None) -> pd.DataFrame:
+        """Results for a named period (MTD, QTD, YTD, 1Y, 3Y, SI)"""
+        if self.subperiods.empty:
+            return pd.DataFrame(columns=CUBE_COLUMNS)
+        as_of = self.as_of if as_of is None else pd.Timestamp(as_of)
+        start, end = period_bounds(period, as_of, self.inception)
+        return self.results(start, end).assign(PERIOD=period)
+
+    def supported_periods(self, as_of=None) -> Tuple[str, ...]:
+        """Named periods that contain at least one whole sub-period"""
+        if self.subperiods.empty:
+            return ()
+        as_of = self.as_of if as_of is None else pd.Timestamp(as_of)
+        sub = self.subperiods
+        supported = []
+        for period in PERIODS:
+            start, end = period_bounds(period, as_of, self.inception)
+            if ((sub["START_TS"] >= start) & (sub["END_TS"] <= end)).any():
+                supported.append(period)
+        return tuple(supported)
+
+    def cube(self, periods=PERIODS, as_of=None) -> pd.DataFrame:
+        """All levels x all requested periods in one frame"""
+        frames = [self.period(p, as_of) for p in periods]
+        return pd.concat(frames, ignore_index=True)
+
+    def rank(
+        self,
+        level: str = "portfolio",
+        period: str = "YTD",
+        by: str = "TWR",
+        as_of=None,
+    ) -> pd.DataFrame:
+        """Entities at ``level`` ranked by ``by`` for ``period``"""
+        rows = self.period(period, as_of)
+        rows = rows[rows["LEVEL"] == level].sort_values(
+            by, ascending=False, na_position="last"
+        )
+        return rows.assign(RANK=np.arange(1, len(rows) + 1)).reset_index(drop=True)
+
+    def _compute(self, start: pd.Timestamp, end: pd.Timestamp) -> pd.DataFrame:
+        sub = self.subperiods
+        sub = sub[(sub["START_TS"] >= start) & (sub["END_TS"] <= end)]
+        if sub.empty:
+            return pd.DataFrame(columns=CUBE_COLUMNS)
+
+        by_portfolio = sub.groupby("PORTFOLIO_ID", sort=False)
+        first = sub.loc[by_portfolio["END_TS"].idxmin()].set_index("PORTFOLIO_ID")
+        last = sub.loc[by_portfolio["END_TS"].idxmax()].set_index("PORTFOLIO_ID")
+        reason = pd.Series(
+            np.select(
+                [sub["RETURN"].isna(), sub["RETURN"] <= -1],
+                ["non-positive capital in a sub-period", "sub-period loss over 100%"],
+                default="",
+            ),
+            index=sub.index,
+        )
+        valid = reason == ""
+        log_growth = np.log1p(sub["RETURN"].where(valid))
+        base = pd.DataFrame(
+            {
+                "START_TS": first["START_TS"],
+                "END_TS": last["END_TS"],
+                "START_VALUE": first["START_VALUE"],
+                "END_VALUE": last["END_VALUE"],
+                "NET_FLOW": by_portfolio["FLOW"].sum(),
+                "LOG_GROWTH": log_growth.groupby(sub["PORTFOLIO_ID"]).sum(),
+                "INVALID_REASON": reason[~valid].groupby(sub["PORTFOLIO_ID"]).first(),
+            }
+        )
+        base = base.join(self.attributes)
+
+        # Dietz capital over the whole period weights portfolios in roll-ups.
+        flows = self._flows[self._flows["SUBPERIOD"].isin(sub["SUBPERIOD"])]
+        flows = flows.join(
+            sub.set_index("SUBPERIOD")["PORTFOLIO_ID"], on="SUBPERIOD"
+        ).join(base[["START_TS", "END_TS"]], on="PORTFOLIO_ID")
+        span = (flows["END_TS"] - flows["START_TS"]).dt.total_seconds()
+        weight = (flows["END_TS"] - flows["TIMESTAMP"]).dt.total_seconds() / span
+        weighted = (flows["FLOW"] * weight).groupby(flows["PORTFOLIO_ID"]).sum()
+        base["CAPITAL"] = base["START_VALUE"] + weighted.reindex(base.index).fillna(0)
+        base["TWR"] = np.expm1(base["LOG_GROWTH"]).where(base["INVALID_REASON"].isna())
+
+        horizon = base["END_TS"].max()
+        frames = []
+        for level, key in LEVEL_KEYS.items():
+            entity = (
+                base.index.to_series()
+                if level == "portfolio"
+                else base[key].fillna("UNASSIGNED")
+            )
+            frames.append(self._roll_up(level, entity, base, flows, horizon))
+        out = pd.concat(frames, ignore_index=True)
+        out["START_DATE"] = start
+        out["END_DATE"] = end
+        out["PERIOD"] = ""
+        return out.reindex(columns=CUBE_COLUMNS)
+
+    def _roll_up(
+        self,
+        level: str,
+        entity: pd.Series,
+        base: pd.DataFrame,
+        flows: pd.DataFrame,
+        horizon: pd.Timestamp,
+    ) -> pd.DataFrame:
+        codes, names = pd.factorize(entity)
+        n = len(names)
+        invalid = base["INVALID_REASON"].notna().to_numpy()
+        capital = np.where(invalid, 0.0, base["CAPITAL"].clip(lower=0).to_numpy())
+        twr = np.where(invalid, 0.0, base["TWR"].to_numpy())
+        wsum = np.bincount(codes, weights=capital, minlength=n)
+        if level == "portfolio":
+            composite = base["TWR"].to_numpy()
+            reason = base["INVALID_REASON"].to_numpy()
+        else:
+            # Capital-weighted composite of member portfolio TWRs.
+            with np.errstate(divide="ignore", invalid="ignore"):
+                composite = (
+                    np.bincount(codes, weights=capital * twr, minlength=n) / wsum
+                )
+            excluded = np.bincount(codes, weights=invalid, minlength=n).astype(int)
+            reason = np.where(
+                excluded > 0,
+                pd.Series(excluded).map("{} invalid portfolio(s) excluded".format),
+                None,
+            )
+
+        # Pooled cash flows: start value and flows in, end value out.
+        flow_codes = codes[base.index.get_indexer(flows["PORTFOLIO_ID"])]
+        groups = np.concatenate([codes, flow_codes, codes])
+        amounts = np.concatenate(
+            [
+                base["START_VALUE"].to_numpy(),
+                flows["FLOW"].to_numpy(),
+                -base["END_VALUE"].to_numpy(),
+            ]
+        )
+        times = pd.concat([base["START_TS"], flows["TIMESTAMP"], base["END_TS"]])
+        years = (horizon - times).dt.total_seconds().to_numpy() / (
+            DAYS_PER_YEAR * 86_400
+        )
+        mwr = solve_irr(groups, amounts, years, n)
+
+        span_years = (
+            (
+                (base["END_TS"] - base["START_TS"]).dt.total_seconds()
+                / (DAYS_PER_YEAR * 86_400)
+            )
+            .groupby(codes)
+            .max()
+        )
+        sums = base[["START_VALUE", "END_VALUE", "NET_FLOW"]].groupby(codes).sum()
+        out = pd.DataFrame(
+            {
+                "LEVEL": level,
+                "ENTITY_ID": names,
+                "PORTFOLIO_COUNT": np.bincount(codes, minlength=n),
+                "START_VALUE": sums["START_VALUE"].to_numpy(),
+                "END_VALUE": sums["END_VALUE"].to_numpy(),
+                "NET_FLOW": sums["NET_FLOW"].to_numpy(),
+                "TWR": composite,
+                "MWR": mwr,
+                "INVALID_REASON": reason,
+            }
+        )
+        out["GAIN"] = out["END_VALUE"] - out["START_VALUE"] - out["NET_FLOW"]
+        span = span_years.to_numpy()
+        out["TWR_ANNUALIZED"] = np.where(
+            span > 1,
+            (1 + out["TWR"]) ** (1 / np.where(span > 0, span, 1)) - 1,
+            out["TWR"],
+        )
+        return out
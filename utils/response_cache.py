@@ -0,0 +1,234 @@
+"""
+LLM Response Cache for Wealth 360 Analytics Platform
+
+Caches completions keyed by normalised prompt, model and a data-version
+fingerprint, so repeat business questions return immediately and answers
+stop matching as soon as the underlying data changes.
+Prompts that are not an exact repeat can still hit when their embedding is
+close enough to a cached prompt for the same model and data version and both
+name the same entities, numbers and negations - a bag-of-words embedding
+alone cannot tell "in Texas" from "in California" or "do not summarize" from
+"summarize". Entries expire after a TTL and the least recently used are
+evicted past a size cap.
+"""
+
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, FrozenSet, Optional, Tuple
+
+import numpy as np
+
+from utils.text_embedding import HashingEmbedder, normalize_text
+
+DEFAULT_TTL_SECONDS = 3600
+DEFAULT_MAX_ENTRIES = 512
+# Cosine similarity at or above which a near-duplicate prompt reuses an answer
+DEFAULT_SIMILARITY = 0.9
+
+CacheKey = Tuple[str, str, str]
+Anchors = Tuple[FrozenSet[str], FrozenSet[str]]
+
+_SENTENCE = re.compile(r"[.!?:;\n]+")
+_TOKEN = re.compile(r"[A-Za-z0-9][A-Za-z0-9_'-]*")
+_NEGATION = re.compile(r"\b(?:not|no|never|none|nor|neither|without|cannot)\b|n't\b")
+
+
+def prompt_anchors(prompt: str) -> Anchors:
+    """
+    Tokens two prompts must share for one to reuse the other's answer:
+    numbers and capitalised words (names, places, tickers, IDs) other than a
+    sentence's first word, and the negation cues present ("n't" counts as
+    "not").
+    """
+    entities = set()
+    for sentence in _SENTENCE.split(str(prompt)):
+        for position, token in enumerate(_TOKEN.findall(sentence)):
+            if any(c.isdigit() for c in token) or (position and token[0].isupper()):
+                entities.add(token.lower())
+    negations = {
+        "not" if cue == "n't" else cue for cue in _NEGATION.findall(str(prompt).lower())
+    }
+    return frozenset(entities), frozenset(negations)
+
+
+class SemanticResponseCache:
+    """
+    Exact + near-duplicate completion cache.
+
+    A near-duplicate is the most similar cached prompt at or above
+    ``similarity`` whose ``prompt_anchors`` are identical to the query's.
+    Entries live in an OrderedDict (LRU order) keyed by (normalised prompt,
+    model, fingerprint); each (model, fingerprint) scope also keeps its prompt
+    embeddings stacked in one float32 matrix so the semantic lookup is a
+    single matrix-vector product. Shared across Streamlit sessions, so all
+    mutation happens under a lock.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        similarity: float = DEFAULT_SIMILARITY,
+        embedder=None,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.similarity = similarity
+        self.embedder = embedder or HashingEmbedder()
+        self.clock = clock
+        self._entries: "OrderedDict[CacheKey, Dict[str, Any]]" = OrderedDict()
+        self._scopes: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self.stats = {"exact_hits": 0, "semantic_hits": 0, "misses": 0, "evictions": 0}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    # -----------------------------
+    # Internals (call with the lock held)
+    # -----------------------------
+
+    def _scope(self, model: str, fingerprint: str) -> Dict[str, Any]:
+        return self._scopes.setdefault(
+            (model, fingerprint),
+            {"keys": [], "vectors": np.zeros((0, self.embedder.dim), np.float32)},
+        )
+
+    def _drop(self, key: CacheKey) -> None:
+        self._entries.pop(key, None)
+        scope = self._scopes.get(key[1:])
+        if scope is None:
+            return
+        idx = scope["keys"].index(key)
+        del scope["keys"][idx]
+        scope["vectors"] = np.delete(scope["vectors"], idx, axis=0)
+        if not scope["keys"]:
+            del self._scopes[key[1:]]
+
+    def _expired(self, entry: Dict[str, Any], now: float) -> bool:
+        return now - entry["created"] > self.ttl_seconds
+
+    def _purge(self, now: float) -> None:
+        for key in [k for k, e in self._entries.items() if self._expired(e, now)]:
+            self._drop(key)
+
+    # -----------------------------
+    # Public API
+    # -----------------------------
+
+    def get(
+        self, prompt: str, model: str, fingerprint: str = ""
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Cached answer or None. The returned dict carries ``response``,
+        ``match`` ("exact" / "semantic"), ``similarity`` and ``age_seconds``.
+        """
+        normalized = normalize_text(prompt)
+        key = (normalized, model, fingerprint)
+        with self._lock:
+            now = self.clock()
+            entry = self._entries.get(key)
+            if entry is not None and not self._expired(entry, now):
+                self._entries.move_to_end(key)
+                self.stats["exact_hits"] += 1
+                return self._result(entry, "exact", 1.0, now)
+
+            scope = self._scopes.get((model, fingerprint))
+            if scope is not None and len(scope["keys"]):
+                query = self.embedder.embed_one(normalized)
+                scores = scope["vectors"] @ query
+                anchors = prompt_anchors(prompt)
+                for best in np.argsort(-scores):
+                    if scores[best] < self.similarity:
+                        break
+                    match = scope["keys"][best]
+                    candidate = self._entries[match]
+                    if candidate["anchors"] != anchors or self._expired(candidate, now):
+                        continue
+                    self._entries.move_to_end(match)
+                    self.stats["semantic_hits"] += 1
+                    return self._result(candidate, "semantic", float(scores[best]), now)
+            self.stats["misses"] += 1
+            return None
+
+    @staticmethod
+    def _result(
+        entry: Dict[str, Any], match: str, similarity: float, now: float
+    ) -> Dict[str, Any]:
+        entry["hits"] += 1
+        return {
+            "response": entry["response"],
+            "match": match,
+            "similarity": similarity,
+            "age_seconds": now - entry["created"],
+            "cached_prompt": entry["prompt"],
+        }
+
+    def put(
+        self, prompt: str, model: str, response: Any, fingerprint: str = ""
+    ) -> None:
+        normalized = normalize_text(prompt)
+        key = (normalized, model, fingerprint)
+        vector = self.embedder.embed_one(normalized)
+        with self._lock:
+            now = self.clock()
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = {
+                "prompt": prompt,
+                "anchors": prompt_anchors(prompt),
+                "response": response,
+                "created": now,
+                "hits": 0,
+            }
+            scope = self._scope(model, fingerprint)
+            scope["keys"].append(key)
+            scope["vectors"] = np.vstack([scope["vectors"], vector[None, :]])
+            self._purge(now)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+                self.stats["evictions"] += 1
+
+    def get_or_compute(
+        self,
+        prompt: str,
+        model: str,
+        compute: Callable[[], Optional[Any]],
+        fingerprint: str = "",
+    ) -> Tuple[Optional[Any], Dict[str, Any]]:
+        """
+        Cached answer, or ``compute()`` stored for next time. Returns the
+        response and a dict describing the lookup (``match`` is "miss" when
+        computed). ``None`` results (failed calls) are not cached.
+        """
+        hit = self.get(prompt, model, fingerprint)
+        if hit is not None:
+            return hit["response"], hit
+        started = time.perf_counter()
+        response = compute()
+        info = {"match": "miss", "latency_seconds": time.perf_counter() - started}
+        if response is not None:
+            self.put(prompt, model, response, fingerprint)
+        return response, info
+
+    def invalidate(self, fingerprint: Optional[str] = None) -> int:
+        """Drop everything, or only entries for one data fingerprint"""
+        with self._lock:
+            keys = [
+                k for k in self._entries if fingerprint is None or k[2] == fingerprint
+            ]
+            for key in keys:
+                self._drop(key)
+            return len(keys)
+
+    def summary(self) -> Dict[str, Any]:
+        lookups = sum(self.stats[k] for k in ("exact_hits", "semantic_hits", "misses"))
+        hits = self.stats["exact_hits"] + self.stats["semantic_hits"]
+        return dict(
+            self.stats,
+            entries=len(self._entries),
+            hit_rate=hits / lookups if lookups else 0.0,
+        )
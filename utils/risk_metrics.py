@@ -0,0 +1,290 @@
+"""
+Portfolio Risk Metrics for Wealth 360 Analytics Platform
+
+Trailing-window volatility, maximum drawdown, historical VaR / CVaR and beta
+for every portfolio at once, computed on the daily value grid derived from
+POSITION_HISTORY. All statistics reduce over the last axis of (portfolio x
+window) blocks, so the same kernels serve the latest-window risk table and
+strided rolling histories; large books are split into chunks that can run
+across a process pool. Results are cached per window length.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Trailing windows in calendar days (the value grid has one column per day).
+WINDOWS = {"3M": 91, "6M": 182, "1Y": 365}
+
+PERIODS_PER_YEAR = 365
+DEFAULT_CONFIDENCE = 0.95
+CHUNK_SIZE = 2_000
+
+METRIC_COLUMNS = [
+    "VOLATILITY",
+    "MAX_DRAWDOWN",
+    "VAR",
+    "CVAR",
+    "BETA",
+    "OBSERVATIONS",
+]
+
+TABLE_COLUMNS = ["PORTFOLIO_ID", "LATEST_VALUE"] + METRIC_COLUMNS + ["VAR_AMOUNT"]
+
+
+def market_level(values: np.ndarray) -> np.ndarray:
+    """
+    Firm index level from day-on-day returns of continuing portfolios only,
+    so portfolios entering the book do not register as market gains.
+    """
+    if values.shape[1] < 2:
+        return np.ones(values.shape[1])
+    prev, cur = values[:, :-1], values[:, 1:]
+    alive = prev > 0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        daily = np.where(alive, cur, 0.0).sum(axis=0) / prev.sum(axis=0)
+    return np.concatenate([[1.0], np.cumprod(np.where(np.isfinite(daily), daily, 1.0))])
+
+
+def span_returns(
+    values: np.ndarray, observed: np.ndarray, market: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Portfolio and market returns between consecutive observed days, scaled
+    to one-day terms by 1/sqrt(gap).
+
+    Both arrays are (portfolio x day - 1), aligned to days 1..T-1 and NaN on
+    days without an observation, so forward-filled gaps between sparse
+    snapshots add no artificial zero returns.
+    """
+    days = np.arange(values.shape[1])
+    last = np.maximum.accumulate(np.where(observed, days, -1), axis=1)
+    prev = last[:, :-1]
+    safe = np.maximum(prev, 0)
+    prev_v = np.take_along_axis(values, safe, axis=1)
+    scale = np.sqrt(np.maximum(days[1:] - prev, 1))
+    ok = observed[:, 1:] & (prev >= 0) & (prev_v > 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        r = np.where(ok, (values[:, 1:] / prev_v - 1.0) / scale, np.nan)
+        m = np.where(ok, (market[1:] / market[safe] - 1.0) / scale, np.nan)
+    return r, m
+
+
+def _nan_quantile_last(x: np.ndarray, q: float) -> np.ndarray:
+    """Linear-interpolated quantile over the last axis, ignoring NaN"""
+    ordered = np.sort(x, axis=-1)  # NaN sorts last
+    count = (~np.isnan(x)).sum(axis=-1)
+    pos = np.clip((count - 1) * q, 0, None)
+    lo = np.floor(pos).astype(np.int64)
+    hi = np.minimum(lo + 1, np.maximum(count - 1, 0))
+    lo_v = np.take_along_axis(ordered, lo[..., None], axis=-1)[..., 0]
+    hi_v = np.take_along_axis(ordered, hi[..., None], axis=-1)[..., 0]
+    out = lo_v + (hi_v - lo_v) * (pos - lo)
+    return np.where(count > 0, out, np.nan)
+
+
+def window_stats(
+    returns: np.ndarray,
+    market: np.ndarray,
+    levels: np.ndarray,
+    confidence: float = DEFAULT_CONFIDENCE,
+    periods_per_year: int = PERIODS_PER_YEAR,
+) -> Dict[str, np.ndarray]:
+    """
+    Risk statistics reduced over the last axis.
+
+    ``returns`` and ``market`` are matching (..., W) one-day return windows
+    (NaN where unobserved) and ``levels`` the (..., W + 1) value windows. VaR and CVaR are positive loss
+    fractions at ``confidence``; MAX_DRAWDOWN is the deepest peak-to-trough
+    decline as a negative fraction.
+    """
+    with np.errstate(divide="ignore", invalid="ignore"):
+        valid = ~np.isnan(returns)
+        n = valid.sum(axis=-1)
+        r = np.where(valid, returns, 0.0)
+        mean = r.sum(axis=-1) / n
+        dev = np.where(valid, returns - mean[..., None], 0.0)
+        vol = np.sqrt((dev**2).sum(axis=-1) / (n - 1)) * np.sqrt(periods_per_year)
+
+        # Beta against the market return over the same observed spans.
+        m = np.where(valid, market, 0.0)
+        m_mean = m.sum(axis=-1) / n
+        m_dev = np.where(valid, m - m_mean[..., None], 0.0)
+        beta = (dev * m_dev).sum(axis=-1) / (m_dev**2).sum(axis=-1)
+
+        cutoff = _nan_quantile_last(returns, 1.0 - confidence)
+        tail = valid & (returns <= cutoff[..., None])
+        cvar = -np.where(tail, returns, 0.0).sum(axis=-1) / tail.sum(axis=-1)
+
+        lv = np.where(levels > 0, levels, np.nan)
+        peak = np.fmax.accumulate(lv, axis=-1)
+        drawdown = np.nanmin(np.where(np.isnan(lv), 0.0, lv / peak - 1.0), axis=-1)
+
+    few = n < 2
+    return {
+        "VOLATILITY": np.where(few, np.nan, vol),
+        "MAX_DRAWDOWN": drawdown,
+        "VAR": np.where(few, np.nan, -cutoff),
+        "CVAR": np.where(few, np.nan, cvar),
+        "BETA": np.where(few | ~np.isfinite(beta), np.nan, beta),
+        "OBSERVATIONS": n,
+    }
+
+
+def _chunk_table(
+    args: Tuple[np.ndarray, np.ndarray, np.ndarray, int, float, int],
+) -> Dict[str, np.ndarray]:
+    values, observed, market, window, confidence, periods_per_year = args
+    r, m = span_returns(values, observed, market)
+    return window_stats(
+        r[:, -window:],
+        m[:, -window:],
+        values[:, -(window + 1) :],
+        confidence,
+        periods_per_year,
+    )
+
+
+def _chunk_rolling(
+    args: Tuple[np.ndarray, np.ndarray, np.ndarray, int, int, float, int],
+) -> Dict[str, np.ndarray]:
+    values, observed, market, window, step, confidence, periods_per_year = args
+    r, m = span_returns(values, observed, market)
+    # Evaluation points are aligned to the last day, every ``step`` days back.
+    r_win = sliding_window_view(r, window, axis=1)[:, ::-step][:, ::-1]
+    m_win = sliding_window_view(m, window, axis=1)[:, ::-step][:, ::-1]
+    level_win = sliding_window_view(values, window + 1, axis=1)[:, ::-step][:, ::-1]
+    return window_stats(r_win, m_win, level_win, confidence, periods_per_year)
+
+
+class RiskEngine:
+    """
+    Firm-wide risk metrics over a (portfolio x day) value matrix.
+
+    ``observed`` marks the days each portfolio was actually valued; returns
+    are taken between observations rather than across forward-filled days.
+    The market is the firm index of continuing portfolios, so BETA measures
+    each portfolio's sensitivity to the book as a whole. ``table`` and ``rolling``
+    results are cached per (window, confidence[, step]).
+    """
+
+    def __init__(
+        self,
+        values: pd.DataFrame,
+        observed: Optional[np.ndarray] = None,
+        confidence: float = DEFAULT_CONFIDENCE,
+        n_jobs: int = 1,
+    ):
+        self.portfolios = values.index
+        self.days = pd.DatetimeIndex(values.columns)
+        self._values = values.to_numpy(dtype=float)
+        if observed is None:
+            observed = np.ones(self._values.shape, dtype=bool)
+        self._observed = np.asarray(observed, dtype=bool)
+        self._market = market_level(self._values)
+        self.confidence = confidence
+        self.n_jobs = n_jobs
+        self._tables: Dict[Tuple[int, float], pd.DataFrame] = {}
+        self._rolling: Dict[Tuple[int, int, float], Dict[str, pd.DataFrame]] = {}
+
+    @classmethod
+    def from_value_series(cls, engine, **kwargs) -> "RiskEngine":
+        """Build from a ValueSeriesEngine's portfolio grid and snapshot days"""
+        grid, observed = engine.portfolio_grid()
+        return cls(grid, observed=observed, **kwargs)
+
+    def __len__(self) -> int:
+        return len(self.portfolios)
+
+    def _map_chunks(self, fn, make_args) -> Dict[str, np.ndarray]:
+        bounds = range(0, len(self.portfolios), CHUNK_SIZE)
+        jobs = [
+            make_args(
+                self._values[i : i + CHUNK_SIZE], self._observed[i : i + CHUNK_SIZE]
+            )
+            for i in bounds
+        ]
+        if self.n_jobs > 1 and len(jobs) > 1:
+            with ProcessPoolExecutor(max_workers=self.n_jobs) as pool:
+                parts: List[Dict[str, np.ndarray]] = list(pool.map(fn, jobs))
+        else:
+            parts = [fn(job) for job in jobs]
+        return {k: np.concatenate([p[k] for p in parts]) for k in METRIC_COLUMNS}
+
+    def table(self, window: int = WINDOWS["1Y"]) -> pd.DataFrame:
+        """Latest trailing-window metrics for every portfolio"""
+        key = (window, self.confidence)
+        if key in self._tables:
+            return self._tables[key]
+        if self._values.shape[1] <= window or not len(self.portfolios):
+            window = max(self._values.shape[1] - 1, 1)
+        stats = self._map_chunks(
+            _chunk_table,
+            lambda chunk, observed: (
+                chunk,
+                observed,
+                self._market,
+                window,
+                self.confidence,
+                PERIODS_PER_YEAR,
+            ),
+        )
+        latest = self._values[:, -1] if self._values.size else np.zeros(0)
+        table = pd.DataFrame({"PORTFOLIO_ID": self.portfolios, "LATEST_VALUE": latest})
+        for col in METRIC_COLUMNS:
+            table[col] = stats[col]
+        table["VAR_AMOUNT"] = table["VAR"] * table["LATEST_VALUE"]
+        table = table.reindex(columns=TABLE_COLUMNS)
+        self._tables[key] = table
+        return table
+
+    def rolling(
+        self, window: int = WINDOWS["3M"], step: int = 7
+    ) -> Dict[str, pd.DataFrame]:
+        """
+        Metric histories (portfolio x evaluation date) every ``step`` days,
+        each evaluated over the trailing ``window``.
+        """
+        key = (window, step, self.confidence)
+        if key in self._rolling:
+            return self._rolling[key]
+        if self._values.shape[1] <= window:
+            return {col: pd.DataFrame(index=self.portfolios) for col in METRIC_COLUMNS}
+        stats = self._map_chunks(
+            _chunk_rolling,
+            lambda chunk, observed: (
+                chunk,
+                observed,
+                self._market,
+                window,
+                step,
+                self.confidence,
+                PERIODS_PER_YEAR,
+            ),
+        )
+        n_eval = next(iter(stats.values())).shape[1]
+        dates = self.days[::-step][:n_eval][::-1]
+        result = {
+            col: pd.DataFrame(stats[col], index=self.portfolios, columns=dates)
+            for col in METRIC_COLUMNS
+        }
+        self._rolling[key] = result
+        return result
+
+    def firm_summary(self, window: int = WINDOWS["1Y"]) -> Dict[str, Optional[float]]:
+        """Value-weighted book-level view of the risk table"""
+        table = self.table(window)
+        weights = table["LATEST_VALUE"].clip(lower=0)
+        total = weights.sum()
+        if not total:
+            return {"VOLATILITY": None, "BETA": None, "VAR_AMOUNT": None}
+        vol = table["VOLATILITY"].fillna(0)
+        beta = table["BETA"].fillna(0)
+        return {
+            "VOLATILITY": float((vol * weights).sum() / total),
+            "BETA": float((beta * weights).sum() / total),
+            "VAR_AMOUNT": float(table["VAR_AMOUNT"].fillna(0).sum()),
+        }
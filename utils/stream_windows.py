@@ -0,0 +1,251 @@
+"""
+Streaming Window Aggregations for Wealth 360 Analytics Platform
+
+Counts and sums over an event stream in event-time windows, with memory
+that does not grow with how long the app runs. Events fall into tumbling
+buckets (e.g. one per minute) held in a fixed ring of slots; each bucket
+keeps totals plus per-key totals for a few dimensions (channel, advisor,
+transaction type). A sliding window over the newest buckets is maintained
+incrementally - events are added as they arrive and a bucket's totals are
+subtracted when it slides out - so every update is O(1) per event and key,
+and snapshots never rescan history.
+"""
+
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+OTHER_KEY = "Other"
+SERIES_COLUMNS = ["WINDOW_START", "COUNT", "SUM"]
+SLIDING_COLUMNS = ["DIMENSION", "KEY", "COUNT", "SUM"]
+
+# Chart granularities: label -> bucket width in seconds
+GRANULARITIES = {"Minute": 60, "Hour": 3_600, "Day": 86_400}
+
+
+class WindowedAggregator:
+    """
+    Tumbling buckets of ``bucket_seconds`` in a ring of ``buckets`` slots,
+    plus a sliding window over the newest ``slide`` buckets.
+
+    ``dimensions`` are the columns aggregated per key; at most ``max_keys``
+    distinct values are tracked per dimension, later ones are folded into
+    ``Other``. ``value_column`` is summed (rows count 1 each regardless).
+    Events older than the oldest retained bucket are counted in ``late``
+    and dropped.
+    """
+
+    def __init__(
+        self,
+        bucket_seconds: int = 60,
+        buckets: int = 30,
+        slide: int = 5,
+        dimensions: Sequence[str] = (),
+        value_column: Optional[str] = None,
+        max_keys: int = 256,
+    ):
+        self.bucket_ns = int(bucket_seconds * 1e9)
+        self.buckets = buckets
+        self.slide = min(slide, buckets)
+        self.dimensions = tuple(dimensions)
+        self.value_column = value_column
+        self.max_keys = max_keys
+        self.head: Optional[int] = None
+        self.late = 0
+        self.events = 0
+        self._slot_bucket = np.full(buckets, -1, dtype=np.int64)
+        self._count = np.zeros(buckets, dtype=np.int64)
+        self._sum = np.zeros(buckets, dtype=np.float64)
+        self._keyed: List[Dict[Tuple[str, Any], List[float]]] = [
+            {} for _ in range(buckets)
+        ]
+        self._known: Dict[str, set] = {dim: set() for dim in self.dimensions}
+        self._sliding: Dict[Tuple[str, Any], List[float]] = {}
+        self._sliding_count = 0
+        self._sliding_sum = 0.0
+        self._lock = threading.Lock()
+
+    # -----------------------------
+    # Window maintenance
+    # -----------------------------
+
+    def _in_slide(self, bucket: int) -> bool:
+        return bucket > self.head - self.slide
+
+    def _leave_slide(self, bucket: int) -> None:
+        slot = bucket % self.buckets
+        if bucket < 0 or self._slot_bucket[slot] != bucket:
+            return
+        self._sliding_count -= int(self._count[slot])
+        self._sliding_sum -= float(self._sum[slot])
+        for key, (count, total) in self._keyed[slot].items():
+            entry = self._sliding[key]
+            entry[0] -= count
+            entry[1] -= total
+            if entry[0] <= 0:
+                del self._sliding[key]
+
+    def _advance(self, bucket: int) -> None:
+        """Open buckets up to ``bucket``, evicting the ones that fall out of the ring"""
+        if self.head is None or bucket - self.head >= self.buckets:
+            # First event, or a gap longer than the ring: nothing survives
+            self._keyed = [{} for _ in range(self.buckets)]
+            self._sliding = {}
+            self._sliding_count, self._sliding_sum = 0, 0.0
+            for opened in range(bucket - self.buckets + 1, bucket + 1):
+                self._open(opened)
+            self.head = bucket
+            return
+        for nxt in range(self.head + 1, bucket + 1):
+            self._leave_slide(nxt - self.slide)
+            self._open(nxt)
+            self.head = nxt
+
+    def _open(self, bucket: int) -> None:
+        slot = bucket % self.buckets
+        self._slot_bucket[slot] = bucket
+        self._count[slot] = 0
+        self._sum[slot] = 0.0
+        self._keyed[slot] = {}
+
+    def _fold_keys(self, dim: str, values: pd.Series) -> pd.Series:
+        known = self._known[dim]
+        for key in values.unique():
+            if key not in known and len(known) < self.max_keys:
+                known.add(key)
+        return values.where(values.isin(known), OTHER_KEY)
+
+    # -----------------------------
+    # Ingestion
+    # -----------------------------
+
+    def ingest(self, events: pd.DataFrame) -> int:
+        """Add a batch of events (any order); returns how many were kept"""
+        if events.empty:
+            return 0
+        ts = pd.to_datetime(events["TIMESTAMP"]).astype("datetime64[ns]")
+        frame = pd.DataFrame(
+            {
+                "_BUCKET": ts.to_numpy().view("i8") // self.bucket_ns,
+                "_VALUE": (
+                    pd.to_numeric(events[self.value_column], errors="coerce")
+                    .fillna(0.0)
+                    .to_numpy()
+                    if self.value_column
+                    else 0.0
+                ),
+            }
+        )
+        with self._lock:
+            self._advance(int(frame["_BUCKET"].max()))
+            retained = frame["_BUCKET"] > self.head - self.buckets
+            self.late += int((~retained).sum())
+            frame = frame[retained]
+            for dim in self.dimensions:
+                frame[dim] = self._fold_keys(
+                    dim, events.loc[retained.to_numpy(), dim].fillna(OTHER_KEY)
+                ).to_numpy()
+            totals = frame.groupby("_BUCKET")["_VALUE"].agg(["size", "sum"])
+            for bucket, (count, total) in totals.iterrows():
+                slot = bucket % self.buckets
+                self._count[slot] += count
+                self._sum[slot] += total
+                if self._in_slide(bucket):
+                    self._sliding_count += int(count)
+                    self._sliding_sum += float(total)
+            for dim in self.dimensions:
+                grouped = frame.groupby(["_BUCKET", dim])["_VALUE"].agg(["size", "sum"])
+                for (bucket, key), (count, total) in grouped.iterrows():
+                    self._add_keyed(int(bucket), (dim, key), int(count), float(total))
+            self.events += len(frame)
+            return len(frame)
+
+    def _add_keyed(
+        self, bucket: int, key: Tuple[str, Any], count: int, total: float
+    ) -> None:
+        entry = self._keyed[bucket % self.buckets].setdefault(key, [0, 0.0])
+        entry[0] += count
+        entry[1] += total
+        if self._in_slide(bucket):
+            entry = self._sliding.setdefault(key, [0, 0.0])
+            entry[0] += count
+            entry[1] += total
+
+    # -----------------------------
+    # Snapshots
+    # -----------------------------
+
+    def series(self, dimension: Optional[str] = None) -> pd.DataFrame:
+        """
+        Tumbling-window counts and sums for every retained bucket, oldest
+        first and zero-filled; per KEY (long form) when ``dimension`` is given.
+        """
+        columns = SERIES_COLUMNS if dimension is None else ["KEY"] + SERIES_COLUMNS
+        with self._lock:
+            if self.head is None:
+                return pd.DataFrame(columns=columns)
+            buckets = np.arange(self.head - self.buckets + 1, self.head + 1)
+            slots = buckets % self.buckets
+            live = self._slot_bucket[slots] == buckets
+            starts = pd.to_datetime(buckets * self.bucket_ns)
+            if dimension is None:
+                return pd.DataFrame(
+                    {
+                        "WINDOW_START": starts,
+                        "COUNT": np.where(live, self._count[slots], 0),
+                        "SUM": np.where(live, self._sum[slots], 0.0),
+                    }
+                )
+            rows = [
+                (key[1], start, count, total)
+                for start, slot, ok in zip(starts, slots, live)
+                if ok
+                for key, (count, total) in self._keyed[slot].items()
+                if key[0] == dimension
+            ]
+        series = pd.DataFrame(rows, columns=columns)
+        if series.empty:
+            return series
+        grid = pd.MultiIndex.from_product(
+            [series["KEY"].unique(), starts], names=["KEY", "WINDOW_START"]
+        )
+        return (
+            series.set_index(["KEY", "WINDOW_START"])
+            .reindex(grid, fill_value=0)
+            .reset_index()
+        )
+
+    def sliding(self, dimension: Optional[str] = None) -> pd.DataFrame:
+        """Per-key totals over the sliding window, busiest first"""
+        with self._lock:
+            rows = [
+                (dim, key, count, total)
+                for (dim, key), (count, total) in self._sliding.items()
+                if dimension is None or dim == dimension
+            ]
+        return pd.DataFrame(rows, columns=SLIDING_COLUMNS).sort_values(
+            "COUNT", ascending=False, ignore_index=True
+        )
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Sliding-window totals and bounds plus ingestion counters"""
+        with self._lock:
+            if self.head is None:
+                return {
+                    "count": 0,
+                    "sum": 0.0,
+                    "start": None,
+                    "end": None,
+                    "events": 0,
+                    "late": self.late,
+                }
+            return {
+                "count": self._sliding_count,
+                "sum": self._sliding_sum,
+                "start": pd.Timestamp((self.head - self.slide + 1) * self.bucket_ns),
+                "end": pd.Timestamp((self.head + 1) * self.bucket_ns),
+                "events": self.events,
+                "late": self.late,
+            }
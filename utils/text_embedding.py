@@ -0,0 +1,111 @@
+"""
+Text Embeddings for Wealth 360 Analytics Platform
+
+Offline embedder used wherever the app needs vector similarity without a
+round trip to Cortex ``AI_EMBED``: word and word-bigram features are hashed
+into a fixed number of float32 buckets and L2-normalised, so cosine
+similarity is a dot product. Anything with the same ``embed`` signature
+(for example a Cortex-backed embedder) can be swapped in.
+"""
+
+import json
+import re
+import zlib
+from typing import Iterable, List
+
+import numpy as np
+
+from utils.llm_telemetry import timed_call
+
+DEFAULT_DIM = 256
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def normalize_text(text: str) -> str:
+    """Lower-cased words separated by single spaces (punctuation dropped)"""
+    return " ".join(_WORD.findall(str(text).lower()))
+
+
+class HashingEmbedder:
+    """
+    Feature-hashing bag of words and bigrams.
+
+    Each feature lands in ``crc32(feature) % dim`` with a sign taken from a
+    second hash bit, which keeps collisions from always adding up.
+    """
+
+    def __init__(self, dim: int = DEFAULT_DIM, bigrams: bool = True):
+        self.dim = dim
+        self.bigrams = bigrams
+
+    def _features(self, text: str) -> List[str]:
+        words = normalize_text(text).split()
+        features = list(words)
+        if self.bigrams:
+            features += [f"{a} {b}" for a, b in zip(words, words[1:])]
+        return features
+
+    def embed(self, texts: Iterable[str]) -> np.ndarray:
+        """(n x dim) float32 unit vectors (all-zero rows for empty texts)"""
+        texts = list(texts)
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature in self._features(text):
+                h = zlib.crc32(feature.encode("utf-8"))
+                out[row, h % self.dim] += 1.0 if (h >> 31) & 1 else -1.0
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        np.divide(out, norms, out=out, where=norms > 0)
+        return out
+
+    def embed_one(self, text: str) -> np.ndarray:
+        return self.embed([text])[0]
+
+
+class CortexEmbedder:
+    """
+    Cortex ``AI_EMBED`` in batches: each batch is bound as one JSON array and
+    flattened, so embedding n texts costs ceil(n / batch_size) queries.
+    """
+
+    SQL = """
+        SELECT f.INDEX AS IDX, AI_EMBED(?, f.VALUE::STRING)::ARRAY AS EMBEDDING
+        FROM TABLE(FLATTEN(INPUT => PARSE_JSON(?))) f
+        ORDER BY f.INDEX
+    """
+
+    def __init__(
+        self,
+        session_factory,
+        model: str = "snowflake-arctic-embed-m-v1.5",
+        dim: int = 768,
+        batch_size: int = 500,
+        telemetry=None,
+    ):
+        self.session_factory = session_factory
+        self.model = model
+        self.dim = dim
+        self.batch_size = batch_size
+        self.telemetry = telemetry
+
+    def embed(self, texts: Iterable[str]) -> np.ndarray:
+        texts = [str(t) for t in texts]
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        session = self.session_factory()
+        for start in range(0, len(texts), self.batch_size):
+            batch = texts[start : start + self.batch_size]
+            with timed_call(
+                self.telemetry, "embed", "cortex", self.model, "\n".join(batch)
+            ):
+                rows = session.sql(
+                    self.SQL, params=[self.model, json.dumps(batch)]
+                ).to_pandas()
+            for offset, vector in enumerate(rows.iloc[:, 1]):
+                values = json.loads(vector) if isinstance(vector, str) else vector
+                out[start + offset] = np.asarray(values, dtype=np.float32)
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        np.divide(out, norms, out=out, where=norms > 0)
+        return out
+
+    def embed_one(self, text: str) -> np.ndarray:
+        return self.embed([text])[0]
@@ -0,0 +1,304 @@
+"""
+Transaction Replay for Wealth 360 Analytics Platform
+
+Replays TRANSACTIONS - or a scaled synthetic copy of them - in timestamp
+order at a configurable speed-up, so the real-time views can be driven and
+load-tested without an external message bus. Replayed events land in a
+bounded, column-wise ring buffer addressed by monotonically increasing
+offsets; each consumer keeps its own offset and every poll returns only the
+events published since its last one. Publishing is pull-driven: the replay
+clock is advanced on each poll, and a batch is written with vectorized
+slices, so thousands of events per second cost a few array copies.
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, Iterable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_CAPACITY = 65_536
+DEFAULT_SPEEDUP = 86_400.0  # one day of event time per second
+RATE_WINDOW_SECONDS = 10.0
+# Consumers that have not polled for this long are forgotten
+CONSUMER_IDLE_SECONDS = 900.0
+
+# Replay speed-ups offered in the UI: label -> event seconds per wall second
+SPEEDUPS = {
+    "1 hour / sec": 3_600.0,
+    "1 day / sec": 86_400.0,
+    "1 week / sec": 604_800.0,
+    "30 days / sec": 2_592_000.0,
+}
+
+
+def synthetic_transactions(
+    template: pd.DataFrame, scale: int, seed: int = 0
+) -> pd.DataFrame:
+    """
+    ``scale`` times as many transactions over the same period: the original
+    rows plus ``scale - 1`` copies with timestamps redrawn uniformly across
+    the template's span, amounts perturbed by +/-25% (lognormal) and IDs
+    suffixed ``-S<n>``. Deterministic for a given ``seed``. A frame without
+    a TIMESTAMP column (a failed query) gives an empty frame.
+    """
+    if "TIMESTAMP" not in template:
+        return template.iloc[0:0].assign(TIMESTAMP=pd.Series(dtype="datetime64[ns]"))
+    if scale <= 1 or template.empty:
+        return template.sort_values("TIMESTAMP", ignore_index=True)
+    rng = np.random.default_rng(seed)
+    ts = pd.to_datetime(template["TIMESTAMP"])
+    first, span = ts.min(), ts.max() - ts.min()
+    copies = [template.assign(TIMESTAMP=ts)]
+    for copy in range(1, scale):
+        factor = rng.lognormal(0.0, 0.25, len(template))
+        frame = template.assign(
+            TIMESTAMP=first + span * rng.random(len(template)),
+            TRANSACTION_ID=template["TRANSACTION_ID"].astype(str) + f"-S{copy}",
+        )
+        for col in ("QUANTITY", "TOTAL_AMOUNT"):
+            if col in frame:
+                frame[col] = frame[col] * factor
+        copies.append(frame)
+    return pd.concat(copies, ignore_index=True).sort_values(
+        "TIMESTAMP", kind="stable", ignore_index=True
+    )
+
+
+# -----------------------------
+# Ring buffer
+# -----------------------------
+
+
+class RingBuffer:
+    """
+    Fixed-capacity event store, one preallocated array per column. Offsets
+    grow forever; only the newest ``capacity`` events are retained, so
+    ``start`` is the oldest offset still readable and ``end`` the next one
+    to be written.
+    """
+
+    def __init__(self, dtypes: Dict[str, np.dtype], capacity: int = DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self._slots = {col: np.empty(capacity, dtype=dt) for col, dt in dtypes.items()}
+        self.end = 0
+
+    @property
+    def start(self) -> int:
+        return max(0, self.end - self.capacity)
+
+    def __len__(self) -> int:
+        return self.end - self.start
+
+    def append(self, batch: Dict[str, np.ndarray]) -> None:
+        """Write equal-length column arrays; overflow evicts the oldest events"""
+        size = len(next(iter(batch.values()), ()))
+        if size > self.capacity:
+            self.end += size - self.capacity
+            batch = {col: values[-self.capacity :] for col, values in batch.items()}
+            size = self.capacity
+        slots = (self.end + np.arange(size)) % self.capacity
+        for col, values in batch.items():
+            self._slots[col][slots] = values
+        self.end += size
+
+    def read(self, offset: int, limit: int) -> Tuple[pd.DataFrame, int, int]:
+        """Up to ``limit`` events from ``offset``, the next offset and the evicted count"""
+        first = max(offset, self.start)
+        last = min(self.end, first + limit)
+        slots = np.arange(first, last) % self.capacity
+        frame = pd.DataFrame(
+            {col: slots_[slots] for col, slots_ in self._slots.items()}
+        )
+        frame.index = pd.RangeIndex(first, last, name="OFFSET")
+        return frame, last, first - offset
+
+
+# -----------------------------
+# Replay service
+# -----------------------------
+
+
+class TransactionReplay:
+    """
+    Event-time replay of a transaction table into a ``RingBuffer``.
+
+    The replay clock starts at the first TIMESTAMP and advances ``speedup``
+    event seconds per wall second; every poll publishes the events it has
+    passed. With ``loop`` the table repeats end to end, timestamps shifted
+    by one span per cycle and IDs suffixed ``-R<cycle>``. Consumers are
+    identified by name; a new one starts ``backlog`` events back from the
+    newest (or at the oldest retained event when ``backlog`` is None), and
+    one idle for ``idle_seconds`` is dropped. Events without a TIMESTAMP
+    column replay as an empty table.
+    """
+
+    def __init__(
+        self,
+        events: pd.DataFrame,
+        speedup: float = DEFAULT_SPEEDUP,
+        capacity: int = DEFAULT_CAPACITY,
+        loop: bool = True,
+        clock: Callable[[], float] = time.monotonic,
+        idle_seconds: float = CONSUMER_IDLE_SECONDS,
+    ):
+        if "TIMESTAMP" not in events:
+            events = events.iloc[0:0].assign(
+                TIMESTAMP=pd.Series(dtype="datetime64[ns]")
+            )
+        events = events.assign(
+            TIMESTAMP=pd.to_datetime(events["TIMESTAMP"]).astype("datetime64[ns]")
+        )
+        events = events.sort_values("TIMESTAMP", kind="stable", ignore_index=True)
+        self._columns = {col: events[col].to_numpy() for col in events.columns}
+        self._times = events["TIMESTAMP"].to_numpy(dtype="datetime64[ns]").view("i8")
+        self._ids = self._columns.get("TRANSACTION_ID")
+        if self._ids is not None:
+            self._ids = self._ids.astype(str).astype(object)
+        self.size = len(events)
+        # One cycle = the table's span plus a second, so cycles never overlap
+        self.period = int(self._times[-1] - self._times[0]) + 10**9 if self.size else 0
+        self.loop = loop
+        self.clock = clock
+        self.buffer = RingBuffer(
+            {col: values.dtype for col, values in self._columns.items()}, capacity
+        )
+        self._lock = threading.Lock()
+        self._offsets: Dict[str, int] = {}
+        self._dropped: Dict[str, int] = {}
+        self._seen: Dict[str, float] = {}
+        self.idle_seconds = idle_seconds
+        self._rate: Deque[Tuple[float, int]] = deque()
+        self._anchor_wall = clock()
+        self._anchor_event = int(self._times[0]) if self.size else 0
+        self.speedup = speedup
+
+    # -----------------------------
+    # Publishing
+    # -----------------------------
+
+    def _position(self, now: float) -> int:
+        """Replay clock (ns of event time) at wall time ``now``"""
+        return self._anchor_event + int((now - self._anchor_wall) * self.speedup * 1e9)
+
+    def set_speedup(self, speedup: float) -> None:
+        """Change speed from the current replay position onwards"""
+        with self._lock:
+            now = self.clock()
+            self._anchor_event = self._position(now)
+            self._anchor_wall = now
+            self.speedup = speedup
+
+    def align(self, other: "TransactionReplay") -> None:
+        """Follow ``other``'s replay clock (position and speed)"""
+        with self._lock:
+            self._anchor_wall = other._anchor_wall
+            self._anchor_event = other._anchor_event
+            self.speedup = other.speedup
+
+    def _due(self, position: int) -> int:
+        """Total events (across cycles) with event time at or before ``position``"""
+        if not self.size:
+            return 0
+        elapsed = position - int(self._times[0])
+        cycle = max(elapsed, 0) // self.period if self.loop else 0
+        within = np.searchsorted(
+            self._times, position - cycle * self.period, side="right"
+        )
+        return int(cycle * self.size + within)
+
+    def _pump(self) -> None:
+        now = self.clock()
+        due = self._due(self._position(now))
+        published = self.buffer.end
+        if due > published:
+            # Skip straight past anything that would be evicted in this batch
+            first = max(published, due - self.buffer.capacity)
+            events = np.arange(first, due)
+            rows, cycles = events % self.size, events // self.size
+            batch = {col: values[rows] for col, values in self._columns.items()}
+            batch["TIMESTAMP"] = (self._times[rows] + cycles * self.period).view(
+                "datetime64[ns]"
+            )
+            if self._ids is not None and cycles.any():
+                suffix = np.where(cycles > 0, np.char.add("-R", cycles.astype(str)), "")
+                batch["TRANSACTION_ID"] = self._ids[rows] + suffix.astype(object)
+            self.buffer.end = first
+            self.buffer.append(batch)
+        self._rate.append((now, self.buffer.end))
+        while now - self._rate[0][0] > RATE_WINDOW_SECONDS:
+            self._rate.popleft()
+
+    # -----------------------------
+    # Consumers
+    # -----------------------------
+
+    def _forget(self, consumer: str) -> None:
+        self._offsets.pop(consumer, None)
+        self._dropped.pop(consumer, None)
+        self._seen.pop(consumer, None)
+
+    def _touch(self, consumer: str) -> None:
+        """Mark ``consumer`` active and drop consumers idle for too long"""
+        now = self.clock()
+        self._seen[consumer] = now
+        for name, seen in list(self._seen.items()):
+            if now - seen > self.idle_seconds:
+                self._forget(name)
+
+    def poll(
+        self,
+        consumer: str,
+        max_events: Optional[int] = None,
+        backlog: Optional[int] = None,
+    ) -> pd.DataFrame:
+        """Events published since ``consumer``'s last poll, oldest first"""
+        with self._lock:
+            self._pump()
+            self._touch(consumer)
+            if consumer not in self._offsets:
+                start = self.buffer.start
+                if backlog is not None:
+                    start = max(start, self.buffer.end - backlog)
+                self._offsets[consumer] = start
+                self._dropped[consumer] = 0
+            frame, offset, dropped = self.buffer.read(
+                self._offsets[consumer], max_events or self.buffer.capacity
+            )
+            self._offsets[consumer] = offset
+            self._dropped[consumer] += dropped
+            return frame
+
+    def seek(self, consumer: str, offset: int) -> None:
+        with self._lock:
+            self._touch(consumer)
+            self._offsets[consumer] = offset
+            self._dropped.setdefault(consumer, 0)
+
+    def close(self, consumers: Iterable[str]) -> None:
+        with self._lock:
+            for consumer in consumers:
+                self._forget(consumer)
+
+    def stats(self, consumer: Optional[str] = None) -> Dict[str, object]:
+        """Published/retained counts, recent publish rate and consumer lag"""
+        with self._lock:
+            self._pump()
+            (t0, n0), (t1, n1) = self._rate[0], self._rate[-1]
+            stats = {
+                "published": self.buffer.end,
+                "retained": len(self.buffer),
+                "capacity": self.buffer.capacity,
+                "events_per_second": (n1 - n0) / (t1 - t0) if t1 > t0 else 0.0,
+                "replay_time": (
+                    pd.Timestamp(self._position(t1)) if self.size else None
+                ),
+                "speedup": self.speedup,
+                "consumers": len(self._offsets),
+            }
+            if consumer in self._offsets:
+                stats["lag"] = self.buffer.end - self._offsets[consumer]
+                stats["dropped"] = self._dropped[consumer]
+            return stats
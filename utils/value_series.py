@@ -0,0 +1,346 @@
+"""
+Portfolio Value Time Series for Wealth 360 Analytics Platform
+
+Builds a dense daily value grid (portfolio x day) from POSITION_HISTORY
+snapshots, carrying each portfolio's last snapshot forward, and rolls it up to
+client and firm level. As-of, period-to-date, period-over-period and rolling
+queries are answered with ``searchsorted`` over the sorted day axis, so trend
+charts at any horizon need no further warehouse scans.
+"""
+
+import threading
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+SNAPSHOT_COLUMNS = ["PORTFOLIO_ID", "CLIENT_ID", "TIMESTAMP", "MARKET_VALUE"]
+
+LEVELS = ("portfolio", "client", "firm")
+
+PERIOD_FREQ = {"YTD": "Y", "QTD": "Q", "MTD": "M"}
+
+CHANGE_COLUMNS = ["START_VALUE", "END_VALUE", "CHANGE", "CHANGE_PCT"]
+
+
+class ValueSeriesEngine:
+    """
+    Dense daily value series per portfolio, client and firm.
+
+    ``load`` takes one row per portfolio snapshot (PORTFOLIO_ID, CLIENT_ID,
+    TIMESTAMP, MARKET_VALUE). Each day on the grid holds the value of the
+    latest snapshot at or before that day - the same semantics as an ASOF JOIN
+    on TIMESTAMP - and portfolios contribute zero before their first snapshot.
+    ``update`` merges newer snapshots and recomputes only the affected days.
+    The engine is shared across Streamlit sessions, so updates and queries
+    hold a lock and never see a grid in the middle of a resize.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.RLock()
+        self.clear()
+
+    def clear(self) -> None:
+        """Drop all loaded snapshots"""
+        with self._lock:
+            self.days = np.array([], dtype="datetime64[D]")
+            self.portfolios = pd.Index([], name="PORTFOLIO_ID")
+            self.portfolio_clients = pd.Series(dtype=object, name="CLIENT_ID")
+            self._values = np.zeros((0, 0))
+            self._observed = np.zeros((0, 0), dtype=bool)
+            self._client_values: Optional[pd.DataFrame] = None
+            self.watermark: Optional[pd.Timestamp] = None
+
+    def __len__(self) -> int:
+        return len(self.portfolios)
+
+    # -----------------------------
+    # Loading and incremental refresh
+    # -----------------------------
+
+    def load(self, snapshots: pd.DataFrame) -> None:
+        """Build the grid from scratch"""
+        with self._lock:
+            self.clear()
+            self.update(snapshots)
+
+    def update(self, snapshots: pd.DataFrame) -> int:
+        """
+        Merge new or restated snapshots into the grid.
+
+        Only days from the earliest incoming snapshot onward are recomputed;
+        the day before it seeds the carry-forward. Returns the number of
+        portfolio-days that received a new observation.
+        """
+        with self._lock:
+            obs = self._daily_observations(snapshots)
+            if obs.empty:
+                return 0
+
+            obs_days = obs["DAY"].to_numpy().astype("datetime64[D]")
+            first_day = obs_days.min()
+            last_day = obs_days.max()
+            if len(self.days):
+                first_day = min(first_day, self.days[0])
+                last_day = max(last_day, self.days[-1])
+            self._resize(obs, first_day, last_day)
+
+            rows = self.portfolios.get_indexer(obs["PORTFOLIO_ID"])
+            cols = (obs_days - self.days[0]).astype(np.int64)
+            start = int(cols.min())
+
+            # Observed cells hold the snapshot value, others are carried forward
+            # from the nearest observed day to their left (or the seed column).
+            window = np.full((len(self.portfolios), len(self.days) - start), np.nan)
+            window[rows, cols - start] = obs["MARKET_VALUE"].to_numpy(dtype=float)
+            keep = self._observed[:, start:] & np.isnan(window)
+            window[keep] = self._values[:, start:][keep]
+            seed = (
+                self._values[:, start - 1] if start else np.zeros(len(self.portfolios))
+            )
+            observed = ~np.isnan(window)
+            last_seen = np.where(observed, np.arange(window.shape[1]), -1)
+            last_seen = np.maximum.accumulate(last_seen, axis=1)
+            filled = np.take_along_axis(window, np.maximum(last_seen, 0), axis=1)
+            filled = np.where(last_seen < 0, seed[:, None], filled)
+
+            self._values[:, start:] = filled
+            self._observed[:, start:] |= observed
+            self._client_values = None
+
+            latest = pd.to_datetime(snapshots["TIMESTAMP"]).max()
+            if self.watermark is None or latest > self.watermark:
+                self.watermark = latest
+            return len(obs)
+
+    def _daily_observations(self, snapshots: pd.DataFrame) -> pd.DataFrame:
+        if snapshots.empty:
+            return pd.DataFrame(columns=["PORTFOLIO_ID", "CLIENT_ID", "DAY"])
+        frame = snapshots.reindex(columns=SNAPSHOT_COLUMNS).copy()
+        frame["TIMESTAMP"] = pd.to_datetime(frame["TIMESTAMP"])
+        frame = frame.dropna(subset=["PORTFOLIO_ID", "TIMESTAMP"])
+        frame["DAY"] = frame["TIMESTAMP"].to_numpy("datetime64[D]")
+        # Several snapshots on one day: the latest one is that day's value.
+        frame = frame.sort_values(["PORTFOLIO_ID", "TIMESTAMP"])
+        frame = frame.drop_duplicates(["PORTFOLIO_ID", "DAY"], keep="last")
+        frame["MARKET_VALUE"] = frame["MARKET_VALUE"].astype(float).fillna(0.0)
+        return frame
+
+    def _resize(
+        self, obs: pd.DataFrame, first_day: np.datetime64, last_day: np.datetime64
+    ) -> None:
+        new_days = np.arange(first_day, last_day + 1, dtype="datetime64[D]")
+        new_ports = obs.loc[
+            ~obs["PORTFOLIO_ID"].isin(self.portfolios), "PORTFOLIO_ID"
+        ].unique()
+        if len(new_days) == len(self.days) and not len(new_ports):
+            self._remember_clients(obs)
+            return
+
+        values = np.zeros((len(self.portfolios) + len(new_ports), len(new_days)))
+        observed = np.zeros(values.shape, dtype=bool)
+        if len(self.days):
+            lead = int((self.days[0] - new_days[0]).astype(np.int64))
+            span = slice(lead, lead + len(self.days))
+            values[: len(self.portfolios), span] = self._values
+            observed[: len(self.portfolios), span] = self._observed
+            # Days appended after the old grid carry the last known value.
+            values[: len(self.portfolios), lead + len(self.days) :] = self._values[
+                :, -1:
+            ]
+        self._values = values
+        self._observed = observed
+        self.days = new_days
+        self.portfolios = self.portfolios.append(pd.Index(new_ports))
+        self.portfolios.name = "PORTFOLIO_ID"
+        self._remember_clients(obs)
+
+    def _remember_clients(self, obs: pd.DataFrame) -> None:
+        owners = obs.dropna(subset=["CLIENT_ID"]).drop_duplicates(
+            "PORTFOLIO_ID", keep="last"
+        )
+        owners = owners.set_index("PORTFOLIO_ID")["CLIENT_ID"]
+        merged = pd.concat(
+            [self.portfolio_clients.drop(owners.index, errors="ignore"), owners]
+        )
+        self.portfolio_clients = merged.reindex(self.portfolios)
+        self._client_values = None
+
+    # -----------------------------
+    # Level roll-ups
+    # -----------------------------
+
+    def _matrix(self, level: str) -> pd.DataFrame:
+        """Values at ``level`` as a (entity x day) frame"""
+        if level not in LEVELS:
+            raise ValueError(f"level must be one of {LEVELS}, got {level!r}")
+        if level == "portfolio":
+            return pd.DataFrame(self._values, index=self.portfolios)
+        if level == "client":
+            if self._client_values is None:
+                grid = pd.DataFrame(self._values, index=self.portfolios)
+                owners = self.portfolio_clients.fillna("UNASSIGNED").to_numpy()
+                self._client_values = grid.groupby(owners).sum()
+                self._client_values.index.name = "CLIENT_ID"
+            return self._client_values
+        firm = pd.DataFrame(self._values.sum(axis=0)[None, :], index=["FIRM"])
+        firm.index.name = "FIRM"
+        return firm
+
+    def _positions(self, when) -> np.ndarray:
+        """Grid column at or before each timestamp (-1 before the grid starts)"""
+        stamps = pd.to_datetime(pd.Series(np.atleast_1d(when)))
+        days = stamps.to_numpy("datetime64[D]")
+        return np.searchsorted(self.days, days, side="right") - 1
+
+    def _values_at(self, level: str, when) -> np.ndarray:
+        matrix = self._matrix(level).to_numpy()
+        pos = self._positions(when)
+        out = np.zeros((matrix.shape[0], len(pos)))
+        valid = pos >= 0
+        out[:, valid] = matrix[:, pos[valid]]
+        return out
+
+    # -----------------------------
+    # Queries
+    # -----------------------------
+
+    def value_as_of(self, when, level: str = "portfolio") -> pd.Series:
+        """Value of every entity at ``level`` as of a timestamp"""
+        with self._lock:
+            index = self._matrix(level).index
+            return pd.Series(
+                self._values_at(level, when)[:, 0], index=index, name="VALUE"
+            )
+
+    def change(self, start, end, level: str = "portfolio") -> pd.DataFrame:
+        """Value change between two as-of timestamps"""
+        with self._lock:
+            values = self._values_at(level, [start, end])
+            start_value, end_value = values[:, 0], values[:, 1]
+            with np.errstate(divide="ignore", invalid="ignore"):
+                pct = np.where(
+                    start_value != 0, (end_value - start_value) / start_value, np.nan
+                )
+            return pd.DataFrame(
+                {
+                    "START_VALUE": start_value,
+                    "END_VALUE": end_value,
+                    "CHANGE": end_value - start_value,
+                    "CHANGE_PCT": pct,
+                },
+                index=self._matrix(level).index,
+            )
+
+    def period_to_date(
+        self, period: str = "YTD", as_of=None, level: str = "firm"
+    ) -> pd.DataFrame:
+        """YTD / QTD / MTD change, measured from the as-of value at period start"""
+        if period not in PERIOD_FREQ:
+            raise ValueError(f"period must be one of {list(PERIOD_FREQ)}")
+        as_of = pd.Timestamp.now() if as_of is None else pd.Timestamp(as_of)
+        start = as_of.to_period(PERIOD_FREQ[period]).start_time
+        return self.change(start, as_of, level)
+
+    def trend(
+        self,
+        start=None,
+        end=None,
+        freq: str = "D",
+        level: str = "firm",
+    ) -> pd.DataFrame:
+        """
+        Values sampled at the end of each ``freq`` period ("D", "W", "M", "Q",
+        "Y") between ``start`` and ``end``, one column per entity, indexed by
+        DATE.
+        """
+        with self._lock:
+            if not len(self.days):
+                return pd.DataFrame()
+            start = pd.Timestamp(self.days[0] if start is None else start).normalize()
+            end = pd.Timestamp(self.days[-1] if end is None else end).normalize()
+            periods = pd.period_range(start, end, freq=freq)
+            dates = periods.to_timestamp(how="end").normalize()
+            # The last (partial) period is sampled at ``end`` itself.
+            dates = dates.where(dates <= end, end)
+            values = self._values_at(level, dates)
+            frame = pd.DataFrame(
+                values.T, index=dates, columns=self._matrix(level).index
+            )
+            frame.index.name = "DATE"
+            return frame
+
+    def portfolio_grid(self) -> Tuple[pd.DataFrame, np.ndarray]:
+        """
+        Copy of the (portfolio x day) value grid, columns as timestamps, and
+        of the matching mask of days each portfolio was actually valued.
+        """
+        with self._lock:
+            grid = pd.DataFrame(
+                self._values.copy(),
+                index=self.portfolios,
+                columns=pd.DatetimeIndex(self.days.astype("datetime64[ns]")),
+            )
+            return grid, self._observed.copy()
+
+    def series(self, entity_id, level: str = "portfolio") -> pd.DataFrame:
+        """Full daily series (DATE, VALUE) of one entity at ``level``"""
+        with self._lock:
+            matrix = self._matrix(level)
+            if entity_id not in matrix.index:
+                return pd.DataFrame(columns=["DATE", "VALUE"])
+            return pd.DataFrame(
+                {
+                    "DATE": self.days.astype("datetime64[ns]"),
+                    "VALUE": matrix.loc[entity_id].to_numpy(),
+                }
+            )
+
+    def period_over_period(
+        self, freq: str = "M", start=None, end=None, level: str = "firm"
+    ) -> pd.DataFrame:
+        """Percentage change between consecutive period-end values"""
+        return self.trend(start, end, freq=freq, level=level).pct_change()
+
+    def rolling(
+        self,
+        window_days: int,
+        stat: str = "mean",
+        start=None,
+        end=None,
+        level: str = "firm",
+    ) -> pd.DataFrame:
+        """
+        Rolling ``mean`` or ``change`` over the trailing ``window_days`` days,
+        computed on the dense grid with cumulative sums / shifted differences.
+        """
+        daily = self.trend(level=level)
+        if daily.empty:
+            return daily
+        values = daily.to_numpy()
+        if stat == "mean":
+            csum = np.vstack([np.zeros((1, values.shape[1])), values.cumsum(axis=0)])
+            counts = np.minimum(np.arange(1, len(values) + 1), window_days)
+            idx = np.arange(1, len(values) + 1)
+            out = (csum[idx] - csum[idx - counts]) / counts[:, None]
+        elif stat == "change":
+            out = np.full(values.shape, np.nan)
+            out[window_days:] = values[window_days:] - values[:-window_days]
+        else:
+            raise ValueError("stat must be 'mean' or 'change'")
+        result = pd.DataFrame(out, index=daily.index, columns=daily.columns)
+        lo = daily.index[0] if start is None else pd.Timestamp(start)
+        hi = daily.index[-1] if end is None else pd.Timestamp(end)
+        return result.loc[lo:hi]
+
+    def summary(self) -> Dict[str, object]:
+        """Grid dimensions for diagnostics"""
+        with self._lock:
+            return {
+                "portfolios": len(self.portfolios),
+                "clients": int(self.portfolio_clients.nunique()),
+                "days": len(self.days),
+                "first_day": pd.Timestamp(self.days[0]) if len(self.days) else None,
+                "last_day": pd.Timestamp(self.days[-1]) if len(self.days) else None,
+                "watermark": self.watermark,
+            }
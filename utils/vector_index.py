@@ -0,0 +1,455 @@
+"""
+Vector Index for Wealth 360 Analytics Platform
+
+In-process approximate nearest-neighbour search over float32 embeddings,
+used for the "Find Similar Clients" search. ``IVFIndex`` clusters vectors
+with spherical k-means and scans only the few inverted lists closest to the
+query; vectors added after the last (re)build sit in a small delta buffer
+that is scanned exactly until it is folded into the lists.
+``ClientEmbeddingIndex`` turns CLIENTS rows into profile text, embeds only
+clients whose profile changed, and persists vectors and profile hashes to
+one ``.npz`` file.
+"""
+
+import os
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from utils.text_embedding import HashingEmbedder
+
+DEFAULT_PROBES = 12
+# Below this many live vectors the index is searched exactly
+MIN_TRAIN = 2048
+KMEANS_ITERATIONS = 8
+KMEANS_SAMPLE_PER_LIST = 32
+# Delta buffer is folded into the inverted lists past max(MIN, FRACTION * indexed)
+DELTA_MIN = 4096
+DELTA_FRACTION = 0.05
+RETRAIN_GROWTH = 4
+ASSIGN_BATCH = 8192
+
+PROFILE_COLUMNS = [
+    "CLIENT_ID",
+    "RISK_TOLERANCE",
+    "AGE",
+    "FINANCIAL_GOALS",
+    "OCCUPATION",
+    "LIFE_EVENT",
+    "MARITAL_STATUS",
+    "LAST_UPDATE_TIMESTAMP",
+]
+
+
+def _unit(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+
+
+class IVFIndex:
+    """
+    Inverted-file index for cosine similarity (inner product of unit vectors).
+
+    Rows live in append-only float32 arrays; upserting an id marks its old
+    row dead. Rows below ``indexed`` are sorted by list, with ``offsets``
+    bounding each list, so a probe is a contiguous slice; rows at or above
+    it are the exact-scan delta. Lists are rebuilt (dropping dead rows) when
+    the delta passes its threshold, and k-means is re-run once the index has
+    grown RETRAIN_GROWTH-fold since it was last trained. Updates swap the
+    arrays, so updates, searches and saves are serialised by a lock.
+    """
+
+    def __init__(
+        self,
+        dim: int,
+        n_lists: Optional[int] = None,
+        n_probe: int = DEFAULT_PROBES,
+        min_train: int = MIN_TRAIN,
+        seed: int = 0,
+    ):
+        self.dim = dim
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.min_train = min_train
+        self.seed = seed
+        self.centroids: Optional[np.ndarray] = None
+        self._vectors = np.zeros((0, dim), dtype=np.float32)
+        self._ids = np.empty(0, dtype=object)
+        self._alive = np.zeros(0, dtype=bool)
+        self._assign = np.zeros(0, dtype=np.int32)
+        self._rows: Dict[str, int] = {}
+        self._size = 0
+        self._indexed = 0
+        self._offsets = np.zeros(1, dtype=np.int64)
+        self._trained_size = 0
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __contains__(self, item_id: str) -> bool:
+        return str(item_id) in self._rows
+
+    @property
+    def trained(self) -> bool:
+        return self.centroids is not None
+
+    # -----------------------------
+    # Storage
+    # -----------------------------
+
+    def _reserve(self, extra: int) -> None:
+        needed = self._size + extra
+        capacity = len(self._vectors)
+        if needed <= capacity:
+            return
+        capacity = max(needed, 2 * capacity, 1024)
+        vectors = np.zeros((capacity, self.dim), dtype=np.float32)
+        vectors[: self._size] = self._vectors[: self._size]
+        self._vectors = vectors
+        self._ids = np.resize(self._ids, capacity)
+        self._alive = np.concatenate(
+            [self._alive[: self._size], np.zeros(capacity - self._size, dtype=bool)]
+        )
+        self._assign = np.resize(self._assign, capacity)
+
+    def _nearest(self, vectors: np.ndarray) -> np.ndarray:
+        out = np.empty(len(vectors), dtype=np.int32)
+        for start in range(0, len(vectors), ASSIGN_BATCH):
+            block = vectors[start : start + ASSIGN_BATCH]
+            out[start : start + len(block)] = np.argmax(
+                block @ self.centroids.T, axis=1
+            )
+        return out
+
+    def _rebuild_lists(self) -> None:
+        """Drop dead rows and sort the rest by list into contiguous slices"""
+        live = np.flatnonzero(self._alive[: self._size])
+        if self.trained:
+            live = live[np.argsort(self._assign[live], kind="stable")]
+            counts = np.bincount(self._assign[live], minlength=len(self.centroids))
+            self._offsets = np.concatenate([[0], np.cumsum(counts)])
+        self._vectors = self._vectors[live]
+        self._ids = self._ids[live]
+        self._assign = self._assign[live]
+        self._alive = np.ones(len(live), dtype=bool)
+        self._size = len(live)
+        self._rows = {item_id: row for row, item_id in enumerate(self._ids)}
+        self._indexed = self._size if self.trained else 0
+
+    # -----------------------------
+    # Build and update
+    # -----------------------------
+
+    def train(self) -> None:
+        """Spherical k-means over a sample of the live vectors, then re-list"""
+        with self._lock:
+            self._train()
+
+    def _train(self) -> None:
+        live = np.flatnonzero(self._alive[: self._size])
+        n_lists = self.n_lists or max(1, int(np.sqrt(len(live))))
+        n_lists = min(n_lists, len(live))
+        rng = np.random.default_rng(self.seed)
+        sample_size = min(len(live), n_lists * KMEANS_SAMPLE_PER_LIST)
+        sample = self._vectors[rng.choice(live, sample_size, replace=False)]
+        centroids = sample[rng.choice(sample_size, n_lists, replace=False)].copy()
+        for _ in range(KMEANS_ITERATIONS):
+            labels = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, sample)
+            empty = np.bincount(labels, minlength=n_lists) == 0
+            sums[empty] = centroids[empty]
+            centroids = _unit(sums)
+        self.centroids = centroids
+        self._assign[live] = self._nearest(self._vectors[live])
+        self._trained_size = len(live)
+        self._rebuild_lists()
+
+    def add(self, ids: Iterable, vectors: np.ndarray) -> None:
+        """Insert or replace vectors (normalised on the way in)"""
+        ids = np.asarray([str(i) for i in ids], dtype=object)
+        vectors = _unit(np.atleast_2d(vectors))
+        if len(ids) != len(vectors):
+            raise ValueError("ids and vectors differ in length")
+        _, last = np.unique(ids[::-1], return_index=True)
+        keep = np.sort(len(ids) - 1 - last)
+        ids, vectors = ids[keep], vectors[keep]
+        if not len(ids):
+            return
+        with self._lock:
+            self._add(ids, vectors)
+
+    def _add(self, ids: np.ndarray, vectors: np.ndarray) -> None:
+        for item_id in ids:
+            row = self._rows.get(item_id)
+            if row is not None:
+                self._alive[row] = False
+        self._reserve(len(ids))
+        rows = np.arange(self._size, self._size + len(ids))
+        self._vectors[rows] = vectors
+        self._ids[rows] = ids
+        self._alive[rows] = True
+        self._rows.update(zip(ids, rows.tolist()))
+        if self.trained:
+            self._assign[rows] = self._nearest(vectors)
+        self._size += len(ids)
+
+        if len(self._rows) >= self.min_train and (
+            not self.trained or len(self._rows) > RETRAIN_GROWTH * self._trained_size
+        ):
+            self._train()
+        elif self.trained and self._size - self._indexed > max(
+            DELTA_MIN, DELTA_FRACTION * self._indexed
+        ):
+            self._rebuild_lists()
+
+    def remove(self, ids: Iterable) -> int:
+        removed = 0
+        with self._lock:
+            for item_id in ids:
+                row = self._rows.pop(str(item_id), None)
+                if row is not None:
+                    self._alive[row] = False
+                    removed += 1
+        return removed
+
+    def vector(self, item_id: str) -> Optional[np.ndarray]:
+        with self._lock:
+            row = self._rows.get(str(item_id))
+            return None if row is None else self._vectors[row].copy()
+
+    # -----------------------------
+    # Search
+    # -----------------------------
+
+    def _ranges(self, query: np.ndarray, n_probe: int) -> List[Tuple[int, int]]:
+        """Row ranges to scan: the probed lists plus the delta buffer"""
+        if not self.trained:
+            return [(0, self._size)]
+        scores = self.centroids @ query
+        n_probe = min(n_probe, len(scores))
+        probes = np.argpartition(-scores, n_probe - 1)[:n_probe]
+        ranges = [(self._offsets[p], self._offsets[p + 1]) for p in probes]
+        return ranges + [(self._indexed, self._size)]
+
+    def search(
+        self, query: np.ndarray, k: int = 10, n_probe: Optional[int] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Top-``k`` (ids, cosine scores), best first"""
+        query = _unit(np.asarray(query).reshape(-1))
+        with self._lock:
+            ranges = [
+                (a, b) for a, b in self._ranges(query, n_probe or self.n_probe) if b > a
+            ]
+            if not ranges:
+                return np.empty(0, dtype=object), np.empty(0, dtype=np.float32)
+            rows = np.concatenate([np.arange(a, b) for a, b in ranges])
+            scores = np.concatenate([self._vectors[a:b] @ query for a, b in ranges])
+            alive = self._alive[rows]
+            rows, scores = rows[alive], scores[alive]
+            k = min(k, len(rows))
+            if k <= 0:
+                return np.empty(0, dtype=object), np.empty(0, dtype=np.float32)
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top], kind="stable")]
+            return self._ids[rows[top]], scores[top]
+
+    # -----------------------------
+    # Persistence
+    # -----------------------------
+
+    def save(self, path: str, extra: Optional[Dict[str, np.ndarray]] = None) -> None:
+        """Write live vectors, list layout and ``extra`` arrays to ``path``"""
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp = f"{path}.tmp.npz"
+        with self._lock:
+            self._write(tmp, extra)
+            os.replace(tmp, path)
+
+    def _write(self, tmp: str, extra: Optional[Dict[str, np.ndarray]]) -> None:
+        self._rebuild_lists()
+        np.savez(
+            tmp,
+            vectors=self._vectors[: self._size],
+            ids=self._ids[: self._size].astype(str),
+            assign=self._assign[: self._size],
+            centroids=(
+                self.centroids
+                if self.trained
+                else np.zeros((0, self.dim), dtype=np.float32)
+            ),
+            params=np.array(
+                [
+                    self.n_lists or 0,
+                    self.n_probe,
+                    self.min_train,
+                    self.seed,
+                    self._trained_size,
+                ]
+            ),
+            **{f"extra_{k}": v for k, v in (extra or {}).items()},
+        )
+
+    @classmethod
+    def load(cls, path: str) -> Tuple["IVFIndex", Dict[str, np.ndarray]]:
+        with np.load(path, allow_pickle=False) as data:
+            n_lists, n_probe, min_train, seed, trained_size = (
+                int(v) for v in data["params"]
+            )
+            index = cls(
+                data["vectors"].shape[1], n_lists or None, n_probe, min_train, seed
+            )
+            index._vectors = data["vectors"].astype(np.float32)
+            index._ids = data["ids"].astype(object)
+            index._assign = data["assign"].astype(np.int32)
+            index._alive = np.ones(len(index._ids), dtype=bool)
+            index._size = len(index._ids)
+            index._trained_size = trained_size
+            if len(data["centroids"]):
+                index.centroids = data["centroids"]
+            index._rebuild_lists()
+            extra = {k[6:]: data[k] for k in data.files if k.startswith("extra_")}
+        return index, extra
+
+
+# -----------------------------
+# Client profile index
+# -----------------------------
+
+
+def _age_band(age: pd.Series) -> pd.Series:
+    decade = (pd.to_numeric(age, errors="coerce") // 10 * 10).astype("Int64")
+    return decade.astype(str).str.replace("<NA>", "unknown", regex=False)
+
+
+def client_profile_text(clients: pd.DataFrame) -> pd.Series:
+    """One descriptive sentence per client, used as the embedding input"""
+    frame = clients.reindex(columns=PROFILE_COLUMNS)
+    goals = (
+        frame["FINANCIAL_GOALS"]
+        .fillna("")
+        .astype(str)
+        .str.replace(r'[\[\]"]', "", regex=True)
+    )
+    text = (
+        frame["RISK_TOLERANCE"].fillna("").astype(str)
+        + " investor, age "
+        + frame["AGE"].fillna("").astype(str)
+        + " in their "
+        + _age_band(frame["AGE"])
+        + "s, goals "
+        + goals
+        + ", occupation "
+        + frame["OCCUPATION"].fillna("").astype(str)
+        + ", life event "
+        + frame["LIFE_EVENT"].fillna("none").astype(str)
+        + ", "
+        + frame["MARITAL_STATUS"].fillna("").astype(str)
+    )
+    text.index = clients.index
+    return text
+
+
+class ClientEmbeddingIndex:
+    """
+    CLIENTS profile embeddings behind an ``IVFIndex``.
+
+    ``upsert`` re-embeds only clients whose profile text hash changed, so a
+    refresh costs one embedding per edited client. The embedder is anything
+    with ``dim`` and ``embed(texts)``; a persisted index built with another
+    embedder is discarded on load. Upserts and saves hold a lock, so sessions
+    refreshing together embed each changed profile once.
+    """
+
+    def __init__(self, embedder=None, index: Optional[IVFIndex] = None):
+        self.embedder = embedder or HashingEmbedder()
+        self.index = index or IVFIndex(self.embedder.dim)
+        self._hashes: Dict[str, int] = {}
+        self.watermark: Optional[pd.Timestamp] = None
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    @property
+    def signature(self) -> str:
+        return f"{type(self.embedder).__name__}:{self.embedder.dim}:{getattr(self.embedder, 'model', '')}"
+
+    def upsert(self, clients: pd.DataFrame) -> int:
+        """Embed new or changed client profiles; returns how many were embedded"""
+        if clients.empty:
+            return 0
+        clients = clients.drop_duplicates(subset="CLIENT_ID", keep="last")
+        ids = clients["CLIENT_ID"].astype(str).to_numpy()
+        texts = client_profile_text(clients)
+        hashes = pd.util.hash_pandas_object(texts, index=False).to_numpy()
+        with self._lock:
+            changed = np.array(
+                [self._hashes.get(i) != h for i, h in zip(ids, hashes)], dtype=bool
+            )
+            if changed.any():
+                vectors = self.embedder.embed(texts[changed].tolist())
+                self.index.add(ids[changed], vectors)
+                self._hashes.update(zip(ids[changed], hashes[changed].tolist()))
+            if "LAST_UPDATE_TIMESTAMP" in clients:
+                latest = pd.to_datetime(clients["LAST_UPDATE_TIMESTAMP"]).max()
+                if pd.notna(latest) and (
+                    self.watermark is None or latest > self.watermark
+                ):
+                    self.watermark = latest
+        return int(changed.sum())
+
+    def _result(self, ids: np.ndarray, scores: np.ndarray) -> pd.DataFrame:
+        return pd.DataFrame({"CLIENT_ID": ids.astype(str), "SIMILARITY": scores})
+
+    def similar(self, text: str, k: int = 10) -> pd.DataFrame:
+        """CLIENT_ID / SIMILARITY of the ``k`` profiles closest to ``text``"""
+        return self._result(*self.index.search(self.embedder.embed([text])[0], k))
+
+    def similar_to_client(self, client_id: str, k: int = 10) -> pd.DataFrame:
+        """Nearest clients to an indexed client (excluding the client itself)"""
+        vector = self.index.vector(client_id)
+        if vector is None:
+            return self._result(np.empty(0, dtype=object), np.empty(0))
+        result = self._result(*self.index.search(vector, k + 1))
+        return result[result["CLIENT_ID"] != str(client_id)].head(k)
+
+    # -----------------------------
+    # Persistence
+    # -----------------------------
+
+    def save(self, path: str) -> None:
+        with self._lock:
+            ids = np.array(list(self._hashes), dtype=str)
+            self.index.save(
+                path,
+                extra={
+                    "hash_ids": ids,
+                    "hashes": np.array(list(self._hashes.values()), dtype=np.uint64),
+                    "signature": np.array([self.signature]),
+                    "watermark": np.array(
+                        [str(self.watermark) if self.watermark is not None else ""]
+                    ),
+                },
+            )
+
+    @classmethod
+    def load(cls, path: str, embedder=None) -> "ClientEmbeddingIndex":
+        """Persisted index if ``path`` holds one built by the same embedder"""
+        client_index = cls(embedder)
+        if not os.path.exists(path):
+            return client_index
+        index, extra = IVFIndex.load(path)
+        if str(extra.get("signature", [""])[0]) != client_index.signature:
+            return client_index
+        client_index.index = index
+        client_index._hashes = dict(
+            zip(extra["hash_ids"].tolist(), extra["hashes"].tolist())
+        )
+        watermark = str(extra["watermark"][0])
+        client_index.watermark = pd.Timestamp(watermark) if watermark else None
+        return client_index